@@ -0,0 +1 @@
+"""Outils partagés par les scripts d'analyse (main.py, new.py, intraday.py, mzrkrt.py)."""
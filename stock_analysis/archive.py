@@ -0,0 +1,371 @@
+"""
+Archive locale des barres minute (1m, 5m...), lue en mémoire mappée.
+
+Yahoo ne conserve que quelques semaines de barres minute : ce qui n'est pas
+archivé localement est perdu. L'archive range, par intervalle et par ticker, une
+colonne par champ dans un fichier binaire à largeur fixe (horodatage ns UTC en
+int64, cours en float32, volume en int64), plus un index des séances : pour
+chaque séance, la plage [debut, fin) de ses barres dans les colonnes et son heure
+d'ouverture.
+
+    <dossier>/<intervalle>/<ticker>/ts.i8, open.f4, high.f4, low.f4, close.f4, volume.i8
+                                    seances.idx, fuseau
+
+Une (ticker, séance, minute) se résout par une recherche dichotomique dans
+l'index puis dans les horodatages, et une séance ou une plage de séances est une
+tranche contiguë des colonnes : les études intraday sur plusieurs années et des
+centaines de tickers lisent les fichiers sans copie, sans passer par pandas.
+
+L'archive ne fait que des ajouts : append() écrit à la suite les séances
+clôturées postérieures à la dernière archivée, colonnes d'abord puis index (une
+écriture interrompue laisse des barres hors index, ignorées puis écrasées par
+l'ajout suivant). update() y verse chaque jour les séances servies par le cache
+de barres.
+
+Comme le cache de barres, l'archive garde les cours cotés (bruts) : un
+fractionnement ultérieur ne réécrit pas les séances archivées. Les lectures qui
+comparent des cours de séances différentes les ajustent : lookup(adjustments=...),
+ou AdjustmentFactors.adjust_panel() sur le panel complété par fill().
+"""
+import os
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.bars import TOLERANCE, _ns, select_bars
+from stock_analysis.cache import CACHE_DIR, RETENTION_INTRADAY, _to_date, market_today
+from stock_analysis.providers import COLONNES, INTERVALLES_JOURNALIERS, _minutes, get_provider
+from stock_analysis.sessions import EXCHANGES, MARKET_TZ, get_calendar
+
+# Colonne -> (fichier, type à largeur fixe)
+FICHIERS = {
+    "ts": ("ts.i8", "<i8"),
+    "Open": ("open.f4", "<f4"),
+    "High": ("high.f4", "<f4"),
+    "Low": ("low.f4", "<f4"),
+    "Close": ("close.f4", "<f4"),
+    "Volume": ("volume.i8", "<i8"),
+}
+
+# Une ligne par séance archivée : barres [debut, fin), ouverture en ns UTC
+INDEX = np.dtype([("seance", "<M8[D]"), ("debut", "<i8"), ("fin", "<i8"), ("ouverture", "<i8")])
+FICHIER_INDEX = "seances.idx"
+FICHIER_FUSEAU = "fuseau"
+
+# Jours par requête (Yahoo refuse plus de 7 jours de barres 1m à la fois)
+FENETRE_REQUETE = {"1m": 7}
+
+
+def _mapper(chemin, dtype):
+    """Fichier de valeurs `dtype` en mémoire mappée (lecture seule), vide s'il n'existe pas"""
+    dtype = np.dtype(dtype)
+    taille = os.path.getsize(chemin) // dtype.itemsize if os.path.exists(chemin) else 0
+    if taille == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(chemin, dtype=dtype, mode="r", shape=(taille,))
+
+
+def _ajouter(chemin, valeurs, position):
+    """Écrit `valeurs` dans `chemin` à partir de l'élément `position` (la suite est tronquée)"""
+    with open(chemin, "ab") as f:
+        f.truncate(position * valeurs.dtype.itemsize)
+        f.write(valeurs.tobytes())
+
+
+def _jours(dates):
+    return np.asarray(pd.to_datetime(dates), dtype="datetime64[D]")
+
+
+class MinuteArchive:
+    """Barres intraday d'un intervalle, en colonnes mappées en mémoire, par ticker"""
+
+    def __init__(self, interval="1m", root=None, provider=None):
+        if interval in INTERVALLES_JOURNALIERS:
+            raise ValueError(f"L'archive ne contient que des barres intraday (intervalle : {interval})")
+        if root is None:
+            provider = provider or get_provider()
+            # Un dossier par fournisseur, comme le cache de barres
+            root = os.path.join(CACHE_DIR, "archive" if provider.name == "yahoo" else f"archive-{provider.name}")
+        self.root = root
+        self.interval = interval
+        self.path = os.path.join(root, interval)
+        # Durée d'une barre en ns
+        self.step = _minutes(interval) * 60 * 10**9
+        self._ouverts = {}
+        self._verrou = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+    def _dossier(self, ticker):
+        return os.path.join(self.path, ticker)
+
+    def _lire(self, ticker):
+        """(index des séances, colonnes, fuseau) du ticker, mappés une fois puis gardés ouverts"""
+        with self._verrou:
+            if ticker not in self._ouverts:
+                dossier = self._dossier(ticker)
+                index = _mapper(os.path.join(dossier, FICHIER_INDEX), INDEX)
+                # Les barres au-delà de la dernière séance indexée sont ignorées
+                n = int(index["fin"][-1]) if len(index) else 0
+                colonnes = {
+                    colonne: _mapper(os.path.join(dossier, fichier), dtype)[:n]
+                    for colonne, (fichier, dtype) in FICHIERS.items()
+                }
+                chemin = os.path.join(dossier, FICHIER_FUSEAU)
+                tz = MARKET_TZ
+                if os.path.exists(chemin):
+                    with open(chemin, encoding="utf-8") as f:
+                        tz = f.read().strip() or MARKET_TZ
+                self._ouverts[ticker] = (index, colonnes, tz)
+            return self._ouverts[ticker]
+
+    def __contains__(self, ticker):
+        return len(self._lire(ticker)[0]) > 0
+
+    def tickers(self):
+        """Tickers ayant au moins une séance archivée"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(t for t in os.listdir(self.path) if t in self)
+
+    def sessions(self, ticker):
+        """Séances archivées du ticker (datetime64[D] triées)"""
+        return self._lire(ticker)[0]["seance"]
+
+    def columns(self, ticker, start=None, end=None):
+        """
+        Colonnes (ts, Open, High, Low, Close, Volume) des séances dans [start, end),
+        toutes par défaut : tranches des fichiers mappés, sans copie.
+        """
+        index, colonnes, _ = self._lire(ticker)
+        seances = index["seance"]
+        i = np.searchsorted(seances, _jours(start), side="left") if start is not None else 0
+        j = np.searchsorted(seances, _jours(end), side="left") if end is not None else len(seances)
+        if i >= j:
+            return {colonne: valeurs[:0] for colonne, valeurs in colonnes.items()}
+        tranche = slice(int(index["debut"][i]), int(index["fin"][j - 1]))
+        return {colonne: valeurs[tranche] for colonne, valeurs in colonnes.items()}
+
+    def session(self, ticker, day):
+        """Colonnes d'une séance (vides si elle n'est pas archivée)"""
+        jour = _jours(day)
+        return self.columns(ticker, jour, jour + np.timedelta64(1, "D"))
+
+    def locate(self, ticker, days, minutes):
+        """
+        Positions, dans les colonnes du ticker, des barres ouvertes `minutes` après
+        l'ouverture de chaque séance de `days` (-1 si séance ou barre absente).
+        """
+        index, colonnes, _ = self._lire(ticker)
+        jours = np.atleast_1d(_jours(days))
+        minutes = np.broadcast_to(np.asarray(minutes, dtype=np.int64), jours.shape)
+        positions = np.full(len(jours), -1, dtype=np.int64)
+        if not len(index):
+            return positions
+
+        k = np.minimum(np.searchsorted(index["seance"], jours, side="left"), len(index) - 1)
+        lignes = index[k]
+        cibles = lignes["ouverture"] + minutes * 60 * 10**9
+        trouvees = np.searchsorted(colonnes["ts"], cibles, side="left")
+        valides = (lignes["seance"] == jours) & (trouvees < lignes["fin"])
+        valides[valides] &= colonnes["ts"][trouvees[valides]] == cibles[valides]
+        positions[valides] = trouvees[valides]
+        return positions
+
+    def frame(self, ticker, start=None, end=None):
+        """Barres des séances dans [start, end) en DataFrame (même format que le cache de barres)"""
+        colonnes = self.columns(ticker, start, end)
+        return self._frame(colonnes, slice(None), self._lire(ticker)[2])
+
+    @staticmethod
+    def _frame(colonnes, lignes, tz):
+        index = pd.DatetimeIndex(
+            pd.to_datetime(np.asarray(colonnes["ts"][lignes]), unit="ns", utc=True), name="Datetime"
+        ).tz_convert(tz)
+        return pd.DataFrame({c: np.asarray(colonnes[c][lignes], dtype=float) for c in COLONNES}, index=index)
+
+    @metrics.timed("archive_lecture")
+    def lookup(self, tickers, timestamps, policy="nearest", tolerance=TOLERANCE, column="Close",
+               adjustments=None, as_of=None):
+        """
+        Même contrat que bars.lookup_bars(), servi directement par les fichiers
+        mappés : `prix` (NaN si aucune barre) et `horodatage` de la barre retenue.
+        Avec `adjustments` (corporate.AdjustmentFactors), les cours bruts sont
+        ajustés des événements survenus entre la séance de la barre et `as_of`.
+        """
+        tickers = np.asarray(tickers, dtype=object).astype(str)
+        cibles = _ns(timestamps)
+
+        prix = np.full(len(tickers), np.nan)
+        horodatages = np.full(len(tickers), np.iinfo(np.int64).min, dtype=np.int64)
+
+        uniques, inverse = np.unique(tickers, return_inverse=True)
+        ordre = np.argsort(inverse, kind="stable")
+        bornes = np.searchsorted(inverse[ordre], np.arange(len(uniques) + 1))
+        for k, ticker in enumerate(uniques):
+            _, colonnes, tz = self._lire(ticker)
+            if not len(colonnes["ts"]):
+                continue
+            lignes = ordre[bornes[k]:bornes[k + 1]]
+            positions = select_bars(colonnes["ts"], cibles[lignes], policy, tolerance)
+            trouvees = positions >= 0
+            valeurs = colonnes[column][positions[trouvees]].astype(float)
+            if adjustments is not None and trouvees.any():
+                # Séance de la barre : date locale de la place de cotation
+                seances = pd.to_datetime(colonnes["ts"][positions[trouvees]], unit="ns", utc=True) \
+                    .tz_convert(tz).tz_localize(None)
+                valeurs = valeurs * adjustments.factors(np.full(len(valeurs), ticker, dtype=object), seances, as_of)
+            prix[lignes[trouvees]] = valeurs
+            horodatages[lignes[trouvees]] = colonnes["ts"][positions[trouvees]]
+
+        return pd.DataFrame({
+            "prix": prix,
+            "horodatage": pd.to_datetime(horodatages, unit="ns", utc=True).tz_convert(get_calendar().tz),
+        })
+
+    def fill(self, panel):
+        """
+        Complète un PricePanel du même intervalle avec les séances archivées qui
+        lui manquent (séances que Yahoo ne conserve plus). Modifie et retourne `panel`.
+        """
+        if panel.interval != self.interval:
+            return panel
+        for ticker, hist in list(panel.frames.items()):
+            index, colonnes, tz = self._lire(ticker)
+            if not len(index):
+                continue
+            i, j = np.searchsorted(index["seance"], _jours([hist.attrs["debut"], hist.attrs["fin"]]), side="left")
+            seances = index[i:j]
+            if not hist.empty:
+                presentes = _jours(hist.index.tz_localize(None) if hist.index.tz is None
+                                   else hist.index.tz_convert(tz).tz_localize(None))
+                seances = seances[~np.isin(seances["seance"], presentes)]
+            if not len(seances):
+                continue
+
+            lignes = np.concatenate([np.arange(a, b) for a, b in zip(seances["debut"], seances["fin"])])
+            complement = self._frame(colonnes, lignes, tz)
+            if hist.index.tz is not None:
+                complement.index = complement.index.tz_convert(hist.index.tz)
+            complete = pd.concat([hist, complement]).sort_index() if not hist.empty else complement
+            complete.attrs.update(hist.attrs)
+            panel.frames[ticker] = complete
+            metrics.count("archive_seances", n=len(seances), interval=self.interval)
+        return panel
+
+    # ------------------------------------------------------------------
+    # Ajout
+    # ------------------------------------------------------------------
+    def _ouvertures(self, seances, premieres, tz):
+        """Heure d'ouverture (ns UTC) de chaque séance : calendrier de la place, sinon première barre"""
+        ouvertures = premieres - premieres % self.step
+        if tz in EXCHANGES:
+            calendrier = get_calendar(tz)
+            k = np.minimum(np.searchsorted(calendrier.sessions, seances), len(calendrier) - 1)
+            connues = calendrier.sessions[k] == seances
+            ouvertures[connues] = calendrier.opens[k[connues]]
+        return ouvertures
+
+    def append(self, ticker, hist):
+        """
+        Ajoute les séances clôturées de `hist` (barres de l'intervalle, tz-aware,
+        séances complètes) postérieures à la dernière archivée. Retourne le nombre
+        de séances ajoutées.
+        """
+        if hist.empty:
+            return 0
+        tz = str(hist.index.tz) if hist.index.tz is not None else MARKET_TZ
+        horodatages = hist.index if hist.index.tz is not None else hist.index.tz_localize(tz)
+        ts = horodatages.tz_convert("UTC").as_unit("ns").asi8
+        jours = _jours(horodatages.tz_convert(tz).tz_localize(None))
+
+        with self._verrou:
+            index, _, _ = self._lire(ticker)
+            # Seules les séances clôturées sont figées
+            gardees = jours < np.datetime64(market_today(tz), "D")
+            if len(index):
+                gardees &= jours > index["seance"][-1]
+            if not gardees.any():
+                return 0
+            lignes = np.flatnonzero(gardees)
+            lignes = lignes[np.argsort(ts[lignes], kind="stable")]
+            # Une barre par horodatage (la dernière reçue l'emporte)
+            _, dernieres = np.unique(ts[lignes][::-1], return_index=True)
+            lignes = lignes[::-1][dernieres]
+
+            seances, debuts = np.unique(jours[lignes], return_index=True)
+            n = int(index["fin"][-1]) if len(index) else 0
+            nouvelles = np.empty(len(seances), dtype=INDEX)
+            nouvelles["seance"] = seances
+            nouvelles["debut"] = n + debuts
+            nouvelles["fin"] = n + np.append(debuts[1:], len(lignes))
+            nouvelles["ouverture"] = self._ouvertures(seances, ts[lignes][debuts], tz)
+
+            valeurs = {"ts": ts[lignes]}
+            for colonne in COLONNES:
+                serie = hist[colonne].to_numpy(dtype=float)[lignes] if colonne in hist else np.full(len(lignes), np.nan)
+                valeurs[colonne] = np.round(np.nan_to_num(serie)) if colonne == "Volume" else serie
+
+            # Fichiers fermés avant l'écriture, rouverts à la lecture suivante
+            self._ouverts.pop(ticker, None)
+            dossier = self._dossier(ticker)
+            os.makedirs(dossier, exist_ok=True)
+            with metrics.timer("archive_ecriture"):
+                for colonne, (fichier, dtype) in FICHIERS.items():
+                    _ajouter(os.path.join(dossier, fichier), valeurs[colonne].astype(dtype), n)
+                # L'index en dernier : il valide les barres écrites
+                _ajouter(os.path.join(dossier, FICHIER_INDEX), nouvelles, len(index))
+                with open(os.path.join(dossier, FICHIER_FUSEAU), "w", encoding="utf-8") as f:
+                    f.write(tz)
+        return len(seances)
+
+    @metrics.timed("archive_ajout")
+    def update(self, tickers, since=None):
+        """
+        Verse dans l'archive les séances clôturées de `tickers` postérieures à la
+        dernière archivée, depuis `since` au plus tôt (par défaut, la profondeur
+        conservée par Yahoo). Barres obtenues par le cache de barres, par fenêtres
+        de FENETRE_REQUETE jours. Retourne une Series ticker -> séances ajoutées.
+        """
+        from stock_analysis.panel import load_panel
+
+        aujourd_hui = market_today()
+        plancher = aujourd_hui - timedelta(days=RETENTION_INTRADAY.get(self.interval, 30) - 1)
+        if since is not None:
+            plancher = max(plancher, _to_date(since))
+        departs = {}
+        for ticker in dict.fromkeys(tickers):
+            seances = self.sessions(ticker)
+            suivante = (pd.Timestamp(seances[-1]).date() + timedelta(days=1)) if len(seances) else plancher
+            departs[ticker] = max(suivante, plancher)
+
+        ajoutees = pd.Series(0, index=pd.Index(list(departs), name="ticker"), dtype=int)
+        fenetre = timedelta(days=FENETRE_REQUETE.get(self.interval, RETENTION_INTRADAY.get(self.interval, 60)))
+        debut = min(departs.values(), default=aujourd_hui)
+        # Fenêtres dans l'ordre chronologique : l'archive ne fait que des ajouts
+        while debut < aujourd_hui:
+            fin = min(debut + fenetre, aujourd_hui)
+            concernes = [t for t, depart in departs.items() if depart < fin]
+            if concernes:
+                panel = load_panel(concernes, debut, fin, self.interval)
+                for ticker in concernes:
+                    if ticker in panel.frames:
+                        ajoutees[ticker] += self.append(ticker, panel.frames[ticker])
+            debut = fin
+        return ajoutees
+
+
+_archives = {}
+_verrou_archives = threading.Lock()
+
+
+def get_archive(interval="1m"):
+    """Archive partagée d'un intervalle (créée au premier appel)"""
+    with _verrou_archives:
+        if interval not in _archives:
+            _archives[interval] = MinuteArchive(interval)
+        return _archives[interval]
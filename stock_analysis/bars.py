@@ -0,0 +1,126 @@
+"""
+Sélection de barres intraday par recherche dichotomique.
+
+Les horodatages d'un historique sont triés : la barre la plus proche (ou la
+précédente / la suivante) d'une heure cible se trouve par np.searchsorted, sans
+boucle Python. lookup_bars() traite d'un coup un lot de requêtes
+(ticker, horodatage), en ne bouclant que sur les tickers distincts.
+"""
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.sessions import get_calendar
+
+POLITIQUES = ("nearest", "previous", "next")
+
+# Écart maximal entre la barre retenue et l'heure cible
+TOLERANCE = pd.Timedelta(hours=1)
+
+
+def session_targets(dates, hours_after_open=None, at=None, calendar=None, timezones=None):
+    """
+    Horodatages cibles (tz-aware) pour chaque date, ramenée à sa séance :
+    soit ouverture + `hours_after_open` heures, soit heure locale `at` ("11:30").
+    `timezones` (un fuseau de bourse par ligne) applique à chaque date le
+    calendrier et les horaires de sa place ; les cibles sont alors rendues à
+    l'heure de New York.
+    """
+    if hours_after_open is None and at is None:
+        raise ValueError("Indiquer hours_after_open ou at")
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    if timezones is not None:
+        fuseaux = np.asarray(timezones, dtype=object)
+        cibles = np.empty(len(dates), dtype=np.int64)
+        for tz in pd.unique(fuseaux):
+            lignes = fuseaux == tz
+            cibles[lignes] = _ns(session_targets(dates[lignes], hours_after_open, at, get_calendar(tz)))
+        return pd.to_datetime(cibles, unit="ns", utc=True).tz_convert(get_calendar().tz)
+
+    calendar = calendar or get_calendar()
+    seances = calendar.next_session(dates)
+    if at is not None:
+        heure = pd.Timedelta(f"{at}:00") if isinstance(at, str) else pd.Timedelta(at)
+        return (seances + heure).tz_localize(calendar.tz)
+    ouvertures, _ = calendar.session_bounds(seances)
+    return ouvertures + pd.Timedelta(hours=hours_after_open)
+
+
+def select_bars(index, targets, policy="nearest", tolerance=TOLERANCE):
+    """
+    Positions, dans `index` (horodatages triés, int64 ns ou DatetimeIndex), des
+    barres retenues pour chaque cible ; -1 si aucune barre (ou hors tolérance).
+    Politiques : "nearest" (à égalité, la barre précédente), "previous", "next".
+    """
+    if policy not in POLITIQUES:
+        raise ValueError(f"Politique inconnue : {policy} (attendu : {', '.join(POLITIQUES)})")
+    index = _ns(index)
+    targets = _ns(targets)
+    n = len(index)
+    if n == 0:
+        return np.full(len(targets), -1, dtype=np.int64)
+
+    suivante = np.searchsorted(index, targets, side="left")
+    suivante = np.where(suivante < n, suivante, -1)
+    precedente = np.searchsorted(index, targets, side="right") - 1
+
+    if policy == "previous":
+        positions = precedente
+    elif policy == "next":
+        positions = suivante
+    else:
+        ecart_prec = np.where(precedente >= 0, targets - index[np.maximum(precedente, 0)], np.iinfo(np.int64).max)
+        ecart_suiv = np.where(suivante >= 0, index[np.maximum(suivante, 0)] - targets, np.iinfo(np.int64).max)
+        positions = np.where(ecart_prec <= ecart_suiv, precedente, suivante)
+
+    if tolerance is not None:
+        ecart = np.abs(index[np.maximum(positions, 0)] - targets)
+        positions = np.where(ecart <= pd.Timedelta(tolerance).value, positions, -1)
+    return positions.astype(np.int64)
+
+
+@metrics.timed("barres_intraday")
+def lookup_bars(frames, tickers, timestamps, policy="nearest", tolerance=TOLERANCE, column="Close"):
+    """
+    Résout un lot de requêtes (ticker, horodatage) sur des historiques intraday
+    (dict ticker -> DataFrame ou PricePanel). Retourne un DataFrame aligné sur
+    l'entrée avec `prix` (NaN si aucune barre) et `horodatage` de la barre.
+    """
+    frames = frames.frames if hasattr(frames, "frames") else frames
+    tickers = np.asarray(tickers, dtype=object).astype(str)
+    cibles = _ns(timestamps)
+
+    prix = np.full(len(tickers), np.nan)
+    horodatages = np.full(len(tickers), np.iinfo(np.int64).min, dtype=np.int64)
+
+    # Requêtes regroupées par ticker : une recherche vectorisée par ticker distinct
+    uniques, inverse = np.unique(tickers, return_inverse=True)
+    ordre = np.argsort(inverse, kind="stable")
+    bornes = np.searchsorted(inverse[ordre], np.arange(len(uniques) + 1))
+    for k, ticker in enumerate(uniques):
+        hist = frames.get(ticker)
+        if hist is None or hist.empty:
+            continue
+        lignes = ordre[bornes[k]:bornes[k + 1]]
+        index = _ns(hist.index)
+        positions = select_bars(index, cibles[lignes], policy, tolerance)
+        trouvees = positions >= 0
+        valeurs = hist[column].to_numpy(dtype=float)
+        prix[lignes[trouvees]] = valeurs[positions[trouvees]]
+        horodatages[lignes[trouvees]] = index[positions[trouvees]]
+
+    return pd.DataFrame({
+        "prix": prix,
+        "horodatage": pd.to_datetime(horodatages, unit="ns", utc=True).tz_convert(get_calendar().tz),
+    })
+
+
+@metrics.timed("conversion_fuseau")
+def _ns(horodatages):
+    """Horodatages (tz-aware, Series, DatetimeIndex ou int64) en ndarray int64 ns UTC"""
+    if isinstance(horodatages, np.ndarray) and horodatages.dtype == np.int64:
+        return horodatages
+    index = pd.DatetimeIndex(horodatages)
+    if index.tz is None:
+        index = index.tz_localize(get_calendar().tz)
+    return index.tz_convert("UTC").as_unit("ns").asi8
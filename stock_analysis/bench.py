@@ -0,0 +1,223 @@
+"""
+Banc d'essai du pipeline de calcul, sur données synthétiques (aucun réseau).
+
+Les transactions sont générées aléatoirement sur un univers de tickers dont les
+cours viennent du SyntheticProvider ; les panels sont construits en mémoire,
+sans passer par le cache SQLite. Chaque étape est chronométrée séparément à
+1e2…1e6 transactions (meilleur de `--repeat` passes), puis rejouée une fois
+sous tracemalloc pour mesurer son pic mémoire :
+
+- table_prix        : construction de la table longue des cours (price_table) ;
+- resolution_prix   : prix d'achat par (ticker, date) (resolve_prices) ;
+- barres_intraday   : barre 5 minutes 2h après l'ouverture (lookup_bars) ;
+- prix_execution    : VWAP ±5 min et glissement sur les barres 5 minutes (execution_prices) ;
+- pnl_realise       : allers-retours (compute_realized + portfolio_totals) ;
+- pnl_latent        : positions conservées (compute_unrealized + ticker_totals) ;
+- serie_risque      : série quotidienne et indicateurs de risque (RiskTracker) ;
+- rapport_texte     : lignes du tableau détaillé, formatées comme les scripts ;
+- rapport_csv       : export CSV (en mémoire).
+
+Les résultats sont écrits en JSON ; avec `--baseline`, chaque mesure est comparée
+à une référence et le code de sortie vaut 1 en cas de régression.
+
+Usage :
+    python -m stock_analysis bench --sizes 1e2,1e3,1e4 --output bench.json
+    python -m stock_analysis bench --baseline bench.json --tolerance 0.25
+"""
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.bars import lookup_bars, session_targets
+from stock_analysis.execution import BarIndex, execution_prices
+from stock_analysis.panel import PricePanel
+from stock_analysis.pnl import (
+    compute_realized,
+    compute_unrealized,
+    portfolio_totals,
+    price_table,
+    resolve_prices,
+    ticker_totals,
+)
+from stock_analysis.providers import SyntheticProvider
+from stock_analysis.risk import RiskTracker, close_matrix
+from stock_analysis.sessions import get_calendar
+
+TAILLES = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Tolérance par défaut avant de signaler une régression (+25 % de temps)
+TOLERANCE = 0.25
+# Écart absolu minimal (secondes) pour parler de régression : ignore le bruit des petites tailles
+ECART_MINIMAL = 0.005
+
+
+class Fixture:
+    """Univers synthétique : panels quotidien et 5 minutes, transactions aléatoires"""
+
+    def __init__(self, n_tickers=100, n_seances=60, fin="2025-10-31", seed=0):
+        calendrier = get_calendar()
+        fin = calendrier.previous_session(fin)
+        seances = calendrier.sessions_in_range(fin - pd.Timedelta(days=3 * n_seances), fin + pd.Timedelta(days=1))
+        self.seances = seances[-n_seances:]
+        self.evaluation = self.seances[-1]
+        self.tickers = [f"T{i:04d}" for i in range(n_tickers)]
+        self.seed = seed
+
+        fournisseur = SyntheticProvider(seed=seed)
+        debut, borne = self.seances[0], self.evaluation + pd.Timedelta(days=1)
+        self.panel = PricePanel({t: fournisseur.history(t, debut, borne) for t in self.tickers})
+        # Barres intraday sur les seules séances d'achat (première moitié de la fenêtre)
+        self.panel_5m = PricePanel(
+            {t: fournisseur.history(t, debut, self.seances[n_seances // 2], "5m") for t in self.tickers},
+            interval="5m",
+        )
+
+    def trades(self, n):
+        """n allers-retours : achat dans la première moitié de la fenêtre, vente après"""
+        rng = np.random.default_rng([self.seed, n])
+        moitie = len(self.seances) // 2
+        achat = rng.integers(0, moitie, n)
+        vente = achat + rng.integers(0, moitie, n)
+        return pd.DataFrame({
+            "ticker": np.asarray(self.tickers, dtype=object)[rng.integers(0, len(self.tickers), n)],
+            "date_achat": self.seances[achat].strftime("%Y-%m-%d"),
+            "date_vente": self.seances[vente].strftime("%Y-%m-%d"),
+            "montant": 1000.0,
+        })
+
+
+def _etapes(fixture, trades):
+    """Étapes mesurées : nom -> callable sans argument"""
+    prix = price_table(fixture.panel)
+    realise = compute_realized(trades, prix)
+    latent = compute_unrealized(trades.drop(columns="date_vente"), prix, fixture.evaluation)
+    clotures = close_matrix(fixture.panel)
+    cibles = session_targets(trades["date_achat"], hours_after_open=2)
+    barres = BarIndex(fixture.panel_5m)
+
+    def serie_risque():
+        suivi = RiskTracker()
+        suivi.update(realise, clotures)
+        return suivi.series(), suivi.contributions()
+
+    def rapport_texte():
+        lignes = [
+            f"{i}. {t.ticker} {t.date_achat} {t.prix_achat:.2f}$ -> {t.date_vente} {t.prix_vente:.2f}$ "
+            f"{t.gain:+.2f}€ ({t.pourcentage:+.2f}%)"
+            for i, t in enumerate(realise.itertuples(index=False), 1)
+        ]
+        return "\n".join(lignes)
+
+    return {
+        "table_prix": lambda: price_table(fixture.panel),
+        "resolution_prix": lambda: resolve_prices(trades["ticker"], trades["date_achat"], prix),
+        "barres_intraday": lambda: lookup_bars(
+            fixture.panel_5m, trades["ticker"], session_targets(trades["date_achat"], hours_after_open=2)
+        ),
+        "prix_execution": lambda: execution_prices(
+            barres, trades["ticker"], cibles, "vwap", quantities=trades["montant"] / 100.0, sides=np.ones(len(trades))
+        ),
+        "pnl_realise": lambda: portfolio_totals(compute_realized(trades, prix), valeur="valeur_vente"),
+        "pnl_latent": lambda: (
+            ticker_totals(compute_unrealized(trades.drop(columns="date_vente"), prix, fixture.evaluation)),
+            portfolio_totals(latent),
+        ),
+        "serie_risque": serie_risque,
+        "rapport_texte": rapport_texte,
+        "rapport_csv": lambda: realise.to_csv(io.StringIO(), index=False),
+    }
+
+
+def _mesurer(fn, repeat):
+    """(meilleur temps en secondes, pic mémoire en octets)"""
+    temps = []
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        fn()
+        temps.append(time.perf_counter() - debut)
+    tracemalloc.start()
+    try:
+        fn()
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(temps), pic
+
+
+def run_bench(sizes=TAILLES, repeat=3, n_tickers=100, stages=None, verbose=True):
+    """Exécute le banc d'essai ; retourne un DataFrame (une ligne par étape × taille)"""
+    fixture = Fixture(n_tickers=n_tickers)
+    resultats = []
+    for n in sizes:
+        trades = fixture.trades(int(n))
+        for etape, fn in _etapes(fixture, trades).items():
+            if stages and etape not in stages:
+                continue
+            secondes, pic = _mesurer(fn, repeat)
+            resultats.append({
+                "etape": etape,
+                "n": int(n),
+                "secondes": secondes,
+                "us_par_trade": secondes / n * 1e6,
+                "trades_par_seconde": n / secondes if secondes > 0 else float("inf"),
+                "pic_memoire_mo": pic / 2**20,
+            })
+            if verbose:
+                r = resultats[-1]
+                print(f"   {etape:<16} n={int(n):>9,}  {secondes * 1000:>10.2f} ms  "
+                      f"{r['us_par_trade']:>8.2f} µs/trade  {r['pic_memoire_mo']:>8.1f} Mo")
+    return pd.DataFrame(resultats)
+
+
+def environment():
+    """Description de la machine et des versions, jointe aux résultats"""
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "systeme": platform.platform(),
+    }
+
+
+def save_results(resultats, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environnement": environment(), "resultats": resultats.to_dict("records")}, f, indent=1)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return pd.DataFrame(json.load(f)["resultats"])
+
+
+def compare(resultats, reference, tolerance=TOLERANCE):
+    """
+    Compare les temps à une référence (mêmes étape et taille) : ajoute `ratio`
+    (temps / temps de référence) et `regression` (ratio > 1 + tolerance, et
+    au moins ECART_MINIMAL secondes de plus).
+    """
+    comparaison = resultats.merge(
+        reference[["etape", "n", "secondes"]], on=["etape", "n"], how="left", suffixes=("", "_reference")
+    )
+    comparaison["ratio"] = comparaison["secondes"] / comparaison["secondes_reference"]
+    ecart = comparaison["secondes"] - comparaison["secondes_reference"]
+    comparaison["regression"] = (comparaison["ratio"] > 1 + tolerance) & (ecart > ECART_MINIMAL)
+    return comparaison
+
+
+def main(argv=None):
+    """Équivaut à `python -m stock_analysis bench` (voir cli)"""
+    from stock_analysis.cli import main as cli_main
+    return cli_main(["bench", *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+Cache local des barres OHLCV (SQLite), partagé par main.py, new.py et intraday.py.
+
+Chaque (ticker, intervalle) garde la liste des plages de dates déjà téléchargées :
+seules les plages manquantes sont demandées à Yahoo. Une séance clôturée n'est
+jamais retéléchargée ; la séance du jour (encore « mutable ») n'est gardée que
+pendant TTL_SEANCE_EN_COURS secondes. Séances et « aujourd'hui » sont ceux de la
+place de cotation du ticker (fuseau mémorisé avec ses barres, voir sessions.py).
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.fetch import get_pool
+from stock_analysis.providers import get_provider
+from stock_analysis.sessions import exchange_timezone, get_calendar
+
+CACHE_DIR = os.environ.get(
+    "STOCK_ANALYSIS_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "stock-analysis"),
+)
+
+# Fuseau par défaut d'un ticker dont les barres n'ont jamais été reçues (NYSE/NASDAQ)
+MARKET_TZ = "America/New_York"
+
+# Durée de validité (secondes) des barres de la séance en cours
+TTL_SEANCE_EN_COURS = int(os.environ.get("STOCK_ANALYSIS_TTL", 15 * 60))
+
+# Profondeur (jours) des données intraday conservées par Yahoo : au-delà,
+# une réponse vide est définitive et peut être mise en cache
+RETENTION_INTRADAY = {"1m": 30, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "60m": 730, "1h": 730, "90m": 60}
+
+COLONNES = ["Open", "High", "Low", "Close", "Volume"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS barres (
+    ticker TEXT NOT NULL,
+    intervalle TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, intervalle, ts)
+);
+CREATE TABLE IF NOT EXISTS couverture (
+    ticker TEXT NOT NULL,
+    intervalle TEXT NOT NULL,
+    debut TEXT NOT NULL,
+    fin TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seance_en_cours (
+    ticker TEXT NOT NULL,
+    intervalle TEXT NOT NULL,
+    jour TEXT NOT NULL,
+    telecharge_le REAL NOT NULL,
+    PRIMARY KEY (ticker, intervalle)
+);
+CREATE TABLE IF NOT EXISTS fuseaux (
+    ticker TEXT PRIMARY KEY,
+    tz TEXT NOT NULL
+);
+"""
+
+
+def _to_date(valeur):
+    """Convertit une date (str 'YYYY-MM-DD', datetime, Timestamp) en datetime.date"""
+    if isinstance(valeur, datetime):
+        return valeur.date()
+    if isinstance(valeur, date):
+        return valeur
+    return pd.Timestamp(valeur).date()
+
+
+def market_today(tz=MARKET_TZ):
+    """Date de la séance en cours sur la place du fuseau `tz` (New York par défaut)"""
+    return pd.Timestamp.now(tz=tz).date()
+
+
+def _soustraire(debut, fin, plages):
+    """Retourne les sous-plages de [debut, fin) non couvertes par `plages` (triées)"""
+    manquantes = []
+    curseur = debut
+    for a, b in plages:
+        if b <= curseur:
+            continue
+        if a >= fin:
+            break
+        if a > curseur:
+            manquantes.append((curseur, min(a, fin)))
+        curseur = max(curseur, b)
+        if curseur >= fin:
+            break
+    if curseur < fin:
+        manquantes.append((curseur, fin))
+    return manquantes
+
+
+def _fusionner(plages):
+    """Fusionne les plages qui se chevauchent ou se touchent"""
+    fusion = []
+    for a, b in sorted(plages):
+        if fusion and a <= fusion[-1][1]:
+            fusion[-1] = (fusion[-1][0], max(fusion[-1][1], b))
+        else:
+            fusion.append((a, b))
+    return fusion
+
+
+class BarCache:
+    """Cache persistant des barres par ticker et par intervalle"""
+
+    def __init__(self, path=None, ttl=TTL_SEANCE_EN_COURS, provider=None):
+        self.provider = provider or get_provider()
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # Un fichier par fournisseur : les données rejouées ou synthétiques ne se mélangent pas à Yahoo
+            # (cours bruts pour Yahoo : l'ancien fichier barres.sqlite contenait des cours ajustés)
+            nom = "barres-brutes.sqlite" if self.provider.name == "yahoo" else f"barres-{self.provider.name}.sqlite"
+            path = os.path.join(CACHE_DIR, nom)
+        self.path = path
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        # La connexion est partagée entre les threads du pool de requêtes
+        self._verrou = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # API publique
+    # ------------------------------------------------------------------
+    def history(self, ticker, start, end, interval="1d"):
+        """
+        Équivalent de yf.Ticker(ticker).history(start, end, interval) :
+        `end` est exclusif, l'index est tz-aware dans le fuseau de la bourse.
+        """
+        debut = _to_date(start)
+        fin = _to_date(end)
+        manquantes = self.missing_ranges(ticker, debut, fin, interval)
+        metrics.count("cache_barres", resultat="miss" if manquantes else "hit", interval=interval)
+        for a, b in manquantes:
+            self._telecharger(ticker, a, b, interval)
+        return self.read(ticker, debut, fin, interval)
+
+    def missing_ranges(self, ticker, start, end, interval="1d"):
+        """
+        Plages [a, b) à télécharger pour couvrir [start, end), réduites aux
+        séances de la place de cotation du ticker (ValueError si elle n'a pas
+        de calendrier connu).
+        """
+        debut = _to_date(start)
+        tz = exchange_timezone(ticker, self.timezone(ticker))
+        calendrier = get_calendar(tz)
+        aujourd_hui = market_today(tz)
+        # Les jours futurs n'ont pas encore de données : inutile de les demander
+        fin = min(_to_date(end), aujourd_hui + timedelta(days=1))
+        if debut >= fin:
+            return []
+
+        with self._verrou:
+            manquantes = _soustraire(debut, fin, self._couverture(ticker, interval))
+            fraiche = self._seance_fraiche(ticker, interval, aujourd_hui)
+
+        # La séance du jour reste valable pendant le TTL
+        if fraiche:
+            demain = aujourd_hui + timedelta(days=1)
+            decoupees = []
+            for a, b in manquantes:
+                decoupees.extend(p for p in [(a, min(b, aujourd_hui)), (max(a, demain), b)] if p[0] < p[1])
+            manquantes = decoupees
+
+        # On ne demande que des séances : plages réduites à leur première et dernière séance
+        ajustees = []
+        for a, b in manquantes:
+            seances = calendrier.sessions_in_range(a, b)
+            if len(seances):
+                ajustees.append((seances[0].date(), seances[-1].date() + timedelta(days=1)))
+        return ajustees
+
+    def timezone(self, ticker):
+        """Fuseau de la bourse du ticker, mémorisé avec ses barres (New York s'il n'en a aucune)"""
+        with self._verrou:
+            ligne = self._conn.execute("SELECT tz FROM fuseaux WHERE ticker = ?", (ticker,)).fetchone()
+        return ligne[0] if ligne else MARKET_TZ
+
+    def tickers(self, interval="1d"):
+        """Tickers ayant des barres en cache pour cet intervalle"""
+        with self._verrou:
+            lignes = self._conn.execute(
+                "SELECT DISTINCT ticker FROM couverture WHERE intervalle = ? ORDER BY ticker", (interval,)
+            ).fetchall()
+        return [l[0] for l in lignes]
+
+    def clear(self, ticker=None):
+        """Vide le cache (entièrement, ou pour un ticker)"""
+        with self._verrou, self._conn:
+            for table in ("barres", "couverture", "seance_en_cours"):
+                if ticker is None:
+                    self._conn.execute(f"DELETE FROM {table}")
+                else:
+                    self._conn.execute(f"DELETE FROM {table} WHERE ticker = ?", (ticker,))
+
+    # ------------------------------------------------------------------
+    # Téléchargement et stockage
+    # ------------------------------------------------------------------
+    def _telecharger(self, ticker, debut, fin, interval):
+        hist = get_pool().run(
+            ("history", ticker, interval, debut, fin),
+            self.provider.history, ticker, debut, fin, interval,
+        )
+        self.store(ticker, hist, debut, fin, interval)
+
+    def store(self, ticker, hist, debut, fin, interval="1d"):
+        """Enregistre des barres téléchargées pour [debut, fin) et met à jour la couverture"""
+        debut, fin = _to_date(debut), _to_date(fin)
+        fuseau = str(hist.index.tz) if not hist.empty and hist.index.tz is not None else self.timezone(ticker)
+        calendrier = get_calendar(exchange_timezone(ticker, fuseau))
+        aujourd_hui = market_today(calendrier.tz)
+        if not hist.empty and self.provider.split_adjusted:
+            hist = self._cours_bruts(ticker, hist)
+
+        with metrics.timer("cache_ecriture"), self._verrou, self._conn:
+            if not hist.empty:
+                tz = str(hist.index.tz) if hist.index.tz is not None else MARKET_TZ
+                self._conn.execute("INSERT OR REPLACE INTO fuseaux VALUES (?, ?)", (ticker, tz))
+                index = hist.index if hist.index.tz is not None else hist.index.tz_localize(tz)
+                ts = index.tz_convert("UTC").as_unit("s").asi8
+                valeurs = hist.reindex(columns=COLONNES).to_numpy(dtype=float)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO barres VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(ticker, interval, int(t), *map(float, v)) for t, v in zip(ts, valeurs)],
+                )
+            elif not self._vide_definitif(debut, fin, interval, aujourd_hui, calendrier):
+                # Réponse vide sur des jours ouvrés : possible erreur réseau, on ne mémorise rien
+                return
+
+            # Seuls les jours strictement passés sont figés
+            fin_figee = min(fin, aujourd_hui)
+            if debut < fin_figee:
+                self._ajouter_couverture(ticker, interval, debut, fin_figee)
+            if fin > aujourd_hui:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO seance_en_cours VALUES (?, ?, ?, ?)",
+                    (ticker, interval, aujourd_hui.isoformat(), time.time()),
+                )
+
+    def _cours_bruts(self, ticker, hist):
+        """
+        Barres ramenées aux cours cotés : le fournisseur les a ajustées des
+        fractionnements survenus depuis, connus par le référentiel d'événements
+        (rafraîchi si besoin avant la conversion).
+        """
+        from stock_analysis.corporate import AdjustmentFactors, get_corporate_store
+
+        facteurs = AdjustmentFactors(get_corporate_store().lookup([ticker], background=False))
+        if ticker not in facteurs:
+            return hist
+        ratios = facteurs.split_ratios(np.full(len(hist), ticker, dtype=object), hist.index)
+        bruts = hist.copy()
+        for colonne in ("Open", "High", "Low", "Close"):
+            if colonne in bruts:
+                bruts[colonne] = bruts[colonne].to_numpy(dtype=float) * ratios
+        if "Volume" in bruts:
+            bruts["Volume"] = bruts["Volume"].to_numpy(dtype=float) / ratios
+        return bruts
+
+    @staticmethod
+    def _vide_definitif(debut, fin, interval, aujourd_hui, calendrier):
+        """Une réponse vide est fiable si la plage ne contient aucune séance
+        ou si elle dépasse la profondeur intraday conservée par Yahoo"""
+        if len(calendrier.sessions_in_range(debut, fin)) == 0:
+            return True
+        retention = RETENTION_INTRADAY.get(interval)
+        return retention is not None and fin < aujourd_hui - timedelta(days=retention)
+
+    def _ajouter_couverture(self, ticker, interval, debut, fin):
+        plages = _fusionner(self._couverture(ticker, interval) + [(debut, fin)])
+        self._conn.execute("DELETE FROM couverture WHERE ticker = ? AND intervalle = ?", (ticker, interval))
+        self._conn.executemany(
+            "INSERT INTO couverture VALUES (?, ?, ?, ?)",
+            [(ticker, interval, a.isoformat(), b.isoformat()) for a, b in plages],
+        )
+
+    def _couverture(self, ticker, interval):
+        lignes = self._conn.execute(
+            "SELECT debut, fin FROM couverture WHERE ticker = ? AND intervalle = ? ORDER BY debut",
+            (ticker, interval),
+        ).fetchall()
+        return [(date.fromisoformat(a), date.fromisoformat(b)) for a, b in lignes]
+
+    def _seance_fraiche(self, ticker, interval, aujourd_hui):
+        ligne = self._conn.execute(
+            "SELECT jour, telecharge_le FROM seance_en_cours WHERE ticker = ? AND intervalle = ?",
+            (ticker, interval),
+        ).fetchone()
+        return (
+            ligne is not None
+            and ligne[0] == aujourd_hui.isoformat()
+            and time.time() - ligne[1] < self.ttl
+        )
+
+    def read(self, ticker, start, end, interval="1d"):
+        """Lit les barres en cache sur [start, end) sans rien télécharger"""
+        debut, fin = _to_date(start), _to_date(end)
+        with metrics.timer("cache_lecture"), self._verrou:
+            tz = self.timezone(ticker)
+            borne_debut = pd.Timestamp(debut).tz_localize(tz).tz_convert("UTC").value // 10**9
+            borne_fin = pd.Timestamp(fin).tz_localize(tz).tz_convert("UTC").value // 10**9
+            lignes = self._conn.execute(
+                "SELECT ts, open, high, low, close, volume FROM barres "
+                "WHERE ticker = ? AND intervalle = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                (ticker, interval, borne_debut, borne_fin),
+            ).fetchall()
+
+        nom_index = "Date" if interval.endswith(("d", "wk", "mo")) else "Datetime"
+        index = pd.DatetimeIndex(
+            pd.to_datetime([l[0] for l in lignes], unit="s", utc=True), name=nom_index
+        ).tz_convert(tz)
+        return pd.DataFrame([l[1:] for l in lignes], index=index, columns=COLONNES, dtype=float)
+
+    def read_many(self, tickers, start, end, interval="1d", chunk_size=500):
+        """
+        Barres en cache de plusieurs tickers sur [start, end), sans rien télécharger,
+        en une requête par paquet de tickers plutôt qu'un DataFrame par ticker.
+        Retourne (DataFrame long ticker, ts (ns UTC), Open... Volume, trié par
+        ticker puis horodatage ; Series ticker -> fuseau de la bourse).
+        """
+        debut, fin = _to_date(start), _to_date(end)
+        tickers = list(dict.fromkeys(tickers))
+        # Bornes élargies d'un jour de part et d'autre : le filtre exact dépend du fuseau de chaque ticker
+        borne_min = pd.Timestamp(debut - timedelta(days=1)).tz_localize("UTC").value // 10**9
+        borne_max = pd.Timestamp(fin + timedelta(days=1)).tz_localize("UTC").value // 10**9
+        lignes, fuseaux = [], {}
+        with metrics.timer("cache_lecture", mode="groupe"), self._verrou:
+            for i in range(0, len(tickers), chunk_size):
+                paquet = tickers[i:i + chunk_size]
+                marques = ", ".join("?" * len(paquet))
+                fuseaux.update(self._conn.execute(
+                    f"SELECT ticker, tz FROM fuseaux WHERE ticker IN ({marques})", paquet
+                ).fetchall())
+                lignes += self._conn.execute(
+                    f"SELECT ticker, ts, open, high, low, close, volume FROM barres "
+                    f"WHERE ticker IN ({marques}) AND intervalle = ? AND ts >= ? AND ts < ? ORDER BY ticker, ts",
+                    (*paquet, interval, borne_min, borne_max),
+                ).fetchall()
+
+        fuseaux = pd.Series([fuseaux.get(t, MARKET_TZ) for t in tickers], index=pd.Index(tickers, name="ticker"), dtype=object)
+        barres = pd.DataFrame(lignes, columns=["ticker", "ts", *COLONNES])
+        ts = barres["ts"].to_numpy(dtype=np.int64)
+        fuseau_ligne = fuseaux.reindex(barres["ticker"]).to_numpy(dtype=object)
+        gardees = np.zeros(len(barres), dtype=bool)
+        for tz in pd.unique(fuseaux):
+            borne_debut = pd.Timestamp(debut).tz_localize(tz).tz_convert("UTC").value // 10**9
+            borne_fin = pd.Timestamp(fin).tz_localize(tz).tz_convert("UTC").value // 10**9
+            gardees |= (fuseau_ligne == tz) & (ts >= borne_debut) & (ts < borne_fin)
+        barres = barres[gardees].reset_index(drop=True)
+        barres["ts"] = barres["ts"].to_numpy(dtype=np.int64) * 10**9
+        return barres, fuseaux
+
+
+_cache_defaut = None
+_verrou_cache = threading.Lock()
+
+
+def get_cache():
+    """Instance partagée du cache (créée au premier appel)"""
+    global _cache_defaut
+    with _verrou_cache:
+        if _cache_defaut is None:
+            _cache_defaut = BarCache()
+        return _cache_defaut
+
+
+def get_history(ticker, start, end, interval="1d"):
+    """Historique d'un ticker servi par le cache partagé"""
+    return get_cache().history(ticker, start, end, interval)
@@ -0,0 +1,1000 @@
+"""
+Ligne de commande unique : python -m stock_analysis <commande> [options]
+
+    realized    allers-retours achat/vente (ex-main.py)
+    unrealized  positions conservées, valorisées à la clôture (ex-new.py)
+    intraday    positions achetées 2h après l'ouverture (ex-intraday.py)
+    watch       surveillance des positions pendant la séance (boucle asyncio)
+    markets     marchés, fuseaux et secteurs des tickers (ex-mzrkrt.py)
+    archive     archive locale des barres minute des séances clôturées
+    screen      filtre d'un univers de tickers sur des indicateurs techniques
+    lots        comptabilité par lots (FIFO, LIFO, coût moyen) des exécutions
+    serve       service HTTP local de valorisation (JSON) pour les tableaux de bord
+    simulate    projection Monte-Carlo des positions conservées (VaR, CVaR, percentiles)
+    sweep       balayage heure d'entrée × durée × sortie de la stratégie intraday
+    bench       banc d'essai du calcul des prix et P&L (données synthétiques)
+    stream      calcul en flux d'un gros fichier de transactions (CSV/Parquet)
+    execution   prix d'exécution modélisés (VWAP, interpolation) d'un fichier d'exécutions
+    record      enregistrement de données de marché pour un rejeu hors ligne
+
+sweep, bench, stream, execution et record remplacent les anciens points d'entrée
+python -m stock_analysis.<module>, qui restent des alias de ces commandes.
+
+Seuls argparse et sys sont importés au démarrage : pandas, NumPy et le reste du
+paquet ne sont chargés que par la commande exécutée (--help est immédiat), et
+yfinance / pyarrow seulement s'il faut réellement télécharger ou stocker.
+
+unrealized / intraday --risk ajoutent la série quotidienne du portefeuille
+(volatilité, Sharpe, drawdown, bêta contre --index, contributions par ticker).
+
+realized / unrealized / intraday --fx convertissent les cours (devise de
+cotation du ticker) en euros, la devise des montants investis (voir stock_analysis.fx).
+
+archive verse chaque jour les barres 1m / 5m dans une archive mappée en mémoire
+(voir stock_analysis.archive) ; intraday y reprend les séances que Yahoo ne
+conserve plus.
+
+screen évalue des critères (croisements de moyennes mobiles, RSI, gap, volume
+relatif, plus hauts sur 52 semaines) sur tout un univers en une passe, en
+matrices NumPy (voir stock_analysis.screener).
+
+lots apparie les ventes aux lots d'achat (fichier d'exécutions --input, ou les
+allers-retours ou positions de portfolio.py selon --strategy, chacun son livre) :
+plus-values réalisées par cession, durées de détention, lots ouverts valorisés
+(voir stock_analysis.lots).
+
+serve garde cours et positions en mémoire, rafraîchit les cours toutes les
+--every secondes et sert unrealized / realized en JSON ; les requêtes identiques
+simultanées partagent un seul calcul (voir stock_analysis.server).
+
+simulate tire les rendements quotidiens des tickers détenus dans l'historique en
+cache (bootstrap de séances entières, par blocs, ou loi normale corrélée) et
+projette la valeur du portefeuille sur --paths chemins, par paquets répartis
+sur les cœurs (voir stock_analysis.montecarlo).
+
+--profile [text|json|openmetrics] affiche en fin d'exécution le relevé des
+étapes chronométrées et des compteurs (voir stock_analysis.metrics).
+"""
+import argparse
+import sys
+
+FICHIERS_CSV = {
+    "realized": "resultats_trading.csv",
+    "unrealized": "positions_latentes.csv",
+    "intraday": "positions_intraday_11h30.csv",
+    "markets": "marches_actions.csv",
+    "screen": "filtre_univers.csv",
+    "lots": "lots_cessions.csv",
+    "simulate": "simulation_portefeuille.csv",
+}
+
+HEURES_APRES_OUVERTURE = 2
+
+
+def _transactions(args, defaut):
+    if args.input:
+        from stock_analysis.portfolio import load_transactions
+        return load_transactions(args.input)
+    return defaut
+
+
+def _csv(args):
+    return FICHIERS_CSV[args.command] if args.csv else None
+
+
+def _liste(conversion):
+    """Type argparse : liste séparée par des virgules, chaque valeur convertie"""
+    return lambda texte: [conversion(v.strip()) for v in texte.split(",") if v.strip()]
+
+
+# ----------------------------------------------------------------------
+# Commandes
+# ----------------------------------------------------------------------
+def run_realized(args):
+    import pandas as pd
+
+    from stock_analysis import metrics, report
+    from stock_analysis.corporate import AdjustmentFactors
+    from stock_analysis.panel import load_panel, transactions_span
+    from stock_analysis.portfolio import TRANSACTIONS
+    from stock_analysis.pnl import compute_realized, portfolio_totals, price_table
+
+    trades = pd.DataFrame(_transactions(args, TRANSACTIONS)).rename(columns={"achat": "date_achat", "vente": "date_vente"})
+
+    # Préchargement groupé des cours : un seul téléchargement par paquet de tickers
+    etendue = transactions_span(trades, date_keys=("date_achat", "date_vente"))
+    panel = load_panel(*etendue)
+    fx = None
+    if args.fx:
+        from stock_analysis.fx import FxRates
+
+        # Une paire par devise de cotation, sur la même étendue que les cours
+        fx = FxRates.load(*etendue)
+
+    # Cours bruts : prix d'achat ajustés des fractionnements et dividendes survenus avant la vente
+    table = price_table(panel)
+    ajustements = AdjustmentFactors.load(etendue[0], closes=table)
+
+    # Calcul vectorisé des résultats (prix résolus par jointure as-of sur les cours)
+    calcul = compute_realized(trades, table, fx=fx, adjustments=ajustements)
+    with metrics.timer("affichage"):
+        report.print_realized(calcul, portfolio_totals(calcul, valeur="valeur_vente"), _csv(args))
+    return 0
+
+
+def _charger_cloture(positions, extra_dates=()):
+    from stock_analysis.panel import load_panel, transactions_span
+
+    # Préchargement groupé des cours : un seul téléchargement par paquet de tickers
+    return (load_panel(*transactions_span(positions, extra_dates=extra_dates)),)
+
+
+def _prix_cloture(positions, panels):
+    from stock_analysis.pnl import price_table, resolve_prices
+
+    return resolve_prices(positions["ticker"], positions["date_achat"], price_table(panels[0]))
+
+
+def _charger_intraday(positions, extra_dates=(), interval="5m"):
+    from stock_analysis.archive import get_archive
+    from stock_analysis.panel import load_panel, transactions_span
+
+    # Cours quotidiens (valorisation, repli) et barres intraday des jours d'achat,
+    # complétées par l'archive locale pour les séances que Yahoo ne conserve plus
+    return (
+        load_panel(*transactions_span(positions, extra_dates=extra_dates)),
+        get_archive(interval).fill(load_panel(*transactions_span(positions), interval=interval)),
+    )
+
+
+def _prix_intraday(positions, panels, method="nearest"):
+    from stock_analysis.intraday import intraday_prices
+
+    # Prix d'achat 2h après ouverture
+    return intraday_prices(positions["ticker"], positions["date_achat"], *panels,
+                           hours_after_open=HEURES_APRES_OUVERTURE, method=method)
+
+
+def _dates(dates):
+    import pandas as pd
+
+    return pd.to_datetime(pd.Series(dates)).astype("datetime64[ns]").to_numpy()
+
+
+def _places(tickers):
+    import numpy as np
+
+    from stock_analysis.metadata import ticker_timezones
+    from stock_analysis.sessions import exchange_timezone
+
+    # Fuseau de la place de cotation de chaque ligne (référentiel en cache)
+    tickers = np.asarray(tickers, dtype=object)
+    fuseaux = ticker_timezones(np.unique(tickers.astype(str))).reindex(tickers).to_numpy(dtype=object)
+    return np.array([exchange_timezone(t, tz) for t, tz in zip(tickers, fuseaux)], dtype=object)
+
+
+def _taux_cloture(positions, fx):
+    from stock_analysis.sessions import next_sessions
+
+    # Taux de la séance d'achat, sur le calendrier de la place du ticker
+    seances = next_sessions(_dates(positions["date_achat"]), _places(positions["ticker"]))
+    return fx.ticker_rates(positions["ticker"], seances)
+
+
+def _taux_intraday(positions, fx, interval="5m"):
+    import numpy as np
+
+    from stock_analysis.bars import session_targets
+    from stock_analysis.fx import FxRates
+    from stock_analysis.panel import transactions_span
+
+    # Taux à l'heure d'achat (barres intraday de la paire), repli sur le taux de la séance
+    cibles = session_targets(_dates(positions["date_achat"]), hours_after_open=HEURES_APRES_OUVERTURE,
+                             timezones=_places(positions["ticker"]))
+    barres = FxRates.load(*transactions_span(positions), interval=interval)
+    taux = barres.ticker_rates(positions["ticker"], cibles, tolerance="1h")
+    manquants = np.isnan(taux)
+    if manquants.any():
+        taux[manquants] = _taux_cloture(positions[manquants], fx)
+    return taux
+
+
+# Stratégie du grand livre -> (chargement des cours, prix d'achat)
+STRATEGIES = {
+    "cloture": (_charger_cloture, _prix_cloture),
+    "intraday_2h": (_charger_intraday, _prix_intraday),
+}
+
+
+def _grand_livre(achats, strategie, charger=None, prix_achat=None, taux_achat=None):
+    """
+    Grand livre de la stratégie, complété des achats qui n'y sont pas encore.
+    Avec `taux_achat` (positions, FxRates -> taux), les cours sont convertis en euros.
+    """
+    from stock_analysis.ledger import PositionLedger
+
+    if charger is None:
+        charger, prix_achat = STRATEGIES[strategie]
+    taux = None
+    if taux_achat is not None:
+        from stock_analysis.fx import FxRates
+        from stock_analysis.panel import transactions_span
+
+        taux = lambda nouveaux: taux_achat(nouveaux, FxRates.load(*transactions_span(nouveaux)))
+    ledger = PositionLedger(strategie)
+    ledger.sync(achats, lambda nouveaux: prix_achat(nouveaux, charger(nouveaux)), taux)
+    return ledger
+
+
+def _valoriser(args, achats, strategie, prix_achat, charger, taux_achat=None):
+    """
+    Calcul commun aux commandes unrealized et intraday : soit tout le calcul à la
+    date d'évaluation, soit la revalorisation incrémentale du grand livre.
+    `taux_achat` (positions, FxRates -> taux) active la conversion en euros.
+    Retourne (calcul, totaux par ticker, date d'évaluation).
+    """
+    import pandas as pd
+
+    from stock_analysis.corporate import AdjustmentFactors
+    from stock_analysis.pnl import compute_unrealized, price_table, ticker_totals
+
+    if args.incremental:
+        from stock_analysis.cache import market_today
+        from stock_analysis.panel import latest_prices
+
+        # Revalorisation incrémentale : seul le dernier cours de chaque ticker est demandé
+        ledger = _grand_livre(achats, strategie, charger, prix_achat, taux_achat)
+        prix_actuels = latest_prices(list(ledger.tickers))
+        taux_actuels = None
+        if taux_achat is not None:
+            from stock_analysis.fx import latest_rates
+
+            # ... et le dernier taux de chaque devise de cotation
+            taux_actuels = latest_rates(list(ledger.tickers))
+        # Fractionnements et dividendes depuis l'achat : facteurs du référentiel d'événements
+        ajustements = AdjustmentFactors.load(list(ledger.tickers), since=ledger.positions["date_achat"].min())
+        facteurs = ledger.adjustment_factors(ajustements, market_today())
+        return (ledger.revalue(prix_actuels, taux_actuels, facteurs),
+                ledger.ticker_totals(prix_actuels, taux_actuels, facteurs), market_today().isoformat())
+
+    positions = pd.DataFrame(achats)
+    panels = charger(positions, [args.date])
+    resultat = prix_achat(positions, panels)
+    if isinstance(resultat, tuple):
+        positions["prix_achat"], positions["heure_achat"] = resultat
+    else:
+        positions["prix_achat"] = resultat
+    fx = None
+    if taux_achat is not None:
+        from stock_analysis.fx import FxRates
+        from stock_analysis.panel import transactions_span
+
+        # Une paire par devise de cotation, sur l'étendue des achats et de l'évaluation
+        fx = FxRates.load(*transactions_span(positions, extra_dates=[args.date]))
+        positions["taux_achat"] = taux_achat(positions, fx)
+    # Cours bruts : prix d'achat ajustés des événements survenus jusqu'à la date d'évaluation
+    table = price_table(panels[0])
+    ajustements = AdjustmentFactors.load(sorted(positions["ticker"].unique()), closes=table)
+    calcul = compute_unrealized(positions, table, args.date, fx=fx, adjustments=ajustements)
+    return calcul, ticker_totals(calcul), args.date
+
+
+def _risque(args, calcul, strategie, date_evaluation):
+    """
+    Série quotidienne du portefeuille et indicateurs de risque jusqu'à la date
+    d'évaluation. En mode incrémental, l'état est conservé entre deux exécutions
+    et seules les nouvelles séances closes sont calculées.
+    """
+    import pandas as pd
+
+    from stock_analysis.corporate import AdjustmentFactors
+    from stock_analysis.panel import load_panel
+    from stock_analysis.pnl import price_table
+    from stock_analysis.risk import RiskTracker, close_matrix, closed_sessions_end, risk_path
+
+    if args.incremental:
+        chemin = risk_path(strategie)
+        suivi = RiskTracker.load(chemin, index=args.index, window=args.window)
+        fin = closed_sessions_end()
+    else:
+        suivi = RiskTracker(index=args.index, window=args.window)
+        fin = pd.Timestamp(date_evaluation) + pd.Timedelta(days=1)
+
+    debut = suivi.start_date(calcul)
+    if debut is not None and debut < fin:
+        # Une semaine de marge : clôtures de la veille pour les premiers rendements
+        tickers = sorted(calcul["ticker"].unique())
+        panel = load_panel([*tickers, args.index], debut - pd.Timedelta(days=7), fin)
+        # Clôtures ajustées à la date d'évaluation, comme les nombres d'actions des positions
+        ajustements = AdjustmentFactors.load([*tickers, args.index], closes=price_table(panel))
+        prix = ajustements.adjust_frame(close_matrix(panel, tickers), as_of=date_evaluation)
+        indice = ajustements.adjust_frame(close_matrix(panel, [args.index]), as_of=date_evaluation)
+        if args.fx:
+            from stock_analysis.fx import FxRates
+
+            # Série valorisée en euros : clôtures converties au taux de chaque séance
+            fx = FxRates.load([*tickers, args.index], debut - pd.Timedelta(days=7), fin)
+            prix, indice = fx.convert_frame(prix), fx.convert_frame(indice)
+        suivi.update(calcul, prix, indice.get(args.index), until=fin)
+        if args.incremental:
+            suivi.save(chemin)
+    return suivi
+
+
+def run_unrealized(args):
+    from stock_analysis import metrics, report
+    from stock_analysis.portfolio import ACHATS
+    from stock_analysis.pnl import portfolio_totals
+
+    achats = _transactions(args, ACHATS)
+    # Les prix d'achat figés en euros ont leur propre grand livre
+    strategie = "cloture_eur" if args.fx else "cloture"
+    calcul, totaux_par_ticker, date_evaluation = _valoriser(args, achats, strategie, _prix_cloture, _charger_cloture,
+                                                            _taux_cloture if args.fx else None)
+    totaux = portfolio_totals(calcul)
+    suivi = _risque(args, calcul, strategie, date_evaluation) if args.risk else None
+
+    with metrics.timer("affichage"):
+        print("=" * 120)
+        print("ANALYSE DES POSITIONS (ACHAT ET CONSERVATION)")
+        print(f"Date d'évaluation : {date_evaluation}")
+        if args.fx:
+            print("Cours convertis en euros (taux de change de la séance d'achat et de la date d'évaluation)")
+        print("=" * 120)
+        report.print_positions(calcul, totaux_par_ticker, 120)
+        report.print_portfolio_summary(calcul, totaux, date_evaluation, len(achats), 120)
+        report.print_detail_table(calcul, "positions_latentes", date_evaluation, 120, csv_path=_csv(args))
+        if suivi is not None:
+            report.print_risk(suivi, args.index, 120)
+    return 0
+
+
+def run_intraday(args):
+    from functools import partial
+
+    from stock_analysis import metrics, report
+    from stock_analysis.portfolio import ACHATS
+    from stock_analysis.pnl import portfolio_totals
+
+    achats = _transactions(args, ACHATS)
+    # Un grand livre par modèle de prix d'exécution : les prix d'achat y sont figés
+    strategie = "intraday_2h"
+    if args.execution != "nearest" or args.bars != "5m":
+        strategie += f"_{args.execution}_{args.bars}"
+    if args.fx:
+        strategie += "_eur"
+    calcul, totaux_par_ticker, date_evaluation = _valoriser(
+        args, achats, strategie, partial(_prix_intraday, method=args.execution),
+        partial(_charger_intraday, interval=args.bars),
+        partial(_taux_intraday, interval=args.bars) if args.fx else None,
+    )
+    totaux = portfolio_totals(calcul)
+    suivi = _risque(args, calcul, strategie, date_evaluation) if args.risk else None
+
+    with metrics.timer("affichage"):
+        print("=" * 130)
+        print("ANALYSE DES POSITIONS - ACHAT 2H APRÈS OUVERTURE DU MARCHÉ (11h30 ET)")
+        print(f"Date d'évaluation : {date_evaluation}")
+        if args.fx:
+            print("Cours convertis en euros (taux de change de l'heure d'achat et de la date d'évaluation)")
+        print("=" * 130)
+        print("ℹ️  Marché US : Ouverture 9h30 ET → Achat à 11h30 ET (2h après ouverture)")
+        print("=" * 130)
+        report.print_positions(calcul, totaux_par_ticker, 130, intraday=True)
+        report.print_portfolio_summary(calcul, totaux, date_evaluation, len(achats), 130,
+                                       strategie="Achat 2h après ouverture (11h30 ET)")
+        report.print_detail_table(calcul, "positions_intraday", date_evaluation, 130, intraday=True,
+                                  csv_path=_csv(args))
+        if suivi is not None:
+            report.print_risk(suivi, args.index, 130)
+
+    print("\n" + "=" * 130)
+    intervalle = {"1m": "1 minute", "5m": "5 minutes"}.get(args.bars, args.bars)
+    modeles = {"vwap": "VWAP de la fenêtre", "interpolation": "interpolation entre barres"}
+    print(f"ℹ️  NOTE : Les prix intraday sont récupérés avec un intervalle de {intervalle}"
+          + (f" ({modeles[args.execution]})" if args.execution in modeles else ""))
+    print("         Si les données intraday ne sont pas disponibles, une estimation est utilisée")
+    print("=" * 130)
+    return 0
+
+
+def run_watch(args):
+    import asyncio
+
+    from stock_analysis import report
+    from stock_analysis.cache import market_today
+    from stock_analysis.corporate import AdjustmentFactors
+    from stock_analysis.pnl import portfolio_totals
+    from stock_analysis.portfolio import ACHATS
+    from stock_analysis.watch import LiveFeed, ReplayFeed, Watcher, emit_json, emit_text, previous_closes
+
+    ledger = _grand_livre(_transactions(args, ACHATS), args.strategy)
+    if args.replay:
+        feed = ReplayFeed(args.replay, args.interval, speed=args.speed)
+        seance = args.replay
+    else:
+        feed = LiveFeed(args.interval)
+        seance = market_today().isoformat()
+
+    # Barres brutes : positions ajustées des événements survenus depuis l'achat
+    ajustements = AdjustmentFactors.load(list(ledger.tickers), since=ledger.positions["date_achat"].min())
+    facteurs = ledger.adjustment_factors(ajustements, seance)
+    watcher = Watcher(ledger, feed, every=args.every, factors=facteurs)
+    # Référence de la variation du jour : clôtures de la veille (cache local)
+    watcher.seed(previous_closes(list(watcher.tickers), seance, ajustements))
+
+    if not args.json:
+        print("=" * 130)
+        print(f"👀 SURVEILLANCE DES POSITIONS ({args.strategy}) - séance du {seance}")
+        print(f"Relevé toutes les {args.every:g}s, barres {args.interval}" + (f", rejouée x{args.speed:g}" if args.replay else ""))
+        print("=" * 130)
+    try:
+        asyncio.run(watcher.run(emit_json if args.json else emit_text, cycles=args.cycles))
+    except KeyboardInterrupt:
+        pass
+
+    if args.json:
+        return 0
+    if not watcher.cycles:
+        print("Aucune séance en cours : marché fermé")
+        return 0
+    calcul = ledger.revalue(watcher.prices(), factors=facteurs)
+    report.print_portfolio_summary(calcul, portfolio_totals(calcul), seance, len(ledger), 130,
+                                   strategie=f"{args.strategy} (dernier relevé)")
+    return 0
+
+
+def run_markets(args):
+    import pandas as pd
+
+    from stock_analysis import metrics, report
+    from stock_analysis.metadata import COLONNES, get_metadata_store
+    from stock_analysis.portfolio import TICKERS
+
+    # Supprimer les doublons
+    tickers_uniques = sorted(set(args.tickers or TICKERS))
+
+    print("=" * 120)
+    print("📊 INFORMATIONS SUR LES MARCHÉS ET HORAIRES DE COTATION")
+    print("=" * 120)
+
+    # Métadonnées servies par le référentiel local (seuls les tickers inconnus
+    # ou périmés sont demandés au fournisseur, en parallèle)
+    store = get_metadata_store()
+    infos = store.lookup(tickers_uniques)
+
+    lignes = []
+    for ticker in tickers_uniques:
+        if ticker in store.errors:
+            print(f"\n❌ Erreur pour {ticker}: {store.errors[ticker]}")
+            lignes.append({"ticker": ticker, "nom": "Erreur", **{c: "N/A" for c in COLONNES if c != "nom"}})
+            continue
+        info = {c: "N/A" for c in COLONNES} | infos.loc[ticker].dropna().to_dict()
+        report.print_market_info(ticker, info)
+        lignes.append({"ticker": ticker, **info})
+
+    with metrics.timer("affichage"):
+        report.print_markets(pd.DataFrame(lignes), _csv(args))
+    return 0
+
+
+def run_archive(args):
+    import pandas as pd
+
+    from stock_analysis import metrics, report
+    from stock_analysis.archive import get_archive
+    from stock_analysis.portfolio import TICKERS
+
+    tickers = sorted(set(args.tickers or TICKERS))
+    archive = get_archive(args.interval)
+
+    print("=" * 100)
+    print(f"🗄️  ARCHIVE DES BARRES {args.interval} - séances clôturées")
+    print(f"Dossier : {archive.path}")
+    print("=" * 100)
+
+    ajoutees = archive.update(tickers, since=args.since)
+
+    lignes = []
+    for ticker in tickers:
+        seances = archive.sessions(ticker)
+        lignes.append({
+            "ticker": ticker,
+            "ajoutees": int(ajoutees.get(ticker, 0)),
+            "seances": len(seances),
+            "barres": len(archive.columns(ticker)["ts"]),
+            "premiere": str(seances[0]) if len(seances) else "N/A",
+            "derniere": str(seances[-1]) if len(seances) else "N/A",
+        })
+    with metrics.timer("affichage"):
+        report.print_archive(pd.DataFrame(lignes), args.interval)
+    return 0
+
+
+def run_screen(args):
+    from stock_analysis import metrics, report
+    from stock_analysis.portfolio import TICKERS
+    from stock_analysis.screener import load_universe, screen
+
+    if args.tickers:
+        univers = sorted(set(args.tickers))
+    elif args.universe:
+        univers = load_universe(args.universe)
+    else:
+        univers = sorted(set(TICKERS))
+
+    print("=" * 120)
+    print(f"🔎 FILTRE DE L'UNIVERS ({len(univers)} tickers)")
+    for critere in args.criteria:
+        print(f"   • {critere}")
+    print("=" * 120)
+
+    try:
+        retenus = screen(univers, args.criteria, as_of=args.date, rank=args.rank,
+                         ascending=args.ascending, top=args.top, adjust=not args.raw)
+    except ValueError as exc:
+        print(f"❌ {exc}")
+        return 2
+    with metrics.timer("affichage"):
+        report.print_screen(retenus, args.criteria, len(univers), _csv(args))
+    return 0
+
+
+def _executions_portefeuille(date_evaluation, strategie):
+    """
+    Exécutions d'un seul portefeuille de portfolio.py, aux clôtures : les
+    allers-retours (realized) ou les positions conservées (unrealized). Les deux
+    stratégies sont indépendantes : réunies dans un même livre, les ventes de
+    l'une seraient appariées aux achats de l'autre.
+    """
+    import pandas as pd
+
+    from stock_analysis.lots import fills_from_positions
+    from stock_analysis.panel import load_panel, transactions_span
+    from stock_analysis.pnl import compute_realized, compute_unrealized, price_table
+    from stock_analysis.portfolio import ACHATS, TRANSACTIONS
+
+    if strategie == "realized":
+        trades = pd.DataFrame(TRANSACTIONS).rename(columns={"achat": "date_achat", "vente": "date_vente"})
+        table = price_table(load_panel(*transactions_span(trades, date_keys=("date_achat", "date_vente"))))
+        return fills_from_positions(realized=compute_realized(trades, table))
+    achats = pd.DataFrame(ACHATS)
+    table = price_table(load_panel(*transactions_span(achats, extra_dates=[date_evaluation])))
+    return fills_from_positions(held=compute_unrealized(achats, table, date_evaluation))
+
+
+def run_lots(args):
+    import pandas as pd
+
+    from stock_analysis import metrics, report
+    from stock_analysis.corporate import AdjustmentFactors, get_corporate_store
+    from stock_analysis.lots import match_lots
+
+    if args.input:
+        from stock_analysis.stream import read_transactions
+
+        fills = pd.concat(list(read_transactions(args.input)), ignore_index=True)
+        date_evaluation = args.date
+    else:
+        from stock_analysis.portfolio import DATE_EVALUATION
+
+        date_evaluation = args.date or DATE_EVALUATION
+        fills = _executions_portefeuille(date_evaluation, args.strategy)
+
+    tickers = sorted(fills["ticker"].astype(str).unique())
+    # Fractionnements seuls : pas de facteurs de dividende à calculer. Le livre
+    # s'arrête à la date d'évaluation (exécutions postérieures ignorées)
+    ajustements = None if args.raw else AdjustmentFactors(get_corporate_store().lookup(tickers))
+    try:
+        livre = match_lots(fills, args.method, ajustements, as_of=date_evaluation)
+    except ValueError as exc:
+        print(f"❌ {exc}")
+        return 2
+
+    # Cours des lots ouverts : clôture à la date d'évaluation, sinon dernier cours connu
+    ouverts = sorted(livre.open_lots["ticker"].unique())
+    if date_evaluation is None:
+        from stock_analysis.cache import market_today
+        from stock_analysis.panel import latest_prices
+
+        prix, date_evaluation = latest_prices(ouverts), market_today().isoformat()
+    else:
+        from stock_analysis.panel import load_panel
+        from stock_analysis.pnl import price_table, resolve_prices
+
+        fin = pd.Timestamp(date_evaluation).normalize()
+        table = price_table(load_panel(ouverts, fin - pd.Timedelta(days=10), fin + pd.Timedelta(days=1)))
+        prix = pd.Series(resolve_prices(ouverts, [fin] * len(ouverts), table, previous_fallback=True), index=ouverts)
+    with metrics.timer("affichage"):
+        source = args.input or f"portfolio.py, {args.strategy}"
+        report.print_lots(livre, prix, date_evaluation, source, _csv(args))
+    return 0
+
+
+def run_serve(args):
+    from stock_analysis import metrics
+    from stock_analysis.portfolio import ACHATS, TRANSACTIONS, load_transactions
+    from stock_analysis.server import ValuationService, serve
+
+    achats = load_transactions(args.positions) if args.positions else ACHATS
+    trades = load_transactions(args.trades) if args.trades else TRANSACTIONS
+
+    # Relevé toujours actif : servi par la route /metrics
+    metrics.enable()
+    print("⏳ Chargement des cours...")
+    serve(ValuationService(achats, trades, every=args.every), args.host, args.port)
+    return 0
+
+
+def run_simulate(args):
+    import pandas as pd
+
+    from stock_analysis import metrics, report
+    from stock_analysis.corporate import AdjustmentFactors
+    from stock_analysis.montecarlo import log_returns, simulate
+    from stock_analysis.panel import load_panel
+    from stock_analysis.portfolio import ACHATS
+    from stock_analysis.pnl import compute_unrealized, price_table, ticker_totals
+    from stock_analysis.risk import close_matrix
+
+    positions = pd.DataFrame(_transactions(args, ACHATS))
+    tickers = sorted(positions["ticker"].unique())
+    fin = pd.Timestamp(args.date).normalize() + pd.Timedelta(days=1)
+    # Historique : --lookback séances (252 séances par an, plus les jours fériés) et tous les achats
+    debut = min(fin - pd.Timedelta(days=args.lookback * 365 // 252 + 14), pd.to_datetime(positions["date_achat"]).min())
+    panel = load_panel(tickers, debut, fin)
+
+    # Valeur actuelle de chaque ticker détenu, comme unrealized
+    table = price_table(panel)
+    ajustements = AdjustmentFactors.load(tickers, closes=table)
+    calcul = compute_unrealized(positions, table, args.date, adjustments=ajustements)
+    valeurs = ticker_totals(calcul)["valeur"]
+
+    # Clôtures ajustées à la date d'évaluation : fractionnements et dividendes hors des rendements
+    clotures = ajustements.adjust_frame(close_matrix(panel, tickers), as_of=args.date)
+    rendements = log_returns(clotures[clotures.index < fin], args.lookback)
+    try:
+        simulation = simulate(valeurs, rendements, paths=args.paths, horizons=args.horizons, method=args.method,
+                              block=args.block, seed=args.seed, chunk_size=args.chunk, workers=args.workers)
+    except ValueError as exc:
+        print(f"❌ {exc}")
+        return 2
+    with metrics.timer("affichage"):
+        report.print_simulation(simulation, args.date, len(positions), _csv(args))
+    return 0
+
+
+def run_sweep(args):
+    from stock_analysis.sweep import encode_positions, load_market_arrays, read_positions
+    from stock_analysis.sweep import run_sweep as balayer
+
+    if args.input:
+        achats = read_positions(args.input)
+    else:
+        from stock_analysis.portfolio import ACHATS
+        achats = ACHATS
+    marche = load_market_arrays(achats, max(args.durees), args.interval)
+    try:
+        resultats = balayer(marche, encode_positions(achats, marche), args.entrees, args.durees, args.sorties,
+                            workers=args.workers)
+    except ValueError as exc:
+        print(f"❌ {exc}")
+        return 2
+
+    print("=" * 100)
+    print(f"🔬 BALAYAGE DE PARAMÈTRES - {len(resultats)} combinaisons, {len(achats)} achats")
+    print("=" * 100)
+    print(resultats.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    return 0
+
+
+def run_bench(args):
+    from stock_analysis.bench import compare, load_results, run_bench as mesurer, save_results
+
+    print("=" * 100)
+    print("⏱️  BANC D'ESSAI DU PIPELINE (données synthétiques)")
+    print("=" * 100)
+    resultats = mesurer(args.sizes, args.repeat, args.tickers, stages=args.stages)
+    if args.output:
+        save_results(resultats, args.output)
+        print(f"\n✅ Résultats enregistrés dans '{args.output}'")
+
+    if args.baseline:
+        comparaison = compare(resultats, load_results(args.baseline), args.tolerance)
+        print("\n" + "=" * 100)
+        print(f"📊 COMPARAISON À LA RÉFÉRENCE '{args.baseline}' (tolérance +{args.tolerance:.0%})")
+        print("=" * 100)
+        print(comparaison[["etape", "n", "secondes", "secondes_reference", "ratio", "regression"]]
+              .to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        if comparaison["regression"].any():
+            print("\n❌ Régression détectée")
+            return 1
+        print("\n✅ Aucune régression")
+    return 0
+
+
+def run_stream(args):
+    from stock_analysis.stream import stream_pnl
+
+    try:
+        totaux = stream_pnl(args.file, args.mode, args.date, args.chunksize, args.output, args.dataset)
+    except ValueError as exc:
+        print(f"❌ {exc}")
+        return 2
+    portefeuille = totaux.portfolio_totals()
+    par_ticker = totaux.ticker_totals()
+
+    print("=" * 100)
+    print(f"📊 RÉSUMÉ ({args.file})")
+    print("=" * 100)
+    print(f"Nombre de tickers      : {len(par_ticker)}")
+    print(f"Nombre de transactions : {int(totaux.par_ticker['positions'].sum())}")
+    print(f"Investissement total   : {portefeuille['investi']:.2f}€")
+    print(f"Valeur                 : {portefeuille['valeur']:.2f}€")
+    print(f"Gain/Perte total       : {portefeuille['plus_value']:+.2f}€")
+    print(f"Rendement              : {portefeuille['rendement']:+.2f}%")
+    if args.output:
+        print(f"\n✅ Résultats exportés dans '{args.output}'")
+    return 0
+
+
+def run_execution(args):
+    import numpy as np
+    import pandas as pd
+
+    from stock_analysis.execution import BarIndex, SlippageModel, reconcile
+    from stock_analysis.panel import load_panel
+    from stock_analysis.sessions import get_calendar
+    from stock_analysis.stream import ResultWriter, read_transactions
+
+    fenetre = pd.Timedelta(minutes=args.window)
+    modele = SlippageModel(args.half_spread, args.impact)
+    calendrier = get_calendar()
+    total, ecarts = 0, []
+    with ResultWriter(args.output, args.dataset) as sortie:
+        for morceau in read_transactions(args.file, args.chunksize):
+            horodatages = pd.DatetimeIndex(pd.to_datetime(morceau["horodatage"]))
+            if horodatages.tz is None:
+                horodatages = horodatages.tz_localize(calendrier.tz)
+            jours = horodatages.tz_convert(calendrier.tz).normalize().tz_localize(None)
+            # Barres du morceau préchargées en une fois (cache local)
+            panel = load_panel(sorted(morceau["ticker"].astype(str).unique()), jours.min(),
+                               jours.max() + pd.Timedelta(days=1), interval=args.bars)
+            morceau = morceau.assign(horodatage=horodatages)
+            resultat = reconcile(morceau, BarIndex(panel), args.method, fenetre, fenetre, modele)
+            sortie.write(resultat)
+            total += len(resultat)
+            if "ecart_bps" in resultat:
+                ecarts.append(resultat["ecart_bps"].dropna().to_numpy())
+
+    print("=" * 100)
+    print(f"🎯 PRIX D'EXÉCUTION MODÉLISÉS ({args.file}, {args.method}, barres {args.bars})")
+    print("=" * 100)
+    print(f"Exécutions             : {total}")
+    if ecarts and sum(len(e) for e in ecarts):
+        ecarts = np.concatenate(ecarts)
+        print(f"Écart moyen au modèle  : {ecarts.mean():+.2f} bps")
+        print(f"Écart médian           : {np.median(ecarts):+.2f} bps")
+        print(f"Écart p95 (absolu)     : {np.percentile(np.abs(ecarts), 95):.2f} bps")
+    if args.output:
+        print(f"\n✅ Résultats exportés dans '{args.output}'")
+    return 0
+
+
+def run_record(args):
+    from stock_analysis.providers import get_provider, provider_from_spec, record
+
+    source = provider_from_spec(args.source) if args.source else get_provider()
+    record(args.root, args.tickers, args.start, args.end, tuple(args.interval or ["1d"]), source)
+    print(f"✅ {len(args.tickers)} ticker(s) enregistré(s) dans '{args.root}'")
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Analyse des arguments
+# ----------------------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(prog="stock_analysis", description="Analyse de transactions boursières")
+    commandes = parser.add_subparsers(dest="command", required=True)
+
+    realized = commandes.add_parser("realized", help="allers-retours achat/vente")
+    realized.set_defaults(run=run_realized)
+
+    unrealized = commandes.add_parser("unrealized", help="positions conservées, valorisées à la clôture")
+    unrealized.set_defaults(run=run_unrealized)
+
+    intraday = commandes.add_parser("intraday", help="positions achetées 2h après l'ouverture")
+    intraday.set_defaults(run=run_intraday)
+
+    intraday.add_argument("--execution", choices=("nearest", "vwap", "interpolation"), default="nearest",
+                          help="prix d'achat : barre la plus proche, VWAP ±5 min ou interpolation entre barres")
+    intraday.add_argument("--bars", default="5m", help="intervalle des barres intraday (défaut : 5m ; 1m sur 30 jours)")
+
+    watch = commandes.add_parser("watch", help="surveillance des positions pendant la séance (asyncio)")
+    watch.add_argument("--strategy", choices=sorted(STRATEGIES), default="intraday_2h",
+                       help="grand livre surveillé (défaut : intraday_2h)")
+    watch.add_argument("--every", type=float, default=60.0, help="secondes entre deux relevés (défaut : 60)")
+    watch.add_argument("--interval", default="1m", help="intervalle des barres relevées (défaut : 1m)")
+    watch.add_argument("--replay", default=None, metavar="AAAA-MM-JJ",
+                       help="rejoue cette séance à horloge accélérée au lieu de la séance en cours")
+    watch.add_argument("--speed", type=float, default=60.0, help="accélération de la séance rejouée (défaut : 60)")
+    watch.add_argument("--cycles", type=int, default=None, help="arrête après ce nombre de relevés")
+    watch.add_argument("--json", action="store_true", help="une mise à jour JSON par ligne")
+    watch.set_defaults(run=run_watch)
+
+    from stock_analysis.portfolio import DATE_EVALUATION
+    for commande in (unrealized, intraday):
+        commande.add_argument("--date", default=DATE_EVALUATION, help="date d'évaluation (AAAA-MM-JJ)")
+        commande.add_argument("--incremental", action="store_true",
+                              help="revalorise le grand livre des positions au dernier cours (prix d'achat figés)")
+        commande.add_argument("--risk", action="store_true",
+                              help="série quotidienne du portefeuille : volatilité, Sharpe, drawdown, bêta, contributions")
+        commande.add_argument("--index", default="SPY", help="indice de référence du bêta (défaut : SPY)")
+        commande.add_argument("--window", type=int, default=63,
+                              help="fenêtre glissante en séances des indicateurs de risque (défaut : 63)")
+
+    for commande in (realized, unrealized, intraday, watch):
+        commande.add_argument("--input", default=None,
+                              help="fichier CSV/Parquet de transactions (par défaut : la liste de portfolio.py)")
+
+    markets = commandes.add_parser("markets", help="marchés, fuseaux et secteurs des tickers")
+    markets.add_argument("tickers", nargs="*", help="tickers (par défaut : la liste de portfolio.py)")
+    markets.set_defaults(run=run_markets)
+
+    archive = commandes.add_parser("archive", help="archive locale des barres minute des séances clôturées")
+    archive.add_argument("tickers", nargs="*", help="tickers (par défaut : la liste de portfolio.py)")
+    archive.add_argument("--interval", default="1m", help="intervalle archivé (défaut : 1m ; 5m conservé 60 jours par Yahoo)")
+    archive.add_argument("--since", default=None, metavar="AAAA-MM-JJ",
+                         help="première séance à archiver (défaut : la plus ancienne encore servie par Yahoo)")
+    archive.set_defaults(run=run_archive)
+
+    screen = commandes.add_parser("screen", help="filtre d'un univers de tickers sur des indicateurs techniques")
+    screen.add_argument("criteria", nargs="+", metavar="critere",
+                        help='critère vérifié à la séance évaluée, ex. "sma(50) crosses_above sma(200)", "rsi(14) < 30"')
+    screen.add_argument("--tickers", nargs="+", default=None, help="tickers de l'univers")
+    screen.add_argument("--universe", default=None,
+                        help="fichier de tickers (CSV/Parquet à colonne ticker, ou un par ligne), ou \"cache\" "
+                             "pour tous les tickers en cache (par défaut : la liste de portfolio.py)")
+    screen.add_argument("--date", default=None, help="séance évaluée (défaut : dernière séance clôturée)")
+    screen.add_argument("--rank", default="relvol(20)", help="terme de classement (défaut : relvol(20))")
+    screen.add_argument("--ascending", action="store_true", help="classement croissant")
+    screen.add_argument("--top", type=int, default=50, help="nombre de tickers affichés et stockés (défaut : 50)")
+    screen.add_argument("--raw", action="store_true", help="cours bruts, sans ajustement des fractionnements et dividendes")
+    screen.set_defaults(run=run_screen)
+
+    lots = commandes.add_parser("lots", help="comptabilité par lots (FIFO, LIFO, coût moyen) des exécutions")
+    lots.add_argument("--input", default=None,
+                      help="fichier CSV/Parquet d'exécutions : ticker, horodatage, sens, quantite, prix[, frais] "
+                           "(par défaut : les exécutions de portfolio.py, voir --strategy)")
+    lots.add_argument("--strategy", choices=("realized", "unrealized"), default="realized",
+                      help="portefeuille de portfolio.py sans --input : allers-retours (realized) ou positions "
+                           "conservées (unrealized) ; un livre par portefeuille (défaut : realized)")
+    lots.add_argument("--method", choices=("fifo", "lifo", "average"), default="fifo",
+                      help="appariement des ventes : premier entré, dernier entré ou coût moyen pondéré (défaut : fifo)")
+    lots.add_argument("--date", default=None,
+                      help="date d'évaluation (AAAA-MM-JJ) : exécutions jusqu'à cette date, lots ouverts à sa clôture "
+                           "(défaut : date de portfolio.py, ou dernier cours avec --input)")
+    lots.add_argument("--raw", action="store_true", help="quantités telles qu'exécutées, sans ajustement des fractionnements")
+    lots.set_defaults(run=run_lots)
+
+    serve = commandes.add_parser("serve", help="service HTTP local de valorisation (JSON) pour les tableaux de bord")
+    serve.add_argument("--host", default="127.0.0.1", help="adresse d'écoute (défaut : 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765, help="port d'écoute (défaut : 8765)")
+    serve.add_argument("--every", type=float, default=60.0,
+                       help="secondes entre deux rafraîchissements des cours (défaut : 60 ; 0 : jamais)")
+    serve.add_argument("--positions", default=None,
+                       help="fichier CSV/Parquet des positions conservées (par défaut : la liste de portfolio.py)")
+    serve.add_argument("--trades", default=None,
+                       help="fichier CSV/Parquet des allers-retours (par défaut : la liste de portfolio.py)")
+    serve.set_defaults(run=run_serve)
+
+    simulate = commandes.add_parser("simulate",
+                                    help="projection Monte-Carlo des positions conservées (VaR, CVaR, percentiles)")
+    simulate.add_argument("--date", default=DATE_EVALUATION, help="date d'évaluation (AAAA-MM-JJ)")
+    simulate.add_argument("--input", default=None,
+                          help="fichier CSV/Parquet des positions conservées (par défaut : la liste de portfolio.py)")
+    simulate.add_argument("--method", choices=("bootstrap", "block", "normal"), default="bootstrap",
+                          help="rendements tirés : séances historiques entières, blocs de séances ou loi normale corrélée")
+    simulate.add_argument("--paths", type=int, default=100_000, help="nombre de chemins simulés (défaut : 100000)")
+    simulate.add_argument("--horizons", type=lambda texte: [int(h) for h in texte.split(",")], default=[1, 5, 21],
+                          help="horizons en séances, séparés par des virgules (défaut : 1,5,21)")
+    simulate.add_argument("--lookback", type=int, default=504, help="séances d'historique (défaut : 504)")
+    simulate.add_argument("--block", type=int, default=5, help="longueur des blocs de --method block (défaut : 5)")
+    simulate.add_argument("--seed", type=int, default=None, help="graine (résultats reproductibles)")
+    simulate.add_argument("--chunk", type=int, default=10_000, help="chemins par paquet (défaut : 10000)")
+    simulate.add_argument("--workers", type=int, default=None, help="processus (défaut : tous les cœurs ; 1 : sans pool)")
+    simulate.set_defaults(run=run_simulate)
+
+    sweep = commandes.add_parser("sweep", help="balayage heure d'entrée × durée × sortie de la stratégie intraday")
+    sweep.add_argument("--input", default=None,
+                       help="CSV des achats (ticker, date_achat, montant, ou export d'intraday) "
+                            "(par défaut : la liste de portfolio.py)")
+    sweep.add_argument("--entrees", type=_liste(float), default=[0.5, 1, 2, 3, 4],
+                       help="heures après l'ouverture, séparées par des virgules (défaut : 0.5,1,2,3,4)")
+    sweep.add_argument("--durees", type=_liste(int), default=[0, 1, 2, 5, 10],
+                       help="séances de détention, séparées par des virgules (défaut : 0,1,2,5,10)")
+    sweep.add_argument("--sorties", type=_liste(str), default=["close", "open"],
+                       help="règles de sortie : close, open ou h<heures> (défaut : close,open)")
+    sweep.add_argument("--interval", default="5m", help="intervalle des barres intraday (défaut : 5m)")
+    sweep.add_argument("--workers", type=int, default=None, help="processus (défaut : tous les cœurs ; 1 : sans pool)")
+    sweep.add_argument("--top", type=int, default=20, help="nombre de combinaisons affichées (défaut : 20)")
+    sweep.set_defaults(run=run_sweep)
+
+    bench = commandes.add_parser("bench", help="banc d'essai du calcul des prix et P&L (hors ligne)")
+    bench.add_argument("--sizes", type=_liste(lambda v: int(float(v))), default=[100, 1_000, 10_000, 100_000, 1_000_000],
+                       help="nombres de transactions, séparés par des virgules (défaut : 1e2,1e3,1e4,1e5,1e6)")
+    bench.add_argument("--repeat", type=int, default=3, help="passes par mesure, la meilleure est retenue (défaut : 3)")
+    bench.add_argument("--tickers", type=int, default=100, help="taille de l'univers synthétique (défaut : 100)")
+    bench.add_argument("--stages", type=_liste(str), default=None, help="étapes à mesurer (toutes par défaut)")
+    bench.add_argument("--output", default=None, help="fichier JSON des résultats")
+    bench.add_argument("--baseline", default=None, help="fichier JSON de référence à comparer")
+    bench.add_argument("--tolerance", type=float, default=0.25,
+                       help="hausse relative tolérée avant de signaler une régression (défaut : 0.25)")
+    bench.set_defaults(run=run_bench)
+
+    stream = commandes.add_parser("stream", help="calcul en flux d'un gros fichier de transactions (CSV/Parquet)")
+    stream.add_argument("mode", choices=("realized", "unrealized"),
+                        help="realized : allers-retours, unrealized : positions conservées")
+    stream.add_argument("file", help="fichier .csv ou .parquet (ticker, date_achat[, date_vente], montant)")
+    stream.add_argument("--date", default=None, help="date d'évaluation (AAAA-MM-JJ, obligatoire en mode unrealized)")
+
+    execution = commandes.add_parser("execution", help="prix d'exécution modélisés d'un fichier d'exécutions")
+    execution.add_argument("file", help="fichier .csv ou .parquet (ticker, horodatage[, quantite, sens, prix])")
+    execution.add_argument("--method", choices=("vwap", "interpolation", "nearest"), default="vwap",
+                           help="prix modélisé : VWAP de la fenêtre, interpolation ou barre la plus proche (défaut : vwap)")
+    execution.add_argument("--window", type=float, default=5.0, help="demi-fenêtre VWAP en minutes (défaut : 5)")
+    execution.add_argument("--bars", default="1m", help="intervalle des barres (défaut : 1m)")
+    execution.add_argument("--half-spread", type=float, default=1.0, help="demi-écart en points de base (défaut : 1)")
+    execution.add_argument("--impact", type=float, default=0.5, help="coefficient d'impact en racine carrée (défaut : 0.5)")
+    execution.set_defaults(run=run_execution)
+
+    for commande in (stream, execution):
+        commande.add_argument("--chunksize", type=int, default=100_000, help="lignes lues par morceau (défaut : 100000)")
+        commande.add_argument("--output", default=None, help="fichier de sortie .csv ou .parquet")
+        commande.add_argument("--dataset", default=None, help="jeu de données du stockage des résultats")
+    stream.set_defaults(run=run_stream)
+
+    record = commandes.add_parser("record", help="enregistre des données de marché pour un rejeu hors ligne")
+    record.add_argument("root", help="dossier de destination (STOCK_ANALYSIS_PROVIDER=replay:<dossier>)")
+    record.add_argument("tickers", nargs="+", help="tickers à enregistrer")
+    record.add_argument("--start", required=True, help="première date (AAAA-MM-JJ)")
+    record.add_argument("--end", required=True, help="date de fin, exclue (AAAA-MM-JJ)")
+    record.add_argument("--interval", action="append", help="intervalle(s) à enregistrer, option répétable (défaut : 1d)")
+    record.add_argument("--source", default=None, help="fournisseur source (défaut : STOCK_ANALYSIS_PROVIDER)")
+    record.set_defaults(run=run_record)
+
+    for commande in (realized, unrealized, intraday, markets, screen, lots, simulate):
+        commande.add_argument("--csv", action="store_true", help="exporte aussi le tableau détaillé en CSV")
+    for commande in (realized, unrealized, intraday):
+        commande.add_argument("--fx", action="store_true",
+                              help="convertit les cours (devise de cotation) en euros, aux taux des dates d'achat, de vente et d'évaluation")
+    for commande in (realized, unrealized, intraday, watch, markets, archive, screen, lots, serve, simulate,
+                     sweep, bench, stream, execution, record):
+        commande.add_argument("--profile", nargs="?", const="text", default=None,
+                              choices=("text", "json", "openmetrics"),
+                              help="relevé des étapes chronométrées et des compteurs (tableau par défaut)")
+        commande.add_argument("--profile-output", default=None,
+                              help="écrit le relevé --profile dans ce fichier plutôt que sur la sortie")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.profile:
+        return args.run(args)
+
+    from stock_analysis import metrics
+    metrics.enable()
+    try:
+        with metrics.timer("commande", nom=args.command):
+            return args.run(args)
+    finally:
+        if args.profile == "text" and not args.profile_output:
+            print("\n" + "=" * 113)
+            print(f"PROFIL D'EXÉCUTION ({args.command})")
+            print("=" * 113)
+        metrics.dump(args.profile, args.profile_output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+"""
+Opérations sur titres (fractionnements d'actions, dividendes) et facteurs
+d'ajustement des cours.
+
+Le cache de barres conserve les cours bruts, tels qu'ils ont été cotés : une
+séance close n'est jamais retéléchargée, même après un fractionnement ou un
+dividende (Yahoo, lui, réajuste tout l'historique à chaque requête). Les
+événements de chaque ticker sont gardés en SQLite, comme le référentiel de
+métadonnées (validité d'un jour par défaut), puis transformés en produits
+cumulés de facteurs : le facteur entre deux dates est le rapport de deux
+produits préfixes trouvés par recherche dichotomique, pour toutes les lignes
+d'un coup. Les cours ajustés se calculent ainsi à la volée, pour n'importe
+quelle date de référence, sans rien retélécharger.
+
+Convention (celle de Yahoo / CRSP) : un cours de la séance t, vu à la date D,
+est multiplié par le produit des facteurs des événements de date ex dans ]t, D] :
+1 / ratio pour un fractionnement, 1 - dividende / clôture de la veille pour un
+dividende. Les volumes sont multipliés par les ratios de fractionnement.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.cache import CACHE_DIR, get_cache
+from stock_analysis import metrics
+from stock_analysis.fetch import get_pool
+from stock_analysis.panel import PricePanel
+from stock_analysis.providers import get_provider
+
+# Durée de validité (secondes) des événements d'un ticker
+TTL_ACTIONS = int(os.environ.get("STOCK_ANALYSIS_TTL_ACTIONS", 24 * 3600))
+
+COLONNES = ["date", "dividende", "fractionnement", "facteur_dividende"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evenements (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    dividende REAL NOT NULL,
+    fractionnement REAL NOT NULL,
+    facteur_dividende REAL,
+    PRIMARY KEY (ticker, date)
+);
+CREATE TABLE IF NOT EXISTS telechargements (
+    ticker TEXT PRIMARY KEY,
+    telecharge_le REAL NOT NULL
+);
+"""
+
+
+def _vide():
+    return pd.DataFrame({
+        "date": pd.Series(dtype="datetime64[ns]"),
+        "dividende": pd.Series(dtype=float),
+        "fractionnement": pd.Series(dtype=float),
+        "facteur_dividende": pd.Series(dtype=float),
+    })
+
+
+def _jours(dates):
+    """Dates (naïves ou tz-aware, scalaire ou tableau) -> jours à minuit en int64 ns (NaT -> min int64)"""
+    serie = pd.to_datetime(pd.Series(dates if np.ndim(dates) else [dates]))
+    if serie.dt.tz is not None:
+        serie = serie.dt.tz_localize(None)
+    return serie.dt.normalize().astype("datetime64[ns]").to_numpy().view("i8")
+
+
+def normalize_actions(actions, split_adjusted=False):
+    """
+    Événements d'un fournisseur (index de dates, colonnes Dividends et Stock
+    Splits, 0 = pas de fractionnement) -> DataFrame (date, dividende,
+    fractionnement, facteur_dividende). Si les dividendes sont déjà ajustés des
+    fractionnements ultérieurs (Yahoo), ils sont ramenés à leur montant brut.
+    """
+    if actions is None or actions.empty:
+        return _vide()
+    index = pd.DatetimeIndex(actions.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df = pd.DataFrame({
+        "date": index.normalize().astype("datetime64[ns]"),
+        "dividende": actions.get("Dividends", pd.Series(0.0, index=actions.index)).fillna(0.0).to_numpy(dtype=float),
+        "fractionnement": actions.get("Stock Splits", pd.Series(0.0, index=actions.index)).fillna(0.0).to_numpy(dtype=float),
+    })
+    df.loc[df["fractionnement"] <= 0, "fractionnement"] = 1.0
+    # Un dividende et un fractionnement le même jour ne font qu'une ligne
+    df = df.groupby("date", as_index=False).agg(dividende=("dividende", "sum"), fractionnement=("fractionnement", "prod"))
+    df = df[(df["dividende"] > 0) | (df["fractionnement"] != 1.0)].reset_index(drop=True)
+    if split_adjusted and len(df):
+        # Produit des ratios des fractionnements postérieurs à chaque date ex
+        ratios = df["fractionnement"].to_numpy()
+        posterieurs = np.concatenate([np.cumprod(ratios[::-1])[::-1][1:], [1.0]])
+        df["dividende"] = df["dividende"] * posterieurs
+    df["facteur_dividende"] = np.where(df["dividende"] > 0, np.nan, 1.0)
+    return df
+
+
+class CorporateActionStore:
+    """Événements par ticker, persistés en SQLite et servis depuis la mémoire"""
+
+    def __init__(self, path=None, ttl=TTL_ACTIONS, pool=None, provider=None):
+        self.provider = provider or get_provider()
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            nom = "actions.sqlite" if self.provider.name == "yahoo" else f"actions-{self.provider.name}.sqlite"
+            path = os.path.join(CACHE_DIR, nom)
+        self.path = path
+        self.ttl = ttl
+        self._pool = pool
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._verrou = threading.RLock()
+        self._en_arriere_plan = set()
+        # Dernières erreurs de téléchargement, par ticker
+        self.errors = {}
+
+        evenements = pd.read_sql_query(
+            f"SELECT ticker, {', '.join(COLONNES)} FROM evenements ORDER BY ticker, date", self._conn
+        )
+        evenements["date"] = pd.to_datetime(evenements["date"]).astype("datetime64[ns]")
+        dates = dict(self._conn.execute("SELECT ticker, telecharge_le FROM telechargements").fetchall())
+        groupes = {t: g[COLONNES].reset_index(drop=True) for t, g in evenements.groupby("ticker", sort=False)}
+        self._memoire = {t: (groupes.get(t, _vide()), telecharge_le) for t, telecharge_le in dates.items()}
+
+    @property
+    def pool(self):
+        return self._pool or get_pool()
+
+    def lookup(self, tickers, background=True):
+        """
+        Événements d'un lot de tickers : dict ticker -> DataFrame (date, dividende,
+        fractionnement, facteur_dividende), trié par date. Les tickers inconnus
+        sont téléchargés avant de répondre, les périmés rafraîchis en arrière-plan
+        (ou tout de suite si `background` est faux). Un échec donne un tableau vide.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        maintenant = time.time()
+        with self._verrou:
+            absents = [t for t in tickers if t not in self._memoire]
+            perimes = [t for t in tickers if t in self._memoire and maintenant - self._memoire[t][1] >= self.ttl]
+        metrics.count("cache_actions", len(absents), resultat="miss")
+        metrics.count("cache_actions", len(perimes), resultat="perime")
+        metrics.count("cache_actions", len(tickers) - len(absents) - len(perimes), resultat="hit")
+
+        if background:
+            self._rafraichir_en_arriere_plan(perimes)
+            self.refresh(absents)
+        else:
+            self.refresh(absents + perimes)
+
+        with self._verrou:
+            return {t: self._memoire[t][0] if t in self._memoire else _vide() for t in tickers}
+
+    def refresh(self, tickers):
+        """Télécharge (en parallèle) et enregistre les événements des tickers"""
+        if not tickers:
+            return
+        actions = self.pool.fetch_all({
+            ("actions", ticker): (lambda ticker=ticker: self.provider.actions(ticker)) for ticker in tickers
+        })
+        for (_, ticker), evenements in actions.items():
+            self._enregistrer(ticker, evenements)
+
+    def set_dividend_factors(self, ticker, dates, facteurs):
+        """Mémorise les facteurs des dividendes calculés (une seule fois par dividende)"""
+        with self._verrou, self._conn:
+            self._conn.executemany(
+                "UPDATE evenements SET facteur_dividende = ? WHERE ticker = ? AND date = ?",
+                [(float(f), ticker, pd.Timestamp(d).date().isoformat()) for d, f in zip(dates, facteurs)],
+            )
+            if ticker in self._memoire:
+                evenements, telecharge_le = self._memoire[ticker]
+                evenements = evenements.copy()
+                lignes = evenements["date"].isin(pd.DatetimeIndex(dates))
+                evenements.loc[lignes, "facteur_dividende"] = pd.Series(
+                    np.asarray(facteurs, dtype=float), index=pd.DatetimeIndex(dates)
+                ).reindex(evenements.loc[lignes, "date"]).to_numpy()
+                self._memoire[ticker] = (evenements, telecharge_le)
+
+    def clear(self, ticker=None):
+        with self._verrou, self._conn:
+            for table in ("evenements", "telechargements"):
+                if ticker is None:
+                    self._conn.execute(f"DELETE FROM {table}")
+                else:
+                    self._conn.execute(f"DELETE FROM {table} WHERE ticker = ?", (ticker,))
+            if ticker is None:
+                self._memoire.clear()
+            else:
+                self._memoire.pop(ticker, None)
+
+    def _rafraichir_en_arriere_plan(self, tickers):
+        for ticker in tickers:
+            with self._verrou:
+                if ticker in self._en_arriere_plan:
+                    continue
+                self._en_arriere_plan.add(ticker)
+            future = self.pool.submit(("actions", ticker), self.provider.actions, ticker)
+            future.add_done_callback(lambda f, ticker=ticker: self._terminer(ticker, f))
+
+    def _terminer(self, ticker, future):
+        try:
+            evenements = future.result()
+        except Exception as e:
+            evenements = e
+        self._enregistrer(ticker, evenements)
+        with self._verrou:
+            self._en_arriere_plan.discard(ticker)
+
+    def _enregistrer(self, ticker, actions):
+        if isinstance(actions, Exception):
+            self.errors[ticker] = actions
+            return
+        evenements = normalize_actions(actions, getattr(self.provider, "split_adjusted", False))
+        telecharge_le = time.time()
+        with self._verrou, self._conn:
+            # Les facteurs de dividende déjà calculés restent valables
+            if ticker in self._memoire and len(evenements) and len(self._memoire[ticker][0]):
+                anciens = self._memoire[ticker][0].set_index(["date", "dividende"])["facteur_dividende"]
+                connus = anciens.reindex(pd.MultiIndex.from_frame(evenements[["date", "dividende"]])).to_numpy()
+                evenements["facteur_dividende"] = np.where(np.isnan(connus), evenements["facteur_dividende"], connus)
+            self._conn.execute("DELETE FROM evenements WHERE ticker = ?", (ticker,))
+            self._conn.executemany(
+                "INSERT INTO evenements VALUES (?, ?, ?, ?, ?)",
+                [
+                    (ticker, e.date.date().isoformat(), float(e.dividende), float(e.fractionnement),
+                     None if np.isnan(e.facteur_dividende) else float(e.facteur_dividende))
+                    for e in evenements.itertuples(index=False)
+                ],
+            )
+            self._conn.execute("INSERT OR REPLACE INTO telechargements VALUES (?, ?)", (ticker, telecharge_le))
+            self._memoire[ticker] = (evenements, telecharge_le)
+            self.errors.pop(ticker, None)
+
+
+_store_defaut = None
+_verrou_store = threading.Lock()
+
+
+def get_corporate_store():
+    """Référentiel d'événements partagé (créé au premier appel)"""
+    global _store_defaut
+    with _verrou_store:
+        if _store_defaut is None:
+            _store_defaut = CorporateActionStore()
+        return _store_defaut
+
+
+class AdjustmentFactors:
+    """Produits préfixes des facteurs d'ajustement par ticker (tableaux NumPy)"""
+
+    def __init__(self, events):
+        # ticker -> (dates ex en ns, produits préfixes tous facteurs, produits préfixes fractionnements)
+        self._tables = {}
+        for ticker, evenements in events.items():
+            if evenements.empty:
+                continue
+            dates = evenements["date"].astype("datetime64[ns]").to_numpy().view("i8")
+            fractionnement = 1.0 / evenements["fractionnement"].to_numpy(dtype=float)
+            # Dividende dont la clôture de la veille est inconnue : ignoré
+            dividende = np.nan_to_num(evenements["facteur_dividende"].to_numpy(dtype=float), nan=1.0)
+            self._tables[ticker] = (
+                dates,
+                np.concatenate([[1.0], np.cumprod(fractionnement * dividende)]),
+                np.concatenate([[1.0], np.cumprod(fractionnement)]),
+            )
+
+    @classmethod
+    def load(cls, tickers, closes=None, since=None, store=None):
+        """
+        Facteurs des tickers. Les facteurs de dividende manquants sont calculés
+        sur `closes` (table longue ticker, date, prix de pnl.price_table, cours
+        bruts), sinon sur le cache de barres, puis mémorisés ; seuls les dividendes
+        postérieurs à `since` sont nécessaires pour ajuster des cours depuis cette date.
+        Sans `since`, la première date de `closes` en tient lieu : les dividendes
+        plus anciens n'ajustent aucun cours de la table, et le cache de barres n'est
+        lu que pour les veilles absentes de la table, pas depuis le premier dividende.
+        """
+        store = store or get_corporate_store()
+        if since is None and closes is not None and len(closes):
+            since = pd.Timestamp(closes["date"].min())
+        evenements = store.lookup(tickers)
+        for ticker, ev in evenements.items():
+            manquants = ev["facteur_dividende"].isna().to_numpy()
+            if since is not None:
+                limite = np.datetime64(pd.Timestamp(since).normalize().as_unit("ns"))
+                manquants = manquants & (ev["date"].to_numpy() > limite)
+            if not manquants.any():
+                continue
+            dates = ev["date"].to_numpy()[manquants]
+            veille = _clotures_veille(ticker, dates, closes)
+            facteurs = 1.0 - ev["dividende"].to_numpy()[manquants] / veille
+            connus = np.isfinite(facteurs) & (facteurs > 0)
+            if connus.any():
+                store.set_dividend_factors(ticker, dates[connus], facteurs[connus])
+        return cls(store.lookup(tickers))
+
+    def __contains__(self, ticker):
+        return ticker in self._tables
+
+    @metrics.timed("ajustement")
+    def factors(self, tickers, dates, as_of=None, dividends=True):
+        """
+        Facteur de chaque ligne (ticker, date) vu à `as_of` (date unique ou une par
+        ligne ; None = tous les événements connus) : produit des facteurs des
+        événements de date ex dans ]date, as_of]. `dividends` faux : fractionnements
+        seuls. Retourne un ndarray (1 sans événement, NaN pour une date manquante).
+        """
+        tickers = np.asarray(tickers, dtype=object)
+        n = len(tickers)
+        jours = _jours(dates) if n else np.empty(0, dtype="i8")
+        if as_of is None:
+            references = np.full(n, np.iinfo("i8").max)
+        else:
+            references = _jours(as_of)
+            if len(references) == 1:
+                references = np.repeat(references, n)
+
+        resultat = np.ones(n)
+        codes, uniques = pd.factorize(tickers)
+        for k, ticker in enumerate(uniques):
+            if ticker not in self._tables:
+                continue
+            lignes = np.flatnonzero(codes == k)
+            dates_ex, cumul_total, cumul_fractionnement = self._tables[ticker]
+            cumul = cumul_total if dividends else cumul_fractionnement
+            i = np.searchsorted(dates_ex, jours[lignes], side="right")
+            j = np.searchsorted(dates_ex, references[lignes], side="right")
+            resultat[lignes] = cumul[j] / cumul[i]
+        resultat[jours == np.iinfo("i8").min] = np.nan
+        return resultat
+
+    def split_ratios(self, tickers, dates, as_of=None):
+        """Ratio cumulé des fractionnements dans ]date, as_of] (2 après un 2 pour 1)"""
+        return 1.0 / self.factors(tickers, dates, as_of, dividends=False)
+
+    def adjust_frame(self, prix, as_of=None, dividends=True):
+        """Tableau dates × tickers de cours bruts ajusté à `as_of`"""
+        if prix.empty or not any(t in self._tables for t in prix.columns):
+            return prix
+        n, m = prix.shape
+        tickers = np.tile(prix.columns.to_numpy(dtype=object), n)
+        dates = np.repeat(prix.index.to_numpy(), m)
+        return prix * self.factors(tickers, dates, as_of, dividends).reshape(n, m)
+
+    def adjust_history(self, ticker, hist, as_of=None, dividends=True):
+        """Historique OHLCV brut d'un ticker ajusté à `as_of` (volumes en actions d'après fractionnements)"""
+        if ticker not in self._tables or hist.empty:
+            return hist
+        tickers = np.full(len(hist), ticker, dtype=object)
+        facteurs = self.factors(tickers, hist.index, as_of, dividends)
+        ajuste = hist.copy()
+        for colonne in ("Open", "High", "Low", "Close"):
+            if colonne in ajuste:
+                ajuste[colonne] = ajuste[colonne].to_numpy(dtype=float) * facteurs
+        if "Volume" in ajuste:
+            ajuste["Volume"] = ajuste["Volume"].to_numpy(dtype=float) * self.split_ratios(tickers, hist.index, as_of)
+        return ajuste
+
+    def adjust_panel(self, panel, as_of=None, dividends=True):
+        """PricePanel de cours bruts ajusté à `as_of` (nouveau panel, mêmes bornes)"""
+        frames = {}
+        for ticker, hist in panel.frames.items():
+            frames[ticker] = self.adjust_history(ticker, hist, as_of, dividends)
+            frames[ticker].attrs.update(hist.attrs)
+        return PricePanel(frames, panel.interval)
+
+
+def _clotures_veille(ticker, dates, closes=None):
+    """Clôture brute de la dernière séance avant chaque date ex (NaN si inconnue)"""
+    dates = pd.DatetimeIndex(dates)
+    veille = np.full(len(dates), np.nan)
+    if closes is not None and len(closes):
+        lignes = closes[closes["ticker"] == ticker]
+        if len(lignes):
+            serie = pd.Series(lignes["prix"].to_numpy(dtype=float), index=pd.DatetimeIndex(lignes["date"])).sort_index()
+            i = np.searchsorted(serie.index.to_numpy(), dates.to_numpy(), side="left") - 1
+            # La veille doit précéder la date ex de quelques jours au plus (pas de trou de couverture)
+            trouves = (i >= 0)
+            trouves[trouves] &= (dates.to_numpy()[trouves] - serie.index.to_numpy()[i[trouves]]) <= np.timedelta64(7, "D")
+            veille[trouves] = serie.to_numpy()[i[trouves]]
+    manquants = np.isnan(veille)
+    if manquants.any():
+        # Une seule lecture du cache de barres pour tous les dividendes manquants
+        debut = dates[manquants].min() - timedelta(days=10)
+        hist = get_cache().history(ticker, debut, dates[manquants].max())
+        if not hist.empty:
+            index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+            index = index.normalize().to_numpy()
+            clotures = hist["Close"].to_numpy(dtype=float)
+            i = np.searchsorted(index, dates[manquants].to_numpy(), side="left") - 1
+            valides = i >= 0
+            lignes = np.flatnonzero(manquants)[valides]
+            veille[lignes] = clotures[i[valides]]
+    return veille
@@ -0,0 +1,269 @@
+"""
+Modèle de prix d'exécution sur barres intraday (1 minute de préférence), pour
+un lot de (ticker, horodatage) : des milliers d'exécutions en un appel.
+
+- vwap : Σ(prix typique × volume) / Σ volume des barres ouvertes dans la
+  fenêtre [t - avant, t + après) ; lu sur des sommes cumulées par ticker, donc
+  deux recherches dichotomiques par exécution quelle que soit la fenêtre ;
+- interpolation : prix à l'instant t, interpolé linéairement dans le temps sur
+  le chemin (ouverture de barre, Open) → (fin de barre, Close) ;
+- nearest : clôture de la barre la plus proche (comportement historique) ;
+- glissement : demi-écart + impact en racine carrée de la participation
+  (σ de la fenêtre × √(quantité / volume de la fenêtre)), signé par le sens.
+
+Comme lookup_bars(), on ne boucle que sur les tickers distincts : les
+exécutions d'un ticker sont résolues d'un bloc par np.searchsorted / np.interp.
+
+Usage (rapprochement d'un fichier d'exécutions) :
+    python -m stock_analysis execution executions.csv --method vwap --window 5 --output modele.parquet
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.bars import TOLERANCE, _ns, lookup_bars
+from stock_analysis.providers import _minutes
+from stock_analysis.sessions import get_calendar
+
+METHODES = ("vwap", "interpolation", "nearest")
+
+# Fenêtre VWAP par défaut : 5 minutes de part et d'autre de l'heure cible
+FENETRE = pd.Timedelta(minutes=5)
+
+SENS = {"achat": 1, "buy": 1, "vente": -1, "sell": -1}
+
+
+class SlippageModel:
+    """
+    Coût d'exécution en points de base : `half_spread_bps` + `impact` × σ × √participation,
+    σ étant la volatilité des rendements de barre sur la fenêtre ramenée à sa durée
+    et la participation bornée à `max_participation`.
+    """
+
+    def __init__(self, half_spread_bps=1.0, impact=0.5, max_participation=1.0):
+        self.half_spread_bps = half_spread_bps
+        self.impact = impact
+        self.max_participation = max_participation
+
+    def cost_bps(self, quantities, volumes, sigmas):
+        quantites = np.abs(np.asarray(quantities, dtype=float))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            participation = np.clip(quantites / np.asarray(volumes, dtype=float), 0.0, self.max_participation)
+        impact = self.impact * np.nan_to_num(np.asarray(sigmas, dtype=float)) * np.sqrt(np.nan_to_num(participation))
+        return self.half_spread_bps + impact * 1e4
+
+
+class BarIndex:
+    """
+    Barres de plusieurs tickers préparées une fois pour toutes (horodatages en ns,
+    sommes cumulées de prix × volume, volume, rendements et rendements²) ; à
+    construire une fois par séance puis réutiliser pour chaque lot d'exécutions.
+    """
+
+    def __init__(self, frames, interval=None):
+        interval = interval or getattr(frames, "interval", "1m")
+        frames = frames.frames if hasattr(frames, "frames") else frames
+        self.interval = interval
+        self.frames = frames
+        self.duree = _minutes(interval) * 60 * 10**9
+        self._barres = {}
+
+    def _preparer(self, ticker):
+        """Tableaux du ticker (None sans barre), calculés au premier usage"""
+        if ticker in self._barres:
+            return self._barres[ticker]
+        hist = self.frames.get(ticker)
+        barres = None
+        if hist is not None and not hist.empty:
+            hist = hist[hist["Close"].notna()]
+            ouverture = hist["Open"].to_numpy(dtype=float)
+            cloture = hist["Close"].to_numpy(dtype=float)
+            typique = (hist["High"].to_numpy(dtype=float) + hist["Low"].to_numpy(dtype=float) + cloture) / 3
+            volume = np.nan_to_num(hist["Volume"].to_numpy(dtype=float))
+            rendement = np.diff(np.log(cloture), prepend=np.log(ouverture[:1]))
+
+            def cumul(valeurs):
+                return np.concatenate([[0.0], np.cumsum(valeurs)])
+
+            barres = {
+                "ts": _ns(hist.index),
+                "open": ouverture,
+                "close": cloture,
+                "pv": cumul(typique * volume),
+                "v": cumul(volume),
+                "p": cumul(typique),
+                "r": cumul(rendement),
+                "rr": cumul(rendement ** 2),
+            }
+        self._barres[ticker] = barres
+        return barres
+
+    def _groupes(self, tickers):
+        """(ticker, lignes) pour chaque ticker distinct ayant des barres"""
+        uniques, inverse = np.unique(tickers, return_inverse=True)
+        ordre = np.argsort(inverse, kind="stable")
+        bornes = np.searchsorted(inverse[ordre], np.arange(len(uniques) + 1))
+        for k, ticker in enumerate(uniques):
+            barres = self._preparer(ticker)
+            if barres is not None:
+                yield barres, ordre[bornes[k]:bornes[k + 1]]
+
+    def window(self, tickers, timestamps, before=FENETRE, after=FENETRE):
+        """
+        Statistiques de la fenêtre [t - before, t + after) de chaque exécution :
+        DataFrame (vwap, volume, barres, sigma) aligné sur l'entrée.
+        """
+        tickers = np.asarray(tickers, dtype=object).astype(str)
+        cibles = _ns(timestamps)
+        n = len(tickers)
+        vwap, volume, sigma = np.full(n, np.nan), np.zeros(n), np.full(n, np.nan)
+        nb = np.zeros(n, dtype=np.int64)
+        avant, apres = pd.Timedelta(before).value, pd.Timedelta(after).value
+
+        for barres, lignes in self._groupes(tickers):
+            i0 = np.searchsorted(barres["ts"], cibles[lignes] - avant, side="left")
+            i1 = np.searchsorted(barres["ts"], cibles[lignes] + apres, side="left")
+            compte = i1 - i0
+            v = barres["v"][i1] - barres["v"][i0]
+            pv = barres["pv"][i1] - barres["pv"][i0]
+            p = barres["p"][i1] - barres["p"][i0]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # Sans volume (barres vides, indices), moyenne des prix typiques
+                vwap[lignes] = np.where(v > 0, pv / v, p / compte)
+                s_r = barres["r"][i1] - barres["r"][i0]
+                s_rr = barres["rr"][i1] - barres["rr"][i0]
+                variance = np.maximum(s_rr - s_r ** 2 / compte, 0.0) / (compte - 1)
+                # Volatilité ramenée à la durée de la fenêtre
+                sigma[lignes] = np.where(compte > 1, np.sqrt(variance * compte), np.nan)
+            volume[lignes] = v
+            nb[lignes] = compte
+        return pd.DataFrame({"vwap": vwap, "volume": volume, "barres": nb, "sigma": sigma})
+
+    def interpolate(self, tickers, timestamps, tolerance=TOLERANCE):
+        """
+        Prix interpolé linéairement dans le temps entre (ouverture, Open) et
+        (fin, Close) des barres encadrant chaque horodatage ; NaN hors des barres
+        du ticker ou à plus de `tolerance` de la barre la plus proche.
+        """
+        tickers = np.asarray(tickers, dtype=object).astype(str)
+        cibles = _ns(timestamps)
+        prix = np.full(len(tickers), np.nan)
+        ecart_max = pd.Timedelta(tolerance).value if tolerance is not None else np.iinfo(np.int64).max
+
+        for barres, lignes in self._groupes(tickers):
+            ts = barres["ts"]
+            # Noeuds du chemin de prix : Open à l'ouverture de la barre, Close à sa fin
+            noeuds = np.column_stack([ts, ts + self.duree]).ravel()
+            valeurs = np.column_stack([barres["open"], barres["close"]]).ravel()
+            origine = noeuds[0]
+            t = cibles[lignes]
+            interpole = np.interp((t - origine).astype(float), (noeuds - origine).astype(float), valeurs)
+
+            # Distance à la barre la plus proche (0 à l'intérieur d'une barre)
+            i = np.clip(np.searchsorted(ts, t, side="right") - 1, 0, len(ts) - 1)
+            dedans = (t >= ts[i]) & (t <= ts[i] + self.duree)
+            suivante = np.minimum(i + 1, len(ts) - 1)
+            distance = np.where(dedans, 0, np.minimum(np.abs(t - ts[i] - self.duree), np.abs(ts[suivante] - t)))
+            valides = (t >= noeuds[0]) & (t <= noeuds[-1]) & (distance <= ecart_max)
+            prix[lignes] = np.where(valides, interpole, np.nan)
+        return prix
+
+
+def _sens(sides, n):
+    if sides is None:
+        return np.ones(n)
+    sides = np.asarray(sides)
+    if sides.dtype.kind in "OUS":
+        return pd.Series(sides).str.lower().map(SENS).to_numpy(dtype=float)
+    return np.sign(sides.astype(float))
+
+
+@metrics.timed("prix_execution")
+def execution_prices(bars, tickers, timestamps, method="vwap", before=FENETRE, after=FENETRE,
+                     quantities=None, sides=None, slippage=None, tolerance=TOLERANCE):
+    """
+    Prix d'exécution modélisés d'un lot de (ticker, horodatage). `bars` est un
+    BarIndex (ou un PricePanel / dict d'historiques intraday). Retourne un
+    DataFrame aligné sur l'entrée : prix_reference (selon `method`), vwap,
+    volume et barres de la fenêtre, sigma, glissement_bps et prix_execution
+    (référence majorée du glissement à l'achat, minorée à la vente).
+    """
+    if method not in METHODES:
+        raise ValueError(f"Méthode inconnue : {method} (attendu : {', '.join(METHODES)})")
+    bars = bars if isinstance(bars, BarIndex) else BarIndex(bars)
+    tickers = np.asarray(tickers, dtype=object).astype(str)
+    n = len(tickers)
+
+    df = bars.window(tickers, timestamps, before, after)
+    if method == "vwap":
+        reference = df["vwap"].to_numpy()
+    elif method == "interpolation":
+        reference = bars.interpolate(tickers, timestamps, tolerance)
+    else:
+        reference = lookup_bars(bars.frames, tickers, timestamps, "nearest", tolerance)["prix"].to_numpy()
+    df.insert(0, "prix_reference", reference)
+
+    slippage = slippage or SlippageModel()
+    quantites = np.zeros(n) if quantities is None else np.asarray(quantities, dtype=float)
+    glissement = slippage.cost_bps(quantites, df["volume"].to_numpy(), df["sigma"].to_numpy())
+    df["glissement_bps"] = np.where(np.isnan(reference), np.nan, glissement)
+    df["prix_execution"] = reference * (1 + _sens(sides, n) * df["glissement_bps"].to_numpy() / 1e4)
+    return df
+
+
+def session_estimate(tickers, dates, daily, targets, calendar=None, timezones=None):
+    """
+    Repli sans barres intraday : interpolation linéaire dans le temps entre
+    l'ouverture (Open) et la clôture (Close) quotidiennes de la séance, sur le
+    calendrier de la place de chaque ligne (`timezones`) ou `calendar`.
+    """
+    from stock_analysis.pnl import price_table, resolve_prices
+
+    ouverture = resolve_prices(tickers, dates, price_table(daily, "Open"))
+    cloture = resolve_prices(tickers, dates, price_table(daily, "Close"))
+    cibles = _ns(targets)
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    fuseaux = np.full(len(dates), (calendar or get_calendar()).tz, dtype=object) if timezones is None \
+        else np.asarray(timezones, dtype=object)
+    debut, fin = np.empty(len(dates), dtype=np.int64), np.empty(len(dates), dtype=np.int64)
+    for tz in pd.unique(fuseaux):
+        lignes = fuseaux == tz
+        calendrier = calendar if calendar is not None and timezones is None else get_calendar(tz)
+        bornes = calendrier.session_bounds(calendrier.next_session(dates[lignes]))
+        debut[lignes], fin[lignes] = _ns(bornes[0]), _ns(bornes[1])
+    fraction = np.clip((cibles - debut) / (fin - debut), 0.0, 1.0)
+    return ouverture + fraction * (cloture - ouverture)
+
+
+# ----------------------------------------------------------------------
+# Rapprochement d'un fichier d'exécutions
+# ----------------------------------------------------------------------
+def reconcile(fills, bars, method="vwap", before=FENETRE, after=FENETRE, slippage=None):
+    """
+    Ajoute aux exécutions (ticker, horodatage[, quantite, sens, prix]) le prix
+    modélisé et, si le prix réel est connu, l'écart en points de base (positif :
+    exécution plus chère que le modèle à l'achat, moins chère à la vente).
+    """
+    horodatages = pd.to_datetime(fills["horodatage"])
+    modele = execution_prices(
+        bars, fills["ticker"], horodatages, method, before, after,
+        quantities=fills["quantite"] if "quantite" in fills else None,
+        sides=fills["sens"] if "sens" in fills else None, slippage=slippage,
+    )
+    resultat = pd.concat([fills.reset_index(drop=True), modele], axis=1)
+    if "prix" in fills:
+        sens = _sens(fills["sens"] if "sens" in fills else None, len(fills))
+        resultat["ecart_bps"] = sens * (fills["prix"].to_numpy(dtype=float) / modele["prix_execution"].to_numpy() - 1) * 1e4
+    return resultat
+
+
+def main(argv=None):
+    """Équivaut à `python -m stock_analysis execution` (voir cli)"""
+    from stock_analysis.cli import main as cli_main
+    return cli_main(["execution", *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Pool partagé pour toutes les requêtes Yahoo (history, info, download).
+
+- concurrence bornée (ThreadPoolExecutor) ;
+- limiteur de débit « token bucket » commun à tous les threads ;
+- nouvelles tentatives avec backoff exponentiel + jitter sur 429 / 5xx /
+  erreurs réseau ;
+- déduplication des requêtes en cours : deux demandes avec la même clé
+  partagent le même Future.
+
+Le pool ne connaît pas yfinance : il exécute des callables, ce qui permet de le
+mesurer avec un faux fetcher local, sans réseau.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from stock_analysis import metrics
+
+CONCURRENCE = int(os.environ.get("STOCK_ANALYSIS_CONCURRENCE", 8))
+REQUETES_PAR_SECONDE = float(os.environ.get("STOCK_ANALYSIS_REQ_PAR_SEC", 5))
+TENTATIVES = 5
+DELAI_BASE = 0.5
+DELAI_MAX = 30.0
+
+# Erreurs réseau des clients HTTP de yfinance (requests, curl_cffi), reconnues par
+# module et nom de classe : elles ne dérivent pas des ConnectionError / TimeoutError natives
+MODULES_HTTP = ("requests", "curl_cffi", "urllib3")
+ERREURS_RESEAU = {"ConnectionError", "Timeout", "ChunkedEncodingError", "IncompleteRead", "ProtocolError"}
+# Codes libcurl transitoires : DNS, connexion, délai dépassé, SSL, réponse vide, envoi / réception
+CODES_CURL = {6, 7, 28, 35, 52, 55, 56}
+
+
+class TokenBucket:
+    """Limiteur de débit : `rate` jetons par seconde, au plus `capacity` en réserve"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._jetons = self.capacity
+        self._dernier = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def acquire(self):
+        """Bloque jusqu'à obtenir un jeton"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._verrou:
+                maintenant = time.monotonic()
+                self._jetons = min(self.capacity, self._jetons + (maintenant - self._dernier) * self.rate)
+                self._dernier = maintenant
+                if self._jetons >= 1:
+                    self._jetons -= 1
+                    return
+                attente = (1 - self._jetons) / self.rate
+            time.sleep(attente)
+
+
+def status_code(exc):
+    """Code HTTP porté par une exception (requests, curl_cffi, yfinance), sinon None"""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        reponse = getattr(exc, "response", None)
+        code = getattr(reponse, "status_code", None)
+    if code is None and type(exc).__name__ == "YFRateLimitError":
+        code = 429
+    return code
+
+
+def is_network_error(exc):
+    """Erreur de connexion ou délai dépassé : exceptions natives, requests, curl_cffi ou urllib3"""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    for classe in type(exc).__mro__:
+        if classe.__module__.split(".")[0] in MODULES_HTTP and classe.__name__ in ERREURS_RESEAU:
+            return True
+    # CurlError brute (curl_cffi.curl) : seul son code libcurl dit si l'erreur est transitoire
+    return type(exc).__name__ == "CurlError" and getattr(exc, "code", None) in CODES_CURL
+
+
+def is_retryable(exc):
+    """429, 5xx et erreurs réseau méritent une nouvelle tentative"""
+    code = status_code(exc)
+    if code is not None:
+        return code == 429 or 500 <= code < 600
+    return is_network_error(exc)
+
+
+class FetchPool:
+    """Exécuteur de requêtes avec concurrence bornée, débit limité et retries"""
+
+    def __init__(self, max_workers=CONCURRENCE, rate=REQUETES_PAR_SECONDE, burst=None,
+                 retries=TENTATIVES, base_delay=DELAI_BASE, max_delay=DELAI_MAX):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self.limiter = TokenBucket(rate, burst)
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._en_cours = {}
+        self._verrou = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        Planifie fn(*args, **kwargs) et retourne un Future. Si une requête de même
+        clé est déjà en cours, son Future est réutilisé.
+        """
+        with self._verrou:
+            future = self._en_cours.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._executer, key, fn, args, kwargs)
+            self._en_cours[key] = future
+        future.add_done_callback(lambda _f, key=key: self._terminer(key, _f))
+        return future
+
+    def run(self, key, fn, *args, **kwargs):
+        """Version bloquante de submit()"""
+        return self.submit(key, fn, *args, **kwargs).result()
+
+    def fetch_all(self, requetes):
+        """
+        Exécute un dict {clé: callable} et retourne {clé: résultat}. Une requête
+        en échec a pour résultat l'exception levée (à tester par l'appelant).
+        """
+        futures = {cle: self.submit(cle, fn) for cle, fn in requetes.items()}
+        resultats = {}
+        for cle, future in futures.items():
+            try:
+                resultats[cle] = future.result()
+            except Exception as e:
+                resultats[cle] = e
+        return resultats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def _terminer(self, key, future):
+        with self._verrou:
+            if self._en_cours.get(key) is future:
+                del self._en_cours[key]
+
+    def _executer(self, key, fn, args, kwargs):
+        # Type de requête (history, download, info...) pour l'instrumentation
+        operation = key[0] if isinstance(key, tuple) and key and isinstance(key[0], str) else "autre"
+        tentative = 0
+        while True:
+            with metrics.timer("attente_debit"):
+                self.limiter.acquire()
+            debut = time.perf_counter()
+            try:
+                resultat = fn(*args, **kwargs)
+            except Exception as e:
+                metrics.observe("requete", time.perf_counter() - debut, operation=operation)
+                tentative += 1
+                if tentative >= self.retries or not is_retryable(e):
+                    metrics.count("requetes", operation=operation, resultat="echec")
+                    raise
+                metrics.count("nouvelles_tentatives", operation=operation)
+                # Backoff exponentiel avec « full jitter »
+                plafond = min(self.max_delay, self.base_delay * 2 ** (tentative - 1))
+                time.sleep(random.uniform(0, plafond))
+                continue
+            metrics.observe("requete", time.perf_counter() - debut, operation=operation)
+            if metrics.enabled():
+                metrics.count("requetes", operation=operation, resultat="succes")
+                metrics.count("octets_recus", metrics.payload_size(resultat), operation=operation)
+            return resultat
+
+
+_pool_defaut = None
+_verrou_pool = threading.Lock()
+
+
+def get_pool():
+    """Pool partagé par tous les scripts (créé au premier appel)"""
+    global _pool_defaut
+    with _verrou_pool:
+        if _pool_defaut is None:
+            _pool_defaut = FetchPool()
+        return _pool_defaut
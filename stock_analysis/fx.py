@@ -0,0 +1,173 @@
+"""
+Taux de change : conversion des cours (devise de cotation) vers la devise des
+montants investis (l'euro).
+
+Les paires sont des tickers Yahoo comme les autres ("USDEUR=X" : euros pour un
+dollar) : elles passent par le cache de barres et le préchargement groupé, donc
+une paire n'est téléchargée qu'une fois par plage de dates, quel que soit le
+nombre de positions ou de tickers cotés dans cette devise. La devise de chaque
+ticker vient du référentiel de métadonnées. Les taux sont ensuite appliqués en
+NumPy à toutes les lignes d'un coup : une recherche dichotomique par devise
+distincte, jamais une requête par transaction.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.cache import market_today
+from stock_analysis.metadata import ticker_currencies
+from stock_analysis.panel import load_panel
+from stock_analysis.sessions import MARKET_TZ
+
+# Devise des montants investis
+DEVISE_BASE = "EUR"
+
+# Devise retenue quand le référentiel n'en donne pas
+DEVISE_DEFAUT = "USD"
+
+# Sous-unités cotées par Yahoo -> (devise, facteur)
+SOUS_UNITES = {"GBp": ("GBP", 0.01), "GBX": ("GBP", 0.01), "ZAc": ("ZAR", 0.01), "ILA": ("ILS", 0.01)}
+
+INTERVALLES_JOURNALIERS = ("1d",)
+
+
+def pair_ticker(devise, base=DEVISE_BASE):
+    """Ticker Yahoo du cours d'une unité de `devise` exprimé en `base` (ex. USDEUR=X)"""
+    return f"{devise}{base}=X"
+
+
+def normalize_currencies(devises):
+    """(devises, facteurs) : sous-unités ramenées à leur devise (GBp -> GBP, 0.01)"""
+    devises = pd.Series(devises, dtype=object).reset_index(drop=True)
+    devises = devises.where(devises.notna() & (devises != ""), DEVISE_DEFAUT).to_numpy(dtype=object, copy=True)
+    facteurs = np.ones(len(devises))
+    for code, (devise, facteur) in SOUS_UNITES.items():
+        lignes = devises == code
+        devises[lignes] = devise
+        facteurs[lignes] = facteur
+    return devises.astype(str), facteurs
+
+
+def _cles(index, journalier, barres=False):
+    """
+    Clés de recherche (int64 ns) : jour naïf à minuit en quotidien, instant UTC en
+    intraday. Les barres quotidiennes (`barres`) gardent le jour de leur propre
+    fuseau : Yahoo horodate les paires à minuit Europe/London, et une conversion à
+    New York les rangerait la veille (taux du lendemain appliqué). Les dates
+    demandées, elles, sont ramenées à leur jour à New York.
+    """
+    index = pd.DatetimeIndex(index)
+    if journalier:
+        if index.tz is not None:
+            index = index.tz_localize(None) if barres else index.tz_convert(MARKET_TZ).tz_localize(None)
+        return index.normalize().as_unit("ns").asi8
+    if index.tz is None:
+        index = index.tz_localize(MARKET_TZ)
+    return index.as_unit("ns").asi8
+
+
+class FxRates:
+    """Séries de taux par devise (unités de `base` pour une unité de la devise), en mémoire"""
+
+    def __init__(self, series, base=DEVISE_BASE, currencies=None, interval="1d"):
+        # devise -> (clés int64 ns triées, taux)
+        self.series = series
+        self.base = base
+        # ticker -> devise de cotation
+        self.currencies = currencies if currencies is not None else pd.Series(dtype=object)
+        self.interval = interval
+
+    @classmethod
+    def load(cls, tickers, start, end, base=DEVISE_BASE, interval="1d"):
+        """
+        Taux des devises de cotation de `tickers` sur [start, end) : une paire par
+        devise distincte, préchargées ensemble via le cache de barres.
+        """
+        devises = ticker_currencies(list(dict.fromkeys(tickers)))
+        normalisees, _ = normalize_currencies(devises)
+        paires = {devise: pair_ticker(devise, base) for devise in sorted(set(normalisees)) if devise != base}
+        panel = load_panel(sorted(paires.values()), start, end, interval) if paires else None
+        return cls.from_panel(panel, paires, base, devises, interval)
+
+    @classmethod
+    def from_panel(cls, panel, pairs, base=DEVISE_BASE, currencies=None, interval="1d"):
+        """Construit les séries à partir d'un PricePanel de paires (devise -> ticker de la paire)"""
+        frames = panel.frames if hasattr(panel, "frames") else (panel or {})
+        journalier = interval in INTERVALLES_JOURNALIERS
+        series = {}
+        for devise, paire in pairs.items():
+            hist = frames.get(paire)
+            if hist is None or hist.empty:
+                continue
+            taux = hist["Close"].to_numpy(dtype=float)
+            cles = _cles(hist.index, journalier, barres=True)
+            valides = np.isfinite(taux) & (taux > 0)
+            ordre = np.argsort(cles[valides], kind="stable")
+            series[devise] = (cles[valides][ordre], taux[valides][ordre])
+        return cls(series, base, currencies, interval)
+
+    def __contains__(self, devise):
+        return devise == self.base or devise in self.series
+
+    @metrics.timed("taux_change")
+    def rate(self, currencies, when, tolerance=None):
+        """
+        Taux de chaque ligne (devise, date ou horodatage) : dernier taux connu à cet
+        instant (jour non coté -> veille). `when` peut être une date unique. Avec des
+        taux quotidiens, les horodatages sont ramenés à leur jour (à New York) ; en
+        intraday, `tolerance` (Timedelta) écarte les barres trop anciennes.
+        Retourne un ndarray aligné sur `currencies` (NaN sans taux).
+        """
+        devises, facteurs = normalize_currencies(currencies)
+        n = len(devises)
+        if np.ndim(when) == 0:
+            when = [when] * n
+        cles = _cles(pd.to_datetime(pd.Series(when)).array, self.interval in INTERVALLES_JOURNALIERS)
+
+        taux = np.full(n, np.nan)
+        uniques, inverse = np.unique(devises, return_inverse=True)
+        for k, devise in enumerate(uniques):
+            lignes = np.flatnonzero(inverse == k)
+            if devise == self.base:
+                taux[lignes] = 1.0
+                continue
+            if devise not in self.series:
+                continue
+            instants, valeurs = self.series[devise]
+            i = np.searchsorted(instants, cles[lignes], side="right") - 1
+            trouves = i >= 0
+            if tolerance is not None:
+                trouves &= cles[lignes] - instants[np.maximum(i, 0)] <= pd.Timedelta(tolerance).value
+            taux[lignes[trouves]] = valeurs[i[trouves]]
+        return taux * facteurs
+
+    def ticker_rates(self, tickers, when, tolerance=None):
+        """Taux de la devise de cotation de chaque ticker (voir rate)"""
+        devises = self.currencies.reindex(np.asarray(tickers, dtype=object)).to_numpy(dtype=object)
+        return self.rate(devises, when, tolerance)
+
+    def convert(self, amounts, currencies, when):
+        """Montants (devise de chaque ligne) convertis dans la devise de base"""
+        return np.asarray(amounts, dtype=float) * self.rate(currencies, when)
+
+    def convert_frame(self, prix):
+        """Tableau dates × tickers (cours en devise de cotation) converti dans la devise de base"""
+        if prix.empty:
+            return prix
+        n, m = prix.shape
+        tickers = np.tile(prix.columns.to_numpy(dtype=object), n)
+        dates = np.repeat(prix.index.to_numpy(), m)
+        taux = self.ticker_rates(tickers, dates).reshape(n, m)
+        return prix * taux
+
+
+def latest_rates(tickers, lookback_days=10, base=DEVISE_BASE):
+    """
+    Dernier taux connu de la devise de cotation de chaque ticker (séance en cours
+    servie par le cache selon son TTL) : Series ticker -> taux (NaN si absent).
+    """
+    aujourd_hui = market_today()
+    fx = FxRates.load(tickers, aujourd_hui - timedelta(days=lookback_days), aujourd_hui + timedelta(days=1), base)
+    return pd.Series(fx.ticker_rates(tickers, pd.Timestamp(aujourd_hui)), index=pd.Index(tickers, name="ticker"))
@@ -0,0 +1,74 @@
+"""
+Prix d'achat intraday : cours de la barre la plus proche d'une heure cible
+(ouverture + N heures), ou prix modélisé (VWAP de la fenêtre, interpolation
+entre barres, voir execution.py), avec repli estimé sur les barres quotidiennes
+quand Yahoo n'a plus de barres intraday pour la séance.
+"""
+import numpy as np
+import pandas as pd
+
+from stock_analysis.bars import lookup_bars, session_targets
+from stock_analysis.execution import execution_prices, session_estimate
+from stock_analysis.metadata import ticker_timezones
+from stock_analysis.pnl import price_table, resolve_prices
+from stock_analysis.sessions import MARKET_TZ, exchange_timezone
+
+
+def format_times(horodatages, fuseaux, modele="%H:%M {}"):
+    """Heures dans le fuseau de la bourse de chaque ligne ("ET" pour New York)"""
+    horodatages = pd.Series(pd.DatetimeIndex(horodatages))
+    heures = np.full(len(horodatages), None, dtype=object)
+    for tz in pd.unique(fuseaux):
+        lignes = fuseaux == tz
+        suffixe = "ET" if tz == MARKET_TZ else "%Z"
+        heures[lignes] = horodatages[lignes].dt.tz_convert(tz).dt.strftime(modele.format(suffixe)).to_numpy(dtype=object)
+    return heures
+
+
+def intraday_prices(tickers, dates, panel, panel_5m, hours_after_open=2, method="nearest"):
+    """
+    Cours de chaque (ticker, date) `hours_after_open` heures après l'ouverture
+    de la séance sur la place de cotation du ticker (New York : ouverture à
+    9h30 ET, donc achat à 11h30 ET pour 2h ; Paris : 11h00 heure locale).
+    `method` : "nearest" (clôture de la barre la plus proche), "vwap" ou
+    "interpolation" (execution_prices, repli par interpolation ouverture →
+    clôture de la séance). Retourne deux tableaux alignés sur l'entrée : prix
+    et heure d'achat.
+    """
+    tickers = np.asarray(tickers, dtype=object)
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+
+    # Fuseau de la bourse de cotation (référentiel en cache) : calendrier, horaires et affichage
+    fuseaux = ticker_timezones(np.unique(tickers.astype(str))).reindex(tickers).to_numpy(dtype=object)
+    places = np.array([exchange_timezone(t, tz) for t, tz in zip(tickers, fuseaux)], dtype=object)
+
+    # Heure d'achat : ouverture de la séance + 2h (week-end / férié local → séance suivante)
+    cibles = session_targets(dates, hours_after_open=hours_after_open, timezones=places)
+    if method != "nearest":
+        # Prix modélisé à l'heure d'achat elle-même
+        prix = execution_prices(panel_5m, tickers, cibles, method)["prix_reference"].to_numpy(dtype=float, copy=True)
+        heures = format_times(cibles, fuseaux)
+        manquants = np.isnan(prix)
+        if manquants.any():
+            prix[manquants] = session_estimate(tickers[manquants], dates[manquants], panel, cibles[manquants],
+                                               timezones=places[manquants])
+            estimees = format_times(cibles[manquants], fuseaux[manquants], "~%H:%M {} (estimé)")
+            heures[manquants] = np.where(np.isnan(prix[manquants]), None, estimees)
+        return prix, heures
+
+    # Barre 5 minutes la plus proche de l'heure d'achat (recherche dichotomique)
+    barres = lookup_bars(panel_5m, tickers, cibles, policy="nearest")
+    prix = barres["prix"].to_numpy(dtype=float, copy=True)
+    heures = format_times(barres["horodatage"], fuseaux)
+
+    # Si pas de données intraday, utiliser le prix d'ouverture + moyenne open/high
+    manquants = np.isnan(prix)
+    if manquants.any():
+        open_price = resolve_prices(tickers[manquants], dates[manquants], price_table(panel, "Open"))
+        high_price = resolve_prices(tickers[manquants], dates[manquants], price_table(panel, "High"))
+        # Approximation : prix 2h après ouverture ≈ (open + high) / 2
+        prix[manquants] = (open_price + high_price) / 2
+        estimees = format_times(cibles[manquants], fuseaux[manquants], "~%H:%M {} (estimé)")
+        heures[manquants] = np.where(np.isnan(prix[manquants]), None, estimees)
+
+    return prix, heures
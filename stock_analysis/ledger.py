@@ -0,0 +1,207 @@
+"""
+Grand livre des positions pour la revalorisation incrémentale (new.py, intraday.py).
+
+Le prix d'achat et le nombre d'actions d'une position ne changent jamais : ils
+sont figés dans une base SQLite lors de la première exécution. Les exécutions
+suivantes ne demandent que le dernier cours de chaque ticker distinct, puis
+recalculent valorisations, totaux par ticker et statistiques en NumPy
+(totaux par ticker en O(nombre de tickers)). Les fractionnements et dividendes
+survenus depuis l'achat s'appliquent au moment de la revalorisation, par des
+facteurs d'ajustement (corporate.py), sans retélécharger d'historique.
+"""
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.cache import CACHE_DIR
+from stock_analysis.providers import get_provider
+from stock_analysis.sessions import get_calendar
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    strategie TEXT NOT NULL,
+    cle TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    date_achat TEXT NOT NULL,
+    heure_achat TEXT,
+    montant REAL NOT NULL,
+    prix_achat REAL NOT NULL,
+    actions REAL NOT NULL,
+    taux_achat REAL NOT NULL DEFAULT 1.0,
+    PRIMARY KEY (strategie, cle)
+);
+"""
+
+
+def _cles(df):
+    """Clé stable d'un achat : ticker, date, montant et rang parmi les achats identiques"""
+    montants = df["montant"].astype(float).map(repr)
+    rang = df.assign(montant=montants).groupby(["ticker", "date_achat", "montant"]).cumcount().astype(str)
+    return df["ticker"] + "|" + df["date_achat"].astype(str) + "|" + montants + "|" + rang
+
+
+class PositionLedger:
+    """Positions figées d'une stratégie, gardées en mémoire sous forme de tableaux"""
+
+    def __init__(self, strategy, path=None):
+        self.strategy = strategy
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # Un fichier par fournisseur, comme le cache de barres : les prix d'achat
+            # rejoués ou synthétiques ne se mélangent pas à ceux de Yahoo
+            nom = "positions.sqlite" if get_provider().name == "yahoo" else f"positions-{get_provider().name}.sqlite"
+            path = os.path.join(CACHE_DIR, nom)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        colonnes = {ligne[1] for ligne in self._conn.execute("PRAGMA table_info(positions)")}
+        if "taux_achat" not in colonnes:
+            # Grand livre antérieur aux taux de change : cours dans la devise des montants
+            with self._conn:
+                self._conn.execute("ALTER TABLE positions ADD COLUMN taux_achat REAL NOT NULL DEFAULT 1.0")
+        self._migrer_cles()
+        self._charger()
+
+    def _migrer_cles(self):
+        """
+        Clés antérieures au montant (ticker|date|rang) réécrites au nouveau format :
+        les prix figés sont conservés, les barres intraday d'origine pouvant ne
+        plus être servies par Yahoo.
+        """
+        anciennes = pd.read_sql_query(
+            "SELECT rowid, ticker, date_achat, montant FROM positions "
+            "WHERE strategie = ? AND cle NOT LIKE '%|%|%|%' ORDER BY rowid",
+            self._conn, params=(self.strategy,),
+        )
+        if anciennes.empty:
+            return
+        anciennes["cle"] = _cles(anciennes)
+        with self._conn:
+            self._conn.executemany("UPDATE positions SET cle = ? WHERE rowid = ?",
+                                   zip(anciennes["cle"], anciennes["rowid"].astype(int).tolist()))
+
+    def _charger(self):
+        self.positions = pd.read_sql_query(
+            "SELECT cle, ticker, date_achat, heure_achat, montant, prix_achat, actions, taux_achat "
+            "FROM positions WHERE strategie = ? ORDER BY rowid",
+            self._conn, params=(self.strategy,),
+        )
+        # Tableaux précalculés pour la revalorisation
+        self.tickers, self._codes = np.unique(self.positions["ticker"].to_numpy(dtype=str), return_inverse=True)
+        self._actions = self.positions["actions"].to_numpy(dtype=float)
+        self._montant = self.positions["montant"].to_numpy(dtype=float)
+        # Prix d'achat dans la devise des montants
+        self._cout_action = self.positions["prix_achat"].to_numpy(dtype=float) * self.positions["taux_achat"].to_numpy(dtype=float)
+        self._actions_ticker = np.bincount(self._codes, weights=self._actions, minlength=len(self.tickers))
+        self._investi_ticker = np.bincount(self._codes, weights=self._montant, minlength=len(self.tickers))
+        self._nb_ticker = np.bincount(self._codes, minlength=len(self.tickers))
+        self._numeros = self.positions.groupby("ticker", sort=False).cumcount().to_numpy() + 1
+
+    def __len__(self):
+        return len(self.positions)
+
+    def sync(self, achats, price_fn, rate_fn=None):
+        """
+        Aligne le grand livre sur `achats` : les positions qui n'y figurent plus
+        (achat retiré, ou montant modifié) sont supprimées, les achats qui n'y sont
+        pas encore sont ajoutés. `price_fn` reçoit le DataFrame des seuls nouveaux
+        achats et retourne leurs prix d'achat (et optionnellement leurs heures
+        d'achat) ; `rate_fn`, s'il est donné, leurs taux de change vers la devise
+        des montants. Les achats sans prix (ou sans taux) sont ignorés et retentés
+        à l'exécution suivante. Retourne le nombre d'achats ajoutés.
+        """
+        df = pd.DataFrame(achats)
+        df["cle"] = _cles(df)
+        retires = self.positions.loc[~self.positions["cle"].isin(df["cle"]), "cle"]
+        if len(retires):
+            with self._conn:
+                self._conn.executemany("DELETE FROM positions WHERE strategie = ? AND cle = ?",
+                                       [(self.strategy, cle) for cle in retires])
+            self._charger()
+        nouveaux = df[~df["cle"].isin(self.positions["cle"])].reset_index(drop=True)
+        if nouveaux.empty:
+            return 0
+
+        resultat = price_fn(nouveaux)
+        prix, heures = resultat if isinstance(resultat, tuple) else (resultat, None)
+        nouveaux["prix_achat"] = np.asarray(prix, dtype=float)
+        nouveaux["heure_achat"] = heures if heures is not None else None
+        nouveaux["taux_achat"] = np.asarray(rate_fn(nouveaux), dtype=float) if rate_fn is not None else 1.0
+        nouveaux = nouveaux[nouveaux["prix_achat"].notna() & nouveaux["taux_achat"].notna()].copy()
+        nouveaux["actions"] = nouveaux["montant"] / (nouveaux["prix_achat"] * nouveaux["taux_achat"])
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO positions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (self.strategy, p.cle, p.ticker, str(p.date_achat), p.heure_achat,
+                     float(p.montant), float(p.prix_achat), float(p.actions), float(p.taux_achat))
+                    for p in nouveaux.itertuples(index=False)
+                ],
+            )
+        self._charger()
+        return len(nouveaux)
+
+    def adjustment_factors(self, adjustments, as_of):
+        """Facteur (corporate.AdjustmentFactors) de chaque position entre sa séance d'achat et `as_of`"""
+        dates = pd.to_datetime(self.positions["date_achat"]).astype("datetime64[ns]").to_numpy()
+        return adjustments.factors(self.positions["ticker"].to_numpy(dtype=object),
+                                   get_calendar().next_session(dates), as_of)
+
+    def revalue(self, prix_actuels, taux_actuels=None, factors=None):
+        """
+        Valorise toutes les positions avec `prix_actuels` (Series ticker -> prix),
+        convertis avec `taux_actuels` (Series ticker -> taux) s'il est donné.
+        `factors` (voir adjustment_factors) ajuste le nombre d'actions de chaque
+        position des événements survenus depuis l'achat.
+        Retourne un DataFrame aux colonnes de pnl.compute_unrealized.
+        """
+        prix_ticker = pd.Series(prix_actuels, dtype=float).reindex(self.tickers).to_numpy()
+        prix_actuel = prix_ticker[self._codes]
+        valeur_action = prix_actuel * self._taux(taux_actuels)[self._codes]
+        actions, cout_action = self._actions, self._cout_action
+        if factors is not None:
+            actions, cout_action = actions / factors, cout_action * factors
+
+        df = self.positions.drop(columns="cle").copy()
+        df["prix_actuel"] = prix_actuel
+        if taux_actuels is not None:
+            df["taux_actuel"] = self._taux(taux_actuels)[self._codes]
+        if factors is not None:
+            df["actions"] = actions
+            df["ajustement"] = factors
+        df["valeur_actuelle"] = actions * valeur_action
+        df["plus_value"] = self._montant * (valeur_action / cout_action - 1.0)
+        df["pourcentage"] = (valeur_action / cout_action - 1.0) * 100
+        df["valide"] = ~np.isnan(valeur_action)
+        df["position"] = self._numeros
+        df["nb_positions"] = self._nb_ticker[self._codes]
+        return df
+
+    def ticker_totals(self, prix_actuels, taux_actuels=None, factors=None):
+        """
+        Totaux par ticker en O(nombre de tickers), colonnes de pnl.ticker_totals
+        (O(nombre de positions) avec des facteurs d'ajustement)
+        """
+        prix_ticker = pd.Series(prix_actuels, dtype=float).reindex(self.tickers).to_numpy() * self._taux(taux_actuels)
+        valides = ~np.isnan(prix_ticker)
+        actions_ticker = self._actions_ticker
+        if factors is not None:
+            actions_ticker = np.bincount(self._codes, weights=self._actions / factors, minlength=len(self.tickers))
+        totaux = pd.DataFrame({
+            "actions": actions_ticker,
+            "investi": self._investi_ticker,
+            "valeur": actions_ticker * prix_ticker,
+            "positions": self._nb_ticker,
+        }, index=pd.Index(self.tickers, name="ticker"))[valides]
+        totaux["plus_value"] = totaux["valeur"] - totaux["investi"]
+        totaux["pourcentage"] = totaux["plus_value"] / totaux["investi"] * 100
+        return totaux
+
+    def _taux(self, taux_actuels):
+        """Taux de change par ticker distinct (1 sans conversion)"""
+        if taux_actuels is None:
+            return np.ones(len(self.tickers))
+        return pd.Series(taux_actuels, dtype=float).reindex(self.tickers).to_numpy()
@@ -0,0 +1,374 @@
+"""
+Comptabilité par lots : appariement des ventes aux lots d'achat d'un même
+ticker (FIFO, LIFO ou coût moyen pondéré), ventes partielles comprises.
+
+Les exécutions (ticker, horodatage, sens, quantite, prix[, frais]) sont triées
+par ticker puis par horodatage et traitées ticker par ticker, sur des tableaux
+NumPy (jamais de liste de dictionnaires), en temps linéaire :
+
+- FIFO : le k-ième titre vendu est le k-ième titre acheté. Lots et ventes sont
+  des intervalles sur les quantités cumulées ; chaque appariement est
+  l'intersection d'un intervalle de vente et d'un intervalle de lot, trouvée par
+  recherche dichotomique, sans boucle sur les exécutions ;
+- LIFO et coût moyen : file de lots en tableaux compacts (array.array : ligne
+  d'achat, quantité restante) avec pointeurs de tête et de queue. Chaque vente
+  épuise des lots entiers puis entame au plus un lot : au total, moins
+  d'appariements que d'exécutions. Au coût moyen, le prix de revient est la
+  moyenne pondérée des titres détenus ; les lots sont consommés dans l'ordre
+  d'achat pour les durées de détention.
+
+Une vente au-delà de la position détenue n'est pas appariée : la quantité en
+excès est reportée dans LotBook.uncovered. Avec des facteurs d'ajustement
+(corporate.AdjustmentFactors), les quantités et les prix sont ramenés en titres
+de la date d'évaluation : un fractionnement entre l'achat et la vente ne fausse
+pas l'appariement.
+
+Usage :
+    python -m stock_analysis lots --input executions.csv --method lifo --date 2025-11-05
+"""
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.sessions import MARKET_TZ
+
+METHODES = ("fifo", "lifo", "average")
+
+SENS = {"achat": 1, "buy": 1, "vente": -1, "sell": -1}
+
+# Reliquat de quantité considéré comme nul (arrondis des quantités fractionnaires)
+EPSILON = 1e-9
+
+
+def normalize_fills(fills, adjustments=None, as_of=None):
+    """
+    Exécutions triées par ticker puis horodatage (ordre d'origine à égalité) :
+    ticker, horodatage (naïf, heure de New York), sens (+1 achat, -1 vente),
+    quantite (> 0), prix (frais inclus : ajoutés à l'achat, déduits à la vente)
+    et execution (ligne d'origine). Sans colonne sens, le signe de la quantité
+    donne le sens. `as_of` : seules les exécutions jusqu'à cette date incluse
+    sont gardées ; avec `adjustments`, quantités et prix sont exprimés en titres
+    à cette date (None : toutes les exécutions, après tous les fractionnements connus).
+    """
+    colonne = "horodatage" if "horodatage" in fills else "date"
+    horodatages = pd.DatetimeIndex(pd.to_datetime(fills[colonne]))
+    if horodatages.tz is not None:
+        horodatages = horodatages.tz_convert(MARKET_TZ).tz_localize(None)
+    horodatages = horodatages.as_unit("ns").to_numpy()
+
+    quantites = fills["quantite"].to_numpy(dtype=float)
+    if "sens" in fills:
+        # Libellés distincts seulement : quelques chaînes pour des millions d'exécutions
+        codes, libelles = pd.factorize(fills["sens"].to_numpy(dtype=object))
+        libelles = [str(libelle).strip().lower() for libelle in libelles]
+        inconnus = [libelle for libelle in libelles if libelle not in SENS]
+        if inconnus or (codes < 0).any():
+            raise ValueError(f"Sens inconnu : {(inconnus or [None])[0]!r} (attendu : {', '.join(SENS)})")
+        sens = np.array([SENS[libelle] for libelle in libelles], dtype=np.int8)[codes]
+    else:
+        sens = np.where(quantites < 0, -1, 1).astype(np.int8)
+    quantites = np.abs(quantites)
+
+    prix = fills["prix"].to_numpy(dtype=float)
+    if "frais" in fills:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            prix = prix + sens * np.nan_to_num(fills["frais"].to_numpy(dtype=float)) / quantites
+
+    # Tri sur les codes des tickers (ordre alphabétique) plutôt que sur les chaînes
+    codes, tickers = pd.factorize(fills["ticker"].to_numpy(dtype=object), sort=True)
+    tickers = np.asarray(tickers, dtype=object).astype(str).astype(object)
+    gardes = quantites > 0
+    if as_of is not None:
+        gardes &= horodatages < np.datetime64(pd.Timestamp(as_of).normalize().as_unit("ns") + pd.Timedelta(days=1))
+    lignes = np.flatnonzero(gardes)
+    lignes = lignes[np.lexsort((horodatages[lignes], codes[lignes]))]
+
+    df = pd.DataFrame({
+        "ticker": tickers[codes[lignes]],
+        "horodatage": horodatages[lignes],
+        "sens": sens[lignes],
+        "quantite": quantites[lignes],
+        "prix": prix[lignes],
+        "execution": lignes,
+    })
+    if adjustments is not None:
+        # Quantités en titres à as_of : ×2 après un 2 pour 1, prix divisé d'autant
+        ratios = adjustments.split_ratios(df["ticker"].to_numpy(), df["horodatage"].to_numpy(), as_of)
+        df["quantite"] = df["quantite"].to_numpy() * ratios
+        df["prix"] = df["prix"].to_numpy() / ratios
+    return df
+
+
+# ----------------------------------------------------------------------
+# Appariement d'un ticker (lignes triées par horodatage)
+# Chaque moteur retourne (appariements, lots ouverts, ventes non couvertes) :
+#   appariements : (ligne de vente, ligne d'achat, quantité, prix de revient unitaire)
+#   lots ouverts : (ligne d'achat, quantité restante, prix de revient unitaire)
+#   ventes non couvertes : (ligne de vente, quantité)
+# ----------------------------------------------------------------------
+def _fifo(sens, quantites, prix):
+    """FIFO vectorisé : intersections d'intervalles sur les quantités cumulées"""
+    achats = np.flatnonzero(sens > 0)
+    ventes = np.flatnonzero(sens < 0)
+
+    # Position réfléchie en zéro : une vente ne couvre que ce qui est détenu
+    cumul = np.cumsum(sens * quantites)
+    position = cumul - np.minimum(np.minimum.accumulate(cumul), 0.0)
+    avant = np.concatenate([[0.0], position[:-1]])
+    couvertes = np.clip(avant[ventes] - position[ventes], 0.0, quantites[ventes])
+    tolerance = EPSILON * max(1.0, float(quantites.sum()))
+
+    fin_lots = np.cumsum(quantites[achats])
+    debut_lots = fin_lots - quantites[achats]
+    fin_ventes = np.cumsum(couvertes)
+    debut_ventes = fin_ventes - couvertes
+
+    # Lots [premier, dernier) chevauchant chaque vente
+    premier = np.searchsorted(fin_lots, debut_ventes + tolerance, side="left")
+    dernier = np.searchsorted(debut_lots, fin_ventes - tolerance, side="left")
+    nombres = np.maximum(dernier - premier, 0)
+    vente = np.repeat(np.arange(len(ventes)), nombres)
+    lot = np.repeat(premier, nombres) + np.arange(nombres.sum()) - np.repeat(np.cumsum(nombres) - nombres, nombres)
+    pris = np.minimum(fin_ventes[vente], fin_lots[lot]) - np.maximum(debut_ventes[vente], debut_lots[lot])
+    gardes = pris > tolerance
+    appariements = (ventes[vente[gardes]], achats[lot[gardes]], pris[gardes], prix[achats[lot[gardes]]])
+
+    vendu = fin_ventes[-1] if len(fin_ventes) else 0.0
+    restes = fin_lots - np.maximum(debut_lots, vendu)
+    ouverts = restes > tolerance
+    lots_ouverts = (achats[ouverts], restes[ouverts], prix[achats[ouverts]])
+
+    excedents = quantites[ventes] - couvertes
+    decouvertes = excedents > tolerance
+    return appariements, lots_ouverts, (ventes[decouvertes], excedents[decouvertes])
+
+
+def _file(sens, quantites, prix, lifo=False, moyen=False):
+    """LIFO / coût moyen : file de lots en tableaux compacts, un passage sur les exécutions"""
+    tolerance = EPSILON * max(1.0, float(quantites.sum()))
+    # File de lots (ligne d'achat, quantité restante) ; array.array plutôt que
+    # ndarray : accès unitaire bien plus rapide dans la boucle, même compacité
+    capacite = int((sens > 0).sum())
+    lignes_lots = array("q", bytes(8 * capacite))
+    restes = array("d", bytes(8 * capacite))
+    tete = queue = 0
+
+    # Appariements, ajoutés en fin de tableau (moins d'appariements que d'exécutions)
+    m_vente, m_achat, m_quantite, m_revient = array("q"), array("q"), array("d"), array("d")
+    decouvertes, excedents = array("q"), array("d")
+    detenu = cout = 0.0
+
+    for i, (s, q, p) in enumerate(zip(sens.tolist(), quantites.tolist(), prix.tolist())):
+        if s > 0:
+            lignes_lots[queue] = i
+            restes[queue] = q
+            queue += 1
+            detenu += q
+            cout += q * p
+            continue
+        revient_moyen = cout / detenu if detenu > tolerance else float("nan")
+        a_vendre = q
+        while a_vendre > tolerance and tete < queue:
+            j = queue - 1 if lifo else tete
+            reste = restes[j]
+            pris = reste if reste < a_vendre else a_vendre
+            m_vente.append(i)
+            m_achat.append(lignes_lots[j])
+            m_quantite.append(pris)
+            if moyen:
+                m_revient.append(revient_moyen)
+            reste -= pris
+            a_vendre -= pris
+            restes[j] = reste
+            if reste <= tolerance:
+                if lifo:
+                    queue -= 1
+                else:
+                    tete += 1
+        vendu = q - max(a_vendre, 0.0)
+        detenu -= vendu
+        cout = revient_moyen * detenu if detenu > tolerance else 0.0
+        if a_vendre > tolerance:
+            decouvertes.append(i)
+            excedents.append(a_vendre)
+
+    m_achat = np.frombuffer(m_achat, dtype=np.int64)
+    revient = np.frombuffer(m_revient, dtype=float) if moyen else prix[m_achat]
+    appariements = (np.frombuffer(m_vente, dtype=np.int64), m_achat, np.frombuffer(m_quantite, dtype=float), revient)
+
+    lignes = np.frombuffer(lignes_lots, dtype=np.int64)[tete:queue]
+    restants = np.frombuffer(restes, dtype=float)[tete:queue]
+    ouverts = restants > tolerance
+    lignes, restants = lignes[ouverts], restants[ouverts]
+    revient = np.full(len(lignes), cout / detenu if detenu > tolerance else np.nan) if moyen else prix[lignes]
+    decouvertes = (np.frombuffer(decouvertes, dtype=np.int64), np.frombuffer(excedents, dtype=float))
+    return appariements, (lignes, restants, revient), decouvertes
+
+
+MOTEURS = {
+    "fifo": _fifo,
+    "lifo": lambda sens, quantites, prix: _file(sens, quantites, prix, lifo=True),
+    "average": lambda sens, quantites, prix: _file(sens, quantites, prix, moyen=True),
+}
+
+
+# ----------------------------------------------------------------------
+# Livre des lots
+# ----------------------------------------------------------------------
+class LotBook:
+    """Cessions appariées, lots ouverts et ventes non couvertes d'un ensemble d'exécutions"""
+
+    def __init__(self, realized, open_lots, uncovered, method="fifo"):
+        self.realized = realized
+        self.open_lots = open_lots
+        self.uncovered = uncovered
+        self.method = method
+
+    def unrealized(self, prices, as_of=None):
+        """
+        Lots ouverts valorisés aux cours `prices` (Series ticker -> prix) :
+        prix_actuel, valeur, plus_value, pourcentage et durée de détention à `as_of`.
+        """
+        lots = self.open_lots.copy()
+        lots["prix_actuel"] = pd.Series(prices, dtype=float).reindex(lots["ticker"].to_numpy()).to_numpy()
+        lots["valeur"] = lots["quantite"] * lots["prix_actuel"]
+        lots["plus_value"] = lots["valeur"] - lots["cout"]
+        lots["pourcentage"] = lots["plus_value"] / lots["cout"] * 100
+        if as_of is not None:
+            lots["duree_jours"] = (pd.Timestamp(as_of).normalize() - lots["date_achat"].dt.normalize()).dt.days
+        return lots
+
+    def ticker_totals(self, prices=None):
+        """
+        Par ticker : quantité vendue, produit, coût des titres vendus, plus-value
+        réalisée, durée moyenne de détention (pondérée par les quantités), quantité
+        et coût des lots ouverts, et avec `prices` leur valeur et plus-value latente.
+        """
+        cessions = self.realized.assign(_jours=self.realized["duree_jours"] * self.realized["quantite"])
+        realise = cessions.groupby("ticker").agg(
+            quantite_vendue=("quantite", "sum"), produit=("produit", "sum"),
+            cout_vendu=("cout", "sum"), plus_value_realisee=("plus_value", "sum"), _jours=("_jours", "sum"),
+        )
+        realise["duree_moyenne"] = realise.pop("_jours") / realise["quantite_vendue"]
+        lots = self.unrealized(prices) if prices is not None else self.open_lots
+        colonnes = {"quantite_ouverte": ("quantite", "sum"), "cout_ouvert": ("cout", "sum")}
+        if prices is not None:
+            colonnes.update(valeur=("valeur", "sum"), plus_value_latente=("plus_value", "sum"))
+        ouvert = lots.groupby("ticker").agg(**colonnes)
+        totaux = realise.join(ouvert, how="outer").rename_axis("ticker")
+        sommes = [c for c in totaux.columns if c != "duree_moyenne"]
+        totaux[sommes] = totaux[sommes].fillna(0.0)
+        return totaux
+
+    def totals(self, prices=None):
+        """Totaux du portefeuille : plus-values réalisée et latente, coût des lots ouverts"""
+        totaux = {
+            "plus_value_realisee": float(self.realized["plus_value"].sum()),
+            "produit": float(self.realized["produit"].sum()),
+            "cout_vendu": float(self.realized["cout"].sum()),
+            "cout_ouvert": float(self.open_lots["cout"].sum()),
+            "cessions": len(self.realized),
+            "lots_ouverts": len(self.open_lots),
+            "ventes_non_couvertes": len(self.uncovered),
+        }
+        if prices is not None:
+            lots = self.unrealized(prices)
+            valorises = lots["prix_actuel"].notna().to_numpy()
+            totaux["valeur"] = float(lots["valeur"][valorises].sum())
+            totaux["plus_value_latente"] = float(lots["plus_value"][valorises].sum())
+        return totaux
+
+
+@metrics.timed("appariement_lots")
+def match_lots(fills, method="fifo", adjustments=None, as_of=None):
+    """
+    Apparie les ventes aux lots d'achat de chaque ticker selon `method`
+    ("fifo", "lifo" ou "average"). `fills` : DataFrame d'exécutions ;
+    `adjustments` et `as_of` : voir normalize_fills. Retourne un LotBook.
+    """
+    if method not in METHODES:
+        raise ValueError(f"Méthode inconnue : {method} (attendu : {', '.join(METHODES)})")
+    df = normalize_fills(fills, adjustments, as_of)
+    moteur = MOTEURS[method]
+    sens = df["sens"].to_numpy()
+    quantites = df["quantite"].to_numpy(dtype=float)
+    prix = df["prix"].to_numpy(dtype=float)
+
+    # Une boucle par ticker distinct (lignes contiguës après le tri)
+    tickers = df["ticker"].to_numpy(dtype=object)
+    bornes = np.flatnonzero(np.r_[True, tickers[1:] != tickers[:-1], True]) if len(df) else np.array([0])
+    appariements, ouverts, decouvertes = [], [], []
+    for debut, fin in zip(bornes[:-1], bornes[1:]):
+        a, o, d = moteur(sens[debut:fin], quantites[debut:fin], prix[debut:fin])
+        appariements.append((a[0] + debut, a[1] + debut, a[2], a[3]))
+        ouverts.append((o[0] + debut, o[1], o[2]))
+        decouvertes.append((d[0] + debut, d[1]))
+    metrics.count("executions", n=len(df), methode=method)
+
+    def colonnes(morceaux, k, dtype):
+        return np.concatenate([m[k] for m in morceaux]).astype(dtype) if morceaux else np.empty(0, dtype=dtype)
+
+    horodatages = df["horodatage"].to_numpy()
+    vente, achat = colonnes(appariements, 0, np.int64), colonnes(appariements, 1, np.int64)
+    quantite, revient = colonnes(appariements, 2, float), colonnes(appariements, 3, float)
+    realized = pd.DataFrame({
+        "ticker": tickers[vente],
+        "date_achat": horodatages[achat],
+        "date_vente": horodatages[vente],
+        "quantite": quantite,
+        "prix_achat": revient,
+        "prix_vente": prix[vente],
+        "cout": quantite * revient,
+        "produit": quantite * prix[vente],
+    })
+    realized["plus_value"] = realized["produit"] - realized["cout"]
+    realized["duree_jours"] = (realized["date_vente"].dt.normalize() - realized["date_achat"].dt.normalize()).dt.days
+
+    lignes, restes = colonnes(ouverts, 0, np.int64), colonnes(ouverts, 1, float)
+    revient_ouvert = colonnes(ouverts, 2, float)
+    open_lots = pd.DataFrame({
+        "ticker": tickers[lignes],
+        "date_achat": horodatages[lignes],
+        "quantite": restes,
+        "prix_achat": revient_ouvert,
+        "cout": restes * revient_ouvert,
+    })
+
+    lignes, excedents = colonnes(decouvertes, 0, np.int64), colonnes(decouvertes, 1, float)
+    uncovered = pd.DataFrame({
+        "ticker": tickers[lignes],
+        "date_vente": horodatages[lignes],
+        "quantite": excedents,
+        "prix_vente": prix[lignes],
+    })
+    return LotBook(realized, open_lots, uncovered, method)
+
+
+def fills_from_positions(realized=None, held=None):
+    """
+    Exécutions équivalentes aux calculs de pnl.compute_realized (un achat et une
+    vente par aller-retour) et pnl.compute_unrealized (un achat par position
+    conservée), lignes valides seulement. À horodatage égal, les achats passent
+    avant les ventes.
+    """
+    morceaux = []
+    for df, ventes in ((realized, True), (held, False)):
+        if df is None or df.empty:
+            continue
+        df = df[df["valide"].to_numpy(dtype=bool)] if "valide" in df else df
+        morceaux.append(pd.DataFrame({
+            "ticker": df["ticker"].to_numpy(dtype=object), "horodatage": pd.to_datetime(df["date_achat"]).to_numpy(),
+            "sens": "achat", "quantite": df["actions"].to_numpy(dtype=float), "prix": df["prix_achat"].to_numpy(dtype=float),
+        }))
+        if ventes:
+            morceaux.append(pd.DataFrame({
+                "ticker": df["ticker"].to_numpy(dtype=object), "horodatage": pd.to_datetime(df["date_vente"]).to_numpy(),
+                "sens": "vente", "quantite": df["actions"].to_numpy(dtype=float), "prix": df["prix_vente"].to_numpy(dtype=float),
+            }))
+    if not morceaux:
+        return pd.DataFrame(columns=["ticker", "horodatage", "sens", "quantite", "prix"])
+    fills = pd.concat(morceaux, ignore_index=True)
+    # Achats d'abord : le tri stable de normalize_fills les garde devant les ventes du même instant
+    return fills.iloc[np.argsort(fills["sens"].to_numpy() != "achat", kind="stable")].reset_index(drop=True)
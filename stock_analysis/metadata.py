@@ -0,0 +1,189 @@
+"""
+Référentiel des métadonnées de tickers (nom, marché, fuseau, pays, secteur...).
+
+`yf.Ticker(t).info` est l'appel Yahoo le plus lent et retourne un gros dict dont
+on ne lit que quelques champs : seuls ces champs sont conservés, en SQLite, avec
+une longue durée de validité (une semaine par défaut). Toutes les entrées sont
+chargées en mémoire à l'ouverture, donc les recherches groupées ne touchent ni
+le disque ni le réseau. Une entrée périmée est servie telle quelle et rafraîchie
+en arrière-plan via le pool de requêtes partagé ; seules les entrées absentes
+sont téléchargées (en parallèle) avant de répondre.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from stock_analysis.cache import CACHE_DIR, MARKET_TZ
+from stock_analysis import metrics
+from stock_analysis.fetch import get_pool
+from stock_analysis.providers import get_provider
+
+# Champs de .info conservés -> colonnes du référentiel
+CHAMPS = {
+    "longName": "nom",
+    "exchange": "marche",
+    "timeZoneFullName": "timezone",
+    "country": "pays",
+    "sector": "secteur",
+    "industry": "industrie",
+    "currency": "devise",
+}
+COLONNES = list(CHAMPS.values())
+
+# Durée de validité (secondes) d'une entrée du référentiel
+TTL_METADONNEES = int(os.environ.get("STOCK_ANALYSIS_TTL_METADONNEES", 7 * 24 * 3600))
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS metadonnees (
+    ticker TEXT PRIMARY KEY,
+    {", ".join(f"{colonne} TEXT" for colonne in COLONNES)},
+    telecharge_le REAL NOT NULL
+);
+"""
+
+
+class MetadataStore:
+    """Métadonnées par ticker, persistées en SQLite et servies depuis la mémoire"""
+
+    def __init__(self, path=None, ttl=TTL_METADONNEES, pool=None, provider=None):
+        self.provider = provider or get_provider()
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            nom = "metadonnees.sqlite" if self.provider.name == "yahoo" else f"metadonnees-{self.provider.name}.sqlite"
+            path = os.path.join(CACHE_DIR, nom)
+        self.path = path
+        self.ttl = ttl
+        self._pool = pool
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._verrou = threading.RLock()
+        self._en_arriere_plan = set()
+        # Dernières erreurs de téléchargement, par ticker
+        self.errors = {}
+
+        lignes = self._conn.execute(f"SELECT ticker, {', '.join(COLONNES)}, telecharge_le FROM metadonnees").fetchall()
+        self._memoire = {l[0]: (dict(zip(COLONNES, l[1:-1])), l[-1]) for l in lignes}
+
+    @property
+    def pool(self):
+        return self._pool or get_pool()
+
+    def __contains__(self, ticker):
+        return ticker in self._memoire
+
+    def lookup(self, tickers, background=True):
+        """
+        Métadonnées d'un lot de tickers (DataFrame indexé par ticker, colonnes
+        COLONNES). Les tickers inconnus sont téléchargés avant de répondre ; les
+        entrées périmées sont rafraîchies en arrière-plan (ou tout de suite si
+        `background` est faux). Un ticker en échec a une ligne vide (voir errors).
+        """
+        tickers = list(dict.fromkeys(tickers))
+        maintenant = time.time()
+        with self._verrou:
+            absents = [t for t in tickers if t not in self._memoire]
+            perimes = [t for t in tickers if t in self._memoire and maintenant - self._memoire[t][1] >= self.ttl]
+        metrics.count("cache_metadonnees", len(absents), resultat="miss")
+        metrics.count("cache_metadonnees", len(perimes), resultat="perime")
+        metrics.count("cache_metadonnees", len(tickers) - len(absents) - len(perimes), resultat="hit")
+
+        if background:
+            self._rafraichir_en_arriere_plan(perimes)
+            self.refresh(absents)
+        else:
+            self.refresh(absents + perimes)
+
+        with self._verrou:
+            lignes = [self._memoire[t][0] if t in self._memoire else {} for t in tickers]
+        return pd.DataFrame(lignes, index=pd.Index(tickers, name="ticker"), columns=COLONNES)
+
+    def get(self, ticker):
+        """Métadonnées d'un ticker (dict), téléchargées si besoin"""
+        return self.lookup([ticker]).iloc[0].to_dict()
+
+    def timezone(self, ticker, default=MARKET_TZ):
+        """Fuseau de la bourse de cotation du ticker"""
+        tz = self.get(ticker)["timezone"]
+        return tz if isinstance(tz, str) and tz else default
+
+    def refresh(self, tickers):
+        """Télécharge (en parallèle) et enregistre les métadonnées des tickers"""
+        if not tickers:
+            return
+        infos = self.pool.fetch_all({
+            ("info", ticker): (lambda ticker=ticker: self.provider.info(ticker)) for ticker in tickers
+        })
+        for (_, ticker), info in infos.items():
+            self._enregistrer(ticker, info)
+
+    def clear(self, ticker=None):
+        with self._verrou, self._conn:
+            if ticker is None:
+                self._conn.execute("DELETE FROM metadonnees")
+                self._memoire.clear()
+            else:
+                self._conn.execute("DELETE FROM metadonnees WHERE ticker = ?", (ticker,))
+                self._memoire.pop(ticker, None)
+
+    def _rafraichir_en_arriere_plan(self, tickers):
+        for ticker in tickers:
+            with self._verrou:
+                if ticker in self._en_arriere_plan:
+                    continue
+                self._en_arriere_plan.add(ticker)
+            future = self.pool.submit(("info", ticker), self.provider.info, ticker)
+            future.add_done_callback(lambda f, ticker=ticker: self._terminer(ticker, f))
+
+    def _terminer(self, ticker, future):
+        try:
+            info = future.result()
+        except Exception as e:
+            info = e
+        self._enregistrer(ticker, info)
+        with self._verrou:
+            self._en_arriere_plan.discard(ticker)
+
+    def _enregistrer(self, ticker, info):
+        if isinstance(info, Exception):
+            self.errors[ticker] = info
+            return
+        valeurs = {colonne: info.get(champ) for champ, colonne in CHAMPS.items()}
+        telecharge_le = time.time()
+        with self._verrou, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO metadonnees VALUES (?, {', '.join('?' * len(COLONNES))}, ?)",
+                (ticker, *(valeurs[c] for c in COLONNES), telecharge_le),
+            )
+            self._memoire[ticker] = (valeurs, telecharge_le)
+            self.errors.pop(ticker, None)
+
+
+_store_defaut = None
+_verrou_store = threading.Lock()
+
+
+def get_metadata_store():
+    """Référentiel partagé (créé au premier appel)"""
+    global _store_defaut
+    with _verrou_store:
+        if _store_defaut is None:
+            _store_defaut = MetadataStore()
+        return _store_defaut
+
+
+def ticker_timezones(tickers, default=MARKET_TZ):
+    """
+    Series ticker -> fuseau de la bourse de cotation (défaut : New York), qui
+    choisit le calendrier des séances (sessions.get_calendar) et l'heure affichée.
+    """
+    fuseaux = get_metadata_store().lookup(tickers)["timezone"]
+    return fuseaux.where(fuseaux.notna() & (fuseaux != ""), default)
+
+
+def ticker_currencies(tickers, default="USD"):
+    """Series ticker -> devise de cotation (défaut : dollar US)"""
+    devises = get_metadata_store().lookup(tickers)["devise"]
+    return devises.where(devises.notna() & (devises != ""), default)
@@ -0,0 +1,246 @@
+"""
+Instrumentation légère des étapes chaudes : compteurs, octets et histogrammes
+de latence (p50 / p95 / p99) par étape.
+
+Désactivée par défaut : timer() retourne alors un contexte vide partagé et
+count() ne fait qu'un test, donc le coût est négligeable. L'option --profile de
+la ligne de commande (ou STOCK_ANALYSIS_PROFILE=1) l'active ; le relevé s'affiche
+en tableau, ou s'exporte en JSON ou au format texte OpenMetrics.
+
+Étapes instrumentées : requêtes (history, download, info) et leurs nouvelles
+tentatives, succès / échecs des caches (barres, métadonnées), conversions de
+fuseau, résolution des prix, recherche des barres intraday, calculs P&L,
+affichage et exports.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Bornes des histogrammes : de 1 µs à ~18 min, 4 seaux par doublement
+BORNES = [1e-6 * 2 ** (i / 4) for i in range(121)]
+
+_actif = os.environ.get("STOCK_ANALYSIS_PROFILE", "") not in ("", "0")
+_verrou = threading.Lock()
+_histogrammes = {}
+_compteurs = {}
+_VIDE = nullcontext()
+
+
+class Histogram:
+    """Histogramme à seaux logarithmiques (quantiles à ~19 % près), plus min / max exacts"""
+
+    def __init__(self):
+        self.seaux = [0] * (len(BORNES) + 1)
+        self.nombre = 0
+        self.somme = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, valeur):
+        self.seaux[bisect.bisect_left(BORNES, valeur)] += 1
+        self.nombre += 1
+        self.somme += valeur
+        self.min = min(self.min, valeur)
+        self.max = max(self.max, valeur)
+
+    def quantile(self, q):
+        if not self.nombre:
+            return float("nan")
+        rang = q * self.nombre
+        cumul = 0
+        for i, n in enumerate(self.seaux):
+            cumul += n
+            if cumul >= rang:
+                borne = BORNES[i] if i < len(BORNES) else self.max
+                return min(max(borne, self.min), self.max)
+        return self.max
+
+
+def enable(actif=True):
+    global _actif
+    _actif = actif
+
+
+def enabled():
+    return _actif
+
+
+def reset():
+    with _verrou:
+        _histogrammes.clear()
+        _compteurs.clear()
+
+
+def _cle(nom, labels):
+    return nom, tuple(sorted(labels.items()))
+
+
+def observe(etape, secondes, **labels):
+    """Enregistre une durée pour l'étape"""
+    if not _actif:
+        return
+    cle = _cle(etape, labels)
+    with _verrou:
+        histogramme = _histogrammes.get(cle)
+        if histogramme is None:
+            histogramme = _histogrammes[cle] = Histogram()
+        histogramme.observe(secondes)
+
+
+@contextmanager
+def _chronometre(etape, labels):
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(etape, time.perf_counter() - debut, **labels)
+
+
+def timer(etape, **labels):
+    """Contexte chronométrant un bloc : with timer("resolution_prix"): ..."""
+    if not _actif:
+        return _VIDE
+    return _chronometre(etape, labels)
+
+
+def timed(etape, **labels):
+    """Décorateur équivalent à timer()"""
+    def decorateur(fn):
+        def enveloppe(*args, **kwargs):
+            if not _actif:
+                return fn(*args, **kwargs)
+            with _chronometre(etape, labels):
+                return fn(*args, **kwargs)
+        enveloppe.__name__ = fn.__name__
+        enveloppe.__qualname__ = fn.__qualname__
+        enveloppe.__doc__ = fn.__doc__
+        enveloppe.__wrapped__ = fn
+        return enveloppe
+    return decorateur
+
+
+def count(nom, n=1, **labels):
+    """Incrémente un compteur (appels, succès / échecs de cache, octets...)"""
+    if not _actif or not n:
+        return
+    cle = _cle(nom, labels)
+    with _verrou:
+        _compteurs[cle] = _compteurs.get(cle, 0) + n
+
+
+def payload_size(resultat):
+    """Taille approximative (octets) d'une réponse : DataFrame, dict ou texte"""
+    if hasattr(resultat, "memory_usage"):
+        return int(resultat.memory_usage(index=True).sum())
+    if isinstance(resultat, (dict, list)):
+        return len(json.dumps(resultat, default=str))
+    if isinstance(resultat, (str, bytes)):
+        return len(resultat)
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Relevés
+# ----------------------------------------------------------------------
+def _libelle(nom, labels):
+    return nom + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+
+def snapshot():
+    """Relevé courant : {"etapes": [...], "compteurs": [...]}"""
+    with _verrou:
+        etapes = [
+            {
+                "etape": nom,
+                "labels": dict(labels),
+                "appels": h.nombre,
+                "total_s": h.somme,
+                "moyenne_s": h.somme / h.nombre,
+                "p50_s": h.quantile(0.50),
+                "p95_s": h.quantile(0.95),
+                "p99_s": h.quantile(0.99),
+                "max_s": h.max,
+            }
+            for (nom, labels), h in _histogrammes.items()
+        ]
+        compteurs = [{"nom": nom, "labels": dict(labels), "valeur": v} for (nom, labels), v in _compteurs.items()]
+    etapes.sort(key=lambda e: -e["total_s"])
+    compteurs.sort(key=lambda c: (c["nom"], sorted(c["labels"].items())))
+    return {"etapes": etapes, "compteurs": compteurs}
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=1)
+
+
+def to_text():
+    """Tableau des étapes (triées par temps total) suivi des compteurs"""
+    releve = snapshot()
+    lignes = [
+        f"{'Étape':<44}{'appels':>8}{'total (s)':>11}{'moy (ms)':>10}"
+        f"{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}{'max (ms)':>10}",
+        "─" * 113,
+    ]
+    for e in releve["etapes"]:
+        lignes.append(
+            f"{_libelle(e['etape'], sorted(e['labels'].items()))[:43]:<44}{e['appels']:>8}{e['total_s']:>11.3f}"
+            f"{e['moyenne_s'] * 1e3:>10.2f}{e['p50_s'] * 1e3:>10.2f}{e['p95_s'] * 1e3:>10.2f}"
+            f"{e['p99_s'] * 1e3:>10.2f}{e['max_s'] * 1e3:>10.2f}"
+        )
+    if releve["compteurs"]:
+        lignes += ["", f"{'Compteur':<60}{'valeur':>14}", "─" * 74]
+        lignes += [
+            f"{_libelle(c['nom'], sorted(c['labels'].items()))[:59]:<60}{c['valeur']:>14,}"
+            for c in releve["compteurs"]
+        ]
+    return "\n".join(lignes)
+
+
+def _om_labels(labels, extra=()):
+    paires = [*labels, *extra]
+    if not paires:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in paires) + "}"
+
+
+def to_openmetrics(prefix="stock_analysis"):
+    """Relevé au format texte OpenMetrics (histogrammes de durée et compteurs)"""
+    with _verrou:
+        histogrammes = sorted(_histogrammes.items())
+        compteurs = sorted(_compteurs.items())
+    lignes = [f"# TYPE {prefix}_duree_secondes histogram", f"# UNIT {prefix}_duree_secondes seconds"]
+    for (nom, labels), h in histogrammes:
+        base = (("etape", nom), *labels)
+        cumul = 0
+        for borne, n in zip(BORNES, h.seaux):
+            cumul += n
+            if n:
+                lignes.append(f"{prefix}_duree_secondes_bucket{_om_labels(base, [('le', f'{borne:.9g}')])} {cumul}")
+        lignes.append(f"{prefix}_duree_secondes_bucket{_om_labels(base, [('le', '+Inf')])} {h.nombre}")
+        lignes.append(f"{prefix}_duree_secondes_count{_om_labels(base)} {h.nombre}")
+        lignes.append(f"{prefix}_duree_secondes_sum{_om_labels(base)} {h.somme:.9g}")
+    for nom in sorted({nom for (nom, _), _ in compteurs}):
+        lignes.append(f"# TYPE {prefix}_{nom} counter")
+        lignes += [
+            f"{prefix}_{nom}_total{_om_labels(labels)} {valeur}"
+            for (n, labels), valeur in compteurs if n == nom
+        ]
+    lignes.append("# EOF")
+    return "\n".join(lignes) + "\n"
+
+
+FORMATS = {"text": to_text, "json": to_json, "openmetrics": to_openmetrics}
+
+
+def dump(format="text", path=None):
+    """Écrit le relevé (tableau, JSON ou OpenMetrics) dans un fichier ou sur la sortie"""
+    contenu = FORMATS[format]()
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(contenu if contenu.endswith("\n") else contenu + "\n")
+    else:
+        print(contenu)
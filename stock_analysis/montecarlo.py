@@ -0,0 +1,221 @@
+"""
+Projection Monte-Carlo de la valeur du portefeuille à quelques séances.
+
+Les log-rendements quotidiens de chaque ticker détenu sont tirés de l'historique
+en cache (clôtures ajustées des fractionnements et dividendes) :
+
+- bootstrap : séances historiques tirées avec remise, une séance entière à la
+  fois : les corrélations entre tickers d'un même jour sont conservées ;
+- block : bootstrap circulaire par blocs de séances consécutives, qui garde
+  en plus les regroupements de volatilité d'une séance à l'autre ;
+- normal : loi normale multivariée (moyenne et covariance de l'historique),
+  corrélée par une racine de la matrice de covariance.
+
+Les détentions actuelles sont conservées sur tout le chemin : la valeur d'un
+ticker à l'horizon h est sa valeur actuelle × exp(somme des log-rendements
+tirés). En bootstrap, les lignes tirées de la matrice des log-rendements L
+(séances × tickers) sont ajoutées jour par jour ; pour une tranche d'horizon
+plus longue que l'historique, la somme vaut C @ L, où C compte les tirages de
+chaque séance historique (chemins × séances) : un seul produit matriciel, quel
+que soit le nombre de jours simulés.
+
+Les chemins sont simulés par paquets de taille fixe, qui bornent la mémoire
+(chemins du paquet × tickers, × horizon pour les tirages). Chaque paquet a sa
+propre graine, dérivée de `seed` (SeedSequence.spawn) : le résultat ne dépend
+pas du nombre de processus. Au-delà de SEUIL_PARALLELE paquets, ceux-ci sont
+répartis sur un pool de processus, chacun recevant une fois la matrice des
+rendements.
+
+Résultat (Simulation) : rendement du portefeuille par chemin et par horizon,
+d'où les percentiles, la VaR et la CVaR (perte moyenne au-delà de la VaR) de la
+distribution simulée.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+
+METHODES = ("bootstrap", "block", "normal")
+CHEMINS = 100_000
+# Horizons en séances : un jour, une semaine, un mois de bourse
+HORIZONS = (1, 5, 21)
+# Séances d'historique (≈ 2 ans)
+HISTORIQUE = 504
+TAILLE_BLOC = 5
+# Chemins par paquet : sommes et tirages de 10 000 chemins, quelques Mo (40 Mo de comptes
+# de tirages pour un horizon plus long que 504 séances d'historique)
+TAILLE_PAQUET = 10_000
+NIVEAUX = (0.95, 0.99)
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+# En dessous de ce nombre de paquets, le pool de processus ne vaut pas son coût
+SEUIL_PARALLELE = 4
+
+
+def log_returns(closes, lookback=HISTORIQUE):
+    """
+    Log-rendements quotidiens (séances × tickers) des `lookback` dernières séances
+    d'une matrice de clôtures (risk.close_matrix). Un jour sans cours compte pour
+    un rendement nul (cours précédent reporté), de même que les séances avant la
+    première cotation d'un ticker.
+    """
+    prix = closes.dropna(how="all")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rendements = np.log(prix.ffill()).diff().iloc[1:]
+    rendements = rendements.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    return rendements.tail(lookback)
+
+
+def _racine(covariance):
+    """Racine R de la covariance (R @ R.T = covariance) : Cholesky, sinon décomposition propre"""
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        # Covariance seulement semi-définie (plus de tickers que de séances, cours identiques)
+        valeurs, vecteurs = np.linalg.eigh(covariance)
+        return vecteurs * np.sqrt(np.clip(valeurs, 0.0, None))
+
+
+def _paquet(donnees, n, graine):
+    """Rendements du portefeuille (n chemins × horizons) d'un paquet"""
+    rng = np.random.default_rng(graine)
+    methode, horizons = donnees["methode"], donnees["horizons"]
+    rendements, valeurs = donnees["rendements"], donnees["valeurs"]
+    nb_seances, nb_tickers = rendements.shape
+    h_max = horizons[-1]
+
+    if methode == "bootstrap":
+        tirages = rng.integers(0, nb_seances, size=(n, h_max))
+    elif methode == "block":
+        bloc = donnees["bloc"]
+        debuts = rng.integers(0, nb_seances, size=(n, -(-h_max // bloc)))
+        tirages = ((debuts[:, :, None] + np.arange(bloc)) % nb_seances).reshape(n, -1)[:, :h_max]
+    decalages = np.arange(n)[:, None] * nb_seances
+
+    sommes = np.zeros((n, nb_tickers))
+    resultat = np.empty((n, len(horizons)))
+    precedent = 0
+    for k, h in enumerate(horizons):
+        # Tranche ]precedent, h] des chemins ajoutée aux sommes de l'horizon précédent
+        if methode == "normal":
+            duree = h - precedent
+            tirage = rng.standard_normal((n, donnees["racine"].shape[1]))
+            sommes += duree * donnees["moyenne"] + np.sqrt(duree) * (tirage @ donnees["racine"].T)
+        elif h - precedent < nb_seances:
+            # Tranche plus courte que l'historique : rendements tirés ajoutés jour par jour (n × tickers)
+            for jour in range(precedent, h):
+                sommes += rendements[tirages[:, jour]]
+        else:
+            comptes = np.bincount((decalages + tirages[:, precedent:h]).ravel(), minlength=n * nb_seances)
+            sommes += comptes.reshape(n, nb_seances).astype(float) @ rendements
+        resultat[:, k] = np.exp(sommes) @ valeurs
+        precedent = h
+    return resultat / valeurs.sum() - 1.0
+
+
+_donnees_worker = {}
+
+
+def _init_worker(donnees):
+    _donnees_worker.update(donnees)
+
+
+def _simuler_paquet(tache):
+    return _paquet(_donnees_worker, *tache)
+
+
+class Simulation:
+    """Rendements simulés du portefeuille (chemins × horizons) et leurs statistiques"""
+
+    def __init__(self, returns, horizons, value, method, sessions, tickers):
+        self.returns = returns
+        self.horizons = tuple(horizons)
+        self.value = value
+        self.method = method
+        self.sessions = sessions
+        self.tickers = tickers
+
+    def __len__(self):
+        return len(self.returns)
+
+    def summary(self, levels=NIVEAUX, percentiles=PERCENTILES):
+        """
+        Une ligne par horizon : rendement moyen, écart-type, probabilité de perte,
+        percentiles des rendements (en %), puis VaR et CVaR à chaque niveau (pertes
+        positives, en montant et en % de la valeur actuelle).
+        """
+        lignes = []
+        for k, h in enumerate(self.horizons):
+            r = self.returns[:, k]
+            ligne = {
+                "horizon": h,
+                "moyenne": r.mean() * 100,
+                "ecart_type": r.std() * 100,
+                "prob_perte": (r < 0).mean() * 100,
+            }
+            for p, valeur in zip(percentiles, np.percentile(r, percentiles)):
+                ligne[f"p{p}"] = valeur * 100
+            for niveau in levels:
+                seuil = np.quantile(r, 1 - niveau)
+                queue = r[r <= seuil]
+                suffixe = f"{niveau * 100:g}"
+                ligne[f"var_{suffixe}"] = -seuil * self.value
+                ligne[f"cvar_{suffixe}"] = -queue.mean() * self.value
+                ligne[f"var_{suffixe}_pct"] = -seuil * 100
+                ligne[f"cvar_{suffixe}_pct"] = -queue.mean() * 100
+            lignes.append(ligne)
+        return pd.DataFrame(lignes)
+
+
+@metrics.timed("simulation")
+def simulate(values, returns, paths=CHEMINS, horizons=HORIZONS, method="bootstrap", block=TAILLE_BLOC,
+             seed=None, chunk_size=TAILLE_PAQUET, workers=None):
+    """
+    Simule `paths` chemins du portefeuille. `values` : Series ticker -> valeur
+    actuelle ; `returns` : log-rendements historiques (séances × tickers, voir
+    log_returns). Un ticker détenu sans historique garde sa valeur (rendement
+    nul). `workers` : processus (défaut : tous les cœurs ; 1 : sans pool).
+    Retourne une Simulation.
+    """
+    if method not in METHODES:
+        raise ValueError(f"Méthode inconnue : {method} (attendu : {', '.join(METHODES)})")
+    horizons = sorted({int(h) for h in horizons})
+    if not horizons or horizons[0] < 1:
+        raise ValueError("Les horizons sont des nombres de séances strictement positifs")
+    valeurs = pd.Series(values, dtype=float).dropna()
+    valeurs = valeurs[valeurs > 0]
+    if valeurs.empty:
+        raise ValueError("Aucune position valorisée à simuler")
+    rendements = returns.reindex(columns=valeurs.index).fillna(0.0).to_numpy(dtype=float)
+    if len(rendements) < 2:
+        raise ValueError("Historique insuffisant : moins de deux séances de rendements")
+
+    donnees = {
+        "methode": method,
+        "horizons": horizons,
+        "rendements": np.ascontiguousarray(rendements),
+        "valeurs": valeurs.to_numpy(),
+        "bloc": max(1, int(block)),
+    }
+    if method == "normal":
+        donnees["moyenne"] = rendements.mean(axis=0)
+        donnees["racine"] = _racine(np.atleast_2d(np.cov(rendements, rowvar=False)))
+
+    # Paquets de taille bornée, une graine indépendante chacun
+    tailles = [min(chunk_size, paths - debut) for debut in range(0, paths, chunk_size)]
+    graines = np.random.SeedSequence(seed).spawn(len(tailles))
+    taches = list(zip(tailles, graines))
+    workers = workers or os.cpu_count() or 1
+    metrics.count("chemins_simules", n=paths, methode=method)
+
+    if workers <= 1 or len(taches) < SEUIL_PARALLELE:
+        morceaux = [_paquet(donnees, n, graine) for n, graine in taches]
+    else:
+        with ProcessPoolExecutor(min(workers, len(taches)), initializer=_init_worker,
+                                 initargs=(donnees,)) as pool:
+            morceaux = list(pool.map(_simuler_paquet, taches))
+    return Simulation(np.concatenate(morceaux), horizons, float(valeurs.sum()), method,
+                      len(rendements), list(valeurs.index))
@@ -0,0 +1,167 @@
+"""
+Préchargement groupé des historiques : au lieu d'un yf.Ticker(...).history() par
+(ticker, date), on calcule l'union des tickers et l'étendue des dates de la liste
+de transactions, puis on télécharge tout par paquets (yf.download(group_by="ticker")
+avec le fournisseur Yahoo). Le calcul des prix se fait ensuite sur un panel en mémoire.
+"""
+from datetime import timedelta
+
+import pandas as pd
+
+from stock_analysis.cache import _to_date, get_cache, get_history, market_today
+from stock_analysis import metrics
+from stock_analysis.fetch import get_pool
+from stock_analysis.sessions import get_calendar
+
+# Nombre de tickers par téléchargement groupé
+TAILLE_PAQUET = 100
+
+
+def transactions_span(transactions, date_keys=("achat", "vente", "date_achat"), extra_dates=()):
+    """
+    Retourne (tickers, debut, fin) couvrant toutes les transactions (liste de
+    dicts ou DataFrame) : union des tickers, et plage [debut, fin) allant de la
+    séance en cours ou précédente pour la plus petite date à la séance en cours
+    ou suivante pour la plus grande.
+    """
+    if isinstance(transactions, pd.DataFrame):
+        tickers = sorted(transactions["ticker"].unique())
+        colonnes = [pd.to_datetime(transactions[k]) for k in date_keys if k in transactions]
+        dates = [_to_date(d) for c in colonnes for d in (c.min(), c.max()) if not pd.isna(d)]
+    else:
+        tickers = sorted({t["ticker"] for t in transactions})
+        dates = [_to_date(t[k]) for t in transactions for k in date_keys if k in t]
+    dates += [_to_date(d) for d in extra_dates]
+    if not dates:
+        raise ValueError("Aucune date trouvée dans les transactions")
+
+    calendrier = get_calendar()
+    debut = calendrier.previous_session(min(dates))
+    fin = calendrier.next_session(max(dates))
+    debut = debut.date() if not pd.isna(debut) else min(dates)
+    fin = fin.date() if not pd.isna(fin) else max(dates)
+    return tickers, debut, fin + timedelta(days=1)
+
+
+def _paquets(liste, taille):
+    for i in range(0, len(liste), taille):
+        yield liste[i:i + taille]
+
+
+def prefetch(tickers, start, end, interval="1d", chunk_size=TAILLE_PAQUET):
+    """
+    Télécharge en masse, dans le cache local, les barres manquantes de `tickers`
+    sur [start, end). Les tickers déjà couverts par le cache ne sont pas redemandés.
+    """
+    cache = get_cache()
+    manquants = {}
+    for ticker in tickers:
+        plages = cache.missing_ranges(ticker, start, end, interval)
+        metrics.count("cache_barres", resultat="miss" if plages else "hit", interval=interval)
+        if plages:
+            manquants[ticker] = (plages[0][0], plages[-1][1])
+
+    # Les paquets partent en parallèle via le pool partagé (débit limité, retries)
+    pool = get_pool()
+    telechargements = []
+    for paquet in _paquets(sorted(manquants), chunk_size):
+        # Une seule requête par paquet, sur l'enveloppe des plages manquantes
+        debut = min(manquants[t][0] for t in paquet)
+        fin = max(manquants[t][1] for t in paquet)
+        future = pool.submit(
+            ("download", tuple(paquet), interval, debut, fin),
+            cache.provider.download, paquet, debut, fin, interval,
+        )
+        telechargements.append((paquet, debut, fin, future))
+
+    for paquet, debut, fin, future in telechargements:
+        try:
+            data = future.result()
+        except Exception:
+            # Les tickers du paquet seront retentés individuellement
+            continue
+        for ticker, hist in data.items():
+            cache.store(ticker, hist, debut, fin, interval)
+
+
+class PricePanel:
+    """Historiques en mémoire, indexés par ticker, pour un intervalle donné"""
+
+    def __init__(self, frames, interval="1d"):
+        self.frames = frames
+        self.interval = interval
+
+    def history(self, ticker, start, end):
+        """
+        Même contrat que get_history() ; si le ticker ou la période n'ont pas été
+        préchargés, on retombe sur le cache (et donc sur Yahoo).
+        """
+        debut, fin = _to_date(start), _to_date(end)
+        hist = self.frames.get(ticker)
+        if hist is None or hist.attrs.get("debut") > debut or hist.attrs.get("fin") < fin:
+            return get_history(ticker, debut, fin, self.interval)
+
+        tz = hist.index.tz
+        borne_debut = pd.Timestamp(debut).tz_localize(tz) if tz is not None else pd.Timestamp(debut)
+        borne_fin = pd.Timestamp(fin).tz_localize(tz) if tz is not None else pd.Timestamp(fin)
+        return hist[(hist.index >= borne_debut) & (hist.index < borne_fin)].copy()
+
+
+def ensure_cached(tickers, start, end, interval="1d", chunk_size=TAILLE_PAQUET):
+    """
+    Précharge `tickers` sur [start, end) puis retente individuellement les échecs
+    du téléchargement groupé. Retourne l'ensemble des tickers restés incomplets.
+    """
+    debut, fin = _to_date(start), _to_date(end)
+    prefetch(tickers, debut, fin, interval, chunk_size)
+
+    cache = get_cache()
+    pool = get_pool()
+
+    # Échecs du téléchargement groupé : on retente ces tickers individuellement
+    a_retenter = {
+        ticker: pool.submit(
+            ("history", ticker, interval, debut, fin),
+            cache.provider.history, ticker, debut, fin, interval,
+        )
+        for ticker in tickers
+        if cache.missing_ranges(ticker, debut, fin, interval)
+    }
+    for ticker, future in a_retenter.items():
+        try:
+            cache.store(ticker, future.result(), debut, fin, interval)
+        except Exception:
+            pass
+    return {ticker for ticker in a_retenter if cache.missing_ranges(ticker, debut, fin, interval)}
+
+
+@metrics.timed("chargement_panel")
+def load_panel(tickers, start, end, interval="1d", chunk_size=TAILLE_PAQUET):
+    """Précharge `tickers` sur [start, end) puis construit le panel en mémoire"""
+    debut, fin = _to_date(start), _to_date(end)
+    incomplets = ensure_cached(tickers, debut, fin, interval, chunk_size)
+
+    cache = get_cache()
+    frames = {}
+    for ticker in tickers:
+        if ticker in incomplets:
+            continue
+        hist = cache.read(ticker, debut, fin, interval)
+        hist.attrs.update(debut=debut, fin=fin)
+        frames[ticker] = hist
+    return PricePanel(frames, interval)
+
+
+def latest_prices(tickers, lookback_days=10):
+    """
+    Dernier cours connu de chaque ticker (clôture de la séance en cours pendant
+    les heures de marché, servie par le cache selon son TTL). Un seul préchargement
+    groupé pour tous les tickers ; retourne une Series ticker -> prix (NaN si absent).
+    """
+    aujourd_hui = market_today()
+    panel = load_panel(tickers, aujourd_hui - timedelta(days=lookback_days), aujourd_hui + timedelta(days=1))
+    prix = {}
+    for ticker in tickers:
+        clotures = panel.frames[ticker]["Close"].dropna() if ticker in panel.frames else pd.Series(dtype=float)
+        prix[ticker] = float(clotures.iloc[-1]) if len(clotures) else float("nan")
+    return pd.Series(prix, dtype=float)
@@ -0,0 +1,256 @@
+"""
+Moteur de calcul des gains/pertes, vectorisé.
+
+Les transactions arrivent sous forme de DataFrame (une ligne par achat) avec au
+minimum les colonnes `ticker`, `date_achat`, `montant` (et `date_vente` pour les
+allers-retours). Chaque date est ramenée à sa séance (calendrier de la place de
+cotation du ticker, d'après le fuseau de ses barres) puis jointe à une table de cours ; la valorisation peut se replier sur le dernier cours connu
+(merge_asof). Actions / valeurs / gains sont ensuite calculés en NumPy.
+L'affichage reste à la charge des scripts : ce module ne fait aucun print.
+"""
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.sessions import MARKET_TZ, exchange_timezone, next_sessions
+
+
+@metrics.timed("table_prix")
+def price_table(panel, column="Close"):
+    """
+    Table longue (ticker, date, prix) construite à partir d'un PricePanel
+    (ou de tout dict ticker -> historique). Les dates sont naïves, à minuit, dans
+    le fuseau de la bourse de chaque ticker, gardé dans attrs["fuseaux"].
+    """
+    frames = panel.frames if hasattr(panel, "frames") else panel
+    morceaux, fuseaux = [], {}
+    for ticker, hist in frames.items():
+        if hist.empty:
+            continue
+        if hist.index.tz is not None:
+            fuseaux[ticker] = exchange_timezone(ticker, str(hist.index.tz))
+        with metrics.timer("conversion_fuseau"):
+            index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+        morceaux.append(pd.DataFrame({
+            "ticker": ticker,
+            "date": index.normalize().astype("datetime64[ns]"),
+            "prix": hist[column].to_numpy(dtype=float),
+        }))
+    if not morceaux:
+        table = pd.DataFrame({"ticker": pd.Series(dtype=object),
+                              "date": pd.Series(dtype="datetime64[ns]"),
+                              "prix": pd.Series(dtype=float)})
+    else:
+        table = pd.concat(morceaux, ignore_index=True).sort_values("date", kind="stable")
+    table.attrs["fuseaux"] = fuseaux
+    return table
+
+
+def _fuseaux(tickers, prices):
+    """Fuseau de la place de chaque ligne d'après la table de cours (None : tout à New York)"""
+    fuseaux = prices.attrs.get("fuseaux") if hasattr(prices, "attrs") else None
+    if not fuseaux or all(tz == MARKET_TZ for tz in fuseaux.values()):
+        return None
+    return np.array([fuseaux.get(t, MARKET_TZ) for t in tickers], dtype=object)
+
+
+@metrics.timed("resolution_prix")
+def resolve_prices(tickers, dates, prices, previous_fallback=False, calendar=None):
+    """
+    Prix de chaque (ticker, date) à la séance correspondante : la date elle-même
+    si c'est une séance, sinon la séance suivante. Sans cours pour cette séance,
+    le résultat est NaN, sauf avec `previous_fallback` où l'on prend le dernier
+    cours connu à la date (valorisation). Retourne un ndarray aligné sur l'entrée.
+    Les séances sont celles de `calendar` s'il est donné, sinon celles de la
+    place de cotation de chaque ticker (fuseaux de price_table, ValueError pour
+    une place sans calendrier connu).
+    """
+    dates = pd.to_datetime(pd.Series(dates)).astype("datetime64[ns]").to_numpy()
+    tickers = np.asarray(tickers, dtype=object)
+    seances = calendar.next_session(dates) if calendar is not None \
+        else next_sessions(dates, _fuseaux(tickers, prices))
+
+    gauche = pd.DataFrame({"ticker": tickers, "date": seances})
+    resultat = gauche.merge(prices, on=["ticker", "date"], how="left")["prix"].to_numpy(dtype=float, copy=True)
+
+    manquants = np.flatnonzero(np.isnan(resultat))
+    if previous_fallback and len(manquants):
+        requete = pd.DataFrame({
+            "date": dates[manquants],
+            "ticker": tickers[manquants],
+            "_ligne": manquants,
+        }).sort_values("date", kind="stable")
+        precedent = pd.merge_asof(requete, prices, on="date", by="ticker", direction="backward")
+        resultat[precedent["_ligne"].to_numpy()] = precedent["prix"].to_numpy()
+    return resultat
+
+
+def _taux_change(df, fx, colonne, dates, fuseaux=None):
+    """
+    Taux (devise de cotation -> devise de base) de chaque ligne à la séance de
+    sa date ; ajoute les colonnes devise et `colonne` si elles sont absentes.
+    Sans `fx`, les cours sont déjà dans la devise des montants (taux 1).
+    """
+    if fx is None:
+        return 1.0
+    if "devise" not in df:
+        df["devise"] = fx.currencies.reindex(df["ticker"].to_numpy(dtype=object)).to_numpy(dtype=object)
+    if colonne not in df:
+        df[colonne] = fx.rate(df["devise"], _seances(dates, fuseaux))
+    return df[colonne].to_numpy(dtype=float)
+
+
+def _seances(dates, fuseaux=None):
+    return next_sessions(dates, fuseaux)
+
+
+def _ajustement(df, adjustments, dates, as_of, fuseaux=None):
+    """
+    Facteur d'ajustement (fractionnements, dividendes) du prix d'achat de chaque
+    ligne entre sa séance d'achat et `as_of` : le nombre d'actions calculé est
+    alors celui détenu à cette date. Sans `adjustments`, les cours sont déjà
+    comparables entre eux (facteur 1).
+    """
+    if adjustments is None:
+        return 1.0
+    df["ajustement"] = adjustments.factors(df["ticker"].to_numpy(dtype=object), _seances(dates, fuseaux), as_of)
+    return df["ajustement"].to_numpy(dtype=float)
+
+
+def _numeroter_positions(df):
+    """Numéro de position par ticker (1, 2, ...) et nombre de positions du ticker"""
+    df["position"] = df.groupby("ticker", sort=False).cumcount().to_numpy() + 1
+    df["nb_positions"] = df.groupby("ticker", sort=False)["ticker"].transform("size").to_numpy()
+
+
+@metrics.timed("pnl", calcul="realise")
+def compute_realized(trades, prices, fx=None, adjustments=None):
+    """
+    Allers-retours achat/vente : ajoute prix_achat, prix_vente, actions,
+    valeur_vente, gain, pourcentage et valide (les deux prix sont connus).
+    Avec `fx` (FxRates), les cours sont convertis dans la devise des montants
+    aux taux des séances d'achat et de vente (colonnes devise, taux_achat, taux_vente).
+    Avec `adjustments` (corporate.AdjustmentFactors), `prices` sont des cours
+    bruts et le prix d'achat est ajusté des événements survenus avant la vente
+    (colonne ajustement).
+    """
+    df = trades.reset_index(drop=True).copy()
+    tickers = df["ticker"].to_numpy(dtype=object)
+    fuseaux = _fuseaux(tickers, prices)
+    if "prix_achat" not in df:
+        df["prix_achat"] = resolve_prices(tickers, df["date_achat"], prices)
+    df["prix_vente"] = resolve_prices(tickers, df["date_vente"], prices)
+
+    montant = df["montant"].to_numpy(dtype=float)
+    prix_achat = df["prix_achat"].to_numpy(dtype=float) * _taux_change(df, fx, "taux_achat", df["date_achat"], fuseaux)
+    prix_achat = prix_achat * _ajustement(df, adjustments, df["date_achat"], _seances(df["date_vente"], fuseaux),
+                                          fuseaux)
+    prix_vente = df["prix_vente"].to_numpy(dtype=float) * _taux_change(df, fx, "taux_vente", df["date_vente"], fuseaux)
+
+    df["actions"] = montant / prix_achat
+    df["valeur_vente"] = montant * prix_vente / prix_achat
+    # montant * (ratio - 1) : un aller-retour au même prix donne exactement 0
+    df["gain"] = montant * (prix_vente / prix_achat - 1.0)
+    df["pourcentage"] = (prix_vente / prix_achat - 1.0) * 100
+    df["valide"] = ~(np.isnan(prix_achat) | np.isnan(prix_vente))
+    _numeroter_positions(df)
+    return df
+
+
+@metrics.timed("pnl", calcul="latent")
+def compute_unrealized(achats, prices, date_evaluation, fx=None, adjustments=None):
+    """
+    Positions conservées valorisées à `date_evaluation` : ajoute prix_achat
+    (si absent), prix_actuel, actions, valeur_actuelle, plus_value,
+    pourcentage et valide. Avec `fx` (FxRates), les cours sont convertis dans
+    la devise des montants au taux de la séance d'achat (taux_achat, si absent)
+    et au dernier taux connu à la date d'évaluation (taux_actuel). Avec
+    `adjustments`, les cours sont bruts et actions est le nombre d'actions
+    détenues à la date d'évaluation (après fractionnements, dividendes réinvestis).
+    """
+    df = achats.reset_index(drop=True).copy()
+    tickers = df["ticker"].to_numpy(dtype=object)
+    if "prix_achat" not in df:
+        df["prix_achat"] = resolve_prices(tickers, df["date_achat"], prices)
+
+    # Un seul prix actuel par ticker distinct
+    uniques, inverse = np.unique(tickers.astype(str), return_inverse=True)
+    prix_uniques = resolve_prices(uniques, [date_evaluation] * len(uniques), prices, previous_fallback=True)
+    df["prix_actuel"] = prix_uniques[inverse]
+
+    fuseaux = _fuseaux(tickers, prices)
+    taux_achat = _taux_change(df, fx, "taux_achat", df["date_achat"], fuseaux)
+    if fx is not None:
+        df["taux_actuel"] = fx.rate(df["devise"], pd.Timestamp(date_evaluation))
+
+    montant = df["montant"].to_numpy(dtype=float)
+    prix_achat = df["prix_achat"].to_numpy(dtype=float) * taux_achat
+    prix_achat = prix_achat * _ajustement(df, adjustments, df["date_achat"], pd.Timestamp(date_evaluation), fuseaux)
+    prix_actuel = df["prix_actuel"].to_numpy(dtype=float)
+    if fx is not None:
+        prix_actuel = prix_actuel * df["taux_actuel"].to_numpy(dtype=float)
+
+    df["actions"] = montant / prix_achat
+    df["valeur_actuelle"] = montant * prix_actuel / prix_achat
+    df["plus_value"] = montant * (prix_actuel / prix_achat - 1.0)
+    df["pourcentage"] = (prix_actuel / prix_achat - 1.0) * 100
+    df["valide"] = ~(np.isnan(prix_achat) | np.isnan(prix_actuel))
+    _numeroter_positions(df)
+    return df
+
+
+def ticker_totals(df, valeur="valeur_actuelle"):
+    """Agrégats par ticker sur les lignes valides (ordre d'apparition conservé)"""
+    valides = df[df["valide"]]
+    totaux = valides.groupby("ticker", sort=False).agg(
+        actions=("actions", "sum"),
+        investi=("montant", "sum"),
+        valeur=(valeur, "sum"),
+    )
+    totaux["positions"] = df.groupby("ticker", sort=False)["ticker"].size().reindex(totaux.index)
+    totaux["plus_value"] = totaux["valeur"] - totaux["investi"]
+    totaux["pourcentage"] = totaux["plus_value"] / totaux["investi"] * 100
+    return totaux
+
+
+def portfolio_totals(df, valeur="valeur_actuelle"):
+    """Totaux du portefeuille sur les lignes valides"""
+    valides = df["valide"].to_numpy()
+    investi = float(df["montant"].to_numpy(dtype=float)[valides].sum())
+    valeur_totale = float(df[valeur].to_numpy(dtype=float)[valides].sum())
+    plus_value = valeur_totale - investi
+    return {
+        "investi": investi,
+        "valeur": valeur_totale,
+        "plus_value": plus_value,
+        "rendement": plus_value / investi * 100 if investi > 0 else float("nan"),
+    }
+
+
+def position_statistics(df, valeur="plus_value"):
+    """
+    Statistiques des lignes valides (celles de report.print_statistics) :
+    nombre et part de gagnantes et de perdantes, gain moyen et meilleur gain,
+    perte moyenne et pire perte, avec leur ticker.
+    """
+    valides = df[df["valide"].to_numpy(dtype=bool)] if "valide" in df else df
+    resultats = valides[valeur].to_numpy(dtype=float)
+    tickers = valides["ticker"].to_numpy(dtype=object)
+    gains, pertes = resultats > 0, resultats < 0
+    n = len(resultats)
+    stats = {
+        "positions": n,
+        "gagnantes": int(gains.sum()),
+        "perdantes": int(pertes.sum()),
+        "part_gagnantes": float(gains.sum() / n * 100) if n else float("nan"),
+        "part_perdantes": float(pertes.sum() / n * 100) if n else float("nan"),
+    }
+    if gains.any():
+        meilleur = int(np.nanargmax(np.where(gains, resultats, -np.inf)))
+        stats.update(gain_moyen=float(resultats[gains].mean()), meilleur_gain=float(resultats[meilleur]),
+                     meilleur_ticker=tickers[meilleur])
+    if pertes.any():
+        pire = int(np.nanargmin(np.where(pertes, resultats, np.inf)))
+        stats.update(perte_moyenne=float(resultats[pertes].mean()), pire_perte=float(resultats[pire]),
+                     pire_ticker=tickers[pire])
+    return stats
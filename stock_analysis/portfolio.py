@@ -0,0 +1,64 @@
+"""
+Transactions et achats analysés par défaut par la ligne de commande
+(remplaçables par un fichier CSV/Parquet avec --input).
+"""
+
+# Date d'évaluation : 05/11/2025
+DATE_EVALUATION = "2025-11-05"
+
+# Définition des transactions avec dates d'achat et de vente
+TRANSACTIONS = [
+    # Semaine 1
+    {"ticker": "SHOP", "achat": "2025-10-06", "vente": "2025-10-08", "montant": 1000},
+    {"ticker": "UPST", "achat": "2025-10-06", "vente": "2025-10-06", "montant": 1000},
+    {"ticker": "PLTR", "achat": "2025-10-07", "vente": "2025-10-07", "montant": 1000},
+    {"ticker": "DIS", "achat": "2025-10-07", "vente": "2025-10-09", "montant": 1000},
+    {"ticker": "AMD", "achat": "2025-10-07", "vente": "2025-10-17", "montant": 1000},
+    {"ticker": "DAL", "achat": "2025-10-07", "vente": "2025-10-09", "montant": 1000},
+    {"ticker": "NFLX", "achat": "2025-10-07", "vente": "2025-10-13", "montant": 1000},
+    {"ticker": "COIN", "achat": "2025-10-07", "vente": "2025-10-15", "montant": 1000},
+    {"ticker": "RIOT", "achat": "2025-10-09", "vente": "2025-10-10", "montant": 1000},
+
+    # Semaine 2
+    {"ticker": "NVDA", "achat": "2025-10-13", "vente": "2025-10-15", "montant": 1000},
+    {"ticker": "PLTR", "achat": "2025-10-13", "vente": "2025-10-13", "montant": 1000},  # 2ème trade
+    {"ticker": "MSFT", "achat": "2025-10-13", "vente": "2025-10-13", "montant": 1000},
+    {"ticker": "META", "achat": "2025-10-14", "vente": "2025-10-14", "montant": 1000},  # MTA = META
+    {"ticker": "CRWD", "achat": "2025-10-16", "vente": "2025-10-17", "montant": 1000},
+]
+
+# Définition des achats (sans vente, position conservée)
+ACHATS = [
+    {"ticker": "SHOP", "date_achat": "2025-10-06", "montant": 1000},
+    {"ticker": "UPST", "date_achat": "2025-10-06", "montant": 1000},
+    {"ticker": "PLTR", "date_achat": "2025-10-07", "montant": 1000},
+    {"ticker": "DIS", "date_achat": "2025-10-07", "montant": 1000},
+    {"ticker": "AMD", "date_achat": "2025-10-07", "montant": 1000},
+    {"ticker": "DAL", "date_achat": "2025-10-07", "montant": 1000},
+    {"ticker": "NFLX", "date_achat": "2025-10-07", "montant": 1000},
+    {"ticker": "COIN", "date_achat": "2025-10-07", "montant": 1000},
+    {"ticker": "RIOT", "date_achat": "2025-10-09", "montant": 1000},
+    {"ticker": "NVDA", "date_achat": "2025-10-13", "montant": 1000},
+    {"ticker": "PLTR", "date_achat": "2025-10-13", "montant": 1000},  # 2ème position
+    {"ticker": "MSFT", "date_achat": "2025-10-13", "montant": 1000},
+    {"ticker": "META", "date_achat": "2025-10-14", "montant": 1000},
+    {"ticker": "CRWD", "date_achat": "2025-10-16", "montant": 1000},
+]
+
+# Liste des tickers de la commande markets
+TICKERS = ["SHOP", "UPST", "PLTR", "DIS", "AMD", "DAL", "NFLX", "COIN", "RIOT", "NVDA", "MSFT", "META", "CRWD"]
+
+
+def load_transactions(path):
+    """Liste de dicts lue depuis un fichier CSV ou Parquet (colonnes achat/vente acceptées)"""
+    import pandas as pd
+
+    from stock_analysis.stream import read_transactions
+    morceaux = list(read_transactions(path))
+    if not morceaux:
+        return []
+    df = pd.concat(morceaux, ignore_index=True)
+    for colonne in ("date_achat", "date_vente"):
+        if colonne in df:
+            df[colonne] = pd.to_datetime(df[colonne]).dt.strftime("%Y-%m-%d")
+    return df.to_dict("records")
@@ -0,0 +1,379 @@
+"""
+Fournisseurs de données de marché interchangeables.
+
+Le cache, le préchargement groupé et le référentiel de métadonnées ne parlent
+plus directement à yfinance mais au fournisseur actif (get_provider()) :
+
+- YahooProvider : yfinance (comportement par défaut) ;
+- ReplayProvider : barres et métadonnées enregistrées sur disque (un .npy par
+  ticker et par intervalle, lu en mémoire mappée), pour rejouer une exécution
+  sans réseau ;
+- SyntheticProvider : trajectoires de prix en mouvement brownien géométrique,
+  déterministes (même graine -> mêmes cours), à n'importe quelle échelle.
+
+Le fournisseur se choisit par la variable d'environnement STOCK_ANALYSIS_PROVIDER :
+"yahoo", "replay:<dossier>" ou "synthetic[:<graine>[:actions]]" (":actions" : avec
+dividendes et fractionnements).
+
+Enregistrement d'un rejeu :
+    python -m stock_analysis record rejeu/ AAPL MSFT --start 2025-01-01 --end 2025-11-06 --interval 1d --interval 5m
+"""
+import json
+import os
+import sys
+import threading
+import zlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.sessions import MARKET_TZ, get_calendar
+
+COLONNES = ["Open", "High", "Low", "Close", "Volume"]
+
+# Enregistrement d'une barre sur disque (horodatage en ns UTC)
+BARRE = np.dtype([("ts", "<i8")] + [(colonne, "<f8") for colonne in COLONNES])
+
+INTERVALLES_JOURNALIERS = ("1d",)
+
+
+def _barres_vides(tz=MARKET_TZ):
+    return pd.DataFrame(columns=COLONNES, index=pd.DatetimeIndex([], tz=tz), dtype=float)
+
+
+def _bornes_ns(start, end, tz):
+    """[start, end) (dates) en ns UTC, minuit dans le fuseau de la bourse"""
+    debut = pd.Timestamp(start).tz_localize(None).normalize().tz_localize(tz)
+    fin = pd.Timestamp(end).tz_localize(None).normalize().tz_localize(tz)
+    return debut.value, fin.value
+
+
+def _minutes(interval):
+    """Durée d'une barre intraday en minutes ("5m", "1h", "60m"...)"""
+    if interval.endswith("m") and not interval.endswith("mo"):
+        return int(interval[:-1])
+    if interval.endswith("h"):
+        return 60 * int(interval[:-1])
+    raise ValueError(f"Intervalle non pris en charge : {interval}")
+
+
+class MarketDataProvider:
+    """Interface commune : historiques OHLCV tz-aware et métadonnées par ticker"""
+
+    # Identifiant du fournisseur (sépare les caches locaux)
+    name = "base"
+
+    # Vrai si les cours rendus sont ajustés des fractionnements ultérieurs
+    # (le cache les ramène alors aux cours cotés, voir corporate.py)
+    split_adjusted = False
+
+    def history(self, ticker, start, end, interval="1d"):
+        """Barres de `ticker` sur [start, end), index tz-aware, colonnes COLONNES"""
+        raise NotImplementedError
+
+    def download(self, tickers, start, end, interval="1d"):
+        """Barres d'un paquet de tickers : dict ticker -> DataFrame"""
+        return {ticker: self.history(ticker, start, end, interval) for ticker in tickers}
+
+    def info(self, ticker):
+        """Métadonnées du ticker (clés de yf.Ticker(...).info)"""
+        return {}
+
+    def actions(self, ticker):
+        """Opérations sur titres : index de dates ex, colonnes Dividends et Stock Splits (0 = aucun)"""
+        return pd.DataFrame(columns=["Dividends", "Stock Splits"], index=pd.DatetimeIndex([]), dtype=float)
+
+
+class YahooProvider(MarketDataProvider):
+    """Données Yahoo Finance via yfinance"""
+
+    name = "yahoo"
+    split_adjusted = True
+
+    # Cours non ajustés des dividendes : Close reste ajusté des fractionnements,
+    # le cache le ramène au cours coté
+    def history(self, ticker, start, end, interval="1d"):
+        import yfinance as yf
+        return yf.Ticker(ticker).history(start=start, end=end, interval=interval, auto_adjust=False)
+
+    def download(self, tickers, start, end, interval="1d"):
+        import yfinance as yf
+        data = yf.download(
+            tickers=list(tickers),
+            start=start,
+            end=end,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=False,
+            ignore_tz=False,
+            threads=True,
+            progress=False,
+        )
+        if data is None or data.empty:
+            return {}
+        presents = set(data.columns.get_level_values(0))
+        return {ticker: data[ticker].dropna(how="all") for ticker in tickers if ticker in presents}
+
+    def info(self, ticker):
+        import yfinance as yf
+        return yf.Ticker(ticker).info
+
+    def actions(self, ticker):
+        import yfinance as yf
+        return yf.Ticker(ticker).actions
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Rejoue des données enregistrées par record() : `<root>/<intervalle>/<ticker>.npy`
+    (tableau structuré BARRE, trié par horodatage) et `<root>/metadata.json`.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.name = f"replay-{zlib.crc32(os.path.abspath(root).encode()):08x}"
+        chemin = os.path.join(root, "metadata.json")
+        self._metadonnees = {}
+        if os.path.exists(chemin):
+            with open(chemin, encoding="utf-8") as f:
+                self._metadonnees = json.load(f)
+
+    def _chemin(self, ticker, interval):
+        return os.path.join(self.root, interval, f"{ticker}.npy")
+
+    def bars(self, ticker, interval="1d"):
+        """Tableau structuré complet du ticker, en mémoire mappée (vide si absent)"""
+        chemin = self._chemin(ticker, interval)
+        if not os.path.exists(chemin):
+            return np.empty(0, dtype=BARRE)
+        return np.load(chemin, mmap_mode="r")
+
+    def history(self, ticker, start, end, interval="1d"):
+        tz = self._metadonnees.get(ticker, {}).get("timeZoneFullName") or MARKET_TZ
+        barres = self.bars(ticker, interval)
+        debut, fin = _bornes_ns(start, end, tz)
+        i, j = np.searchsorted(barres["ts"], [debut, fin], side="left")
+        morceau = barres[i:j]
+        index = pd.DatetimeIndex(pd.to_datetime(np.asarray(morceau["ts"]), unit="ns", utc=True)).tz_convert(tz)
+        return pd.DataFrame({colonne: np.asarray(morceau[colonne]) for colonne in COLONNES}, index=index)
+
+    def info(self, ticker):
+        return dict(self._metadonnees.get(ticker, {}))
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Cours en mouvement brownien géométrique, sur les séances du calendrier NYSE.
+    Les clôtures journalières d'un ticker sont tirées une fois pour tout le
+    calendrier (graine = graine du fournisseur + ticker) ; les barres intraday
+    d'une séance sont un pont brownien de l'ouverture à la clôture du jour, donc
+    cohérentes avec les barres journalières quelle que soit la période demandée.
+    Avec `corporate_actions`, chaque ticker verse un dividende trimestriel et se
+    fractionne de temps en temps : les cours rendus sont alors les cours cotés,
+    qui décrochent aux dates ex (la trajectoire brownienne est le cours ajusté).
+    """
+
+    SECTEURS = ["Technology", "Healthcare", "Financial Services", "Energy", "Industrials", "Consumer Cyclical"]
+
+    # Devise de cotation selon le suffixe Yahoo du ticker (défaut : dollar US)
+    DEVISES = {".PA": "EUR", ".DE": "EUR", ".AS": "EUR", ".MI": "EUR", ".L": "GBp", ".SW": "CHF",
+               ".TO": "CAD", ".T": "JPY", ".HK": "HKD"}
+
+    def __init__(self, seed=0, mu=0.08, sigma=0.35, corporate_actions=False):
+        self.seed = seed
+        self.mu = mu
+        self.sigma = sigma
+        self.corporate_actions = corporate_actions
+        self.name = f"synthetic-{seed}" + ("-actions" if corporate_actions else "")
+        self.calendar = get_calendar()
+
+    def _graine(self, ticker, *extra):
+        return [self.seed, zlib.crc32(ticker.encode()), *extra]
+
+    @lru_cache(maxsize=256)
+    def _journalier(self, ticker):
+        """(open, high, low, close, volume) pour toutes les séances du calendrier"""
+        rng = np.random.default_rng(self._graine(ticker))
+        n = len(self.calendar)
+        dt = 1 / 252
+        # Paires de devises ("USDEUR=X") : taux proche de 1, sans tendance, peu volatil
+        change = ticker.endswith("=X")
+        mu, sigma = (0.0, 0.08) if change else (self.mu, self.sigma)
+        ecart = sigma * np.sqrt(dt)
+        rendements = (mu - sigma ** 2 / 2) * dt + ecart * rng.standard_normal(n)
+        cloture = (rng.uniform(0.5, 1.5) if change else rng.uniform(20, 500)) * np.exp(np.cumsum(rendements))
+        ouverture = np.concatenate([[cloture[0]], cloture[:-1]]) * np.exp(0.2 * ecart * rng.standard_normal(n))
+        haut = np.maximum(ouverture, cloture) * np.exp(0.5 * ecart * np.abs(rng.standard_normal(n)))
+        bas = np.minimum(ouverture, cloture) * np.exp(-0.5 * ecart * np.abs(rng.standard_normal(n)))
+        volume = np.round(rng.lognormal(14, 0.5, n))
+
+        seances, rendement, ratio = self._evenements(ticker)
+        if len(seances):
+            # Décrochage à chaque date ex, normalisé pour que les cours du jour restent inchangés
+            aujourd_hui = min(np.searchsorted(self.calendar.sessions, self._aujourd_hui(), side="right"), n) - 1
+            saut = np.ones(n)
+            saut[seances] = (1.0 - rendement) / ratio
+            cumul = np.cumprod(saut)
+            ouverture, haut, bas, cloture = (a * cumul / cumul[aujourd_hui] for a in (ouverture, haut, bas, cloture))
+            actions = np.ones(n)
+            actions[seances] = ratio
+            actions = np.cumprod(actions)
+            volume = np.round(volume * actions / actions[aujourd_hui])
+        return ouverture, haut, bas, cloture, volume
+
+    def _aujourd_hui(self):
+        return np.datetime64(pd.Timestamp.now(tz=self.calendar.tz).date(), "D")
+
+    @lru_cache(maxsize=256)
+    def _evenements(self, ticker):
+        """(indices des séances ex, rendement du dividende, ratio de fractionnement)"""
+        if not self.corporate_actions or ticker.endswith("=X"):
+            return np.empty(0, dtype=int), np.empty(0), np.empty(0)
+        n = len(self.calendar)
+        rng = np.random.default_rng(self._graine(ticker, 2))
+        # Dividende trimestriel de 0,2 à 1 % du cours, un fractionnement tous les cinq ans environ
+        dividendes = np.arange(rng.integers(63), n, 63)
+        fractionnements = np.flatnonzero(rng.random(n) < 1 / (5 * 252))
+        seances = np.union1d(dividendes, fractionnements)
+        rendement = np.where(np.isin(seances, dividendes), rng.uniform(0.002, 0.01, len(seances)), 0.0)
+        ratio = np.where(np.isin(seances, fractionnements), rng.choice([2.0, 3.0, 4.0], len(seances)), 1.0)
+        return seances, rendement, ratio
+
+    def history(self, ticker, start, end, interval="1d"):
+        cal = self.calendar
+        i = np.searchsorted(cal.sessions, np.datetime64(pd.Timestamp(start).date(), "D"), side="left")
+        j = np.searchsorted(cal.sessions, np.datetime64(pd.Timestamp(end).date(), "D"), side="left")
+        if i >= j:
+            return _barres_vides(cal.tz)
+        ouverture, haut, bas, cloture, volume = (a[i:j] for a in self._journalier(ticker))
+
+        if interval in INTERVALLES_JOURNALIERS:
+            index = pd.DatetimeIndex(cal.sessions[i:j].astype("datetime64[ns]")).tz_localize(cal.tz)
+            return pd.DataFrame({"Open": ouverture, "High": haut, "Low": bas, "Close": cloture,
+                                 "Volume": volume}, index=index)
+
+        pas = _minutes(interval) * 60 * 10**9
+        morceaux = []
+        for k in range(j - i):
+            seance = i + k
+            n = int((cal.closes[seance] - cal.opens[seance]) // pas)
+            rng = np.random.default_rng(self._graine(ticker, seance))
+            # Pont brownien du log-prix de l'ouverture à la clôture de la séance
+            marche = np.concatenate([[0.0], np.cumsum(rng.standard_normal(n))]) * self.sigma * np.sqrt(1 / (252 * n))
+            t = np.linspace(0, 1, n + 1)
+            log_prix = np.log(ouverture[k]) + marche - t * marche[-1] + t * np.log(cloture[k] / ouverture[k])
+            points = np.exp(log_prix)
+            debut_barre, fin_barre = points[:-1], points[1:]
+            bruit = np.exp(0.1 * self.sigma * np.sqrt(1 / (252 * n)) * np.abs(rng.standard_normal((2, n))))
+            morceaux.append(pd.DataFrame({
+                "Open": debut_barre,
+                "High": np.maximum(debut_barre, fin_barre) * bruit[0],
+                "Low": np.minimum(debut_barre, fin_barre) / bruit[1],
+                "Close": fin_barre,
+                "Volume": np.round(volume[k] / n * rng.uniform(0.5, 1.5, n)),
+            }, index=cal.opens[seance] + pas * np.arange(n)))
+        barres = pd.concat(morceaux)
+        barres.index = pd.to_datetime(barres.index, unit="ns", utc=True).tz_convert(cal.tz)
+        return barres
+
+    def info(self, ticker):
+        rng = np.random.default_rng(self._graine(ticker, 1))
+        secteur = self.SECTEURS[rng.integers(len(self.SECTEURS))]
+        return {
+            "longName": f"{ticker} (synthétique)",
+            "exchange": "SYN",
+            "timeZoneFullName": self.calendar.tz,
+            "country": "United States",
+            "sector": secteur,
+            "industry": secteur,
+            "currency": next((d for suffixe, d in self.DEVISES.items() if ticker.endswith(suffixe)), "USD"),
+        }
+
+    def actions(self, ticker):
+        seances, rendement, ratio = self._evenements(ticker)
+        # Événements connus à ce jour seulement
+        passes = self.calendar.sessions[seances] <= self._aujourd_hui()
+        seances, rendement, ratio = seances[passes], rendement[passes], ratio[passes]
+        veille = self._journalier(ticker)[3][np.maximum(seances - 1, 0)]
+        index = pd.DatetimeIndex(self.calendar.sessions[seances].astype("datetime64[ns]")).tz_localize(self.calendar.tz)
+        return pd.DataFrame({"Dividends": rendement * veille, "Stock Splits": np.where(ratio != 1.0, ratio, 0.0)},
+                            index=index)
+
+
+def record(root, tickers, start, end, intervals=("1d",), provider=None, metadata=True):
+    """
+    Enregistre sous `root`, pour un ReplayProvider, les barres de `tickers` sur
+    [start, end) (fusionnées avec celles déjà enregistrées) et leurs métadonnées.
+    """
+    provider = provider or get_provider()
+    for interval in intervals:
+        os.makedirs(os.path.join(root, interval), exist_ok=True)
+        for ticker, hist in provider.download(tickers, start, end, interval).items():
+            if hist.empty:
+                continue
+            index = hist.index if hist.index.tz is not None else hist.index.tz_localize(MARKET_TZ)
+            nouvelles = np.empty(len(hist), dtype=BARRE)
+            nouvelles["ts"] = index.tz_convert("UTC").as_unit("ns").asi8
+            for colonne in COLONNES:
+                nouvelles[colonne] = hist[colonne].to_numpy(dtype=float) if colonne in hist else np.nan
+
+            chemin = os.path.join(root, interval, f"{ticker}.npy")
+            if os.path.exists(chemin):
+                nouvelles = np.concatenate([np.load(chemin), nouvelles])
+            # Tri par horodatage, la dernière barre enregistrée l'emporte
+            _, derniers = np.unique(nouvelles["ts"][::-1], return_index=True)
+            np.save(chemin, nouvelles[::-1][derniers])
+
+    if metadata:
+        chemin = os.path.join(root, "metadata.json")
+        metadonnees = {}
+        if os.path.exists(chemin):
+            with open(chemin, encoding="utf-8") as f:
+                metadonnees = json.load(f)
+        metadonnees.update({ticker: provider.info(ticker) for ticker in tickers})
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump(metadonnees, f, ensure_ascii=False, indent=1, default=str)
+
+
+def provider_from_spec(spec):
+    """Fournisseur décrit par "yahoo", "replay:<dossier>" ou "synthetic[:<graine>[:actions]]" """
+    nom, _, argument = spec.partition(":")
+    if nom == "yahoo":
+        return YahooProvider()
+    if nom == "replay":
+        return ReplayProvider(argument)
+    if nom == "synthetic":
+        graine, _, options = argument.partition(":")
+        return SyntheticProvider(seed=int(graine or 0), corporate_actions=options == "actions")
+    raise ValueError(f"Fournisseur inconnu : {spec} (attendu : yahoo, replay:<dossier>, synthetic[:<graine>[:actions]])")
+
+
+_fournisseur = None
+_verrou = threading.Lock()
+
+
+def get_provider():
+    """Fournisseur actif (STOCK_ANALYSIS_PROVIDER, Yahoo par défaut)"""
+    global _fournisseur
+    with _verrou:
+        if _fournisseur is None:
+            _fournisseur = provider_from_spec(os.environ.get("STOCK_ANALYSIS_PROVIDER", "yahoo"))
+        return _fournisseur
+
+
+def set_provider(provider):
+    """Remplace le fournisseur actif (à appeler avant le premier accès au cache)"""
+    global _fournisseur
+    with _verrou:
+        _fournisseur = provider_from_spec(provider) if isinstance(provider, str) else provider
+
+
+def main(argv=None):
+    """Équivaut à `python -m stock_analysis record` (voir cli)"""
+    from stock_analysis.cli import main as cli_main
+    return cli_main(["record", *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,500 @@
+"""
+Affichage et export des résultats, communs à toutes les commandes : détail
+par transaction ou par ticker, résumé global, tableau détaillé, statistiques,
+stockage Parquet et export CSV optionnel.
+"""
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.results import write_results
+from stock_analysis.sessions import EXCHANGES
+
+# Colonnes du tableau détaillé des positions conservées (export CSV)
+COLONNES_POSITIONS = {
+    "ticker": "Ticker",
+    "position": "Position",
+    "date_achat": "Date Achat",
+    "heure_achat": "Heure Achat",
+    "prix_achat": "Prix Achat ($)",
+    "prix_actuel": "Prix Actuel ($)",
+    "actions": "Actions",
+    "montant": "Investi (€)",
+    "valeur_actuelle": "Valeur Actuelle (€)",
+    "plus_value": "Plus-Value (€)",
+    "pourcentage": "% Gain",
+}
+
+# Taux de change (devise de cotation -> euro), affichés avec --fx
+COLONNES_CHANGE = {
+    "taux_achat": "Taux Achat",
+    "taux_actuel": "Taux Actuel",
+    "taux_vente": "Taux Vente",
+}
+
+COLONNES_TRANSACTIONS = {
+    "ticker": "Ticker",
+    "date_achat": "Date Achat",
+    "prix_achat": "Prix Achat",
+    "date_vente": "Date Vente",
+    "prix_vente": "Prix Vente",
+    "actions": "Actions",
+    "gain": "Gain/Perte (€)",
+    "pourcentage": "% Gain",
+}
+
+COLONNES_MARCHES = {
+    "ticker": "Ticker",
+    "nom": "Nom",
+    "marche": "Marché",
+    "pays": "Pays",
+    "timezone": "Timezone",
+    "devise": "Devise",
+    "secteur": "Secteur",
+    "industrie": "Industrie",
+}
+
+
+def _colonnes_change(calcul):
+    """Colonnes de taux de change présentes dans le calcul (conversion active)"""
+    if "devise" not in calcul and "taux_actuel" not in calcul:
+        return {}
+    return {k: v for k, v in COLONNES_CHANGE.items() if k in calcul}
+
+
+def titre(texte, largeur, avant=""):
+    print(avant + "=" * largeur)
+    print(texte)
+    print("=" * largeur)
+
+
+def store(lignes, dataset, csv_path=None, df_csv=None, run_date=None,
+          libelles=("Résultats ajoutés", "Résultats exportés")):
+    """Ajoute les lignes au stockage Parquet et, si demandé, exporte le tableau en CSV"""
+    chemin = write_results(lignes, dataset, run_date=run_date)
+    print(f"\n✅ {libelles[0]} dans '{chemin}'")
+    if csv_path:
+        with metrics.timer("export", format="csv"):
+            df_csv.to_csv(csv_path, index=False, encoding='utf-8')
+        print(f"✅ {libelles[1]} dans '{csv_path}'")
+
+
+# ----------------------------------------------------------------------
+# Allers-retours (commande realized)
+# ----------------------------------------------------------------------
+def print_realized(calcul, totaux, csv_path=None):
+    print("=" * 100)
+    print("ANALYSE DES TRANSACTIONS")
+    print("=" * 100)
+
+    for i, trade in enumerate(calcul.itertuples(index=False), 1):
+        if trade.valide:
+            statut = "✅ GAIN" if trade.gain >= 0 else "❌ PERTE"
+            print(f"\n{i}. {trade.ticker} {statut}")
+            print(f"   Achat  : {trade.date_achat} à {trade.prix_achat:.2f}$ ({trade.actions:.4f} actions)")
+            print(f"   Vente  : {trade.date_vente} à {trade.prix_vente:.2f}$")
+            print(f"   Résultat: {trade.gain:+.2f}€ ({trade.pourcentage:+.2f}%)")
+        else:
+            print(f"\n{i}. {trade.ticker} - ERREUR: Impossible de récupérer les cours")
+
+    # Affichage du résumé
+    titre("RÉSUMÉ GLOBAL", 100, avant="\n")
+    print(f"Nombre de transactions : {len(calcul)}")
+    print(f"Investissement total   : {totaux['investi']:.2f}€")
+    print(f"Gain/Perte total       : {totaux['plus_value']:+.2f}€")
+    print(f"Rendement              : {totaux['rendement']:+.2f}%")
+
+    valides = calcul[calcul["valide"]]
+    libelles = COLONNES_TRANSACTIONS | _colonnes_change(calcul)
+    df = valides.rename(columns=libelles)[list(libelles.values())]
+    if not df.empty:
+        titre("TABLEAU DÉTAILLÉ", 100, avant="\n")
+        print(df.to_string(index=False))
+
+        # Stockage Parquet (historique par date d'exécution), CSV en option
+        colonnes = ["ticker", "date_achat", "prix_achat", "date_vente", "prix_vente", "actions", "montant", "gain", "pourcentage"]
+        store(valides[colonnes + list(_colonnes_change(calcul))], "resultats_trading", csv_path, df)
+
+
+# ----------------------------------------------------------------------
+# Positions conservées (commandes unrealized et intraday)
+# ----------------------------------------------------------------------
+def print_positions(calcul, totaux_par_ticker, largeur=120, intraday=False):
+    """Détail des positions, regroupées par ticker, avec le total de chaque ticker"""
+    for ticker, positions in calcul.groupby("ticker", sort=False):
+        print(f"\n{'─' * largeur}")
+        print(f"📊 {ticker} - {len(positions)} position(s)")
+        print(f"{'─' * largeur}")
+
+        if positions["prix_actuel"].isna().all():
+            print(f"❌ Impossible de récupérer le prix actuel de {ticker}")
+            continue
+
+        for position in positions.itertuples(index=False):
+            i = position.position
+            if position.valide:
+                statut = "📈 GAIN" if position.plus_value >= 0 else "📉 PERTE"
+                position_label = f"Position #{i}" if len(positions) > 1 else "Position unique"
+
+                print(f"\n   {position_label} {statut}")
+                if intraday:
+                    print(f"   ├─ Date achat    : {position.date_achat} à {position.heure_achat}")
+                    print(f"   ├─ Prix achat    : {position.prix_achat:.2f}$ (2h après ouverture)")
+                else:
+                    print(f"   ├─ Date achat    : {position.date_achat}")
+                    print(f"   ├─ Prix achat    : {position.prix_achat:.2f}$")
+                print(f"   ├─ Actions       : {position.actions:.4f}")
+                print(f"   ├─ Investi       : {position.montant:.2f}€")
+                print(f"   ├─ Valeur actuelle: {position.valeur_actuelle:.2f}€")
+                print(f"   └─ Plus-value    : {position.plus_value:+.2f}€ ({position.pourcentage:+.2f}%)")
+            else:
+                print(f"   ❌ Position #{i} - Impossible de récupérer le prix d'achat")
+
+        # Résumé par ticker
+        if ticker in totaux_par_ticker.index:
+            total = totaux_par_ticker.loc[ticker]
+
+            print(f"\n   {'─' * (largeur - 20)}")
+            print(f"   💼 TOTAL {ticker}")
+            print(f"   ├─ Positions     : {len(positions)}")
+            print(f"   ├─ Actions total : {total['actions']:.4f}")
+            print(f"   ├─ Investi       : {total['investi']:.2f}€")
+            print(f"   ├─ Valeur actuelle: {total['valeur']:.2f}€")
+            print(f"   └─ Plus-value    : {total['plus_value']:+.2f}€ ({total['pourcentage']:+.2f}%)")
+
+
+def print_portfolio_summary(calcul, totaux, date_evaluation, nb_achats, largeur=120, strategie=None):
+    titre("📊 RÉSUMÉ GLOBAL DU PORTEFEUILLE", largeur, avant="\n\n")
+    if strategie:
+        print(f"Stratégie              : {strategie}")
+    print(f"Date d'évaluation      : {date_evaluation}")
+    print(f"Nombre de tickers      : {calcul['ticker'].nunique()}")
+    print(f"Nombre total d'achats  : {nb_achats}")
+    print(f"Investissement total   : {totaux['investi']:.2f}€")
+    print(f"Valeur actuelle        : {totaux['valeur']:.2f}€")
+    print(f"Plus-value latente     : {totaux['plus_value']:+.2f}€")
+
+    if totaux["investi"] > 0:
+        print(f"Rendement global       : {totaux['rendement']:+.2f}%")
+
+
+def positions_table(calcul, intraday=False):
+    """
+    (lignes, tableau) : positions valides regroupées par ticker comme dans
+    l'affichage détaillé, et leur tableau aux en-têtes de l'export CSV.
+    """
+    lignes = pd.concat([positions for _, positions in calcul.groupby("ticker", sort=False)])
+    lignes = lignes[lignes["valide"]]
+    colonnes = {k: v for k, v in COLONNES_POSITIONS.items() if intraday or k != "heure_achat"}
+    colonnes |= _colonnes_change(calcul)
+    df = lignes.assign(
+        position=lambda d: d["position"].where(d["nb_positions"] > 1, "-")
+    ).rename(columns=colonnes)[list(colonnes.values())]
+    return lignes[list(colonnes)], df
+
+
+def print_statistics(df, largeur=120):
+    titre("📈 STATISTIQUES", largeur, avant="\n")
+    gains = df[df['Plus-Value (€)'] > 0]
+    pertes = df[df['Plus-Value (€)'] < 0]
+
+    print(f"Positions gagnantes    : {len(gains)} ({len(gains)/len(df)*100:.1f}%)")
+    print(f"Positions perdantes    : {len(pertes)} ({len(pertes)/len(df)*100:.1f}%)")
+
+    if len(gains) > 0:
+        print(f"Gain moyen             : +{gains['Plus-Value (€)'].mean():.2f}€")
+        print(f"Meilleur gain          : +{gains['Plus-Value (€)'].max():.2f}€ ({gains.loc[gains['Plus-Value (€)'].idxmax(), 'Ticker']})")
+
+    if len(pertes) > 0:
+        print(f"Perte moyenne          : {pertes['Plus-Value (€)'].mean():.2f}€")
+        print(f"Pire perte             : {pertes['Plus-Value (€)'].min():.2f}€ ({pertes.loc[pertes['Plus-Value (€)'].idxmin(), 'Ticker']})")
+
+
+def print_detail_table(calcul, dataset, date_evaluation, largeur=120, intraday=False, csv_path=None):
+    """Tableau détaillé, statistiques et stockage des positions conservées"""
+    lignes, df = positions_table(calcul, intraday)
+    if df.empty:
+        return
+    titre("📋 TABLEAU DÉTAILLÉ DE TOUTES LES POSITIONS", largeur, avant="\n")
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.width', largeur)
+    print(df.to_string(index=False))
+
+    print_statistics(df, largeur)
+
+    # Stockage Parquet (historique par date d'évaluation), CSV en option
+    store(lignes, dataset, csv_path, df, run_date=date_evaluation)
+
+
+def print_risk(suivi, indice, largeur=120, seances=10):
+    """Indicateurs de risque sur la période, dernières séances et contributions par ticker"""
+    titre("📉 RISQUE ET PERFORMANCE", largeur, avant="\n")
+    resume = suivi.summary()
+    if not resume["seances"]:
+        print("Aucune séance valorisée")
+        return
+
+    print(f"Période                : {resume['debut']:%Y-%m-%d} → {resume['fin']:%Y-%m-%d} ({resume['seances']} séances)")
+    print(f"Rendement cumulé       : {resume['rendement'] * 100:+.2f}% ({indice} : {resume['rendement_indice'] * 100:+.2f}%)")
+    print(f"P&L cumulé             : {resume['pnl']:+.2f}€")
+    print(f"Volatilité annualisée  : {resume['volatilite'] * 100:.2f}%")
+    print(f"Ratio de Sharpe        : {resume['sharpe']:.2f}")
+    print(f"Drawdown maximal       : {resume['drawdown_max'] * 100:.2f}% ({resume['date_drawdown_max']:%Y-%m-%d})")
+    print(f"{'Bêta vs ' + indice:<23}: {resume['beta']:.2f}")
+
+    serie = suivi.series().tail(seances)
+    tableau = pd.DataFrame({
+        "Date": serie.index.strftime("%Y-%m-%d"),
+        "Valeur (€)": serie["valeur"].round(2).to_numpy(),
+        "P&L Jour (€)": serie["pnl"].round(2).to_numpy(),
+        "Rendement %": (serie["rendement"] * 100).round(2).to_numpy(),
+        f"Volatilité {suivi.window}j %": (serie["volatilite"] * 100).round(2).to_numpy(),
+        f"Sharpe {suivi.window}j": serie["sharpe"].round(2).to_numpy(),
+        "Drawdown %": (serie["drawdown"] * 100).round(2).to_numpy(),
+        f"Bêta {suivi.window}j": serie["beta"].round(2).to_numpy(),
+    })
+    print(f"\n📅 Dernières séances :")
+    print(tableau.to_string(index=False))
+
+    contributions = suivi.contributions()
+    print(f"\n🧩 Contribution par ticker :")
+    print(pd.DataFrame({
+        "Ticker": contributions.index,
+        "P&L (€)": contributions["pnl"].round(2).to_numpy(),
+        "Contribution (pts %)": (contributions["rendement"] * 100).round(2).to_numpy(),
+    }).to_string(index=False))
+
+
+# ----------------------------------------------------------------------
+# Marchés et horaires (commande markets)
+# ----------------------------------------------------------------------
+def print_market_info(ticker, info):
+    print(f"\n{'─' * 120}")
+    print(f"🏢 {ticker} - {info['nom']}")
+    print(f"{'─' * 120}")
+    print(f"   📍 Marché (Exchange)  : {info['marche']}")
+    print(f"   🌍 Pays               : {info['pays']}")
+    print(f"   🕐 Timezone           : {info['timezone']}")
+    print(f"   💱 Devise             : {info['devise']}")
+    print(f"   🏭 Secteur            : {info['secteur']}")
+    print(f"   🔧 Industrie          : {info['industrie']}")
+
+
+def print_markets(marches, csv_path=None):
+    """Résumé par marché, horaires, tableau détaillé et stockage (DataFrame aux colonnes COLONNES_MARCHES)"""
+    df = marches.rename(columns=COLONNES_MARCHES)[list(COLONNES_MARCHES.values())]
+
+    titre("📊 RÉSUMÉ PAR MARCHÉ", 120, avant="\n\n")
+
+    if not df.empty:
+        print("\nNombre d'actions par marché :")
+        for marche, count in df['Marché'].value_counts().items():
+            print(f"   • {marche}: {count} action(s)")
+
+        print("\n" + "─" * 120)
+        print("🕐 HORAIRES DE TRADING (Heure de New York - ET)")
+        print("─" * 120)
+        print("   📈 Marché principal: NYSE / NASDAQ")
+        print("   ├─ Pré-marché     : 04:00 - 09:30 ET")
+        print("   ├─ Session régulière: 09:30 - 16:00 ET")
+        print("   └─ Après-marché   : 16:00 - 20:00 ET")
+
+        print("\n" + "─" * 120)
+        print("🌍 CONVERSION HORAIRES (pour référence)")
+        print("─" * 120)
+        print("   • 09:30 ET = 15:30 CET (Paris)")
+        print("   • 16:00 ET = 22:00 CET (Paris)")
+
+        # Places sans calendrier de séances (sessions.EXCHANGES) : cours refusés par les calculs
+        fuseaux = marches["timezone"]
+        sans_calendrier = marches.loc[fuseaux.notna() & ~fuseaux.isin(["N/A", "", *EXCHANGES])
+                                      & ~marches["ticker"].str.endswith("=X"), "ticker"]
+        if len(sans_calendrier):
+            print(f"\n⚠️  Places sans calendrier de séances : {', '.join(sans_calendrier)}")
+            print(f"   Places prises en charge : {', '.join(p.name for p in EXCHANGES.values())}")
+
+        # Tableau détaillé
+        titre("📋 TABLEAU DÉTAILLÉ", 120, avant="\n\n")
+        pd.set_option('display.max_columns', None)
+        pd.set_option('display.width', 120)
+        pd.set_option('display.max_colwidth', 40)
+        print(df.to_string(index=False))
+
+        # Stockage Parquet (historique par date d'exécution), CSV en option
+        store(marches[list(COLONNES_MARCHES)], "marches_actions", csv_path, df,
+              libelles=("Informations ajoutées", "Informations exportées"))
+
+    # Information sur les cours utilisés
+    titre("⚠️  INFORMATION IMPORTANTE SUR LES COURS UTILISÉS", 120, avant="\n\n")
+    print("""
+Lorsque vous spécifiez une DATE sans HEURE précise, Yahoo Finance retourne :
+   • Le cours de CLÔTURE (Close) de cette journée
+   • Clôture = 16:00 ET (22:00 heure de Paris)
+
+Pour un bot de trading qui achète pendant la journée :
+   • Si achat à 10:00 ET → Utilisez des données intraday (1min, 5min, 1h)
+   • Si achat à la clôture → Le cours de Close est correct
+   • Si achat à l'ouverture → Utilisez le cours Open (09:30 ET)
+
+💡 Recommandation : Vérifiez à quelle heure votre bot effectue les transactions !
+""")
+
+
+# ----------------------------------------------------------------------
+# Archive des barres minute (commande archive)
+# ----------------------------------------------------------------------
+COLONNES_ARCHIVE = {
+    "ticker": "Ticker",
+    "ajoutees": "Séances Ajoutées",
+    "seances": "Séances Archivées",
+    "barres": "Barres",
+    "premiere": "Première Séance",
+    "derniere": "Dernière Séance",
+}
+
+
+def print_archive(etat, interval, largeur=100):
+    """État de l'archive par ticker (DataFrame aux colonnes COLONNES_ARCHIVE)"""
+    titre(f"📋 ARCHIVE {interval} PAR TICKER", largeur, avant="\n")
+    print(etat.rename(columns=COLONNES_ARCHIVE)[list(COLONNES_ARCHIVE.values())].to_string(index=False))
+    print(f"\n✅ {int(etat['ajoutees'].sum())} séance(s) ajoutée(s), "
+          f"{int(etat['seances'].sum())} séance(s) et {int(etat['barres'].sum())} barre(s) archivées au total")
+
+
+# ----------------------------------------------------------------------
+# Filtre de l'univers (commande screen)
+# ----------------------------------------------------------------------
+def print_screen(retenus, criteres, nb_tickers, csv_path=None, largeur=120):
+    """Tickers retenus par le filtre, classés, puis stockage (jeu « screener »)"""
+    titre(f"📋 TICKERS RETENUS : {len(retenus)} / {nb_tickers}", largeur, avant="\n")
+    if retenus.empty:
+        print("Aucun ticker ne vérifie tous les critères")
+        return
+    df = retenus.rename(columns={"rang": "Rang", "ticker": "Ticker", "date": "Séance", "close": "Clôture"})
+    print(df.round(2).to_string(index=False))
+
+    lignes = retenus.assign(criteres=" et ".join(criteres))
+    store(lignes, "screener", csv_path, df, run_date=retenus["date"].iloc[0],
+          libelles=("Sélection ajoutée", "Sélection exportée"))
+
+
+# ----------------------------------------------------------------------
+# Comptabilité par lots (commande lots)
+# ----------------------------------------------------------------------
+COLONNES_LOTS = {
+    "ticker": "Ticker",
+    "quantite_vendue": "Vendu",
+    "produit": "Produit",
+    "cout_vendu": "Coût Vendu",
+    "plus_value_realisee": "P/V Réalisée",
+    "duree_moyenne": "Détention (j)",
+    "quantite_ouverte": "Détenu",
+    "cout_ouvert": "Coût Détenu",
+    "valeur": "Valeur",
+    "plus_value_latente": "P/V Latente",
+}
+
+COLONNES_LOTS_OUVERTS = {
+    "ticker": "Ticker",
+    "date_achat": "Date Achat",
+    "quantite": "Quantité",
+    "prix_achat": "Prix Revient",
+    "prix_actuel": "Prix Actuel",
+    "plus_value": "Plus-Value",
+    "pourcentage": "% Gain",
+    "duree_jours": "Détention (j)",
+}
+
+METHODES_LOTS = {"fifo": "premier entré, premier sorti", "lifo": "dernier entré, premier sorti",
+                 "average": "coût moyen pondéré"}
+
+
+def print_lots(livre, prix, date_evaluation, source, csv_path=None, largeur=120, lots_affiches=50):
+    """
+    Livre des lots (lots.LotBook) : totaux par ticker, lots ouverts valorisés aux
+    cours `prix`, résumé, puis stockage des cessions (jeu « lots_cessions ») et
+    des lots ouverts (jeu « lots_ouverts »).
+    """
+    print("=" * largeur)
+    print(f"COMPTABILITÉ PAR LOTS ({source}, {livre.method} : {METHODES_LOTS[livre.method]})")
+    print(f"Date d'évaluation : {date_evaluation}")
+    print("=" * largeur)
+
+    totaux_par_ticker = livre.ticker_totals(prix).reset_index()
+    titre("📋 TOTAUX PAR TICKER", largeur, avant="\n")
+    if totaux_par_ticker.empty:
+        print("Aucune exécution")
+        return
+    print(totaux_par_ticker.rename(columns=COLONNES_LOTS).round(2).to_string(index=False))
+
+    ouverts = livre.unrealized(prix, date_evaluation)
+    titre(f"📦 LOTS OUVERTS : {len(ouverts)}", largeur, avant="\n")
+    if not ouverts.empty:
+        df = ouverts.assign(date_achat=ouverts["date_achat"].dt.strftime("%Y-%m-%d %H:%M"))
+        print(df.rename(columns=COLONNES_LOTS_OUVERTS)[list(COLONNES_LOTS_OUVERTS.values())]
+              .head(lots_affiches).round(2).to_string(index=False))
+        if len(ouverts) > lots_affiches:
+            print(f"... {len(ouverts) - lots_affiches} autre(s) lot(s)")
+
+    if not livre.uncovered.empty:
+        print(f"\n⚠️  {len(livre.uncovered)} vente(s) au-delà de la position détenue, "
+              f"{livre.uncovered['quantite'].sum():.4f} titre(s) non appariés")
+
+    totaux = livre.totals(prix)
+    titre("RÉSUMÉ", largeur, avant="\n")
+    print(f"Cessions appariées         : {totaux['cessions']}")
+    print(f"Produit des cessions       : {totaux['produit']:.2f}")
+    print(f"Coût des titres vendus     : {totaux['cout_vendu']:.2f}")
+    print(f"Plus-value réalisée        : {totaux['plus_value_realisee']:+.2f}")
+    print(f"Coût des lots ouverts      : {totaux['cout_ouvert']:.2f}")
+    print(f"Valeur des lots ouverts    : {totaux['valeur']:.2f}")
+    print(f"Plus-value latente         : {totaux['plus_value_latente']:+.2f}")
+    print(f"Plus-value totale          : {totaux['plus_value_realisee'] + totaux['plus_value_latente']:+.2f}")
+
+    cessions = livre.realized.assign(methode=livre.method)
+    if not cessions.empty:
+        store(cessions, "lots_cessions", csv_path, cessions, run_date=date_evaluation)
+    if not ouverts.empty:
+        store(ouverts.assign(methode=livre.method), "lots_ouverts", run_date=date_evaluation,
+              libelles=("Lots ouverts ajoutés", "Lots ouverts exportés"))
+
+
+# ----------------------------------------------------------------------
+# Projection Monte-Carlo (commande simulate)
+# ----------------------------------------------------------------------
+METHODES_SIMULATION = {"bootstrap": "bootstrap des séances historiques", "block": "bootstrap par blocs de séances",
+                       "normal": "loi normale multivariée"}
+
+
+def print_simulation(simulation, date_evaluation, nb_achats, csv_path=None, largeur=120):
+    """
+    Distribution simulée par horizon : percentiles des rendements, VaR et CVaR,
+    puis stockage du résumé (jeu « simulation »)
+    """
+    resume = simulation.summary()
+    print("=" * largeur)
+    print("PROJECTION MONTE-CARLO DU PORTEFEUILLE")
+    print(f"Date d'évaluation      : {date_evaluation}")
+    print(f"Méthode                : {METHODES_SIMULATION[simulation.method]}")
+    print(f"Chemins simulés        : {len(simulation)}")
+    print(f"Historique             : {simulation.sessions} séances, {len(simulation.tickers)} tickers, {nb_achats} achats")
+    print(f"Valeur actuelle        : {simulation.value:.2f}€")
+    print("=" * largeur)
+
+    titre("📈 RENDEMENTS SIMULÉS (%)", largeur, avant="\n")
+    colonnes = {"horizon": "Horizon (séances)", "moyenne": "Moyenne", "ecart_type": "Écart-type",
+                "prob_perte": "P(perte)", **{c: c.upper() for c in resume.columns if c.startswith("p") and c[1:].isdigit()}}
+    print(resume[list(colonnes)].rename(columns=colonnes).round(2).to_string(index=False))
+
+    titre("⚠️  VALEUR EN RISQUE", largeur, avant="\n")
+    for ligne in resume.itertuples(index=False):
+        ligne = ligne._asdict()
+        print(f"Horizon {ligne['horizon']:>3} séance(s) :")
+        for cle in ligne:
+            if cle.startswith("var_") and not cle.endswith("_pct"):
+                niveau = cle[len("var_"):]
+                print(f"   VaR {niveau}%  : {ligne[cle]:10.2f}€ ({ligne[cle + '_pct']:.2f}%)   "
+                      f"CVaR {niveau}% : {ligne['c' + cle]:10.2f}€ ({ligne['c' + cle + '_pct']:.2f}%)")
+
+    lignes = resume.assign(date_evaluation=date_evaluation, methode=simulation.method, chemins=len(simulation),
+                           seances=simulation.sessions, valeur=simulation.value)
+    store(lignes, "simulation", csv_path, lignes, run_date=date_evaluation)
@@ -0,0 +1,153 @@
+"""
+Stockage en colonnes (Parquet) des résultats des scripts.
+
+Chaque exécution ajoute un fichier Parquet compressé à un jeu de données, sans
+jamais réécrire les précédents : `<dossier>/<jeu>/date=AAAA-MM-JJ/<horodatage>.parquet`
+(partitionnement « hive » par date d'exécution). Les types sont explicites :
+montants et prix en décimal à précision fixe (plus de bruit du type 1.13e-13),
+tickers en dictionnaire (catégoriel), dates en date32.
+
+read_results() ne charge que les colonnes, dates et tickers demandés, fichiers
+mappés en mémoire. L'export CSV reste possible via export_csv().
+pyarrow n'est importé qu'à l'usage.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.cache import _to_date, market_today
+
+RESULTS_DIR = os.environ.get("STOCK_ANALYSIS_RESULTS", "resultats")
+
+COMPRESSION = "zstd"
+
+# Nombre de décimales conservées par colonne (préfixe), les autres flottants en ont 6
+ECHELLES = {
+    "prix": 4,
+    "montant": 2,
+    "investi": 2,
+    "valeur": 2,
+    "gain": 2,
+    "plus_value": 2,
+    "pourcentage": 4,
+    "rendement": 4,
+    "actions": 6,
+}
+ECHELLE_DEFAUT = 6
+PRECISION = 18
+
+# Colonnes texte encodées en dictionnaire (peu de valeurs distinctes)
+CATEGORIELLES = ("ticker", "marche", "pays", "devise", "secteur", "industrie", "timezone", "strategie")
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.fs as fs
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Le stockage des résultats nécessite pyarrow (pip install pyarrow)") from exc
+    return pa, ds, fs, pq
+
+
+def _echelle(colonne):
+    for prefixe, echelle in ECHELLES.items():
+        if colonne.startswith(prefixe):
+            return echelle
+    return ECHELLE_DEFAUT
+
+
+def _colonne(pa, nom, serie):
+    """Convertit une colonne pandas vers son type Arrow de stockage"""
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return pa.array(serie.to_numpy())
+    if pd.api.types.is_float_dtype(serie):
+        echelle = _echelle(nom)
+        valeurs = np.round(serie.to_numpy(dtype=float), echelle)
+        manquants = ~np.isfinite(valeurs)
+        valeurs[manquants] = 0.0
+        return pa.array(valeurs, mask=manquants).cast(pa.decimal128(PRECISION, echelle))
+    if nom.startswith("date") and not pd.api.types.is_datetime64_any_dtype(serie):
+        return pa.array(pd.to_datetime(serie).dt.date, type=pa.date32())
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return pa.array(serie)
+    texte = pa.array(serie.astype("string"), type=pa.string())
+    return texte.dictionary_encode() if nom in CATEGORIELLES else texte
+
+
+@metrics.timed("export", format="parquet")
+def write_results(df, dataset, run_date=None, root=RESULTS_DIR):
+    """
+    Ajoute `df` au jeu de données `dataset`, dans la partition de `run_date`
+    (date de marché du jour par défaut). Retourne le chemin du fichier écrit.
+    """
+    pa, _, _, pq = _pyarrow()
+    jour = _to_date(run_date) if run_date is not None else market_today()
+    execution = pd.Timestamp.now(tz="UTC")
+
+    df = df.reset_index(drop=True)
+    table = pa.table({nom: _colonne(pa, nom, df[nom]) for nom in df.columns})
+    table = table.append_column("execution", pa.array(np.full(len(df), execution.value), type=pa.timestamp("ns", "UTC")))
+
+    dossier = os.path.join(root, dataset, f"date={jour.isoformat()}")
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, f"{execution.strftime('%H%M%S')}-{execution.value % 10**9:09d}.parquet")
+    pq.write_table(table, chemin, compression=COMPRESSION)
+    return chemin
+
+
+@metrics.timed("lecture_resultats")
+def read_results(dataset, columns=None, start=None, end=None, tickers=None,
+                 latest=False, decimals=False, root=RESULTS_DIR):
+    """
+    Lit le jeu de données `dataset` : seulement les `columns` demandées, les
+    partitions dans [start, end] et les `tickers` donnés. Avec `latest`, ne
+    garde que la dernière exécution de chaque date. Les décimaux sont convertis
+    en float64, sauf avec `decimals=True` (objets Decimal exacts).
+    """
+    pa, ds, fs, _ = _pyarrow()
+    chemin = os.path.join(root, dataset)
+    if not os.path.isdir(chemin):
+        return pd.DataFrame()
+    # Fichiers mappés en mémoire ; la date vient du nom de partition
+    jeu = ds.dataset(
+        chemin, format="parquet", filesystem=fs.LocalFileSystem(use_mmap=True),
+        partitioning=ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive"),
+    )
+
+    filtre = None
+    for condition in (
+        ds.field("date") >= pa.scalar(_to_date(start), pa.date32()) if start is not None else None,
+        ds.field("date") <= pa.scalar(_to_date(end), pa.date32()) if end is not None else None,
+        ds.field("ticker").isin(list(tickers)) if tickers is not None else None,
+    ):
+        if condition is not None:
+            filtre = condition if filtre is None else filtre & condition
+
+    colonnes = None
+    if columns is not None:
+        colonnes = list(dict.fromkeys(["date", *columns, *(["execution"] if latest else [])]))
+    table = jeu.to_table(columns=colonnes, filter=filtre)
+
+    df = table.to_pandas()
+    if latest and not df.empty:
+        derniere = df.groupby("date")["execution"].transform("max")
+        df = df[df["execution"] == derniere].reset_index(drop=True)
+        if columns is not None and "execution" not in columns:
+            df = df.drop(columns="execution")
+    if not decimals:
+        for nom, type_ in zip(table.schema.names, table.schema.types):
+            if pa.types.is_decimal(type_) and nom in df:
+                df[nom] = df[nom].astype(float)
+    return df
+
+
+def export_csv(df, path, columns=None):
+    """Export CSV optionnel (colonnes renommées selon `columns` si fourni)"""
+    if columns is not None:
+        df = df.rename(columns=columns)[list(columns.values())]
+    df.to_csv(path, index=False, encoding='utf-8')
+    return path
@@ -0,0 +1,424 @@
+"""
+Série quotidienne de valorisation du portefeuille et indicateurs de risque.
+
+À partir des positions (ticker, actions, montant, date d'achat et, pour les
+allers-retours, date de vente) et de la matrice des clôtures (séances × tickers)
+tirée du panel, on calcule en NumPy les détentions à chaque clôture (cumul des
+achats et ventes), la valeur de marché, le P&L quotidien et sa contribution par
+ticker, le rendement quotidien (achats du jour ajoutés au dénominateur),
+l'indice de performance et le drawdown.
+
+Volatilité, Sharpe et bêta glissants sont lus sur des sommes cumulées (r, r²,
+r_indice, r_indice², r·r_indice) : ajouter des séances ne coûte que le calcul
+des nouvelles lignes, et les séances sont traitées par blocs pour borner la
+mémoire sur de longs historiques. RiskTracker conserve cet état entre deux
+exécutions (--incremental) ; seul un achat antidaté (avant la dernière séance
+traitée) ou une position retirée impose un recalcul complet.
+
+Conventions : les ventes se font à la clôture de la séance de vente, les achats
+au prix d'achat de la position ; sans position détenue, le rendement du jour
+est nul.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.cache import CACHE_DIR, market_today
+from stock_analysis.providers import get_provider
+from stock_analysis.sessions import get_calendar
+
+SEANCES_PAR_AN = 252
+# Fenêtre glissante par défaut : ~ un trimestre de séances
+FENETRE = 63
+INDICE = "SPY"
+# Séances traitées par bloc (matrices bloc × tickers)
+TAILLE_BLOC = 256
+
+RISK_PATH = "risque-{}.npz"
+
+# Sommes cumulées : r, r², m, m², r·m (r : portefeuille, m : indice)
+_NB_SOMMES = 5
+
+
+def risk_path(strategy):
+    """
+    Fichier d'état du suivi de risque d'une stratégie, dans le dossier du cache à
+    côté du grand livre (un fichier par fournisseur, comme lui)
+    """
+    fournisseur = get_provider().name
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    nom = strategy if fournisseur == "yahoo" else f"{strategy}-{fournisseur}"
+    return os.path.join(CACHE_DIR, RISK_PATH.format(nom))
+
+
+def closed_sessions_end(calendar=None):
+    """
+    Borne exclue des séances closes : demain si la séance du jour est terminée
+    (ou s'il n'y a pas de séance aujourd'hui), sinon aujourd'hui. Une barre du jour
+    encore en cours n'entre ainsi jamais dans une série enregistrée.
+    """
+    calendar = calendar or get_calendar()
+    aujourd_hui = pd.Timestamp(market_today())
+    if calendar.is_session(aujourd_hui):
+        _, cloture = calendar.session_bounds(aujourd_hui)
+        if pd.Timestamp.now(tz=cloture.tz) < cloture:
+            return aujourd_hui
+    return aujourd_hui + pd.Timedelta(days=1)
+
+
+def close_matrix(panel, tickers=None, column="Close"):
+    """Clôtures (séances × tickers) d'un PricePanel, dates naïves à minuit"""
+    frames = panel.frames if hasattr(panel, "frames") else panel
+    colonnes = {}
+    for ticker in (frames if tickers is None else tickers):
+        hist = frames.get(ticker)
+        if hist is None or hist.empty:
+            continue
+        index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+        serie = pd.Series(hist[column].to_numpy(dtype=float), index=index.normalize().astype("datetime64[ns]"))
+        colonnes[ticker] = serie[~serie.index.duplicated(keep="last")]
+    if not colonnes:
+        return pd.DataFrame(index=pd.DatetimeIndex([], dtype="datetime64[ns]"), columns=pd.Index([], dtype=object))
+    return pd.DataFrame(colonnes).sort_index()
+
+
+def _mouvements(positions, calendar):
+    """
+    Positions ramenées à leurs séances : DataFrame (ticker, achat, vente, actions,
+    cout, cle). Les lignes non valides (prix inconnu) sont ignorées.
+    """
+    df = positions
+    if "valide" in df:
+        df = df[df["valide"].to_numpy(dtype=bool)]
+    df = df[np.isfinite(df["actions"].to_numpy(dtype=float))]
+    achat = calendar.next_session(pd.to_datetime(df["date_achat"]).to_numpy(dtype="datetime64[ns]"))
+    if "date_vente" in df:
+        vente = calendar.next_session(pd.to_datetime(df["date_vente"]).to_numpy(dtype="datetime64[ns]"))
+    else:
+        vente = pd.DatetimeIndex(np.full(len(df), np.datetime64("NaT"), dtype="datetime64[ns]"))
+    mouvements = pd.DataFrame({
+        "ticker": df["ticker"].to_numpy(dtype=object),
+        "achat": achat.to_numpy(),
+        "vente": vente.to_numpy(),
+        "actions": df["actions"].to_numpy(dtype=float),
+        "cout": df["montant"].to_numpy(dtype=float),
+    })
+    # Clé d'une position : ticker, séances d'achat / de vente, nombre d'actions
+    mouvements["cle"] = (
+        mouvements["ticker"] + "|" + pd.Series(achat.strftime("%Y-%m-%d"), dtype=object).to_numpy()
+        + "|" + pd.Series(vente.strftime("%Y-%m-%d"), dtype=object).fillna("-").to_numpy()
+        + "|" + mouvements["actions"].map("{:.10g}".format)
+    )
+    return mouvements
+
+
+class RiskTracker:
+    """
+    Série de valorisation du portefeuille, prolongée séance par séance.
+
+    update() ne traite que les séances postérieures à la dernière déjà suivie ;
+    series() et summary() lisent les fenêtres glissantes sur les sommes cumulées.
+    """
+
+    def __init__(self, index=INDICE, window=FENETRE, periods=SEANCES_PAR_AN, risk_free=0.0, calendar=None):
+        self.index = index
+        self.window = window
+        self.periods = periods
+        self.risk_free = risk_free
+        self.calendar = calendar or get_calendar()
+        self.reset()
+
+    def reset(self):
+        self.dates = np.empty(0, dtype="datetime64[ns]")
+        self.valeur = np.empty(0)
+        self.flux = np.empty(0)
+        self.pnl = np.empty(0)
+        self.rendement = np.empty(0)
+        self.rendement_indice = np.empty(0)
+        self.nav = np.empty(0)
+        self.pic = np.empty(0)
+        self._sommes = np.zeros((1, _NB_SOMMES))
+        self._dernier_prix = pd.Series(dtype=float)
+        self._dernier_indice = float("nan")
+        self._contributions = pd.DataFrame({"pnl": [], "rendement": []}, index=pd.Index([], dtype=object))
+        self._cles = set()
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.dates[-1]) if len(self.dates) else None
+
+    # ------------------------------------------------------------------
+    # Mise à jour
+    # ------------------------------------------------------------------
+    def _recalcul_complet(self, mouvements):
+        """Vrai si les positions ont changé avant la dernière séance suivie"""
+        if not len(self.dates):
+            return False
+        cles = set(mouvements["cle"])
+        nouveaux = mouvements[~mouvements["cle"].isin(self._cles)]
+        return bool(self._cles - cles) or bool((nouveaux["achat"] <= self.dates[-1]).any())
+
+    def start_date(self, positions):
+        """
+        Première séance dont update() aura besoin des clôtures (None s'il n'y a
+        aucune position) : la séance suivant la dernière suivie, ou la première
+        séance d'achat en cas de recalcul complet.
+        """
+        mouvements = _mouvements(positions, self.calendar)
+        if mouvements.empty:
+            return None
+        if len(self.dates) and not self._recalcul_complet(mouvements):
+            return self.last_date + pd.Timedelta(days=1)
+        return pd.Timestamp(mouvements["achat"].min())
+
+    @metrics.timed("risque")
+    def update(self, positions, prices, index_prices=None, until=None):
+        """
+        Prolonge la série avec les clôtures `prices` (DataFrame séances × tickers,
+        voir close_matrix) et celles de l'indice (Series), pour les séances
+        postérieures à la dernière suivie et antérieures à `until` (exclue).
+        Retourne le nombre de séances ajoutées.
+        """
+        mouvements = _mouvements(positions, self.calendar)
+        if self._recalcul_complet(mouvements):
+            self.reset()
+        if mouvements.empty:
+            return 0
+
+        if len(self.dates):
+            debut = self.dates[-1] + np.timedelta64(1, "D")
+        else:
+            debut = np.datetime64(mouvements["achat"].min(), "ns")
+        dates = prices.index.to_numpy(dtype="datetime64[ns]")
+        anterieures = dates < debut
+        retenues = ~anterieures
+        if until is not None:
+            retenues &= dates < np.datetime64(pd.Timestamp(until), "ns")
+        if not retenues.any():
+            self._cles = set(mouvements["cle"])
+            return 0
+
+        tickers = np.unique(mouvements["ticker"].to_numpy(dtype=str))
+        matrice = prices.reindex(columns=tickers)
+        precedent = self._dernier_prix.reindex(tickers)
+        if not len(self.dates):
+            # Premier calcul : dernière clôture connue avant la première séance (jamais
+            # celle d'une séance exclue par `until`)
+            avant = matrice[anterieures].ffill()
+            precedent = avant.iloc[-1] if len(avant) else precedent
+        indice = (
+            pd.Series(index_prices, dtype=float).reindex(prices.index).ffill().to_numpy()
+            if index_prices is not None else np.full(len(dates), np.nan)
+        )
+        dernier_indice = self._dernier_indice
+        if not len(self.dates) and index_prices is not None and anterieures.any():
+            dernier_indice = indice[anterieures][-1]
+
+        codes = np.searchsorted(tickers, mouvements["ticker"].to_numpy(dtype=str))
+        selection = np.flatnonzero(retenues)
+        precedent = precedent.to_numpy(dtype=float)
+        clotures = matrice.to_numpy(dtype=float)
+        for i in range(0, len(selection), TAILLE_BLOC):
+            lignes = selection[i:i + TAILLE_BLOC]
+            precedent, dernier_indice = self._avancer(
+                dates[lignes], clotures[lignes], precedent,
+                indice[lignes], dernier_indice, mouvements, codes, tickers,
+            )
+
+        self._dernier_prix = pd.Series(precedent, index=tickers)
+        self._dernier_indice = dernier_indice
+        self._cles = set(mouvements["cle"])
+        return len(selection)
+
+    def _avancer(self, dates, clotures, precedent, indice, dernier_indice, mouvements, codes, tickers):
+        """Traite un bloc de séances ; retourne (dernières clôtures, dernier cours de l'indice)"""
+        n, k = clotures.shape
+        debut, fin = dates[0], dates[-1]
+        achat = mouvements["achat"].to_numpy()
+        vente = mouvements["vente"].to_numpy()
+        actions = mouvements["actions"].to_numpy()
+        cout = mouvements["cout"].to_numpy()
+
+        # Clôtures prolongées (dernier cours connu), ligne 0 = clôture précédente
+        prix = pd.DataFrame(np.vstack([precedent, clotures])).ffill().to_numpy()
+        prix_precedent, prix = prix[:-1], prix[1:]
+        variation = np.nan_to_num(prix - prix_precedent)
+        prix_connu = np.nan_to_num(prix)
+
+        # Détentions à la clôture précédant le bloc, puis variations du bloc
+        vendues = ~np.isnat(vente) & (vente < debut)
+        detenues = (achat < debut) & ~vendues
+        detention_initiale = np.bincount(codes[detenues], weights=actions[detenues], minlength=k)
+
+        achats = np.flatnonzero((achat >= debut) & (achat <= fin))
+        ligne_achat = np.searchsorted(dates, achat[achats])
+        ventes = np.flatnonzero(~np.isnat(vente) & (vente >= debut) & (vente <= fin) & (achat <= fin))
+        ligne_vente = np.searchsorted(dates, vente[ventes])
+
+        mouvements_detention = np.zeros((n, k))
+        np.add.at(mouvements_detention, (ligne_achat, codes[achats]), actions[achats])
+        np.add.at(mouvements_detention, (ligne_vente, codes[ventes]), -actions[ventes])
+        detention = detention_initiale + np.cumsum(mouvements_detention, axis=0)
+        detention_precedente = np.vstack([detention_initiale, detention[:-1]])
+
+        # P&L : variation des positions détenues + écart clôture / prix d'achat du jour
+        gain = detention_precedente * variation
+        np.add.at(gain, (ligne_achat, codes[achats]),
+                  np.nan_to_num(actions[achats] * prix[ligne_achat, codes[achats]] - cout[achats]))
+        pnl = gain.sum(axis=1)
+
+        valeur = (detention * prix_connu).sum(axis=1)
+        apports = np.bincount(ligne_achat, weights=cout[achats], minlength=n)
+        produits = np.bincount(ligne_vente, weights=np.nan_to_num(actions[ventes] * prix[ligne_vente, codes[ventes]]),
+                               minlength=n)
+
+        # Rendement quotidien : achats du jour ajoutés à la valeur de la veille
+        valeur_precedente = np.concatenate([self.valeur[-1:] if len(self.valeur) else [0.0], valeur[:-1]])
+        base = valeur_precedente + apports
+        rendement = np.divide(pnl, base, out=np.zeros(n), where=base > 0)
+
+        # Contributions par ticker : P&L et points de rendement (somme des rendements quotidiens)
+        poids = np.divide(1.0, base, out=np.zeros(n), where=base > 0)
+        contributions = pd.DataFrame({"pnl": gain.sum(axis=0), "rendement": poids @ gain}, index=tickers)
+        self._contributions = self._contributions.add(contributions, fill_value=0.0)
+
+        cours_indice = np.concatenate([[dernier_indice], indice])
+        rendement_indice = np.nan_to_num(cours_indice[1:] / cours_indice[:-1] - 1.0)
+        if np.isfinite(indice).any():
+            dernier_indice = indice[np.isfinite(indice)][-1]
+
+        nav = (self.nav[-1] if len(self.nav) else 1.0) * np.cumprod(1.0 + rendement)
+        pic = np.maximum.accumulate(np.concatenate([self.pic[-1:] if len(self.pic) else [1.0], nav]))[1:]
+
+        termes = np.column_stack([
+            rendement, rendement ** 2, rendement_indice, rendement_indice ** 2, rendement * rendement_indice,
+        ])
+        sommes = self._sommes[-1] + np.cumsum(termes, axis=0)
+
+        self.dates = np.concatenate([self.dates, dates])
+        self.valeur = np.concatenate([self.valeur, valeur])
+        self.flux = np.concatenate([self.flux, apports - produits])
+        self.pnl = np.concatenate([self.pnl, pnl])
+        self.rendement = np.concatenate([self.rendement, rendement])
+        self.rendement_indice = np.concatenate([self.rendement_indice, rendement_indice])
+        self.nav = np.concatenate([self.nav, nav])
+        self.pic = np.concatenate([self.pic, pic])
+        self._sommes = np.vstack([self._sommes, sommes])
+        return prix[-1], dernier_indice
+
+    # ------------------------------------------------------------------
+    # Indicateurs
+    # ------------------------------------------------------------------
+    def _statistiques(self, sommes, n):
+        """Volatilité et Sharpe annualisés, bêta, à partir de sommes sur n séances"""
+        s_r, s_rr, s_m, s_mm, s_rm = (sommes[..., j] for j in range(_NB_SOMMES))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.maximum(s_rr - s_r ** 2 / n, 0.0) / (n - 1)
+            variance_indice = np.maximum(s_mm - s_m ** 2 / n, 0.0) / (n - 1)
+            covariance = (s_rm - s_r * s_m / n) / (n - 1)
+            ecart_type = np.sqrt(variance)
+            volatilite = ecart_type * np.sqrt(self.periods)
+            sharpe = (s_r / n - self.risk_free / self.periods) / ecart_type * np.sqrt(self.periods)
+            beta = np.where(variance_indice > 0, covariance / variance_indice, np.nan)
+        return volatilite, np.where(ecart_type > 0, sharpe, np.nan), beta
+
+    def series(self, window=None):
+        """
+        Série quotidienne : valeur, flux, pnl, rendement (et de l'indice), nav,
+        drawdown, puis volatilité, Sharpe et bêta sur `window` séances glissantes.
+        """
+        window = window or self.window
+        n = len(self.dates)
+        volatilite = sharpe = beta = np.full(n, np.nan)
+        if n >= window > 1:
+            fenetres = self._sommes[window:] - self._sommes[:-window]
+            stats = self._statistiques(fenetres, window)
+            volatilite, sharpe, beta = (np.concatenate([np.full(window - 1, np.nan), s]) for s in stats)
+        return pd.DataFrame({
+            "valeur": self.valeur,
+            "flux": self.flux,
+            "pnl": self.pnl,
+            "rendement": self.rendement,
+            "rendement_indice": self.rendement_indice,
+            "nav": self.nav,
+            "drawdown": self.nav / self.pic - 1.0,
+            "volatilite": volatilite,
+            "sharpe": sharpe,
+            "beta": beta,
+        }, index=pd.DatetimeIndex(self.dates, name="date"))
+
+    def contributions(self):
+        """
+        P&L cumulé par ticker et sa contribution au rendement (somme sur les
+        séances de P&L du ticker / base du jour ; le total des tickers égale la
+        somme des rendements quotidiens), du plus fort au plus faible.
+        """
+        df = self._contributions.copy()
+        df.index.name = "ticker"
+        return df.sort_values("pnl", ascending=False)
+
+    def summary(self):
+        """Indicateurs sur toute la période suivie (dict)"""
+        n = len(self.dates)
+        if not n:
+            return {"seances": 0}
+        volatilite, sharpe, beta = (float(s) for s in self._statistiques(self._sommes[-1], n)) if n > 1 \
+            else (float("nan"),) * 3
+        drawdown = self.nav / self.pic - 1.0
+        creux = int(np.argmin(drawdown))
+        return {
+            "seances": n,
+            "debut": pd.Timestamp(self.dates[0]),
+            "fin": pd.Timestamp(self.dates[-1]),
+            "valeur": float(self.valeur[-1]),
+            "pnl": float(self.pnl.sum()),
+            "rendement": float(self.nav[-1] - 1.0),
+            "rendement_indice": float(np.prod(1.0 + self.rendement_indice) - 1.0),
+            "volatilite": volatilite,
+            "sharpe": sharpe,
+            "beta": beta,
+            "drawdown_max": float(drawdown[creux]),
+            "date_drawdown_max": pd.Timestamp(self.dates[creux]),
+        }
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+    def save(self, path):
+        """Enregistre l'état (tableaux NumPy compressés)"""
+        np.savez_compressed(
+            path,
+            index=np.array(self.index),
+            dates=self.dates, valeur=self.valeur, flux=self.flux, pnl=self.pnl,
+            rendement=self.rendement, rendement_indice=self.rendement_indice,
+            nav=self.nav, pic=self.pic, sommes=self._sommes,
+            tickers=self._dernier_prix.index.to_numpy(dtype=str), dernier_prix=self._dernier_prix.to_numpy(),
+            dernier_indice=np.array(self._dernier_indice),
+            contributions_tickers=self._contributions.index.to_numpy(dtype=str),
+            contributions=self._contributions.to_numpy(dtype=float),
+            cles=np.array(sorted(self._cles), dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path, index=INDICE, **kwargs):
+        """État enregistré par save() ; un suivi vide si le fichier manque ou porte sur un autre indice"""
+        suivi = cls(index=index, **kwargs)
+        if not os.path.exists(path):
+            return suivi
+        with np.load(path) as etat:
+            if str(etat["index"]) != index:
+                return suivi
+            for nom in ("dates", "valeur", "flux", "pnl", "rendement", "rendement_indice", "nav", "pic"):
+                setattr(suivi, nom, etat[nom])
+            suivi._sommes = etat["sommes"]
+            suivi._dernier_prix = pd.Series(etat["dernier_prix"], index=etat["tickers"].astype(object))
+            suivi._dernier_indice = float(etat["dernier_indice"])
+            suivi._contributions = pd.DataFrame(etat["contributions"], columns=["pnl", "rendement"],
+                                                index=etat["contributions_tickers"].astype(object))
+            suivi._cles = set(etat["cles"].tolist())
+        return suivi
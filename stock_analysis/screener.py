@@ -0,0 +1,345 @@
+"""
+Filtre vectorisé d'un univers de tickers sur les barres quotidiennes en cache.
+
+Les barres de tout l'univers sont préchargées en une passe (téléchargements
+groupés, seules les plages absentes du cache sont demandées), lues en une
+requête par paquet de tickers puis rangées dans des matrices NumPy séances × tickers (Open, High, Low, Close,
+Volume), ajustées des opérations sur titres. Chaque indicateur se calcule sur
+toutes les colonnes à la fois, par sommes cumulées, fenêtres glissantes ou
+récurrence le long des séances : aucune boucle Python par ticker.
+
+Les critères sont des expressions « terme opérateur terme », toutes vérifiées
+(et logique) à la séance évaluée :
+
+    sma(50) crosses_above sma(200)      croisement de moyennes mobiles
+    close > ema(20)                     moyenne mobile exponentielle
+    rsi(14) < 30                        RSI de Wilder
+    gap > 2                             écart d'ouverture (% de la clôture de la veille)
+    relvol(20) > 1.5                    volume / volume moyen des 20 séances précédentes
+    high >= high52                      nouveau plus haut sur 52 semaines
+
+Termes : open, high, low, close, volume, sma(n), ema(n), rsi(n), gap,
+relvol(n), change(n) (variation en % sur n séances), high52, low52, ou un nombre.
+Opérateurs : <, <=, >, >=, crosses_above, crosses_below.
+"""
+import re
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.cache import _to_date
+from stock_analysis.sessions import get_calendar
+
+COLONNES = ["Open", "High", "Low", "Close", "Volume"]
+
+# Séances d'une année de bourse (plus hauts / plus bas sur 52 semaines)
+SEANCES_52_SEMAINES = 252
+
+OPERATEURS = ("crosses_above", "crosses_below", "<=", ">=", "<", ">")
+
+# Termes sans paramètre
+TERMES = ("open", "high", "low", "close", "volume", "gap", "high52", "low52")
+
+# Paramètre par défaut des indicateurs appelés sans argument
+PARAMETRES_DEFAUT = {"sma": 20, "ema": 20, "rsi": 14, "relvol": 20, "change": 1}
+
+_CRITERE = re.compile(r"^(?P<gauche>.+?)\s*(?P<operateur>crosses_above|crosses_below|<=|>=|<|>)\s*(?P<droite>.+)$")
+_TERME = re.compile(r"^\s*(?:(?P<nombre>[-+]?\d+(?:\.\d+)?)|(?P<nom>[a-z]+\d*)\s*(?:\(\s*(?P<arg>\d+)\s*\))?)\s*$")
+
+
+# ----------------------------------------------------------------------
+# Expressions
+# ----------------------------------------------------------------------
+def parse_term(texte):
+    """Terme d'expression -> (nom, paramètre) ; ("nombre", valeur) pour une constante"""
+    m = _TERME.match(texte.lower())
+    if m is None:
+        raise ValueError(f"Terme invalide : {texte!r}")
+    if m["nombre"] is not None:
+        return ("nombre", float(m["nombre"]))
+    nom = m["nom"]
+    if nom in TERMES:
+        if m["arg"] is not None:
+            raise ValueError(f"{nom} ne prend pas de paramètre : {texte!r}")
+        return (nom, None)
+    if nom in PARAMETRES_DEFAUT:
+        n = int(m["arg"]) if m["arg"] is not None else PARAMETRES_DEFAUT[nom]
+        if n < 1:
+            raise ValueError(f"Paramètre invalide : {texte!r}")
+        return (nom, n)
+    raise ValueError(f"Indicateur inconnu : {nom!r} (attendu : {', '.join(TERMES + tuple(PARAMETRES_DEFAUT))})")
+
+
+def parse_criterion(texte):
+    """« terme opérateur terme » -> (terme gauche, opérateur, terme droit)"""
+    m = _CRITERE.match(texte)
+    if m is None:
+        raise ValueError(f"Critère invalide : {texte!r} (opérateurs : {', '.join(OPERATEURS)})")
+    return parse_term(m["gauche"]), m["operateur"], parse_term(m["droite"])
+
+
+def term_name(terme):
+    """Nom de colonne d'un terme : sma_50, rsi_14, gap, high52..."""
+    nom, parametre = terme
+    return nom if parametre is None else f"{nom}_{parametre}"
+
+
+def lookback(terme):
+    """Séances d'historique nécessaires au calcul d'un terme à la dernière séance"""
+    nom, parametre = terme
+    if nom in ("sma", "relvol", "change"):
+        return parametre + 1
+    if nom in ("ema", "rsi"):
+        # Amorçage des récurrences : l'effet de la valeur initiale devient négligeable
+        return 4 * parametre + 1
+    if nom in ("high52", "low52"):
+        return SEANCES_52_SEMAINES
+    return 2
+
+
+# ----------------------------------------------------------------------
+# Matrices et indicateurs
+# ----------------------------------------------------------------------
+def price_matrices(bars, timezones, tickers, sessions):
+    """
+    Matrices séances × tickers (dict colonne -> ndarray float) des barres
+    quotidiennes d'une table longue (BarCache.read_many : ticker, ts en ns UTC,
+    OHLCV), alignées sur `sessions` (datetime64[D]) ; NaN sans barre.
+    """
+    sessions = np.asarray(sessions, dtype="datetime64[D]")
+    matrices = {colonne: np.full((len(sessions), len(tickers)), np.nan) for colonne in COLONNES}
+    if bars.empty:
+        return matrices
+    colonnes = pd.Index(tickers).get_indexer(bars["ticker"])
+    ts = bars["ts"].to_numpy(dtype=np.int64)
+
+    # Jour de chaque barre dans le fuseau de sa bourse : une conversion par fuseau distinct
+    fuseaux = timezones.reindex(bars["ticker"]).to_numpy(dtype=object)
+    jours = np.empty(len(bars), dtype="datetime64[D]")
+    for tz in pd.unique(fuseaux):
+        lignes = fuseaux == tz
+        locales = pd.to_datetime(ts[lignes], unit="ns", utc=True).tz_convert(tz).tz_localize(None)
+        jours[lignes] = locales.to_numpy(dtype="datetime64[D]")
+
+    i = np.minimum(np.searchsorted(sessions, jours), len(sessions) - 1)
+    presentes = (sessions[i] == jours) & (colonnes >= 0)
+    for colonne in COLONNES:
+        matrices[colonne][i[presentes], colonnes[presentes]] = bars[colonne].to_numpy(dtype=float)[presentes]
+    return matrices
+
+
+def _prolonger(x):
+    """Dernière valeur connue reportée le long des séances (NaN avant la première)"""
+    lignes = np.where(np.isnan(x), 0, np.arange(len(x))[:, None])
+    np.maximum.accumulate(lignes, axis=0, out=lignes)
+    return x[lignes, np.arange(x.shape[1])]
+
+
+def _somme_glissante(x, n):
+    """Somme sur les n dernières séances (NaN tant que la fenêtre n'est pas pleine)"""
+    valides = ~np.isnan(x)
+    cumul = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(np.where(valides, x, 0.0), axis=0)])
+    comptes = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(valides, axis=0)])
+    somme = np.full(x.shape, np.nan)
+    if n <= len(x):
+        pleines = comptes[n:] - comptes[:-n] == n
+        somme[n - 1:] = np.where(pleines, cumul[n:] - cumul[:-n], np.nan)
+    return somme
+
+
+def _decaler(x, k=1):
+    """Valeur de la séance t - k (NaN pour les k premières séances)"""
+    decale = np.full(x.shape, np.nan)
+    decale[k:] = x[:-k]
+    return decale
+
+
+def _moyenne_exponentielle(x, alpha):
+    """Récurrence m[t] = m[t-1] + alpha (x[t] - m[t-1]), amorcée sur la première valeur"""
+    moyenne = np.full(x.shape, np.nan)
+    courante = np.full(x.shape[1], np.nan)
+    for t in range(len(x)):
+        valeur = x[t]
+        suivante = courante + alpha * (valeur - courante)
+        # Séance sans valeur : la moyenne est conservée
+        courante = np.where(np.isnan(courante), valeur, np.where(np.isnan(valeur), courante, suivante))
+        moyenne[t] = courante
+    return moyenne
+
+
+def _rsi(cloture, n):
+    """RSI de Wilder (lissage 1 / n des hausses et des baisses)"""
+    variation = cloture - _decaler(cloture)
+    hausses = _moyenne_exponentielle(np.where(variation > 0, variation, np.where(np.isnan(variation), np.nan, 0.0)), 1 / n)
+    baisses = _moyenne_exponentielle(np.where(variation < 0, -variation, np.where(np.isnan(variation), np.nan, 0.0)), 1 / n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(baisses > 0, 100 - 100 / (1 + hausses / baisses), np.where(hausses > 0, 100.0, 50.0))
+    return np.where(np.isnan(hausses), np.nan, rsi)
+
+
+def _extremum_glissant(x, n, fonction):
+    """Maximum / minimum (np.fmax / np.fmin) sur les n dernières séances disponibles"""
+    n = min(n, len(x))
+    bord = np.full((n - 1, x.shape[1]), np.nan)
+    fenetres = np.lib.stride_tricks.sliding_window_view(np.vstack([bord, x]), n, axis=0)
+    return fonction.reduce(fenetres, axis=-1)
+
+
+class Indicators:
+    """Indicateurs calculés à la demande (et mémorisés) sur des matrices séances × tickers"""
+
+    def __init__(self, matrices):
+        # Cours reportés sur les séances sans barre ; volume nul ces jours-là
+        self.bars = matrices
+        self.prices = {c: _prolonger(matrices[c]) for c in ("Open", "High", "Low", "Close")}
+        self.volume = np.nan_to_num(matrices["Volume"])
+        self._memoire = {}
+
+    def __call__(self, terme):
+        if terme not in self._memoire:
+            with metrics.timer("indicateur", nom=terme[0]):
+                self._memoire[terme] = self._calculer(*terme)
+        return self._memoire[terme]
+
+    def _calculer(self, nom, parametre):
+        cloture = self.prices["Close"]
+        if nom == "nombre":
+            return np.full(cloture.shape, parametre)
+        if nom in ("open", "high", "low", "close"):
+            return self.prices[nom.capitalize()]
+        if nom == "volume":
+            return self.volume
+        if nom == "sma":
+            return _somme_glissante(cloture, parametre) / parametre
+        if nom == "ema":
+            return _moyenne_exponentielle(cloture, 2 / (parametre + 1))
+        if nom == "rsi":
+            return _rsi(cloture, parametre)
+        if nom == "gap":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return (self.bars["Open"] / _decaler(cloture) - 1) * 100
+        if nom == "relvol":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                moyenne = _decaler(_somme_glissante(self.volume, parametre)) / parametre
+                return np.where(moyenne > 0, self.volume / moyenne, np.nan)
+        if nom == "change":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return (cloture / _decaler(cloture, parametre) - 1) * 100
+        if nom == "high52":
+            return _extremum_glissant(self.bars["High"], SEANCES_52_SEMAINES, np.fmax)
+        if nom == "low52":
+            return _extremum_glissant(self.bars["Low"], SEANCES_52_SEMAINES, np.fmin)
+        raise ValueError(f"Indicateur inconnu : {nom!r}")
+
+
+def evaluate(indicateurs, criteres):
+    """Masque des tickers vérifiant tous les critères à la dernière séance des matrices"""
+    retenus = ~np.isnan(indicateurs.bars["Close"][-1])
+    for gauche, operateur, droite in criteres:
+        a, b = indicateurs(gauche), indicateurs(droite)
+        with np.errstate(invalid="ignore"):
+            if operateur == "crosses_above":
+                condition = (a[-2] <= b[-2]) & (a[-1] > b[-1]) if len(a) > 1 else np.zeros(a.shape[1], dtype=bool)
+            elif operateur == "crosses_below":
+                condition = (a[-2] >= b[-2]) & (a[-1] < b[-1]) if len(a) > 1 else np.zeros(a.shape[1], dtype=bool)
+            else:
+                condition = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}[operateur](a[-1], b[-1])
+        retenus &= condition
+    return retenus
+
+
+# ----------------------------------------------------------------------
+# Univers et filtre
+# ----------------------------------------------------------------------
+def load_universe(source):
+    """Tickers d'un fichier (CSV / Parquet avec une colonne ticker, ou un ticker par ligne) ou du cache ("cache")"""
+    if source == "cache":
+        from stock_analysis.cache import get_cache
+        return get_cache().tickers()
+    if source.endswith(".parquet"):
+        tickers = pd.read_parquet(source, columns=["ticker"])["ticker"]
+    else:
+        with open(source, encoding="utf-8") as f:
+            entete = f.readline().split(",")[0].strip().lower() == "ticker"
+        tickers = pd.read_csv(source, usecols=["ticker"])["ticker"] if entete else \
+            pd.read_csv(source, header=None, usecols=[0], names=["ticker"], comment="#")["ticker"]
+    return sorted({str(t).strip().upper() for t in tickers.dropna() if str(t).strip()})
+
+
+@metrics.timed("screener")
+def screen(tickers, criteria, as_of=None, rank="relvol(20)", ascending=False, top=None, adjust=True):
+    """
+    Tickers de `tickers` vérifiant tous les `criteria` (textes ou critères
+    analysés) à la séance `as_of` (dernière séance clôturée par défaut), classés
+    selon le terme `rank`. Retourne un DataFrame : rang, ticker, date, close et
+    la valeur de chaque terme utilisé.
+    """
+    from stock_analysis.cache import get_cache
+    from stock_analysis.panel import ensure_cached
+    from stock_analysis.risk import closed_sessions_end
+
+    criteres = [parse_criterion(c) if isinstance(c, str) else c for c in criteria]
+    cle = parse_term(rank) if isinstance(rank, str) else rank
+    termes = list(dict.fromkeys([t for g, _, d in criteres for t in (g, d) if t[0] != "nombre"] + [cle]))
+
+    calendrier = get_calendar()
+    fin = _to_date(as_of) + timedelta(days=1) if as_of is not None else closed_sessions_end(calendrier).date()
+    jusqu_a = np.searchsorted(calendrier.sessions, np.datetime64(fin, "D"), side="left")
+    profondeur = max([2, *map(lookback, termes)])
+    seances = calendrier.sessions[max(jusqu_a - profondeur, 0):jusqu_a]
+    if not len(seances):
+        raise ValueError(f"Aucune séance avant le {fin}")
+
+    # Une passe : téléchargement groupé des plages absentes du cache, puis lecture groupée
+    tickers = list(dict.fromkeys(tickers))
+    debut, fin = pd.Timestamp(seances[0]).date(), pd.Timestamp(seances[-1]).date() + timedelta(days=1)
+    ensure_cached(tickers, debut, fin)
+    with metrics.timer("matrices_screener"):
+        matrices = price_matrices(*get_cache().read_many(tickers, debut, fin), tickers, seances)
+        if adjust:
+            matrices = _ajuster(matrices, tickers, seances)
+    indicateurs = Indicators(matrices)
+
+    retenus = evaluate(indicateurs, criteres)
+    metrics.count("screener_tickers", n=len(tickers))
+    metrics.count("screener_retenus", n=int(retenus.sum()))
+
+    colonnes = np.flatnonzero(retenus)
+    resultat = pd.DataFrame({
+        "ticker": np.asarray(tickers, dtype=object)[colonnes],
+        "date": pd.Timestamp(seances[-1]).date(),
+        "close": indicateurs.prices["Close"][-1, colonnes],
+    })
+    for terme in termes:
+        if terme[0] != "close":
+            resultat[term_name(terme)] = indicateurs(terme)[-1, colonnes]
+    resultat = resultat.sort_values(term_name(cle), ascending=ascending, na_position="last", kind="stable")
+    if top is not None:
+        resultat = resultat.head(top)
+    resultat.insert(0, "rang", np.arange(1, len(resultat) + 1))
+    return resultat.reset_index(drop=True)
+
+
+def _ajuster(matrices, tickers, seances):
+    """Matrices de cours bruts ajustées des fractionnements et dividendes, vues à la dernière séance"""
+    from stock_analysis.corporate import AdjustmentFactors
+
+    ajustements = AdjustmentFactors.load(tickers, since=pd.Timestamp(seances[0]).date())
+    concernes = np.flatnonzero([t in ajustements for t in tickers])
+    if not len(concernes):
+        return matrices
+    n = len(seances)
+    lignes = np.tile(np.asarray(tickers, dtype=object)[concernes], n)
+    dates = np.repeat(seances.astype("datetime64[ns]"), len(concernes))
+    facteurs = ajustements.factors(lignes, dates, as_of=seances[-1]).reshape(n, -1)
+    ratios = ajustements.split_ratios(lignes, dates, as_of=seances[-1]).reshape(n, -1)
+
+    ajustees = dict(matrices)
+    for colonne in ("Open", "High", "Low", "Close"):
+        ajustees[colonne] = matrices[colonne].copy()
+        ajustees[colonne][:, concernes] *= facteurs
+    ajustees["Volume"] = matrices["Volume"].copy()
+    ajustees["Volume"][:, concernes] *= ratios
+    return ajustees
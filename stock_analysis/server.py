@@ -0,0 +1,347 @@
+"""
+Service HTTP local de valorisation (bibliothèque standard, http.server) : les
+tableaux de bord interrogent un processus long au lieu de relancer unrealized /
+realized, qui retéléchargent et réaffichent tout à chaque consultation.
+
+- Positions, allers-retours et table des clôtures restent en mémoire. Le
+  rafraîchissement planifié (toutes les --every secondes) ne relit que les
+  dernières séances des tickers suivis, en un préchargement groupé, et publie
+  une nouvelle version des cours.
+- Chaque réponse est calculée une seule fois par (route, paramètres, version
+  des cours) puis mémorisée ; des requêtes identiques simultanées attendent le
+  même calcul (un Future partagé, comme fetch.FetchPool pour Yahoo). Des
+  dizaines de tableaux de bord coûtent un calcul par version, et aucun
+  aller-retour Yahoo entre deux rafraîchissements.
+- ETag par version : un client à jour reçoit 304 sans corps.
+
+Routes (JSON) :
+    GET /unrealized[?date=AAAA-MM-JJ]  positions, totaux par ticker et du portefeuille, statistiques
+    GET /tickers[?date=AAAA-MM-JJ]     totaux par ticker des positions
+    GET /statistics[?date=AAAA-MM-JJ]  statistiques des positions
+    GET /realized                      allers-retours, totaux par ticker et du portefeuille, statistiques
+    GET /health                        version des cours, dernier rafraîchissement
+    GET /metrics                       relevé metrics (OpenMetrics)
+
+Sans date, les positions sont valorisées au dernier cours connu.
+
+Usage :
+    python -m stock_analysis serve --port 8765 --every 60
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.cache import market_today
+from stock_analysis.corporate import AdjustmentFactors
+from stock_analysis.panel import load_panel, transactions_span
+from stock_analysis.pnl import (compute_realized, compute_unrealized, portfolio_totals, position_statistics,
+                                price_table, ticker_totals)
+
+HOTE = "127.0.0.1"
+PORT = 8765
+# Secondes entre deux rafraîchissements des cours
+PERIODE = 60.0
+# Jours relus à chaque rafraîchissement (dernière séance close et séance en cours)
+FENETRE_RAFRAICHISSEMENT = 10
+# Réponses mémorisées, toutes routes et dates confondues
+REPONSES_MEMORISEES = 256
+
+
+class SharedResults:
+    """
+    Résultats mémorisés par clé et calculés une seule fois : la première demande
+    calcule, les demandes simultanées de la même clé attendent son Future. Un
+    échec n'est pas mémorisé (la demande suivante recalcule). Au plus
+    `max_entries` résultats, les moins récemment demandés sortent en premier.
+    """
+
+    def __init__(self, max_entries=REPONSES_MEMORISEES):
+        self.max_entries = max_entries
+        self._futures = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, key, fn):
+        """Retourne (résultat, origine) ; origine : "calcul", "partage" (calcul en cours) ou "memoire" """
+        with self._verrou:
+            future = self._futures.get(key)
+            if future is not None:
+                self._futures.move_to_end(key)
+                origine = "memoire" if future.done() else "partage"
+            else:
+                future = Future()
+                self._futures[key] = future
+                origine = "calcul"
+                while len(self._futures) > self.max_entries:
+                    self._futures.popitem(last=False)
+        if origine == "calcul":
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                with self._verrou:
+                    if self._futures.get(key) is future:
+                        del self._futures[key]
+                future.set_exception(e)
+        return future.result(), origine
+
+    def clear(self):
+        with self._verrou:
+            self._futures.clear()
+
+
+def _propre(valeur):
+    """Valeur sérialisable en JSON strict : NaN et infinis -> null, types NumPy -> Python"""
+    if isinstance(valeur, dict):
+        return {str(k): _propre(v) for k, v in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return [_propre(v) for v in valeur]
+    if hasattr(valeur, "item"):
+        valeur = valeur.item()
+    if isinstance(valeur, float) and not math.isfinite(valeur):
+        return None
+    return valeur
+
+
+def _lignes(df):
+    """Lignes d'un DataFrame en dicts (NaN -> null, dates ISO)"""
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+class ValuationService:
+    """
+    Positions (`achats`) et allers-retours (`trades`) valorisés sur une table de
+    clôtures gardée en mémoire ; réponses JSON mémorisées par version des cours.
+    """
+
+    def __init__(self, achats, trades, every=PERIODE):
+        self.achats = pd.DataFrame(achats)
+        self.trades = pd.DataFrame(trades).rename(columns={"achat": "date_achat", "vente": "date_vente"})
+        self.every = every
+        self.refreshed_at = None
+        self.refreshes = 0
+        self._etat = (0, None, None)
+        self._resultats = SharedResults()
+        self._arret = threading.Event()
+        self._thread = None
+
+        # Historique complet, une seule fois : des premières transactions à aujourd'hui
+        positions = pd.concat([self.achats, self.trades], ignore_index=True)
+        self.tickers, debut, fin = transactions_span(positions, date_keys=("date_achat", "date_vente"),
+                                                     extra_dates=[market_today()])
+        with metrics.timer("chargement_initial"):
+            self._publier(price_table(load_panel(self.tickers, debut, fin)))
+
+    @property
+    def version(self):
+        return self._etat[0]
+
+    def _publier(self, table):
+        """Installe une nouvelle table de cours (version suivante) et oublie les réponses mémorisées"""
+        ajustements = AdjustmentFactors.load(self.tickers, closes=table)
+        self._etat = (self._etat[0] + 1, table, ajustements)
+        self.refreshed_at = pd.Timestamp.now(tz="UTC")
+        self._resultats.clear()
+
+    @metrics.timed("rafraichissement")
+    def refresh(self):
+        """Relit les dernières séances de tous les tickers en un préchargement groupé"""
+        aujourd_hui = pd.Timestamp(market_today())
+        debut = aujourd_hui - pd.Timedelta(days=FENETRE_RAFRAICHISSEMENT)
+        recent = price_table(load_panel(self.tickers, debut, aujourd_hui + pd.Timedelta(days=1)))
+        _, table, _ = self._etat
+        table = pd.concat([table[table["date"] < debut], recent], ignore_index=True)
+        self._publier(table.sort_values("date", kind="stable", ignore_index=True))
+        self.refreshes += 1
+
+    def start(self):
+        """Démarre le rafraîchissement planifié (thread démon)"""
+        if self.every and self.every > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._boucle, name="rafraichissement", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._arret.set()
+
+    def _boucle(self):
+        while not self._arret.wait(self.every):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Les cours précédents restent servis jusqu'au prochain essai
+                metrics.count("rafraichissements", resultat="echec")
+                print(f"⚠️  Rafraîchissement des cours impossible : {e}")
+
+    # ------------------------------------------------------------------
+    # Calculs (mémorisés par version)
+    # ------------------------------------------------------------------
+    def _memoriser(self, cle, fn, etat=None):
+        """
+        (version, résultat) de `fn(etat)` : un seul instantané de l'état (version,
+        cours, ajustements) sert à la clé et au calcul, un rafraîchissement
+        simultané ne peut pas étiqueter un résultat d'une autre version.
+        """
+        etat = etat or self._etat
+        resultat, origine = self._resultats.get((etat[0], *cle), lambda: fn(etat))
+        metrics.count("calculs_serveur", calcul=cle[0], origine=origine)
+        return etat[0], resultat
+
+    def unrealized(self, date=None, etat=None):
+        """Valorisation des positions à `date` (dernier cours connu sans date)"""
+        return self._memoriser(("unrealized", date), lambda e: self._unrealized(e, date), etat)[1]
+
+    def _unrealized(self, etat, date):
+        version, table, ajustements = etat
+        evaluation = date or market_today().isoformat()
+        with metrics.timer("calcul_serveur", route="unrealized"):
+            calcul = compute_unrealized(self.achats, table, evaluation, adjustments=ajustements)
+            return {
+                "date_evaluation": evaluation,
+                "version": version,
+                "totaux": portfolio_totals(calcul),
+                "statistiques": position_statistics(calcul),
+                "tickers": _lignes(ticker_totals(calcul).reset_index()),
+                "positions": _lignes(calcul),
+            }
+
+    def realized(self, etat=None):
+        """Allers-retours achat/vente"""
+        return self._memoriser(("realized",), self._realized, etat)[1]
+
+    def _realized(self, etat):
+        version, table, ajustements = etat
+        with metrics.timer("calcul_serveur", route="realized"):
+            calcul = compute_realized(self.trades, table, adjustments=ajustements)
+            return {
+                "version": version,
+                "totaux": portfolio_totals(calcul, valeur="valeur_vente"),
+                "statistiques": position_statistics(calcul, valeur="gain"),
+                "tickers": _lignes(ticker_totals(calcul, valeur="valeur_vente").reset_index()),
+                "transactions": _lignes(calcul),
+            }
+
+    def health(self):
+        return {
+            "version": self.version,
+            "rafraichi_le": self.refreshed_at.isoformat() if self.refreshed_at is not None else None,
+            "rafraichissements": self.refreshes,
+            "periode": self.every,
+            "tickers": len(self.tickers),
+            "positions": len(self.achats),
+            "transactions": len(self.trades),
+        }
+
+    # ------------------------------------------------------------------
+    # Routes
+    # ------------------------------------------------------------------
+    def response(self, route, params):
+        """
+        Réponse d'une route : (statut HTTP, type de contenu, corps en octets, ETag
+        ou None). Le corps JSON est lui-même mémorisé : une requête déjà servie
+        pour cette version ne coûte qu'une recherche.
+        """
+        if route == "/health":
+            return HTTPStatus.OK, "application/json", json.dumps(_propre(self.health())).encode(), None
+        if route == "/metrics":
+            return HTTPStatus.OK, "application/openmetrics-text", metrics.to_openmetrics().encode(), None
+        if route not in ROUTES:
+            return _erreur(HTTPStatus.NOT_FOUND, f"Route inconnue : {route} (routes : {', '.join(sorted(ROUTES))})")
+        date = params.get("date")
+        if date is not None:
+            try:
+                date = pd.Timestamp(date).date().isoformat()
+            except ValueError:
+                return _erreur(HTTPStatus.BAD_REQUEST, f"Date invalide : {date!r} (attendu : AAAA-MM-JJ)")
+
+        # ETag de la version dont le corps a réellement été calculé
+        version, corps = self._memoriser(("json", route, date), lambda etat: self._encoder(route, date, etat))
+        return HTTPStatus.OK, "application/json", corps, f'"{version}-{route.strip("/")}-{date or "dernier"}"'
+
+    def _encoder(self, route, date, etat):
+        with metrics.timer("serialisation", route=route):
+            return json.dumps(_propre(ROUTES[route](self, date, etat)), ensure_ascii=False).encode()
+
+
+def _erreur(statut, message):
+    return statut, "application/json", json.dumps({"erreur": message}, ensure_ascii=False).encode(), None
+
+
+def _partie(cle):
+    """Route réduite à une partie de la valorisation des positions (même calcul mémorisé)"""
+    def route(service, date, etat):
+        valorisation = service.unrealized(date, etat)
+        return {"date_evaluation": valorisation["date_evaluation"], "version": valorisation["version"],
+                cle: valorisation[cle]}
+    return route
+
+
+ROUTES = {
+    "/unrealized": lambda service, date, etat: service.unrealized(date, etat),
+    "/tickers": _partie("tickers"),
+    "/statistics": _partie("statistiques"),
+    "/realized": lambda service, date, etat: service.realized(etat),
+}
+
+
+class _Requetes(BaseHTTPRequestHandler):
+    """Traitement d'une requête (un thread par connexion, ThreadingHTTPServer)"""
+
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def do_GET(self):
+        debut = time.perf_counter()
+        url = urlsplit(self.path)
+        route = url.path.rstrip("/") or "/"
+        params = {cle: valeurs[-1] for cle, valeurs in parse_qs(url.query).items()}
+        try:
+            statut, type_contenu, corps, etag = self.service.response(route, params)
+        except Exception as e:
+            statut, type_contenu, corps, etag = _erreur(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            statut, corps = HTTPStatus.NOT_MODIFIED, b""
+        self.send_response(statut)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", f"{type_contenu}; charset=utf-8")
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+        metrics.observe("requete_http", time.perf_counter() - debut, route=route, statut=int(statut))
+
+    def log_message(self, format, *args):
+        # Des dizaines de tableaux de bord interrogent en boucle : pas de journal par requête
+        pass
+
+
+def make_server(service, host=HOTE, port=PORT):
+    """Serveur HTTP multi-thread lié à `service` (non démarré)"""
+    requetes = type("Requetes", (_Requetes,), {"service": service})
+    serveur = ThreadingHTTPServer((host, port), requetes)
+    serveur.daemon_threads = True
+    return serveur
+
+
+def serve(service, host=HOTE, port=PORT):
+    """Démarre le rafraîchissement planifié puis sert jusqu'à Ctrl+C"""
+    serveur = make_server(service, host, port)
+    service.start()
+    hote, port = serveur.server_address[:2]
+    print(f"🌐 Service de valorisation sur http://{hote}:{port} "
+          f"({len(service.tickers)} tickers, rafraîchissement toutes les {service.every:g} s)")
+    print(f"   Routes : {', '.join(sorted([*ROUTES, '/health', '/metrics']))}")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Arrêt du service")
+    finally:
+        service.stop()
+        serveur.server_close()
@@ -0,0 +1,285 @@
+"""
+Calendriers des séances par place de cotation, précalculés.
+
+Une place est repérée par le fuseau de sa bourse (metadata.ticker_timezones,
+fuseau des barres en cache) : New York (NYSE/NASDAQ), Londres (LSE), Paris,
+Amsterdam et Bruxelles (Euronext), Francfort (Xetra). get_calendar(tz) rend le
+calendrier de la place, avec ses jours fériés et ses horaires locaux ; un fuseau
+sans calendrier connu est refusé (ValueError) plutôt que résolu sur celui de New
+York. Les paires de devises (« EURUSD=X ») suivent le calendrier NYSE, comme les
+taux de fx.py.
+
+Les séances sont un tableau trié de dates (datetime64[D]) ; les recherches
+« séance suivante / précédente » se font par np.searchsorted, donc en O(log n)
+et de façon vectorisée pour un lot de dates. Chaque séance porte aussi ses
+heures d'ouverture et de clôture (demi-séances comprises).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    DateOffset,
+    EasterMonday,
+    GoodFriday,
+    Holiday,
+    MO,
+    USLaborDay,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    next_monday_or_tuesday,
+    sunday_to_monday,
+    weekend_to_monday,
+)
+
+MARKET_TZ = "America/New_York"
+
+OUVERTURE = pd.Timedelta(hours=9, minutes=30)
+CLOTURE = pd.Timedelta(hours=16)
+CLOTURE_ANTICIPEE = pd.Timedelta(hours=13)
+
+# Fermetures exceptionnelles (deuils nationaux, événements climatiques...)
+FERMETURES_EXCEPTIONNELLES = [
+    "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14",
+    "2004-06-11", "2007-01-02", "2012-10-29", "2012-10-30",
+    "2018-12-05", "2025-01-09",
+]
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """Jours fériés NYSE (le 1er janvier tombant un samedi n'est pas reporté)"""
+
+    rules = [
+        Holiday("New Years Day", month=1, day=1, observance=sunday_to_monday),
+        Holiday("Martin Luther King Jr. Day", month=1, day=1, start_date="1998-01-01",
+                offset=DateOffset(weekday=MO(3))),
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+class LSEHolidayCalendar(AbstractHolidayCalendar):
+    """Jours fériés de la Bourse de Londres (bank holidays d'Angleterre)"""
+
+    rules = [
+        Holiday("New Years Day", month=1, day=1, observance=weekend_to_monday),
+        GoodFriday,
+        EasterMonday,
+        Holiday("Early May Bank Holiday", month=5, day=1, offset=DateOffset(weekday=MO(1))),
+        Holiday("Spring Bank Holiday", month=5, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday("Summer Bank Holiday", month=8, day=31, offset=DateOffset(weekday=MO(-1))),
+        Holiday("Christmas", month=12, day=25, observance=weekend_to_monday),
+        Holiday("Boxing Day", month=12, day=26, observance=next_monday_or_tuesday),
+    ]
+
+
+class EuronextHolidayCalendar(AbstractHolidayCalendar):
+    """Jours fériés Euronext (Paris, Amsterdam, Bruxelles), jamais reportés"""
+
+    rules = [
+        Holiday("New Years Day", month=1, day=1),
+        GoodFriday,
+        EasterMonday,
+        Holiday("Labour Day", month=5, day=1),
+        Holiday("Christmas", month=12, day=25),
+        Holiday("Boxing Day", month=12, day=26),
+    ]
+
+
+class XetraHolidayCalendar(AbstractHolidayCalendar):
+    """Jours fériés Xetra (Francfort), jamais reportés"""
+
+    rules = [
+        Holiday("New Years Day", month=1, day=1),
+        GoodFriday,
+        EasterMonday,
+        Holiday("Labour Day", month=5, day=1),
+        Holiday("Christmas Eve", month=12, day=24),
+        Holiday("Christmas", month=12, day=25),
+        Holiday("Boxing Day", month=12, day=26),
+        Holiday("New Years Eve", month=12, day=31),
+    ]
+
+
+class Exchange:
+    """
+    Place de cotation : jours fériés, fermetures et ouvertures exceptionnelles
+    (jours fériés déplacés), horaires locaux et demi-séances (jours (mois, jour)
+    clôturant à `early_close`).
+    """
+
+    def __init__(self, name, holidays, opens_at, closes_at, early_close=None, early_days=(),
+                 closures=(), openings=()):
+        self.name = name
+        self.holidays = holidays
+        self.opens_at = opens_at
+        self.closes_at = closes_at
+        self.early_close = early_close
+        self.early_days = early_days
+        self.closures = pd.DatetimeIndex(list(closures))
+        self.openings = pd.DatetimeIndex(list(openings))
+
+    def early_closes(self, seances, feries):
+        """Masque des demi-séances parmi `seances`"""
+        anticipee = np.zeros(len(seances), dtype=bool)
+        for mois, jour in self.early_days:
+            anticipee |= np.asarray((seances.month == mois) & (seances.day == jour))
+        return anticipee
+
+
+class NYSE(Exchange):
+    """NYSE/NASDAQ : demi-séance aussi le lendemain de Thanksgiving"""
+
+    def early_closes(self, seances, feries):
+        thanksgiving = feries[(feries.month == 11) & (feries.dayofweek == 3)]
+        return super().early_closes(seances, feries) | np.asarray(seances.isin(thanksgiving + pd.Timedelta(days=1)))
+
+
+_EURONEXT = dict(holidays=EuronextHolidayCalendar, opens_at=pd.Timedelta(hours=9),
+                 closes_at=pd.Timedelta(hours=17, minutes=30), early_close=pd.Timedelta(hours=14, minutes=5),
+                 early_days=((12, 24), (12, 31)))
+
+# Fuseau de la bourse -> place de cotation
+EXCHANGES = {
+    MARKET_TZ: NYSE("NYSE", NYSEHolidayCalendar, OUVERTURE, CLOTURE, CLOTURE_ANTICIPEE,
+                    early_days=((7, 3), (12, 24)), closures=FERMETURES_EXCEPTIONNELLES),
+    "Europe/London": Exchange(
+        "LSE", LSEHolidayCalendar, pd.Timedelta(hours=8), pd.Timedelta(hours=16, minutes=30),
+        pd.Timedelta(hours=12, minutes=30), early_days=((12, 24), (12, 31)),
+        # Bank holidays déplacés ou ajoutés (jubilés, mariage et funérailles royaux, couronnement)
+        closures=["1999-12-31", "2002-06-03", "2002-06-04", "2011-04-29", "2012-06-04", "2012-06-05",
+                  "2020-05-08", "2022-06-02", "2022-06-03", "2022-09-19", "2023-05-08"],
+        openings=["2002-05-27", "2012-05-28", "2020-05-04", "2022-05-30"],
+    ),
+    "Europe/Paris": Exchange("Euronext Paris", **_EURONEXT),
+    "Europe/Amsterdam": Exchange("Euronext Amsterdam", **_EURONEXT),
+    "Europe/Brussels": Exchange("Euronext Bruxelles", **_EURONEXT),
+    "Europe/Berlin": Exchange("Xetra", XetraHolidayCalendar, pd.Timedelta(hours=9),
+                              pd.Timedelta(hours=17, minutes=30)),
+}
+
+
+def exchange_timezone(ticker, tz):
+    """Fuseau dont le calendrier s'applique au ticker : celui de sa bourse, New York pour une paire de devises"""
+    if not isinstance(tz, str) or not tz or str(ticker).endswith("=X"):
+        return MARKET_TZ
+    return tz
+
+
+def _jours(dates):
+    """Convertit une date ou une liste de dates en ndarray datetime64[D]"""
+    return np.asarray(pd.to_datetime(dates), dtype="datetime64[D]")
+
+
+class TradingCalendar:
+    """Séances de bourse d'une place entre `start` et `end`, avec ouverture et clôture"""
+
+    def __init__(self, start="2000-01-01", end=None, tz=MARKET_TZ):
+        if tz not in EXCHANGES:
+            raise ValueError(f"Place de cotation non prise en charge : {tz} "
+                             f"(fuseaux connus : {', '.join(EXCHANGES)})")
+        if end is None:
+            end = pd.Timestamp.now().normalize() + pd.DateOffset(years=5)
+        self.tz = tz
+        self.exchange = place = EXCHANGES[tz]
+
+        feries = place.holidays().holidays(start, end)
+        fermetures = feries.union(place.closures).difference(place.openings)
+        jours = np.arange(_jours(start), _jours(end) + 1, dtype="datetime64[D]")
+        self.sessions = jours[np.is_busday(jours, holidays=_jours(fermetures))]
+        seances = pd.DatetimeIndex(self.sessions.astype("datetime64[ns]"))
+
+        # Demi-séances (NYSE : 3 juillet, lendemain de Thanksgiving, 24 décembre)
+        anticipee = place.early_closes(seances, feries)
+        self.early_close = anticipee
+
+        # Heures d'ouverture / clôture en nanosecondes UTC
+        clotures = np.where(anticipee, (place.early_close or place.closes_at).value, place.closes_at.value)
+        self.opens = (seances + place.opens_at).tz_localize(tz).tz_convert("UTC").asi8
+        self.closes = pd.DatetimeIndex(seances.asi8 + clotures).tz_localize(tz).tz_convert("UTC").asi8
+
+    def __len__(self):
+        return len(self.sessions)
+
+    # ------------------------------------------------------------------
+    # Recherches vectorisées
+    # ------------------------------------------------------------------
+    def _indices(self, dates, side):
+        jours = _jours(dates)
+        return jours, np.searchsorted(self.sessions, jours, side=side)
+
+    def _resultat(self, dates, indices, valides):
+        seances = np.where(valides, self.sessions[np.clip(indices, 0, len(self.sessions) - 1)],
+                           np.datetime64("NaT"))
+        if np.ndim(dates) == 0:
+            return pd.Timestamp(seances[()])
+        return pd.DatetimeIndex(seances.astype("datetime64[ns]"))
+
+    def next_session(self, dates):
+        """Séance égale ou postérieure à chaque date (NaT au-delà du calendrier)"""
+        _, i = self._indices(dates, "left")
+        return self._resultat(dates, i, i < len(self.sessions))
+
+    def previous_session(self, dates):
+        """Séance égale ou antérieure à chaque date (NaT avant le calendrier)"""
+        _, i = self._indices(dates, "right")
+        return self._resultat(dates, i - 1, i > 0)
+
+    def is_session(self, dates):
+        """Vrai pour les dates qui sont des jours de séance"""
+        jours, i = self._indices(dates, "left")
+        i = np.clip(i, 0, len(self.sessions) - 1)
+        return self.sessions[i] == jours
+
+    def sessions_in_range(self, start, end):
+        """Séances dans [start, end)"""
+        debut = np.searchsorted(self.sessions, _jours(start), side="left")
+        fin = np.searchsorted(self.sessions, _jours(end), side="left")
+        return pd.DatetimeIndex(self.sessions[debut:fin].astype("datetime64[ns]"))
+
+    def session_bounds(self, dates):
+        """(ouverture, clôture) tz-aware de la séance de chaque date (qui doit être une séance)"""
+        i = np.searchsorted(self.sessions, np.atleast_1d(_jours(dates)), side="left")
+        i = np.clip(i, 0, len(self.sessions) - 1)
+        ouvertures = pd.to_datetime(self.opens[i], unit="ns", utc=True).tz_convert(self.tz)
+        clotures = pd.to_datetime(self.closes[i], unit="ns", utc=True).tz_convert(self.tz)
+        if np.ndim(dates) == 0:
+            return ouvertures[0], clotures[0]
+        return ouvertures, clotures
+
+
+_calendriers = {}
+_verrou = threading.Lock()
+
+
+def get_calendar(tz=MARKET_TZ):
+    """Calendrier partagé de la place du fuseau `tz` (construit au premier appel)"""
+    with _verrou:
+        if tz not in _calendriers:
+            _calendriers[tz] = TradingCalendar(tz=tz)
+        return _calendriers[tz]
+
+
+def next_sessions(dates, timezones=None):
+    """
+    Séance égale ou postérieure à chaque date, sur le calendrier de la place de
+    chaque ligne (`timezones` : un fuseau par ligne ; New York par défaut).
+    """
+    dates = pd.to_datetime(pd.Series(dates)).astype("datetime64[ns]").to_numpy()
+    if timezones is None:
+        return get_calendar().next_session(dates)
+    fuseaux = np.asarray(timezones, dtype=object)
+    seances = np.full(len(dates), np.datetime64("NaT"), dtype="datetime64[ns]")
+    for tz in pd.unique(fuseaux):
+        lignes = fuseaux == tz
+        seances[lignes] = get_calendar(tz).next_session(dates[lignes]).to_numpy()
+    return pd.DatetimeIndex(seances)
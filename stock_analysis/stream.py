@@ -0,0 +1,176 @@
+"""
+Traitement en flux de gros fichiers de transactions (CSV ou Parquet).
+
+Le fichier est lu par morceaux de taille bornée ; chaque morceau est trié par
+ticker et date, ses cours sont préchargés en une fois (load_panel sur l'union
+de ses tickers et de ses dates, le cache SQLite évitant de retélécharger d'un
+morceau à l'autre), puis calculé par le moteur vectorisé (pnl.py), les prix
+d'achat étant ajustés des fractionnements et dividendes survenus pendant la
+détention (corporate.AdjustmentFactors). Les lignes calculées sont écrites au
+fil de l'eau (CSV, Parquet ou stockage des résultats) et seuls des totaux par
+ticker restent en mémoire : la mémoire ne dépend que de la taille des morceaux
+et du nombre de tickers, pas de la taille du fichier.
+
+Usage :
+    python -m stock_analysis stream realized export_courtier.csv --output resultats.parquet
+    python -m stock_analysis stream unrealized achats.parquet --date 2025-11-05 --dataset positions_latentes
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.corporate import AdjustmentFactors
+from stock_analysis.panel import load_panel, transactions_span
+from stock_analysis.pnl import compute_realized, compute_unrealized, price_table
+
+TAILLE_MORCEAU = 100_000
+
+# Noms de colonnes acceptés en entrée -> noms du moteur de calcul
+ALIAS = {"achat": "date_achat", "vente": "date_vente"}
+
+MODES = ("realized", "unrealized")
+
+
+def read_transactions(path, chunksize=TAILLE_MORCEAU):
+    """Lit un fichier CSV ou Parquet de transactions par morceaux de `chunksize` lignes"""
+    if path.endswith((".parquet", ".pq")):
+        from stock_analysis.results import _pyarrow
+        _, _, _, pq = _pyarrow()
+        for lot in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield lot.to_pandas().rename(columns=ALIAS)
+    else:
+        for morceau in pd.read_csv(path, chunksize=chunksize, dtype={"ticker": str}):
+            yield morceau.rename(columns=ALIAS)
+
+
+class ResultWriter:
+    """Écriture incrémentale des lignes calculées : .csv, .parquet ou jeu du stockage des résultats"""
+
+    def __init__(self, path=None, dataset=None, run_date=None):
+        self.path = path
+        self.dataset = dataset
+        self.run_date = run_date
+        self.lignes = 0
+        self._parquet = None
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df):
+        if df.empty:
+            return
+        if self.dataset is not None:
+            from stock_analysis.results import write_results
+            write_results(df, self.dataset, run_date=self.run_date)
+        if self.path is not None and self.path.endswith((".parquet", ".pq")):
+            from stock_analysis.results import _colonne, _pyarrow
+            pa, _, _, pq = _pyarrow()
+            table = pa.table({nom: _colonne(pa, nom, df[nom]) for nom in df.columns})
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        elif self.path is not None:
+            df.to_csv(self.path, mode="a", header=self.lignes == 0, index=False, encoding='utf-8')
+        self.lignes += len(df)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RunningTotals:
+    """Totaux par ticker cumulés de morceau en morceau (taille en O(nombre de tickers))"""
+
+    COLONNES = ["actions", "investi", "valeur", "positions", "valides"]
+
+    def __init__(self):
+        self.par_ticker = pd.DataFrame(columns=self.COLONNES, dtype=float)
+
+    def add(self, df, valeur):
+        valides = df["valide"].to_numpy()
+        morceau = pd.DataFrame({
+            "ticker": df["ticker"].to_numpy(),
+            "actions": np.where(valides, df["actions"].to_numpy(dtype=float), 0.0),
+            "investi": np.where(valides, df["montant"].to_numpy(dtype=float), 0.0),
+            "valeur": np.where(valides, df[valeur].to_numpy(dtype=float), 0.0),
+            "positions": 1.0,
+            "valides": valides.astype(float),
+        }).groupby("ticker", sort=False).sum()
+        self.par_ticker = self.par_ticker.add(morceau, fill_value=0.0)
+
+    def positions(self, tickers):
+        """Nombre de positions déjà vues pour chaque ticker (numérotation continue)"""
+        return self.par_ticker["positions"].reindex(tickers).fillna(0).to_numpy(dtype=np.int64)
+
+    def ticker_totals(self):
+        """Mêmes colonnes que pnl.ticker_totals"""
+        totaux = self.par_ticker[self.par_ticker["valides"] > 0].copy()
+        totaux["positions"] = totaux["positions"].astype(np.int64)
+        totaux["plus_value"] = totaux["valeur"] - totaux["investi"]
+        totaux["pourcentage"] = totaux["plus_value"] / totaux["investi"] * 100
+        return totaux.drop(columns="valides").rename_axis("ticker")
+
+    def portfolio_totals(self):
+        """Mêmes clés que pnl.portfolio_totals"""
+        investi = float(self.par_ticker["investi"].sum())
+        valeur = float(self.par_ticker["valeur"].sum())
+        return {
+            "investi": investi,
+            "valeur": valeur,
+            "plus_value": valeur - investi,
+            "rendement": (valeur - investi) / investi * 100 if investi > 0 else float("nan"),
+        }
+
+
+def process_chunk(chunk, mode="realized", date_evaluation=None, interval="1d"):
+    """Calcule un morceau : un seul préchargement des cours pour ses tickers et ses dates"""
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu : {mode} (attendu : {', '.join(MODES)})")
+    chunk = chunk.sort_values(["ticker", "date_achat"], kind="stable")
+    extra = [date_evaluation] if mode == "unrealized" else []
+    panel = load_panel(*transactions_span(chunk, date_keys=("date_achat", "date_vente"), extra_dates=extra),
+                       interval=interval)
+    prix = price_table(panel)
+    # Cours bruts : prix d'achat ajustés des événements survenus pendant la détention
+    ajustements = AdjustmentFactors.load(sorted(chunk["ticker"].unique()), closes=prix)
+    if mode == "realized":
+        return compute_realized(chunk, prix, adjustments=ajustements)
+    return compute_unrealized(chunk, prix, date_evaluation, adjustments=ajustements)
+
+
+def stream_pnl(path, mode="realized", date_evaluation=None, chunksize=TAILLE_MORCEAU,
+               output=None, dataset=None):
+    """
+    Traite tout le fichier morceau par morceau et écrit les lignes calculées au
+    fur et à mesure. Retourne les totaux cumulés (RunningTotals).
+    """
+    if mode == "unrealized" and date_evaluation is None:
+        raise ValueError("date_evaluation est obligatoire en mode unrealized")
+    valeur = "valeur_vente" if mode == "realized" else "valeur_actuelle"
+    totaux = RunningTotals()
+    with ResultWriter(output, dataset, run_date=date_evaluation) as sortie:
+        for chunk in read_transactions(path, chunksize):
+            calcul = process_chunk(chunk, mode, date_evaluation)
+            # Numérotation des positions continue d'un morceau à l'autre
+            calcul["position"] += totaux.positions(calcul["ticker"])
+            totaux.add(calcul, valeur)
+            sortie.write(calcul.drop(columns="nb_positions"))
+    return totaux
+
+
+def main(argv=None):
+    """Équivaut à `python -m stock_analysis stream` (voir cli)"""
+    from stock_analysis.cli import main as cli_main
+    return cli_main(["stream", *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
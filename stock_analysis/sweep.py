@@ -0,0 +1,288 @@
+"""
+Balayage de paramètres pour la stratégie d'intraday.py : heure d'entrée
+(heures après l'ouverture), durée de détention (en séances) et règle de sortie.
+
+Les barres nécessaires (quotidiennes et intraday) sont chargées une seule fois
+dans des tableaux NumPy (matrices tickers × séances pour les barres quotidiennes,
+barres intraday de chaque ticker concaténées), placés en mémoire partagée ;
+chaque processus du pool s'y attache sans copie et évalue un lot de
+combinaisons. Les cours bruts y sont ajustés des fractionnements et dividendes
+(corporate.AdjustmentFactors) : un rendement entre deux séances ne saute pas à
+un fractionnement. Le résultat est un tableau classé par rendement, que
+to_cube() remet en forme (entrées × durées × sorties).
+
+Usage :
+    python -m stock_analysis sweep --input positions_intraday_11h30.csv \\
+        --entrees 0.5,1,2,3 --durees 0,1,5,10 --sorties close,open,h2
+"""
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.archive import get_archive
+from stock_analysis.bars import TOLERANCE, _ns, select_bars
+from stock_analysis.corporate import AdjustmentFactors
+from stock_analysis.panel import load_panel, transactions_span
+from stock_analysis.sessions import get_calendar
+
+# Sorties possibles : ouverture / clôture de la séance de sortie, ou "h<heures>"
+# (cours intraday <heures> après l'ouverture de cette séance, ex. "h2")
+SORTIES = ("open", "close")
+
+# En dessous de ce nombre de combinaisons, le pool de processus ne vaut pas son coût
+SEUIL_PARALLELE = 64
+
+
+class MarketArrays:
+    """Barres d'un univers de tickers, alignées dans des matrices NumPy"""
+
+    def __init__(self, tickers, sessions, opens_ns, daily_open, daily_close,
+                 intraday_ns, intraday_close, intraday_bounds):
+        self.tickers = list(tickers)
+        self.sessions = sessions
+        self.opens_ns = opens_ns
+        self.daily_open = daily_open
+        self.daily_close = daily_close
+        # Barres intraday du ticker i : intraday_ns[intraday_bounds[i]:intraday_bounds[i + 1]]
+        self.intraday_ns = intraday_ns
+        self.intraday_close = intraday_close
+        self.intraday_bounds = intraday_bounds
+
+    def arrays(self):
+        return {
+            "opens_ns": self.opens_ns,
+            "daily_open": self.daily_open,
+            "daily_close": self.daily_close,
+            "intraday_ns": self.intraday_ns,
+            "intraday_close": self.intraday_close,
+            "intraday_bounds": self.intraday_bounds,
+        }
+
+    @classmethod
+    def from_panels(cls, tickers, daily, intraday, start, end, calendar=None):
+        """Construit les matrices à partir de deux PricePanel (1d et intraday)"""
+        calendar = calendar or get_calendar()
+        seances = calendar.sessions_in_range(start, end)
+        ouvertures, _ = calendar.session_bounds(seances)
+        jours = seances.values.astype("datetime64[D]")
+
+        daily_open = np.full((len(tickers), len(seances)), np.nan)
+        daily_close = np.full((len(tickers), len(seances)), np.nan)
+        for i, ticker in enumerate(tickers):
+            hist = daily.frames.get(ticker)
+            if hist is None or hist.empty:
+                continue
+            dates = hist.index.tz_localize(None).values.astype("datetime64[D]")
+            colonnes = np.searchsorted(jours, dates)
+            ok = (colonnes < len(jours)) & (jours[np.minimum(colonnes, len(jours) - 1)] == dates)
+            daily_open[i, colonnes[ok]] = hist["Open"].to_numpy(dtype=float)[ok]
+            daily_close[i, colonnes[ok]] = hist["Close"].to_numpy(dtype=float)[ok]
+
+        # Barres intraday : horodatages propres à chaque ticker (pas de grille commune,
+        # où un ticker sans barre à un horodatage d'un autre ticker aurait NaN)
+        horodatages, clotures = [], []
+        for ticker in tickers:
+            hist = intraday.frames.get(ticker)
+            if hist is None or hist.empty:
+                horodatages.append(np.empty(0, dtype=np.int64))
+                clotures.append(np.empty(0))
+                continue
+            hist = hist.sort_index()
+            horodatages.append(_ns(hist.index))
+            clotures.append(hist["Close"].to_numpy(dtype=float))
+        bornes = np.concatenate([[0], np.cumsum([len(h) for h in horodatages])]).astype(np.int64)
+
+        return cls(tickers, jours, ouvertures.tz_convert("UTC").as_unit("ns").asi8,
+                   daily_open, daily_close, np.concatenate(horodatages).astype(np.int64),
+                   np.concatenate(clotures).astype(float), bornes)
+
+
+def load_market_arrays(achats, max_holding, interval="5m"):
+    """Charge (cache / Yahoo) les barres couvrant achats et sorties possibles"""
+    tickers, debut, fin = transactions_span(achats)
+    calendrier = get_calendar()
+    derniere = np.searchsorted(calendrier.sessions, np.datetime64(fin - timedelta(days=1), "D"))
+    derniere = min(derniere + max_holding, len(calendrier.sessions) - 1)
+    fin = pd.Timestamp(calendrier.sessions[derniere]).date() + timedelta(days=1)
+
+    daily = load_panel(tickers, debut, fin)
+    # Séances plus anciennes que la rétention de Yahoo : lues dans l'archive locale
+    intraday = get_archive(interval).fill(load_panel(tickers, debut, fin, interval=interval))
+    # Cours bruts (cache et archive) ramenés à une même base : tous les événements connus
+    ajustements = AdjustmentFactors.load(tickers, since=debut)
+    return MarketArrays.from_panels(tickers, ajustements.adjust_panel(daily), ajustements.adjust_panel(intraday),
+                                    debut, fin, calendrier)
+
+
+def encode_positions(achats, marche):
+    """Positions sous forme de tableaux : indice du ticker, indice de séance d'entrée, montant"""
+    df = pd.DataFrame(achats)
+    rang = {t: i for i, t in enumerate(marche.tickers)}
+    jours = pd.to_datetime(df["date_achat"]).values.astype("datetime64[D]")
+    return {
+        "ticker": df["ticker"].map(rang).to_numpy(dtype=np.int64),
+        "seance": np.searchsorted(marche.sessions.astype("datetime64[D]"), jours, side="left"),
+        "montant": df["montant"].to_numpy(dtype=float),
+    }
+
+
+def _prix_intraday(donnees, tickers, seances, heures):
+    """Cours intraday `heures` après l'ouverture des séances, barre la plus proche du ticker"""
+    cibles = donnees["opens_ns"][seances] + np.int64(heures * 3600 * 10**9)
+    bornes = donnees["intraday_bounds"]
+    prix = np.full(len(tickers), np.nan)
+
+    # Une recherche vectorisée par ticker distinct, sur ses propres horodatages
+    uniques, inverse = np.unique(tickers, return_inverse=True)
+    ordre = np.argsort(inverse, kind="stable")
+    limites = np.searchsorted(inverse[ordre], np.arange(len(uniques) + 1))
+    for k, ticker in enumerate(uniques):
+        debut, fin = bornes[ticker], bornes[ticker + 1]
+        if debut == fin:
+            continue
+        lignes = ordre[limites[k]:limites[k + 1]]
+        positions = select_bars(donnees["intraday_ns"][debut:fin], cibles[lignes], "nearest", TOLERANCE)
+        trouvees = positions >= 0
+        prix[lignes[trouvees]] = donnees["intraday_close"][debut:fin][positions[trouvees]]
+    return prix
+
+
+def evaluate(donnees, positions, entree, duree, sortie):
+    """Évalue une combinaison sur toutes les positions (NumPy uniquement)"""
+    nb_seances = len(donnees["opens_ns"])
+    tickers = positions["ticker"]
+    seances = positions["seance"]
+    montant = positions["montant"]
+
+    dans_calendrier = seances < nb_seances
+    seances_entree = np.minimum(seances, nb_seances - 1)
+    prix_entree = _prix_intraday(donnees, tickers, seances_entree, entree)
+
+    seances_sortie = seances_entree + duree
+    dans_calendrier &= seances_sortie < nb_seances
+    seances_sortie = np.minimum(seances_sortie, nb_seances - 1)
+    if sortie == "close":
+        prix_sortie = donnees["daily_close"][tickers, seances_sortie]
+    elif sortie == "open":
+        prix_sortie = donnees["daily_open"][tickers, seances_sortie]
+    else:
+        prix_sortie = _prix_intraday(donnees, tickers, seances_sortie, float(sortie[1:]))
+    if duree == 0 and (sortie == "open" or (sortie != "close" and float(sortie[1:]) <= entree)):
+        # Sortir dans la séance d'entrée à l'ouverture, ou à une heure qui ne suit pas
+        # l'entrée, n'a pas de sens (durée de détention nulle ou négative)
+        dans_calendrier = np.zeros_like(dans_calendrier)
+
+    rendements = prix_sortie / prix_entree - 1.0
+    valides = dans_calendrier & ~np.isnan(rendements)
+    investi = montant[valides].sum()
+    gain = (montant[valides] * rendements[valides]).sum()
+    return {
+        "entree": entree,
+        "duree": duree,
+        "sortie": sortie,
+        "positions": int(valides.sum()),
+        "rendement": gain / investi * 100 if investi > 0 else np.nan,
+        "rendement_moyen": rendements[valides].mean() * 100 if valides.any() else np.nan,
+        "gain": gain,
+        "taux_reussite": (rendements[valides] > 0).mean() * 100 if valides.any() else np.nan,
+    }
+
+
+# ----------------------------------------------------------------------
+# Mémoire partagée entre processus
+# ----------------------------------------------------------------------
+_donnees_worker = {}
+_blocs_worker = []
+
+
+def _partager(tableaux):
+    blocs, description = [], {}
+    for nom, tableau in tableaux.items():
+        tableau = np.ascontiguousarray(tableau)
+        bloc = SharedMemory(create=True, size=max(tableau.nbytes, 1))
+        np.ndarray(tableau.shape, tableau.dtype, buffer=bloc.buf)[...] = tableau
+        blocs.append(bloc)
+        description[nom] = (bloc.name, tableau.shape, tableau.dtype.str)
+    return blocs, description
+
+
+def _init_worker(description, positions):
+    for nom, (nom_bloc, forme, dtype) in description.items():
+        bloc = SharedMemory(name=nom_bloc)
+        # Le processus principal reste propriétaire du segment (pas de unlink ici)
+        try:
+            resource_tracker.unregister(bloc._name, "shared_memory")
+        except Exception:
+            pass
+        _blocs_worker.append(bloc)
+        _donnees_worker[nom] = np.ndarray(forme, np.dtype(dtype), buffer=bloc.buf)
+    _donnees_worker["positions"] = positions
+
+
+def _evaluer_lot(combinaisons):
+    return [evaluate(_donnees_worker, _donnees_worker["positions"], *c) for c in combinaisons]
+
+
+def run_sweep(marche, positions, entry_offsets, holding_periods, exit_rules, workers=None):
+    """
+    Évalue toutes les combinaisons (entrée × durée × sortie) et retourne un
+    DataFrame classé par rendement décroissant.
+    """
+    for sortie in exit_rules:
+        if sortie not in SORTIES and not sortie.startswith("h"):
+            raise ValueError(f"Règle de sortie inconnue : {sortie}")
+    combinaisons = list(itertools.product(entry_offsets, holding_periods, exit_rules))
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(combinaisons) < SEUIL_PARALLELE:
+        donnees = marche.arrays()
+        lignes = [evaluate(donnees, positions, *c) for c in combinaisons]
+    else:
+        blocs, description = _partager(marche.arrays())
+        try:
+            taille = -(-len(combinaisons) // (workers * 4))
+            lots = [combinaisons[i:i + taille] for i in range(0, len(combinaisons), taille)]
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(description, positions)) as pool:
+                lignes = [ligne for lot in pool.map(_evaluer_lot, lots) for ligne in lot]
+        finally:
+            for bloc in blocs:
+                bloc.close()
+                bloc.unlink()
+
+    resultats = pd.DataFrame(lignes)
+    return resultats.sort_values("rendement", ascending=False, na_position="last").reset_index(drop=True)
+
+
+def to_cube(resultats, metric="rendement"):
+    """Remet les résultats en cube NumPy (entrées × durées × sorties)"""
+    cube = resultats.pivot_table(index="entree", columns=["duree", "sortie"], values=metric, dropna=False)
+    entrees = sorted(resultats["entree"].unique())
+    durees = sorted(resultats["duree"].unique())
+    sorties = list(dict.fromkeys(resultats["sortie"]))
+    colonnes = pd.MultiIndex.from_product([durees, sorties])
+    valeurs = cube.reindex(index=entrees, columns=colonnes).to_numpy()
+    return valeurs.reshape(len(entrees), len(durees), len(sorties))
+
+
+def read_positions(path):
+    """Achats depuis un CSV : colonnes brutes (ticker, date_achat, montant) ou export d'intraday.py"""
+    df = pd.read_csv(path).rename(columns={"Ticker": "ticker", "Date Achat": "date_achat", "Investi (€)": "montant"})
+    return df[["ticker", "date_achat", "montant"]].to_dict("records")
+
+
+def main(argv=None):
+    """Équivaut à `python -m stock_analysis sweep` (voir cli)"""
+    from stock_analysis.cli import main as cli_main
+    return cli_main(["sweep", *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Mode surveillance : boucle asyncio qui, pendant la séance, relève à intervalle
+régulier la dernière barre de chaque ticker détenu et met à jour en mémoire la
+valorisation et le P&L des positions du grand livre.
+
+- Une seule requête groupée par cycle : download du paquet des tickers détenus
+  sur la seule séance du jour (l'historique n'est jamais redemandé), via le pool
+  partagé (débit limité, retries, requêtes identiques en cours fusionnées).
+- Source des barres interchangeable : LiveFeed (fournisseur actif) ou ReplayFeed
+  (une séance rejouée à horloge accélérée depuis n'importe quel fournisseur,
+  synthétique ou enregistré : sans réseau, pour les essais).
+- Contre-pression : un cycle ne démarre jamais avant la fin du précédent ; un
+  cycle trop long fait sauter les échéances dépassées au lieu de les enchaîner,
+  et les mises à jour passent par une file bornée, si bien qu'un consommateur
+  lent (affichage, écriture) ralentit les relevés au lieu d'accumuler du retard.
+- Mise à jour incrémentale : seuls les tickers ayant une nouvelle barre sont
+  revalorisés, les totaux sont corrigés de leur écart (O(tickers mis à jour)).
+- Barres brutes : le nombre d'actions de chaque position et la clôture de la
+  veille sont ajustés des fractionnements et dividendes survenus depuis.
+"""
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import metrics
+from stock_analysis.cache import market_today
+from stock_analysis.fetch import get_pool
+from stock_analysis.panel import load_panel
+from stock_analysis.providers import _minutes, get_provider
+from stock_analysis.sessions import get_calendar
+
+# Secondes entre deux relevés
+PERIODE = 60.0
+INTERVALLE = "1m"
+# Mises à jour en attente avant que les relevés ne ralentissent
+TAILLE_FILE = 4
+# Accélération de l'horloge d'une séance rejouée (1 minute de séance par seconde)
+VITESSE_REPLAY = 60.0
+
+
+def _dernieres_barres(barres, bornes=None):
+    """
+    Dernière barre de chaque ticker : DataFrame indexé par ticker (horodatage en ns
+    UTC, prix de clôture, volume cumulé de la séance). `bornes` limite chaque
+    historique à ses `bornes[ticker]` premières barres.
+    """
+    lignes = {}
+    for ticker, hist in barres.items():
+        n = len(hist) if bornes is None else bornes[ticker]
+        if not n:
+            continue
+        lignes[ticker] = (
+            hist.index[n - 1].value,
+            float(hist["Close"].iat[n - 1]),
+            float(np.nansum(hist["Volume"].to_numpy(dtype=float)[:n])),
+        )
+    return pd.DataFrame.from_dict(lignes, orient="index", columns=["horodatage", "prix", "volume"])
+
+
+def previous_closes(tickers, session, adjustments=None):
+    """
+    Clôture de la séance précédant `session` pour chaque ticker (Series, NaN si
+    absente). Avec `adjustments` (corporate.AdjustmentFactors), elle est ajustée
+    des événements de date ex `session`, pour se comparer aux cours du jour.
+    """
+    calendrier = get_calendar()
+    veille = calendrier.previous_session(pd.Timestamp(session).normalize() - pd.Timedelta(days=1))
+    panel = load_panel(tickers, veille - pd.Timedelta(days=7), pd.Timestamp(session).normalize())
+    prix, dates = {}, {}
+    for ticker in tickers:
+        clotures = panel.frames[ticker]["Close"].dropna() if ticker in panel.frames else pd.Series(dtype=float)
+        prix[ticker] = float(clotures.iloc[-1]) if len(clotures) else float("nan")
+        dates[ticker] = pd.Timestamp(clotures.index[-1].date()) if len(clotures) else pd.NaT
+    prix = pd.Series(prix, dtype=float)
+    if adjustments is not None and len(prix):
+        prix *= adjustments.factors(prix.index.to_numpy(dtype=object), list(dates.values()), session)
+    return prix
+
+
+class LiveFeed:
+    """Barres du jour via le fournisseur actif, une requête groupée par relevé"""
+
+    def __init__(self, interval=INTERVALLE, provider=None):
+        self.interval = interval
+        self.provider = provider
+
+    def now(self):
+        return pd.Timestamp.now(tz=get_calendar().tz)
+
+    async def sleep(self, secondes):
+        await asyncio.sleep(max(secondes, 0.0))
+
+    async def latest(self, tickers):
+        fournisseur = self.provider or get_provider()
+        jour = market_today()
+        tickers = list(tickers)
+        future = get_pool().submit(
+            ("download", tuple(tickers), self.interval, jour, jour + timedelta(days=1)),
+            fournisseur.download, tickers, jour, jour + timedelta(days=1), self.interval,
+        )
+        return _dernieres_barres(await asyncio.wrap_future(future))
+
+
+class ReplayFeed:
+    """
+    Séance `session` rejouée : ses barres sont lues une fois (un download groupé),
+    l'horloge part de l'ouverture et avance `speed` fois plus vite que le temps
+    réel ; chaque relevé ne livre que les barres closes à l'heure simulée.
+    `delay` simule la durée d'une requête (en secondes de séance).
+    """
+
+    def __init__(self, session, interval=INTERVALLE, provider=None, speed=VITESSE_REPLAY, delay=0.0, calendar=None):
+        calendar = calendar or get_calendar()
+        self.session = pd.Timestamp(session).normalize()
+        self.interval = interval
+        self.provider = provider
+        self.speed = speed
+        self.delay = delay
+        self.start, _ = calendar.session_bounds(self.session)
+        self._duree = _minutes(interval) * 60 * 10**9
+        self._barres = {}
+        self._fins = {}
+        self._t0 = None
+
+    def now(self):
+        if self._t0 is None:
+            self._t0 = time.monotonic()
+        return self.start + pd.Timedelta(seconds=(time.monotonic() - self._t0) * self.speed)
+
+    async def sleep(self, secondes):
+        await asyncio.sleep(max(secondes, 0.0) / self.speed)
+
+    async def latest(self, tickers):
+        manquants = [t for t in tickers if t not in self._barres]
+        if manquants:
+            fournisseur = self.provider or get_provider()
+            barres = await asyncio.to_thread(
+                fournisseur.download, manquants, self.session, self.session + pd.Timedelta(days=1), self.interval,
+            )
+            for ticker in manquants:
+                hist = barres.get(ticker)
+                if hist is None:
+                    hist = pd.DataFrame(columns=["Close", "Volume"], index=pd.DatetimeIndex([], tz="UTC"), dtype=float)
+                self._barres[ticker] = hist
+                self._fins[ticker] = pd.DatetimeIndex(hist.index).as_unit("ns").asi8 + self._duree
+        if self.delay:
+            await self.sleep(self.delay)
+
+        horloge = self.now().value
+        bornes = {t: int(np.searchsorted(self._fins[t], horloge, side="right")) for t in tickers}
+        return _dernieres_barres({t: self._barres[t] for t in tickers}, bornes)
+
+
+class Watcher:
+    """
+    Valorisation en mémoire des positions d'un grand livre, tenue à jour à partir
+    des dernières barres. Les totaux par ticker sont figés (actions, investi) ;
+    seuls prix, valeurs et totaux du portefeuille changent à chaque relevé.
+    `factors` (PositionLedger.adjustment_factors à la séance suivie) ramène le
+    nombre d'actions de chaque position aux cours cotés ce jour-là.
+    """
+
+    def __init__(self, ledger, feed, every=PERIODE, queue_size=TAILLE_FILE, calendar=None, factors=None):
+        self.ledger = ledger
+        self.feed = feed
+        self.every = every
+        self.queue_size = queue_size
+        self.calendar = calendar or get_calendar()
+        self.factors = factors
+
+        positions = ledger.positions[["ticker", "actions", "montant"]].copy()
+        if factors is not None:
+            positions["actions"] = positions["actions"].to_numpy(dtype=float) / factors
+        totaux = positions.groupby("ticker")[["actions", "montant"]].sum().sort_index()
+        self.tickers = totaux.index.to_numpy(dtype=str)
+        self.actions = totaux["actions"].to_numpy(dtype=float)
+        self.investi = totaux["montant"].to_numpy(dtype=float)
+        k = len(self.tickers)
+        self.prix = np.full(k, np.nan)
+        self.veille = np.full(k, np.nan)
+        self.horodatages = np.full(k, np.iinfo(np.int64).min)
+        self.volumes = np.zeros(k)
+
+        # Totaux sur les tickers dont le cours est connu
+        self._valeur = 0.0
+        self._investi = 0.0
+        self._valeur_veille = 0.0
+        self.cycles = 0
+        self.skipped = 0
+
+    def seed(self, prix_veille):
+        """Clôtures de la veille (Series ticker -> prix), référence de la variation du jour"""
+        self.veille = pd.Series(prix_veille, dtype=float).reindex(self.tickers).to_numpy()
+        self.prix = self.veille.copy()
+        connus = ~np.isnan(self.prix)
+        self._valeur = float((self.actions * self.prix)[connus].sum())
+        self._investi = float(self.investi[connus].sum())
+        self._valeur_veille = self._valeur
+
+    def apply(self, barres):
+        """Intègre les barres plus récentes que celles déjà vues ; retourne les tickers mis à jour"""
+        if barres.empty:
+            return []
+        i = np.searchsorted(self.tickers, barres.index.to_numpy(dtype=str))
+        horodatages = barres["horodatage"].to_numpy(dtype=np.int64)
+        prix = barres["prix"].to_numpy(dtype=float)
+        nouvelles = (horodatages > self.horodatages[i]) & ~np.isnan(prix)
+        i, horodatages, prix = i[nouvelles], horodatages[nouvelles], prix[nouvelles]
+        if not len(i):
+            return []
+
+        # Correction des totaux par l'écart des seuls tickers mis à jour
+        ancien = self.prix[i]
+        inconnus = np.isnan(ancien)
+        self._valeur += float((self.actions[i] * (prix - np.nan_to_num(ancien))).sum())
+        self._investi += float(self.investi[i][inconnus].sum())
+        self._valeur_veille += float(np.nan_to_num(self.actions[i] * self.veille[i])[inconnus].sum())
+
+        self.prix[i] = prix
+        self.horodatages[i] = horodatages
+        self.volumes[i] = barres["volume"].to_numpy(dtype=float)[nouvelles]
+        return self.tickers[i].tolist()
+
+    def snapshot(self, mis_a_jour=()):
+        """État du portefeuille (dict sérialisable en JSON)"""
+        plus_value = self._valeur - self._investi
+        variation = self._valeur - self._valeur_veille
+        return {
+            "horodatage": self.feed.now().isoformat(),
+            "cycle": self.cycles,
+            "valeur": round(self._valeur, 2),
+            "investi": round(self._investi, 2),
+            "plus_value": round(plus_value, 2),
+            "rendement": round(plus_value / self._investi * 100, 4) if self._investi > 0 else None,
+            "variation_jour": round(variation, 2),
+            "variation_jour_pct": round(variation / self._valeur_veille * 100, 4) if self._valeur_veille > 0 else None,
+            "tickers_valorises": int((~np.isnan(self.prix)).sum()),
+            "tickers": len(self.tickers),
+            "mis_a_jour": list(mis_a_jour),
+            "cycles_sautes": self.skipped,
+        }
+
+    def prices(self):
+        """Derniers cours connus (Series ticker -> prix), pour PositionLedger.revalue()"""
+        return pd.Series(self.prix, index=self.tickers)
+
+    # ------------------------------------------------------------------
+    # Boucle
+    # ------------------------------------------------------------------
+    def _seance(self, maintenant):
+        """(ouverture, clôture) de la séance du jour, ou None un jour sans séance"""
+        jour = maintenant.tz_convert(self.calendar.tz).normalize().tz_localize(None)
+        if not self.calendar.is_session(jour):
+            return None
+        return self.calendar.session_bounds(jour)
+
+    async def _cycle(self, file):
+        """Un relevé groupé, intégré puis transmis au consommateur"""
+        with metrics.timer("cycle_surveillance"):
+            mis_a_jour = self.apply(await self.feed.latest(self.tickers))
+        self.cycles += 1
+        metrics.count("tickers_mis_a_jour", len(mis_a_jour))
+        with metrics.timer("attente_file"):
+            # File pleine : le consommateur impose son rythme aux relevés
+            await file.put(self.snapshot(mis_a_jour))
+
+    async def _relever(self, file, cycles):
+        prochaine = None
+        while cycles is None or self.cycles < cycles:
+            maintenant = self.feed.now()
+            seance = self._seance(maintenant)
+            if seance is None:
+                return
+            if maintenant >= seance[1]:
+                # Dernier relevé à la clôture, si la séance a été suivie
+                if self.cycles:
+                    await self._cycle(file)
+                return
+            if maintenant < seance[0]:
+                # Avant l'ouverture : on attend la première barre
+                await self.feed.sleep((seance[0] - maintenant).total_seconds())
+                continue
+
+            await self._cycle(file)
+
+            # Échéances à pas fixe ; celles déjà dépassées sont sautées, pas rattrapées
+            pas = pd.Timedelta(seconds=self.every)
+            prochaine = (prochaine or maintenant) + pas
+            maintenant = self.feed.now()
+            if maintenant > prochaine:
+                sautees = int((maintenant - prochaine) / pas) + 1
+                self.skipped += sautees
+                metrics.count("cycles_sautes", sautees)
+                prochaine += sautees * pas
+            await self.feed.sleep((min(prochaine, seance[1]) - maintenant).total_seconds())
+
+    async def _consommer(self, file, emit):
+        while True:
+            mise_a_jour = await file.get()
+            if mise_a_jour is None:
+                return
+            resultat = emit(mise_a_jour)
+            if asyncio.iscoroutine(resultat):
+                await resultat
+
+    async def run(self, emit=print, cycles=None):
+        """
+        Relève les barres jusqu'à la clôture (ou `cycles` relevés) et passe chaque
+        mise à jour à `emit` (fonction ou coroutine), dans une tâche séparée.
+        """
+        file = asyncio.Queue(maxsize=self.queue_size)
+        consommateur = asyncio.create_task(self._consommer(file, emit))
+        try:
+            await self._relever(file, cycles)
+        finally:
+            await file.put(None)
+            await consommateur
+        return self.snapshot()
+
+
+def format_update(mise_a_jour):
+    """Ligne d'affichage d'une mise à jour"""
+    heure = pd.Timestamp(mise_a_jour["horodatage"]).strftime("%H:%M:%S")
+    rendement = mise_a_jour["rendement"]
+    jour = mise_a_jour["variation_jour_pct"]
+    ligne = (
+        f"{heure} ET │ Valeur {mise_a_jour['valeur']:>12.2f}€ │ "
+        f"P&L {mise_a_jour['plus_value']:+10.2f}€ ({rendement if rendement is not None else float('nan'):+.2f}%) │ "
+        f"Jour {mise_a_jour['variation_jour']:+9.2f}€ ({jour if jour is not None else float('nan'):+.2f}%) │ "
+        f"{mise_a_jour['tickers_valorises']}/{mise_a_jour['tickers']} tickers, "
+        f"{len(mise_a_jour['mis_a_jour'])} mis à jour"
+    )
+    if mise_a_jour["cycles_sautes"]:
+        ligne += f" │ ⚠️  {mise_a_jour['cycles_sautes']} cycle(s) sauté(s)"
+    return ligne
+
+
+def emit_text(mise_a_jour):
+    print(format_update(mise_a_jour), flush=True)
+
+
+def emit_json(mise_a_jour):
+    print(json.dumps(mise_a_jour, ensure_ascii=False), flush=True)
@@ -0,0 +1,67 @@
+"""Cache des barres : plages manquantes, couverture figée et TTL de la séance en cours"""
+from datetime import date
+
+import pytest
+
+from stock_analysis import cache
+from stock_analysis.cache import BarCache, _fusionner, _soustraire
+from stock_analysis.providers import SyntheticProvider
+
+AUJOURD_HUI = date(2024, 3, 13)
+
+
+class _Compteur(SyntheticProvider):
+    """Fournisseur synthétique qui note les plages demandées"""
+
+    def __init__(self):
+        super().__init__()
+        self.demandes = []
+
+    def history(self, ticker, start, end, interval="1d"):
+        self.demandes.append((str(start), str(end)))
+        return super().history(ticker, start, end, interval)
+
+
+@pytest.fixture
+def barres(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "market_today", lambda tz=None: AUJOURD_HUI)
+    return BarCache(path=str(tmp_path / "barres.sqlite"), provider=_Compteur())
+
+
+def test_soustraction_et_fusion_des_plages():
+    j = lambda n: date(2024, 3, n)
+    assert _soustraire(j(1), j(20), [(j(3), j(5)), (j(8), j(10))]) == [(j(1), j(3)), (j(5), j(8)), (j(10), j(20))]
+    assert _soustraire(j(4), j(9), [(j(1), j(5)), (j(5), j(12))]) == []
+    assert _fusionner([(j(8), j(10)), (j(1), j(5)), (j(5), j(6))]) == [(j(1), j(6)), (j(8), j(10))]
+
+
+def test_seules_les_seances_manquantes_sont_demandees(barres):
+    barres.history("AAPL", "2024-03-04", "2024-03-07")
+    barres.history("AAPL", "2024-03-04", "2024-03-12")
+    # La deuxième demande ne porte que sur les séances non couvertes, une troisième sur rien
+    assert barres.provider.demandes == [("2024-03-04", "2024-03-07"), ("2024-03-07", "2024-03-12")]
+    assert barres.missing_ranges("AAPL", "2024-03-02", "2024-03-12") == []
+    # Week-ends en bordure : plage réduite à ses séances
+    assert barres.missing_ranges("AAPL", "2024-02-24", "2024-03-04") == [(date(2024, 2, 26), date(2024, 3, 2))]
+
+
+def test_jours_futurs_jamais_demandes(barres):
+    assert barres.missing_ranges("AAPL", "2024-03-14", "2024-03-20") == []
+
+
+def test_seance_en_cours_gardee_pendant_le_ttl(barres, monkeypatch):
+    barres.history("AAPL", "2024-03-11", "2024-03-14")
+    assert barres.missing_ranges("AAPL", "2024-03-11", "2024-03-14") == []
+    # TTL écoulé : seule la séance du jour est redemandée, les précédentes sont figées
+    instant = cache.time.time()
+    monkeypatch.setattr(cache.time, "time", lambda: instant + barres.ttl + 1)
+    assert barres.missing_ranges("AAPL", "2024-03-11", "2024-03-14") == [(AUJOURD_HUI, date(2024, 3, 14))]
+
+
+def test_reponse_vide_sur_seance_non_memorisee(barres):
+    vide = barres.provider.history("AAPL", "2024-03-09", "2024-03-09")
+    barres.store("AAPL", vide, "2024-03-04", "2024-03-06")
+    assert barres.missing_ranges("AAPL", "2024-03-04", "2024-03-06") == [(date(2024, 3, 4), date(2024, 3, 6))]
+    # Week-end sans séance : la réponse vide est définitive
+    barres.store("AAPL", vide, "2024-03-09", "2024-03-11")
+    assert barres.missing_ranges("AAPL", "2024-03-09", "2024-03-11") == []
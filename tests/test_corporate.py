@@ -0,0 +1,96 @@
+"""Fractionnement pendant la détention : flux, balayage, surveillance et archive sur cours bruts"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis import corporate, stream, sweep
+from stock_analysis.archive import MinuteArchive
+from stock_analysis.corporate import AdjustmentFactors
+from stock_analysis.panel import PricePanel
+from stock_analysis.watch import Watcher
+
+# PLTR : 4 pour 1, date ex 2025-03-18 ; achat le 10, vente le 25
+SEANCES = pd.bdate_range("2025-03-10", "2025-03-25")
+CLOTURES = np.where(SEANCES < "2025-03-18", 100.0, 24.0)
+ATTENDU = 24.0 / (100.0 * 0.25) - 1
+
+
+class _Referentiel:
+    """Référentiel d'événements en mémoire"""
+
+    def lookup(self, tickers, background=True):
+        evenements = pd.DataFrame({
+            "date": pd.to_datetime(["2025-03-18"]), "dividende": [0.0],
+            "fractionnement": [4.0], "facteur_dividende": [1.0],
+        })
+        return {t: evenements if t == "PLTR" else evenements.iloc[:0] for t in tickers}
+
+
+@pytest.fixture(autouse=True)
+def referentiel(monkeypatch):
+    monkeypatch.setattr(corporate, "get_corporate_store", lambda: _Referentiel())
+
+
+def _quotidien():
+    hist = pd.DataFrame({"Open": CLOTURES, "Close": CLOTURES, "Volume": 1e6}, index=SEANCES)
+    hist.attrs.update(debut=date(2025, 3, 10), fin=date(2025, 3, 26))
+    return hist
+
+
+def _intraday():
+    index = pd.DatetimeIndex([j + pd.Timedelta(hours=9, minutes=30) for j in SEANCES]).tz_localize("America/New_York")
+    hist = pd.DataFrame({"Close": CLOTURES}, index=index)
+    hist.attrs.update(debut=date(2025, 3, 10), fin=date(2025, 3, 26))
+    return hist
+
+
+def test_flux_realise_a_travers_un_fractionnement(monkeypatch):
+    monkeypatch.setattr(stream, "load_panel", lambda *a, **k: PricePanel({"PLTR": _quotidien()}))
+    trades = pd.DataFrame([{"ticker": "PLTR", "date_achat": "2025-03-10", "date_vente": "2025-03-25",
+                            "montant": 1000.0}])
+    calcul = stream.process_chunk(trades, "realized")
+    assert calcul["valeur_vente"].iloc[0] == pytest.approx(1000 * (1 + ATTENDU))
+
+
+def test_flux_latent_a_travers_un_fractionnement(monkeypatch):
+    monkeypatch.setattr(stream, "load_panel", lambda *a, **k: PricePanel({"PLTR": _quotidien()}))
+    achats = pd.DataFrame([{"ticker": "PLTR", "date_achat": "2025-03-10", "montant": 1000.0}])
+    calcul = stream.process_chunk(achats, "unrealized", "2025-03-25")
+    assert calcul["valeur_actuelle"].iloc[0] == pytest.approx(1000 * (1 + ATTENDU))
+
+
+def test_balayage_a_travers_un_fractionnement(monkeypatch):
+    panels = {"1d": PricePanel({"PLTR": _quotidien()}), "5m": PricePanel({"PLTR": _intraday()}, interval="5m")}
+    monkeypatch.setattr(sweep, "load_panel", lambda *a, interval="1d", **k: panels[interval])
+    monkeypatch.setattr(sweep, "get_archive", lambda interval: type("Archive", (), {"fill": staticmethod(lambda p: p)}))
+    achats = [{"ticker": "PLTR", "date_achat": "2025-03-10", "montant": 1000.0}]
+    marche = sweep.load_market_arrays(achats, max_holding=11)
+    ligne = sweep.evaluate(marche.arrays(), sweep.encode_positions(achats, marche), 0.0, 11, "close")
+    assert ligne["positions"] == 1
+    assert ligne["rendement"] == pytest.approx(ATTENDU * 100)
+
+
+def test_surveillance_apres_fractionnement():
+    ledger = type("Ledger", (), {})()
+    ledger.positions = pd.DataFrame({"ticker": ["PLTR"], "actions": [10.0], "montant": [1000.0],
+                                     "date_achat": ["2025-03-10"]})
+    facteurs = AdjustmentFactors.load(["PLTR"]).factors(["PLTR"], ["2025-03-10"], "2025-03-25")
+    horloge = type("Feed", (), {"now": staticmethod(lambda: pd.Timestamp("2025-03-25 10:00", tz="America/New_York"))})
+    watcher = Watcher(ledger, horloge, factors=facteurs)
+    watcher.seed(pd.Series({"PLTR": 24.0}))
+    # 10 actions achetées à 100 : 40 après le 4 pour 1
+    assert watcher.snapshot()["valeur"] == pytest.approx(40 * 24.0)
+    assert watcher.snapshot()["rendement"] == pytest.approx(ATTENDU * 100)
+
+
+def test_archive_lue_ajustee(tmp_path, monkeypatch):
+    monkeypatch.setattr("stock_analysis.archive.market_today", lambda tz=None: date(2025, 3, 26))
+    archive = MinuteArchive("5m", root=str(tmp_path))
+    hist = _intraday().assign(Open=CLOTURES, High=CLOTURES, Low=CLOTURES, Volume=1000)
+    archive.append("PLTR", hist)
+    cible = pd.DatetimeIndex([pd.Timestamp("2025-03-10 09:30", tz="America/New_York")])
+    assert archive.lookup(["PLTR"], cible)["prix"].iloc[0] == 100.0
+    ajustee = archive.lookup(["PLTR"], cible, adjustments=AdjustmentFactors.load(["PLTR"]), as_of="2025-03-25")
+    assert ajustee["prix"].iloc[0] == pytest.approx(25.0)
@@ -0,0 +1,82 @@
+"""Séances par place de cotation : calendriers, cibles intraday, résolution des cours et cache"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.bars import session_targets
+from stock_analysis.cache import BarCache
+from stock_analysis.pnl import price_table, resolve_prices
+from stock_analysis.providers import SyntheticProvider
+from stock_analysis.sessions import get_calendar, next_sessions
+
+LONDRES = "Europe/London"
+
+
+def test_jours_feries_locaux():
+    # Thanksgiving : Londres et Paris cotent, New York est fermé
+    assert not get_calendar().is_session("2024-11-28")
+    assert get_calendar(LONDRES).is_session("2024-11-28")
+    assert get_calendar("Europe/Paris").is_session("2024-11-28")
+    # Bank holiday d'août, lundi de Pâques, 1er mai, Boxing Day
+    assert not get_calendar(LONDRES).is_session("2024-08-26")
+    assert get_calendar().is_session("2024-08-26")
+    assert not get_calendar("Europe/Paris").is_session("2024-04-01")
+    assert not get_calendar("Europe/Berlin").is_session("2024-05-01")
+    assert not get_calendar(LONDRES).is_session("2024-12-26")
+
+
+def test_bank_holidays_deplaces():
+    londres = get_calendar(LONDRES)
+    # 2022 : Spring bank holiday déplacé au 2 juin (jubilé), funérailles le 19 septembre
+    assert londres.is_session("2022-05-30")
+    assert not londres.is_session("2022-06-02")
+    assert not londres.is_session("2022-09-19")
+
+
+def test_horaires_et_demi_seances_locaux():
+    ouverture, cloture = get_calendar(LONDRES).session_bounds(pd.Timestamp("2024-12-24"))
+    assert (ouverture.hour, cloture.hour, cloture.minute) == (8, 12, 30)
+    ouverture, cloture = get_calendar("Europe/Paris").session_bounds(pd.Timestamp("2024-06-03"))
+    assert (ouverture.hour, cloture.hour, cloture.minute) == (9, 17, 30)
+
+
+def test_place_inconnue_refusee():
+    with pytest.raises(ValueError, match="Asia/Tokyo"):
+        get_calendar("Asia/Tokyo")
+
+
+def test_seances_par_ligne():
+    seances = next_sessions(["2024-11-28", "2024-11-28", "2024-11-28"], ["America/New_York", LONDRES, "Europe/Paris"])
+    assert list(seances.strftime("%Y-%m-%d")) == ["2024-11-29", "2024-11-28", "2024-11-28"]
+
+
+def test_cibles_a_l_heure_locale():
+    cibles = session_targets(["2024-11-28", "2024-11-28"], hours_after_open=2,
+                             timezones=["America/New_York", LONDRES])
+    # New York : séance suivante (29/11) à 11h30 ET ; Londres : le jour même à 10h00 locale
+    assert cibles[0] == pd.Timestamp("2024-11-29 11:30", tz="America/New_York")
+    assert cibles[1] == pd.Timestamp("2024-11-28 10:00", tz=LONDRES)
+
+
+def _barres(jours, tz, prix):
+    index = pd.DatetimeIndex(pd.to_datetime(jours)).tz_localize(tz)
+    return pd.DataFrame({"Open": prix, "High": prix, "Low": prix, "Close": prix, "Volume": 1000.0}, index=index)
+
+
+def test_cours_resolu_sur_la_seance_locale():
+    table = price_table({
+        "VOD.L": _barres(["2024-11-27", "2024-11-28", "2024-11-29"], LONDRES, [70.0, 71.0, 72.0]),
+        "AAPL": _barres(["2024-11-27", "2024-11-29"], "America/New_York", [230.0, 235.0]),
+    })
+    prix = resolve_prices(["VOD.L", "AAPL"], ["2024-11-28", "2024-11-28"], table)
+    np.testing.assert_array_equal(prix, [71.0, 235.0])
+
+
+def test_plages_manquantes_sur_le_calendrier_local(tmp_path):
+    cache = BarCache(path=str(tmp_path / "barres.sqlite"), provider=SyntheticProvider())
+    cache.store("VOD.L", _barres(["2024-11-18", "2024-11-19"], LONDRES, [70.0, 71.0]), "2024-11-18", "2024-11-20")
+    assert cache.timezone("VOD.L") == LONDRES
+    # Thanksgiving : séance à Londres, à demander ; un ticker new-yorkais n'a rien à demander
+    assert [(str(a), str(b)) for a, b in cache.missing_ranges("VOD.L", "2024-11-28", "2024-11-29")] \
+        == [("2024-11-28", "2024-11-29")]
+    assert cache.missing_ranges("AAPL", "2024-11-28", "2024-11-29") == []
@@ -0,0 +1,90 @@
+"""Prix d'exécution : VWAP et volatilité de fenêtre comparés à une boucle, interpolation et glissement"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.execution import BarIndex, SlippageModel, execution_prices, reconcile
+
+OUVERTURE = pd.Timestamp("2024-03-05 09:30", tz="America/New_York")
+
+
+def _minutes(rng, n=390, decalage=0):
+    index = pd.date_range(OUVERTURE + pd.Timedelta(minutes=decalage), periods=n, freq="1min")
+    cloture = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    ouverture = np.concatenate([[100.0], cloture[:-1]])
+    return pd.DataFrame({
+        "Open": ouverture, "High": np.maximum(ouverture, cloture) + 0.05,
+        "Low": np.minimum(ouverture, cloture) - 0.05, "Close": cloture,
+        "Volume": rng.integers(0, 5000, n).astype(float),
+    }, index=index)
+
+
+@pytest.fixture(scope="module")
+def barres():
+    rng = np.random.default_rng(1)
+    return {"AAA": _minutes(rng), "BBB": _minutes(rng, n=200, decalage=30)}
+
+
+def _fenetre_boucle(hist, t, avant, apres):
+    """VWAP, volume et σ recalculés barre par barre"""
+    rendements = np.diff(np.log(hist["Close"].to_numpy()), prepend=np.log(hist["Open"].iloc[0]))
+    dedans = (hist.index >= t - avant) & (hist.index < t + apres)
+    fenetre = hist[dedans]
+    typique = (fenetre["High"] + fenetre["Low"] + fenetre["Close"]) / 3
+    sigma = np.std(rendements[dedans], ddof=1) * np.sqrt(dedans.sum()) if dedans.sum() > 1 else np.nan
+    volume = fenetre["Volume"].sum()
+    vwap = (typique * fenetre["Volume"]).sum() / volume if volume > 0 else np.nan
+    return vwap, volume, sigma
+
+
+def test_vwap_et_sigma_identiques_a_la_boucle(barres):
+    rng = np.random.default_rng(2)
+    tickers = rng.choice(["AAA", "BBB"], 300)
+    horodatages = OUVERTURE + pd.to_timedelta(rng.integers(0, 420 * 60, 300), unit="s")
+    avant, apres = pd.Timedelta(minutes=3), pd.Timedelta(minutes=7)
+    fenetres = BarIndex(barres).window(tickers, horodatages, avant, apres)
+    for ticker, t, ligne in zip(tickers, horodatages, fenetres.itertuples(index=False)):
+        vwap, volume, sigma = _fenetre_boucle(barres[ticker], t, avant, apres)
+        assert ligne.volume == pytest.approx(volume)
+        if volume > 0:
+            assert ligne.vwap == pytest.approx(vwap)
+        np.testing.assert_allclose(ligne.sigma, sigma, rtol=1e-6, atol=1e-12)
+
+
+def test_interpolation_sur_le_chemin_open_close(barres):
+    hist = barres["AAA"]
+    debut, fin = hist.index[10], hist.index[10] + pd.Timedelta(minutes=1)
+    prix = BarIndex(barres).interpolate(["AAA"] * 3, pd.DatetimeIndex([debut, debut + pd.Timedelta(seconds=30), fin]))
+    ouverture, cloture = hist["Open"].iloc[10], hist["Close"].iloc[10]
+    np.testing.assert_allclose(prix, [ouverture, (ouverture + cloture) / 2, cloture])
+    # Avant les barres du ticker et ticker inconnu : NaN
+    hors = BarIndex(barres).interpolate(["BBB", "ZZZ"], pd.DatetimeIndex([OUVERTURE, OUVERTURE]))
+    assert np.isnan(hors).all()
+
+
+def test_glissement_signe_par_le_sens(barres):
+    modele = SlippageModel(half_spread_bps=2.0, impact=0.5)
+    assert modele.cost_bps([0], [1000], [0.01])[0] == 2.0
+    assert modele.cost_bps([250], [1000], [0.01])[0] == pytest.approx(2.0 + 0.5 * 0.01 * 0.5 * 1e4)
+    # Participation bornée, volume nul
+    assert modele.cost_bps([5000], [0], [0.01])[0] == pytest.approx(2.0 + 0.5 * 0.01 * 1e4)
+
+    t = OUVERTURE + pd.Timedelta(minutes=100)
+    prix = execution_prices(barres, ["AAA", "AAA"], pd.DatetimeIndex([t, t]), quantities=[100, 100],
+                            sides=["achat", "vente"], slippage=modele)
+    reference, glissement = prix["prix_reference"].iloc[0], prix["glissement_bps"].iloc[0]
+    assert glissement > 2.0
+    np.testing.assert_allclose(prix["prix_execution"], reference * (1 + np.array([1, -1]) * glissement / 1e4))
+
+
+def test_rapprochement_ecart_en_points_de_base(barres):
+    t = OUVERTURE + pd.Timedelta(minutes=60)
+    sans_cout = SlippageModel(0.0, 0.0)
+    modele = execution_prices(barres, ["AAA"], pd.DatetimeIndex([t]), method="nearest",
+                              slippage=sans_cout)["prix_execution"].iloc[0]
+    executions = pd.DataFrame({"ticker": ["AAA", "AAA"], "horodatage": [t, t], "sens": ["buy", "sell"],
+                               "prix": [modele * 1.001, modele * 1.001]})
+    ecarts = reconcile(executions, barres, method="nearest", slippage=sans_cout)["ecart_bps"]
+    np.testing.assert_allclose(ecarts, [10.0, -10.0])
+    with pytest.raises(ValueError, match="Méthode inconnue"):
+        execution_prices(barres, ["AAA"], pd.DatetimeIndex([t]), method="twap")
@@ -0,0 +1,90 @@
+"""Pool de requêtes : erreurs retentées, backoff, déduplication"""
+import threading
+
+import pytest
+import requests
+from curl_cffi import CurlError
+from curl_cffi.requests import exceptions as curl_exceptions
+
+from stock_analysis import fetch
+from stock_analysis.fetch import FetchPool, is_retryable
+
+
+class _ReponseHttp(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.status_code = code
+
+
+@pytest.mark.parametrize("erreur, attendu", [
+    (requests.exceptions.ConnectionError("connexion refusée"), True),
+    (requests.exceptions.ReadTimeout("délai"), True),
+    (requests.exceptions.ChunkedEncodingError("coupure"), True),
+    (curl_exceptions.ConnectionError("connexion"), True),
+    (curl_exceptions.Timeout("délai"), True),
+    (CurlError("Failed to connect", code=7), True),
+    (CurlError("Bad URL", code=3), False),
+    (ConnectionResetError(), True),
+    (TimeoutError(), True),
+    (_ReponseHttp(429), True),
+    (_ReponseHttp(503), True),
+    (_ReponseHttp(404), False),
+    (requests.exceptions.InvalidURL("url"), False),
+    (ValueError("réponse invalide"), False),
+])
+def test_is_retryable(erreur, attendu):
+    assert is_retryable(erreur) is attendu
+
+
+@pytest.fixture
+def attentes(monkeypatch):
+    """Attentes du backoff relevées au lieu d'être dormies (plafond du jitter)"""
+    relevees = []
+    monkeypatch.setattr(fetch.random, "uniform", lambda a, b: b)
+    monkeypatch.setattr(fetch.time, "sleep", relevees.append)
+    return relevees
+
+
+def test_connexion_requests_retentee_avec_backoff(attentes):
+    pool = FetchPool(max_workers=1, rate=0, retries=5, base_delay=0.5, max_delay=1.5)
+    appels = []
+
+    def requete():
+        appels.append(1)
+        if len(appels) < 4:
+            raise requests.exceptions.ConnectionError("Connection aborted")
+        return "ok"
+
+    assert pool.run(("history", "AAA"), requete) == "ok"
+    assert len(appels) == 4
+    # Backoff exponentiel plafonné à max_delay
+    assert attentes == [0.5, 1.0, 1.5]
+    pool.shutdown()
+
+
+def test_abandon_apres_les_tentatives_et_erreur_definitive(attentes):
+    pool = FetchPool(max_workers=1, rate=0, retries=3, base_delay=0.1)
+    with pytest.raises(requests.exceptions.Timeout):
+        pool.run("a", lambda: (_ for _ in ()).throw(requests.exceptions.Timeout("délai")))
+    assert len(attentes) == 2
+    appels = []
+    with pytest.raises(ValueError):
+        pool.run("b", lambda: appels.append(1) or (_ for _ in ()).throw(ValueError("404")))
+    assert len(appels) == 1
+    pool.shutdown()
+
+
+def test_requetes_identiques_partagent_le_future():
+    pool = FetchPool(max_workers=4, rate=0)
+    bloque, appels = threading.Event(), []
+
+    def requete():
+        appels.append(1)
+        bloque.wait(5)
+        return len(appels)
+
+    futures = [pool.submit(("info", "AAA"), requete) for _ in range(10)]
+    bloque.set()
+    assert {f.result() for f in futures} == {1}
+    assert len(appels) == 1
+    pool.shutdown()
@@ -0,0 +1,41 @@
+"""Recherche des taux de change : barres quotidiennes horodatées à Londres"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.fx import FxRates
+
+
+def _taux(dates, valeurs, tz="Europe/London"):
+    """FxRates d'une paire USD -> EUR, barres quotidiennes à minuit `tz` (comme Yahoo)"""
+    barres = pd.DataFrame({"Close": valeurs}, index=pd.DatetimeIndex(dates, tz=tz))
+    return FxRates.from_panel({"USDEUR=X": barres}, {"USD": "USDEUR=X"},
+                              currencies=pd.Series({"AAPL": "USD", "SAP.DE": "EUR"}))
+
+
+def test_barre_londres_du_jour_meme():
+    fx = _taux(["2024-03-04", "2024-03-05", "2024-03-06"], [0.91, 0.92, 0.93])
+    np.testing.assert_allclose(fx.rate(["USD"] * 3, ["2024-03-04", "2024-03-05", "2024-03-06"]), [0.91, 0.92, 0.93])
+
+
+def test_barre_londres_heure_ete():
+    # Minuit à Londres en été : 23h UTC la veille
+    fx = _taux(["2024-07-01", "2024-07-02"], [0.90, 0.95])
+    assert fx.rate(["USD"], "2024-07-02")[0] == pytest.approx(0.95)
+    assert fx.rate(["USD"], "2024-07-01")[0] == pytest.approx(0.90)
+
+
+def test_jour_non_cote_et_horodatage_new_york():
+    fx = _taux(["2024-03-08", "2024-03-11"], [0.92, 0.93])
+    # Week-end : taux de la veille cotée ; avant la première barre : NaN
+    np.testing.assert_allclose(fx.rate(["USD", "USD"], ["2024-03-10", "2024-03-07"]), [0.92, np.nan])
+    # Horodatage intraday à New York ramené à son jour
+    quand = pd.Timestamp("2024-03-11 15:30", tz="America/New_York")
+    assert fx.rate(["USD"], quand)[0] == pytest.approx(0.93)
+
+
+def test_devise_de_base_et_devise_absente():
+    fx = _taux(["2024-03-04"], [0.92])
+    np.testing.assert_allclose(fx.ticker_rates(["AAPL", "SAP.DE"], "2024-03-05"), [0.92, 1.0])
+    # Pas de paire GBP chargée : NaN
+    assert np.isnan(fx.rate(["GBp"], "2024-03-05")[0])
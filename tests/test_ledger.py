@@ -0,0 +1,80 @@
+"""Grand livre des positions : resynchronisation après modification et revalorisation incrémentale"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis import pnl
+from stock_analysis.ledger import PositionLedger
+
+PRIX_ACHAT = {("AAA", "2024-03-04"): 50.0, ("AAA", "2024-03-05"): 40.0, ("BBB", "2024-03-04"): 200.0}
+ACHATS = [
+    {"ticker": "AAA", "date_achat": "2024-03-04", "montant": 1000.0},
+    {"ticker": "AAA", "date_achat": "2024-03-04", "montant": 1000.0},
+    {"ticker": "AAA", "date_achat": "2024-03-05", "montant": 400.0},
+    {"ticker": "BBB", "date_achat": "2024-03-04", "montant": 500.0},
+]
+
+
+class _Prix:
+    """price_fn qui note les achats dont on lui demande le prix"""
+
+    def __init__(self, prix=PRIX_ACHAT):
+        self.prix = prix
+        self.demandes = []
+
+    def __call__(self, nouveaux):
+        self.demandes.append(len(nouveaux))
+        return [self.prix.get((t, d), np.nan) for t, d in zip(nouveaux["ticker"], nouveaux["date_achat"])]
+
+
+@pytest.fixture
+def chemin(tmp_path):
+    return str(tmp_path / "positions.sqlite")
+
+
+def test_prix_figes_entre_deux_executions(chemin):
+    prix = _Prix()
+    assert PositionLedger("test", chemin).sync(ACHATS, prix) == 4
+    ledger = PositionLedger("test", chemin)
+    assert ledger.sync(ACHATS, prix) == 0
+    assert prix.demandes == [4]
+    assert list(ledger.positions["actions"]) == [20.0, 20.0, 10.0, 2.5]
+
+
+def test_resynchronisation_apres_modification(chemin):
+    prix = _Prix()
+    ledger = PositionLedger("test", chemin)
+    ledger.sync(ACHATS, prix)
+    # Montant modifié, achat retiré : l'ancienne position disparaît, seule la nouvelle est valorisée
+    modifies = [dict(ACHATS[0], montant=1500.0), ACHATS[1], ACHATS[2]]
+    assert ledger.sync(modifies, prix) == 1
+    assert prix.demandes == [4, 1]
+    assert sorted(ledger.positions["montant"]) == [400.0, 1000.0, 1500.0]
+    assert "BBB" not in ledger.tickers
+    assert len(PositionLedger("test", chemin)) == 3
+    # Les autres stratégies du même fichier ne sont pas touchées
+    assert PositionLedger("autre", chemin).sync(ACHATS[3:], prix) == 1
+    assert len(PositionLedger("test", chemin)) == 3
+
+
+def test_achat_sans_prix_retente(chemin):
+    ledger = PositionLedger("test", chemin)
+    achats = ACHATS + [{"ticker": "CCC", "date_achat": "2024-03-04", "montant": 100.0}]
+    assert ledger.sync(achats, _Prix()) == 4
+    assert ledger.sync(achats, _Prix({**PRIX_ACHAT, ("CCC", "2024-03-04"): 10.0})) == 1
+
+
+def test_revalorisation_identique_au_calcul_complet(chemin):
+    ledger = PositionLedger("test", chemin)
+    ledger.sync(ACHATS, _Prix())
+    actuels = pd.Series({"AAA": 55.0, "BBB": 180.0})
+    revalue = ledger.revalue(actuels)
+
+    achats = pd.DataFrame(ACHATS).assign(prix_achat=[50.0, 50.0, 40.0, 200.0])
+    table = pd.DataFrame({"ticker": ["AAA", "BBB"], "date": pd.to_datetime(["2024-03-08"] * 2), "prix": [55.0, 180.0]})
+    complet = pnl.compute_unrealized(achats, table, "2024-03-08")
+    for colonne in ("valeur_actuelle", "plus_value", "pourcentage", "position", "nb_positions"):
+        np.testing.assert_allclose(revalue[colonne], complet[colonne])
+    totaux = ledger.ticker_totals(actuels)
+    pd.testing.assert_frame_equal(totaux.sort_index(), pnl.ticker_totals(complet).sort_index(),
+                                  check_dtype=False, check_names=False)
@@ -0,0 +1,102 @@
+"""Appariement des lots (FIFO, LIFO, coût moyen) comparé à une file naïve"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.lots import match_lots
+
+
+def _executions(rng, n=60, tickers=("AAA", "BBB", "CCC")):
+    """Exécutions aléatoires, horodatages distincts, ventes parfois au-delà de la position"""
+    return pd.DataFrame({
+        "ticker": rng.choice(tickers, n),
+        "horodatage": pd.Timestamp("2024-01-02 10:00") + pd.to_timedelta(rng.permutation(n) * 37, unit="h"),
+        "sens": rng.choice(["achat", "achat", "vente"], n),
+        "quantite": rng.integers(1, 20, n).astype(float) / rng.choice([1, 4], n),
+        "prix": rng.uniform(10, 200, n).round(2),
+    })
+
+
+def _reference(fills, lifo=False, moyen=False):
+    """File de lots en Python pur : (appariements, lots ouverts, excédents par ticker)"""
+    appariements, ouverts, excedents = [], [], {}
+    fills = fills.sort_values(["ticker", "horodatage"], kind="stable")
+    for ticker, lignes in fills.groupby("ticker", sort=True):
+        file, moyenne = deque(), 0.0
+        for e in lignes.itertuples(index=False):
+            if e.sens == "achat":
+                detenu = sum(q for _, q, _ in file)
+                moyenne = (moyenne * detenu + e.prix * e.quantite) / (detenu + e.quantite)
+                file.append([e.horodatage, e.quantite, e.prix])
+                continue
+            reste = e.quantite
+            while reste > 1e-9 and file:
+                lot = file[-1] if lifo else file[0]
+                q = min(reste, lot[1])
+                revient = moyenne if moyen else lot[2]
+                appariements.append((ticker, lot[0], e.horodatage, q, (e.prix - revient) * q))
+                lot[1] -= q
+                reste -= q
+                if lot[1] <= 1e-9:
+                    file.pop() if lifo else file.popleft()
+            if reste > 1e-9:
+                excedents[ticker] = excedents.get(ticker, 0.0) + reste
+        ouverts.extend((ticker, date, q) for date, q, _ in file)
+    return appariements, ouverts, excedents
+
+
+@pytest.mark.parametrize("methode", ["fifo", "lifo", "average"])
+@pytest.mark.parametrize("graine", range(25))
+def test_match_lots_reference(methode, graine):
+    fills = _executions(np.random.default_rng(graine))
+    livre = match_lots(fills, methode)
+    appariements, ouverts, excedents = _reference(fills, lifo=methode == "lifo", moyen=methode == "average")
+
+    attendus = pd.DataFrame(appariements, columns=["ticker", "date_achat", "date_vente", "quantite", "plus_value"])
+    obtenus = livre.realized[attendus.columns]
+    cles = ["ticker", "date_vente", "date_achat"]
+    attendus = attendus.sort_values(cles, ignore_index=True)
+    obtenus = obtenus.sort_values(cles, ignore_index=True)
+    pd.testing.assert_frame_equal(obtenus[cles], attendus[cles], check_dtype=False)
+    np.testing.assert_allclose(obtenus["quantite"], attendus["quantite"])
+    np.testing.assert_allclose(obtenus["plus_value"], attendus["plus_value"], atol=1e-6)
+
+    lots = livre.open_lots.sort_values(["ticker", "date_achat"], ignore_index=True)
+    attendus = pd.DataFrame(ouverts, columns=["ticker", "date_achat", "quantite"]).sort_values(
+        ["ticker", "date_achat"], ignore_index=True)
+    assert lots["ticker"].tolist() == attendus["ticker"].tolist()
+    assert lots["date_achat"].tolist() == attendus["date_achat"].tolist()
+    np.testing.assert_allclose(lots["quantite"], attendus["quantite"])
+
+    decouvert = livre.uncovered.groupby("ticker")["quantite"].sum().to_dict()
+    assert decouvert.keys() == excedents.keys()
+    np.testing.assert_allclose([decouvert[t] for t in sorted(decouvert)], [excedents[t] for t in sorted(excedents)])
+
+
+def test_vente_partielle():
+    fills = pd.DataFrame({
+        "ticker": ["AAA"] * 3,
+        "horodatage": pd.to_datetime(["2024-01-02", "2024-01-03", "2024-01-04"]),
+        "sens": ["achat", "achat", "vente"],
+        "quantite": [10.0, 10.0, 15.0],
+        "prix": [100.0, 110.0, 120.0],
+    })
+    fifo = match_lots(fills, "fifo")
+    assert fifo.realized["quantite"].tolist() == [10.0, 5.0]
+    assert fifo.realized["plus_value"].sum() == pytest.approx(10 * 20 + 5 * 10)
+    assert fifo.open_lots["quantite"].tolist() == [5.0]
+    assert fifo.open_lots["prix_achat"].tolist() == [110.0]
+
+    lifo = match_lots(fills, "lifo")
+    assert lifo.realized["plus_value"].sum() == pytest.approx(10 * 10 + 5 * 20)
+    assert lifo.open_lots["prix_achat"].tolist() == [100.0]
+
+    moyen = match_lots(fills, "average")
+    assert moyen.realized["plus_value"].sum() == pytest.approx(15 * (120 - 105))
+
+
+def test_methode_inconnue():
+    with pytest.raises(ValueError):
+        match_lots(pd.DataFrame(columns=["ticker", "horodatage", "sens", "quantite", "prix"]), "hifo")
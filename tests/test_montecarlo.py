@@ -0,0 +1,73 @@
+"""Monte-Carlo : tirages comparés à une simulation chemin par chemin, graines, loi normale et VaR"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.montecarlo import log_returns, simulate
+
+VALEURS = pd.Series({"AAA": 6000.0, "BBB": 3000.0, "CCC": 1000.0})
+
+
+@pytest.fixture(scope="module")
+def rendements():
+    rng = np.random.default_rng(6)
+    return pd.DataFrame(rng.normal(0.0005, 0.02, (40, 3)), columns=list(VALEURS.index))
+
+
+def _chemins_boucle(rendements, valeurs, n, horizons, seed):
+    """Même tirage que le paquet unique de simulate(), sommé séance par séance"""
+    graine = np.random.SeedSequence(seed).spawn(1)[0]
+    tirages = np.random.default_rng(graine).integers(0, len(rendements), size=(n, max(horizons)))
+    resultat = np.empty((n, len(horizons)))
+    for i in range(n):
+        cumul = np.cumsum(rendements[tirages[i]], axis=0)
+        for k, h in enumerate(horizons):
+            resultat[i, k] = np.exp(cumul[h - 1]) @ valeurs / valeurs.sum() - 1
+    return resultat
+
+
+def test_bootstrap_identique_a_la_boucle(rendements):
+    # Horizon 100 plus long que les 40 séances d'historique : sommes par comptes de tirages
+    horizons = [1, 5, 100]
+    simulation = simulate(VALEURS, rendements, paths=300, horizons=horizons, seed=12, workers=1)
+    attendu = _chemins_boucle(rendements.to_numpy(), VALEURS.to_numpy(), 300, horizons, 12)
+    np.testing.assert_allclose(simulation.returns, attendu, rtol=1e-9, atol=1e-12)
+
+
+def test_graine_independante_des_processus(rendements):
+    arguments = dict(paths=2000, horizons=(1, 21), method="block", seed=3, chunk_size=400)
+    seul = simulate(VALEURS, rendements, workers=1, **arguments)
+    pool = simulate(VALEURS, rendements, workers=2, **arguments)
+    np.testing.assert_array_equal(seul.returns, pool.returns)
+    assert len(seul) == 2000 and seul.sessions == 40
+    assert not np.array_equal(seul.returns, simulate(VALEURS, rendements, workers=1, **dict(arguments, seed=4)).returns)
+
+
+def test_loi_normale_moments(rendements):
+    simulation = simulate(VALEURS[["AAA"]], rendements, paths=50_000, horizons=(10,), method="normal", seed=1, workers=1)
+    log_valeur = np.log1p(simulation.returns[:, 0])
+    assert log_valeur.mean() == pytest.approx(10 * rendements["AAA"].mean(), abs=0.002)
+    assert log_valeur.std() == pytest.approx(np.sqrt(10) * rendements["AAA"].std(), rel=0.02)
+
+
+def test_var_cvar_et_ticker_sans_historique(rendements):
+    valeurs = pd.concat([VALEURS, pd.Series({"DDD": 10000.0})])
+    simulation = simulate(valeurs, rendements, paths=5000, horizons=(5,), seed=2, workers=1)
+    resume = simulation.summary(levels=(0.95,)).iloc[0]
+    r = simulation.returns[:, 0]
+    seuil = np.quantile(r, 0.05)
+    assert resume["var_95"] == pytest.approx(-seuil * 20000.0)
+    assert resume["cvar_95"] == pytest.approx(-r[r <= seuil].mean() * 20000.0)
+    assert resume["cvar_95"] >= resume["var_95"]
+    # DDD sans historique garde sa valeur : la moitié du portefeuille ne bouge pas
+    seul = simulate(VALEURS, rendements, paths=5000, horizons=(5,), seed=2, workers=1)
+    np.testing.assert_allclose(r, seul.returns[:, 0] / 2)
+
+
+def test_rendements_et_erreurs():
+    clotures = pd.DataFrame({"AAA": [10.0, 11.0, np.nan, 12.1], "BBB": [np.nan, 5.0, 5.0, 4.0]})
+    np.testing.assert_allclose(log_returns(clotures), [[np.log(1.1), 0.0], [0.0, 0.0], [np.log(1.1), np.log(0.8)]])
+    with pytest.raises(ValueError, match="Méthode inconnue"):
+        simulate(VALEURS, log_returns(clotures), method="garch")
+    with pytest.raises(ValueError, match="Aucune position"):
+        simulate(pd.Series({"AAA": 0.0}), log_returns(clotures))
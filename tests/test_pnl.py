@@ -0,0 +1,86 @@
+"""Moteur P&L vectorisé comparé à l'ancienne boucle ligne par ligne de main.py"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.pnl import compute_realized, compute_unrealized, portfolio_totals, price_table, ticker_totals
+from stock_analysis.sessions import get_calendar
+
+TICKERS = ["AAA", "BBB", "CCC"]
+
+
+@pytest.fixture(scope="module")
+def historiques():
+    rng = np.random.default_rng(3)
+    seances = get_calendar().sessions_in_range("2024-01-02", "2024-07-01")
+    frames = {}
+    for ticker in TICKERS:
+        index = seances.tz_localize("America/New_York")
+        clotures = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(index))))
+        frames[ticker] = pd.DataFrame({"Close": clotures}, index=index)
+    return frames
+
+
+def _cours_boucle(hist, date):
+    """Ancienne recherche de main.py : date exacte, sinon première barre suivante, sinon dernière"""
+    hist = hist.tz_localize(None)
+    cible = pd.Timestamp(date)
+    if cible in hist.index:
+        return hist.loc[cible, "Close"]
+    suivantes = hist.index[hist.index >= cible]
+    return hist.loc[suivantes[0], "Close"] if len(suivantes) else hist["Close"].iloc[-1]
+
+
+def _transactions(rng, n=200):
+    achats = pd.Timestamp("2024-01-02") + pd.to_timedelta(rng.integers(0, 120, n), unit="D")
+    return pd.DataFrame({
+        "ticker": rng.choice(TICKERS, n),
+        "date_achat": achats.strftime("%Y-%m-%d"),
+        "date_vente": (achats + pd.to_timedelta(rng.integers(0, 40, n), unit="D")).strftime("%Y-%m-%d"),
+        "montant": rng.choice([500.0, 1000.0, 2500.0], n),
+    })
+
+
+def test_realise_identique_a_la_boucle(historiques):
+    trades = _transactions(np.random.default_rng(7))
+    calcul = compute_realized(trades, price_table(historiques))
+    assert calcul["valide"].all()
+    for t, ligne in zip(trades.itertuples(index=False), calcul.itertuples(index=False)):
+        prix_achat = _cours_boucle(historiques[t.ticker], t.date_achat)
+        prix_vente = _cours_boucle(historiques[t.ticker], t.date_vente)
+        actions = t.montant / prix_achat
+        assert ligne.prix_achat == prix_achat and ligne.prix_vente == prix_vente
+        assert ligne.actions == pytest.approx(actions)
+        assert ligne.gain == pytest.approx(actions * prix_vente - t.montant)
+        assert ligne.pourcentage == pytest.approx((actions * prix_vente - t.montant) / t.montant * 100)
+
+
+def test_latent_valorise_au_dernier_cours_connu(historiques):
+    achats = _transactions(np.random.default_rng(11), n=50).drop(columns="date_vente")
+    # Date d'évaluation après la dernière barre : repli sur la dernière clôture
+    calcul = compute_unrealized(achats, price_table(historiques), "2024-07-15")
+    derniers = {t: historiques[t]["Close"].iloc[-1] for t in TICKERS}
+    np.testing.assert_array_equal(calcul["prix_actuel"], achats["ticker"].map(derniers))
+    valeurs = achats["montant"] / calcul["prix_achat"] * calcul["prix_actuel"]
+    np.testing.assert_allclose(calcul["valeur_actuelle"], valeurs)
+    totaux = portfolio_totals(calcul)
+    assert totaux["valeur"] == pytest.approx(valeurs.sum())
+    assert totaux["investi"] == achats["montant"].sum()
+
+
+def test_seance_sans_cours_invalide(historiques):
+    # Cours manquant le jour de l'achat : la ligne est invalide au lieu de prendre un autre jour
+    troue = dict(historiques, AAA=historiques["AAA"].drop(pd.Timestamp("2024-03-04", tz="America/New_York")))
+    trades = pd.DataFrame({"ticker": ["AAA", "BBB"], "date_achat": ["2024-03-04", "2024-03-04"],
+                           "date_vente": ["2024-03-08", "2024-03-08"], "montant": [1000.0, 1000.0]})
+    calcul = compute_realized(trades, price_table(troue))
+    assert list(calcul["valide"]) == [False, True]
+    assert list(ticker_totals(calcul, "valeur_vente").index) == ["BBB"]
+
+
+def test_aller_retour_au_meme_prix_nul(historiques):
+    trades = pd.DataFrame({"ticker": ["CCC"] * 3, "date_achat": ["2024-02-05"] * 3,
+                           "date_vente": ["2024-02-05"] * 3, "montant": [1000.0, 333.0, 0.1]})
+    calcul = compute_realized(trades, price_table(historiques))
+    assert (calcul["gain"] == 0).all()
+    assert list(calcul["position"]) == [1, 2, 3] and (calcul["nb_positions"] == 3).all()
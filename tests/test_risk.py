@@ -0,0 +1,72 @@
+"""Suivi de risque : état incrémental identique au recalcul complet, fenêtres glissantes"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.risk import RiskTracker
+from stock_analysis.sessions import get_calendar
+
+SEANCES = get_calendar().sessions_in_range("2024-01-02", "2024-12-31")
+POSITIONS = pd.DataFrame({
+    "ticker": ["AAA", "BBB", "AAA", "CCC"],
+    "date_achat": ["2024-01-03", "2024-02-10", "2024-04-02", "2024-05-06"],
+    "date_vente": ["2024-09-03", None, None, "2024-07-01"],
+    "actions": [10.0, 5.0, 4.0, 20.0],
+    "montant": [1000.0, 1000.0, 500.0, 1000.0],
+})
+
+
+@pytest.fixture(scope="module")
+def clotures():
+    rng = np.random.default_rng(4)
+    return pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.015, (len(SEANCES), 4)), axis=0)),
+                        index=SEANCES, columns=["AAA", "BBB", "CCC", "SPY"])
+
+
+def _suivi(positions, clotures, jusqu_a=None):
+    suivi = RiskTracker(window=20)
+    suivi.update(positions, clotures.drop(columns="SPY"), clotures["SPY"], until=jusqu_a)
+    return suivi
+
+
+def test_incremental_identique_au_recalcul_complet(clotures, tmp_path):
+    chemin = str(tmp_path / "risque.npz")
+    _suivi(POSITIONS, clotures, "2024-06-14").save(chemin)
+    suivi = RiskTracker.load(chemin, window=20)
+    assert suivi.start_date(POSITIONS) == pd.Timestamp("2024-06-14")
+    ajoutees = suivi.update(POSITIONS, clotures.drop(columns="SPY"), clotures["SPY"])
+    assert ajoutees == len(SEANCES[SEANCES >= "2024-06-14"])
+
+    complet = _suivi(POSITIONS, clotures)
+    pd.testing.assert_frame_equal(suivi.series(), complet.series(), rtol=1e-9)
+    pd.testing.assert_frame_equal(suivi.contributions(), complet.contributions(), rtol=1e-9)
+    resume, attendu = suivi.summary(), complet.summary()
+    for cle, valeur in attendu.items():
+        assert resume[cle] == (valeur if isinstance(valeur, pd.Timestamp) else pytest.approx(valeur)), cle
+
+
+def test_achat_antidate_impose_un_recalcul(clotures):
+    suivi = _suivi(POSITIONS, clotures, "2024-06-14")
+    antidate = pd.concat([POSITIONS, pd.DataFrame([{"ticker": "BBB", "date_achat": "2024-03-01", "date_vente": None,
+                                                    "actions": 2.0, "montant": 200.0}])], ignore_index=True)
+    assert suivi.start_date(antidate) == pd.Timestamp("2024-01-03")
+    suivi.update(antidate, clotures.drop(columns="SPY"), clotures["SPY"])
+    pd.testing.assert_frame_equal(suivi.series(), _suivi(antidate, clotures).series(), rtol=1e-9)
+
+
+def test_fenetres_glissantes_identiques_a_pandas(clotures):
+    serie = _suivi(POSITIONS, clotures).series()
+    rendement, indice = serie["rendement"], serie["rendement_indice"]
+    np.testing.assert_allclose(serie["volatilite"], rendement.rolling(20).std() * np.sqrt(252), rtol=1e-6)
+    np.testing.assert_allclose(serie["beta"], rendement.rolling(20).cov(indice) / indice.rolling(20).var(), rtol=1e-6)
+    np.testing.assert_allclose(serie["drawdown"], serie["nav"] / np.maximum(serie["nav"].cummax(), 1.0) - 1)
+
+
+def test_valeur_et_pnl_du_portefeuille(clotures):
+    serie = _suivi(POSITIONS, clotures).series()
+    jour = pd.Timestamp("2024-06-03")
+    # AAA : 10 + 4 actions, BBB : 5, CCC : 20 (vendues le 1er juillet)
+    attendu = 14 * clotures.at[jour, "AAA"] + 5 * clotures.at[jour, "BBB"] + 20 * clotures.at[jour, "CCC"]
+    assert serie.at[jour, "valeur"] == pytest.approx(attendu)
+    # P&L cumulé = valeur finale + produits des ventes - apports
+    assert serie["pnl"].sum() == pytest.approx(serie["valeur"].iloc[-1] - serie["flux"].sum())
@@ -0,0 +1,81 @@
+"""Filtre d'univers : critères, indicateurs vectorisés comparés à pandas et passe complète sur le cache"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis import cache, screener
+from stock_analysis.cache import BarCache
+from stock_analysis.providers import SyntheticProvider
+from stock_analysis.screener import Indicators, evaluate, parse_criterion, parse_term, price_matrices
+
+
+@pytest.fixture(scope="module")
+def matrices():
+    rng = np.random.default_rng(8)
+    n, k = 300, 6
+    cloture = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (n, k)), axis=0))
+    cloture[:40, 5] = np.nan  # Introduction en bourse tardive
+    ouverture = cloture * (1 + rng.normal(0, 0.005, (n, k)))
+    return {"Open": ouverture, "High": np.fmax(ouverture, cloture) * 1.01, "Low": np.fmin(ouverture, cloture) * 0.99,
+            "Close": cloture, "Volume": rng.integers(1000, 10000, (n, k)).astype(float)}
+
+
+def test_analyse_des_criteres():
+    assert parse_criterion("sma(50) crosses_above sma(200)") == (("sma", 50), "crosses_above", ("sma", 200))
+    assert parse_criterion("RSI < 30") == (("rsi", 14), "<", ("nombre", 30.0))
+    assert parse_term("high52") == ("high52", None)
+    for invalide in ("close(3)", "macd(12)", "sma(0)"):
+        with pytest.raises(ValueError):
+            parse_term(invalide)
+    with pytest.raises(ValueError, match="Critère invalide"):
+        parse_criterion("close = 3")
+
+
+def test_indicateurs_identiques_a_pandas(matrices):
+    indicateurs = Indicators(matrices)
+    cloture = pd.DataFrame(matrices["Close"])
+    volume = pd.DataFrame(matrices["Volume"])
+    np.testing.assert_allclose(indicateurs(("sma", 20)), cloture.rolling(20).mean(), rtol=1e-10)
+    np.testing.assert_allclose(indicateurs(("ema", 10)), cloture.ewm(span=10, adjust=False).mean(), rtol=1e-10)
+    np.testing.assert_allclose(indicateurs(("relvol", 5)), volume / volume.rolling(5).mean().shift(), rtol=1e-10)
+    np.testing.assert_allclose(indicateurs(("change", 3)), cloture.pct_change(3, fill_method=None) * 100, rtol=1e-10)
+    high52 = pd.DataFrame(matrices["High"]).rolling(252, min_periods=1).max()
+    np.testing.assert_allclose(indicateurs(("high52", None)), high52, rtol=1e-12)
+
+    # RSI de Wilder : moyennes lissées en 1/n, amorcées sur la première variation
+    variation = cloture.diff()
+    hausses = variation.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    baisses = (-variation).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    np.testing.assert_allclose(indicateurs(("rsi", 14))[1:], (100 - 100 / (1 + hausses / baisses))[1:], rtol=1e-8)
+
+
+def test_croisements_a_la_derniere_seance():
+    cloture = np.array([[10.0, 10.0, 10.0], [9.0, 11.0, 9.0], [11.0, 9.0, np.nan]])
+    matrices = {c: cloture for c in ("Open", "High", "Low", "Close")} | {"Volume": np.ones_like(cloture)}
+    indicateurs = Indicators(matrices)
+    dessus = evaluate(indicateurs, [parse_criterion("close crosses_above 10")])
+    dessous = evaluate(indicateurs, [parse_criterion("close crosses_below 10")])
+    # Le troisième ticker n'a pas de barre à la séance évaluée : jamais retenu
+    assert list(dessus) == [True, False, False] and list(dessous) == [False, True, False]
+
+
+def test_matrices_alignees_sur_les_seances_locales():
+    seances = np.array(["2024-03-04", "2024-03-05"], dtype="datetime64[D]")
+    ts = [pd.Timestamp("2024-03-05", tz="Asia/Tokyo").value, pd.Timestamp("2024-03-04", tz="America/New_York").value]
+    barres = pd.DataFrame({"ticker": ["7203.T", "AAPL"], "ts": ts,
+                           "Open": [1.0, 2.0], "High": 1.0, "Low": 1.0, "Close": [3.0, 4.0], "Volume": 1.0})
+    fuseaux = pd.Series({"7203.T": "Asia/Tokyo", "AAPL": "America/New_York"})
+    cloture = price_matrices(barres, fuseaux, ["AAPL", "7203.T"], seances)["Close"]
+    # Minuit à Tokyo le 5 est le 4 en UTC : la barre reste sur la séance du 5
+    np.testing.assert_array_equal(cloture, [[4.0, np.nan], [np.nan, 3.0]])
+
+
+def test_passe_complete_sur_le_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "_cache_defaut", BarCache(path=str(tmp_path / "barres.sqlite"), provider=SyntheticProvider()))
+    tickers = ["AAA", "BBB", "CCC", "DDD"]
+    resultat = screener.screen(tickers, ["close > 0", "volume > 0"], as_of="2024-06-14", rank="change(5)", adjust=False)
+    assert sorted(resultat["ticker"]) == tickers
+    assert list(resultat["rang"]) == [1, 2, 3, 4]
+    assert (resultat["date"] == pd.Timestamp("2024-06-14").date()).all()
+    assert resultat["change_5"].is_monotonic_decreasing
+    assert len(screener.screen(tickers, ["close < 0"], as_of="2024-06-14", adjust=False)) == 0
@@ -0,0 +1,88 @@
+"""Service de valorisation : calculs partagés et ETag cohérent avec le corps servi"""
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from stock_analysis.server import SharedResults, ValuationService
+
+
+def test_requetes_simultanees_un_seul_calcul():
+    partage = SharedResults()
+    appels, depart = [], threading.Event()
+
+    def calcul():
+        appels.append(1)
+        time.sleep(0.05)
+        return 42
+
+    resultats = []
+
+    def client():
+        depart.wait()
+        resultats.append(partage.get("cle", calcul))
+
+    clients = [threading.Thread(target=client) for _ in range(20)]
+    for c in clients:
+        c.start()
+    depart.set()
+    for c in clients:
+        c.join()
+    assert len(appels) == 1
+    assert [r for r, _ in resultats] == [42] * 20
+    assert {o for _, o in resultats} <= {"calcul", "partage", "memoire"}
+    assert partage.get("cle", calcul) == (42, "memoire")
+
+
+def test_echec_non_memorise_et_eviction():
+    partage = SharedResults(max_entries=2)
+    with pytest.raises(RuntimeError):
+        partage.get("a", lambda: (_ for _ in ()).throw(RuntimeError("réseau")))
+    assert partage.get("a", lambda: 1) == (1, "calcul")
+    partage.get("b", lambda: 2)
+    partage.get("c", lambda: 3)
+    # "a", le moins récemment demandé, est sorti
+    assert partage.get("a", lambda: 10) == (10, "calcul")
+
+
+def _service():
+    """Service sans chargement de cours : une position, deux clôtures"""
+    service = object.__new__(ValuationService)
+    service.achats = pd.DataFrame([{"ticker": "AAA", "date_achat": "2024-03-04", "montant": 1000.0}])
+    service.trades = pd.DataFrame(columns=["ticker", "date_achat", "date_vente", "montant"])
+    service._resultats = SharedResults()
+    table = pd.DataFrame({"ticker": ["AAA", "AAA"], "date": pd.to_datetime(["2024-03-04", "2024-03-05"]),
+                          "prix": [100.0, 110.0]})
+    service._etat = (1, table, None)
+    return service, table
+
+
+def test_etag_de_la_version_calculee():
+    service, table = _service()
+    get = service._resultats.get
+
+    def rafraichi_pendant_la_requete(cle, fn):
+        # Un rafraîchissement publie la version 2 entre la lecture de l'état et le calcul
+        if service._etat[0] == 1:
+            service._etat = (2, table.assign(prix=table["prix"] * 2), None)
+        return get(cle, fn)
+
+    service._resultats.get = rafraichi_pendant_la_requete
+    statut, _, corps, etag = service.response("/unrealized", {"date": "2024-03-05"})
+    corps = json.loads(corps)
+    assert statut == 200
+    assert etag.startswith(f'"{corps["version"]}-')
+    assert corps["version"] == 1
+    assert corps["totaux"]["valeur"] == pytest.approx(1100.0)
+
+
+def test_routes_et_erreurs():
+    service, _ = _service()
+    assert service.response("/inconnue", {})[0] == 404
+    assert service.response("/unrealized", {"date": "hier"})[0] == 400
+    _, _, corps, etag = service.response("/tickers", {"date": "2024-03-05"})
+    assert json.loads(corps)["tickers"][0]["ticker"] == "AAA"
+    # Même version, même requête : même ETag, corps mémorisé
+    assert service.response("/tickers", {"date": "2024-03-05"})[3] == etag
@@ -0,0 +1,65 @@
+"""Calendrier NYSE : jours fériés, fermetures exceptionnelles, demi-séances et recherches vectorisées"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.sessions import TradingCalendar, get_calendar
+
+
+@pytest.fixture(scope="module")
+def nyse():
+    return get_calendar()
+
+
+@pytest.mark.parametrize("jour", [
+    "2024-03-29",  # Vendredi saint
+    "2024-06-19",  # Juneteenth
+    "2021-07-05",  # 4 juillet tombé un dimanche, reporté au lundi
+    "2022-12-26",  # Noël tombé un dimanche
+    "2024-11-28",  # Thanksgiving
+    "2025-01-09",  # Fermeture exceptionnelle (deuil national)
+    "2012-10-29",  # Ouragan Sandy
+])
+def test_jours_fermes(nyse, jour):
+    assert not nyse.is_session(jour)
+
+
+def test_premier_janvier_un_samedi_non_reporte(nyse):
+    assert nyse.is_session("2021-12-31")
+    assert nyse.is_session("2021-06-18")  # Juneteenth seulement depuis 2022
+
+
+def test_demi_seances(nyse):
+    jours = pd.DatetimeIndex(["2024-07-03", "2024-11-29", "2024-12-24", "2024-12-23"])
+    _, clotures = nyse.session_bounds(jours)
+    assert list(clotures.hour) == [13, 13, 13, 16]
+    ouverture, cloture = nyse.session_bounds(pd.Timestamp("2024-03-11"))
+    # Heure d'été : 9h30-16h à New York
+    assert (ouverture, cloture) == (pd.Timestamp("2024-03-11 09:30", tz="America/New_York"),
+                                    pd.Timestamp("2024-03-11 16:00", tz="America/New_York"))
+
+
+def test_seance_suivante_et_precedente(nyse):
+    dates = pd.DatetimeIndex(["2024-03-28", "2024-03-29", "2024-03-30", "2024-04-01"])
+    assert list(nyse.next_session(dates).strftime("%Y-%m-%d")) == ["2024-03-28", "2024-04-01", "2024-04-01", "2024-04-01"]
+    assert list(nyse.previous_session(dates).strftime("%Y-%m-%d")) == ["2024-03-28", "2024-03-28", "2024-03-28", "2024-04-01"]
+    assert nyse.next_session("2024-11-28") == pd.Timestamp("2024-11-29")
+
+
+def test_hors_calendrier_nat():
+    calendrier = TradingCalendar(start="2024-01-01", end="2024-01-31")
+    assert pd.isna(calendrier.next_session("2024-02-15"))
+    assert pd.isna(calendrier.previous_session("2023-12-15"))
+
+
+def test_identique_a_une_recherche_jour_par_jour(nyse):
+    # Référence : avancer jour par jour jusqu'à une séance
+    seances = set(nyse.sessions_in_range("2023-01-01", "2025-01-10").strftime("%Y-%m-%d"))
+    dates = pd.date_range("2023-01-01", "2024-12-31")
+    attendu = []
+    for d in dates:
+        while d.strftime("%Y-%m-%d") not in seances:
+            d += pd.Timedelta(days=1)
+        attendu.append(d)
+    np.testing.assert_array_equal(nyse.next_session(dates), pd.DatetimeIndex(attendu))
+    assert len(nyse.sessions_in_range("2024-01-01", "2025-01-01")) == 252
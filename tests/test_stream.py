@@ -0,0 +1,75 @@
+"""Traitement en flux : mêmes résultats par morceaux bornés qu'en un seul calcul"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis import corporate, pnl, stream
+from stock_analysis.panel import PricePanel
+from stock_analysis.sessions import get_calendar
+
+TICKERS = ["AAA", "BBB", "CCC", "DDD"]
+
+
+class _SansEvenements:
+    def lookup(self, tickers, background=True):
+        return {t: pd.DataFrame(columns=["date", "dividende", "fractionnement", "facteur_dividende"]) for t in tickers}
+
+
+@pytest.fixture
+def panel(monkeypatch):
+    rng = np.random.default_rng(5)
+    index = get_calendar().sessions_in_range("2024-01-02", "2024-06-01").tz_localize("America/New_York")
+    frames = {t: pd.DataFrame({"Close": 50 * np.exp(np.cumsum(rng.normal(0, 0.02, len(index))))}, index=index)
+              for t in TICKERS}
+    complet = PricePanel(frames)
+    chargements = []
+
+    def load_panel(tickers, start, end, interval="1d"):
+        chargements.append(sorted(tickers))
+        return PricePanel({t: complet.frames[t] for t in tickers})
+
+    monkeypatch.setattr(stream, "load_panel", load_panel)
+    monkeypatch.setattr(corporate, "get_corporate_store", lambda: _SansEvenements())
+    complet.chargements = chargements
+    return complet
+
+
+@pytest.fixture
+def fichier(tmp_path):
+    rng = np.random.default_rng(9)
+    achats = pd.Timestamp("2024-01-02") + pd.to_timedelta(rng.integers(0, 100, 53), unit="D")
+    trades = pd.DataFrame({
+        "ticker": rng.choice(TICKERS, 53),
+        "achat": achats.strftime("%Y-%m-%d"),
+        "vente": (achats + pd.to_timedelta(rng.integers(0, 30, 53), unit="D")).strftime("%Y-%m-%d"),
+        "montant": rng.choice([250.0, 1000.0], 53),
+    })
+    chemin = tmp_path / "trades.csv"
+    trades.to_csv(chemin, index=False)
+    return str(chemin), trades.rename(columns=stream.ALIAS)
+
+
+def test_morceaux_identiques_au_calcul_global(panel, fichier, tmp_path):
+    chemin, trades = fichier
+    sortie = str(tmp_path / "resultats.csv")
+    totaux = stream.stream_pnl(chemin, "realized", chunksize=10, output=sortie)
+    # 53 lignes par morceaux de 10 : 6 préchargements
+    assert len(panel.chargements) == 6
+
+    attendu = pnl.compute_realized(trades.sort_values(["ticker", "date_achat"], kind="stable"), pnl.price_table(panel))
+    lignes = pd.read_csv(sortie)
+    assert len(lignes) == 53
+    assert lignes["gain"].sum() == pytest.approx(attendu["gain"].sum())
+    assert totaux.portfolio_totals() == pytest.approx(pnl.portfolio_totals(attendu, "valeur_vente"))
+    pd.testing.assert_frame_equal(totaux.ticker_totals().sort_index(),
+                                  pnl.ticker_totals(attendu, "valeur_vente").sort_index(), check_dtype=False)
+    # Numérotation continue d'un morceau à l'autre
+    for _, positions in lignes.groupby("ticker")["position"]:
+        assert sorted(positions) == list(range(1, len(positions) + 1))
+
+
+def test_latent_exige_une_date(panel, fichier):
+    with pytest.raises(ValueError, match="date_evaluation"):
+        stream.stream_pnl(fichier[0], "unrealized")
+    with pytest.raises(ValueError, match="Mode inconnu"):
+        stream.process_chunk(fichier[1], "intraday")
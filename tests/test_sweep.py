@@ -0,0 +1,81 @@
+"""Balayage : cours intraday par ticker, évaluation d'une combinaison et sorties invalides"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_analysis.panel import PricePanel
+from stock_analysis.sweep import MarketArrays, encode_positions, evaluate, run_sweep
+
+SEANCES = pd.to_datetime(["2024-03-04", "2024-03-05", "2024-03-06"])
+
+
+def _quotidien(ouvertures, clotures):
+    hist = pd.DataFrame({"Open": ouvertures, "Close": clotures}, index=SEANCES)
+    hist.attrs.update(debut=date(2024, 3, 4), fin=date(2024, 3, 7))
+    return hist
+
+
+def _intraday(decalage_minutes, clotures):
+    """Barres à l'ouverture et 2 h après, décalées de `decalage_minutes`"""
+    horodatages = [jour + pd.Timedelta(hours=h, minutes=30 + decalage_minutes)
+                   for jour in SEANCES for h in (9, 11)]
+    index = pd.DatetimeIndex(horodatages).tz_localize("America/New_York")
+    hist = pd.DataFrame({"Close": clotures}, index=index)
+    hist.attrs.update(debut=date(2024, 3, 4), fin=date(2024, 3, 7))
+    return hist
+
+
+@pytest.fixture
+def marche():
+    quotidien = PricePanel({
+        "AAA": _quotidien([100.0, 110.0, 120.0], [105.0, 115.0, 125.0]),
+        "BBB": _quotidien([50.0, 55.0, 60.0], [52.0, 57.0, 62.0]),
+    })
+    # BBB n'a aucune barre aux horodatages de AAA : une grille commune lui donnerait NaN
+    intraday = PricePanel({
+        "AAA": _intraday(0, [100.0, 102.0, 110.0, 112.0, 120.0, 122.0]),
+        "BBB": _intraday(1, [50.0, 51.0, 55.0, 56.0, 60.0, 61.0]),
+    }, interval="5m")
+    return MarketArrays.from_panels(["AAA", "BBB"], quotidien, intraday, date(2024, 3, 4), date(2024, 3, 7))
+
+
+def _positions(marche):
+    return encode_positions([
+        {"ticker": "AAA", "date_achat": "2024-03-04", "montant": 1000.0},
+        {"ticker": "BBB", "date_achat": "2024-03-04", "montant": 1000.0},
+    ], marche)
+
+
+def test_barre_la_plus_proche_de_chaque_ticker(marche):
+    ligne = evaluate(marche.arrays(), _positions(marche), 2.0, 1, "h2")
+    assert ligne["positions"] == 2
+    # AAA : 102 -> 112 ; BBB : 51 -> 56, lues sur ses propres barres (11h31)
+    attendu = (1000 * (112 / 102 - 1) + 1000 * (56 / 51 - 1)) / 2000 * 100
+    assert ligne["rendement"] == pytest.approx(attendu)
+
+
+def test_sortie_a_la_cloture(marche):
+    ligne = evaluate(marche.arrays(), _positions(marche), 0.0, 2, "close")
+    assert ligne["gain"] == pytest.approx(1000 * (125 / 100 - 1) + 1000 * (62 / 50 - 1))
+    assert ligne["taux_reussite"] == 100.0
+
+
+def test_sorties_impossibles_le_jour_meme(marche):
+    donnees, positions = marche.arrays(), _positions(marche)
+    assert evaluate(donnees, positions, 2.0, 0, "open")["positions"] == 0
+    assert evaluate(donnees, positions, 2.0, 0, "h2")["positions"] == 0
+    assert evaluate(donnees, positions, 0.0, 0, "h2")["positions"] == 2
+
+
+def test_sortie_hors_calendrier(marche):
+    assert np.isnan(evaluate(marche.arrays(), _positions(marche), 0.0, 5, "close")["rendement"])
+
+
+def test_run_sweep_classe_par_rendement(marche):
+    resultats = run_sweep(marche, _positions(marche), [0.0, 2.0], [1, 2], ["close", "open"], workers=1)
+    assert len(resultats) == 8
+    assert resultats["rendement"].is_monotonic_decreasing
+    with pytest.raises(ValueError):
+        run_sweep(marche, _positions(marche), [0.0], [1], ["midi"], workers=1)